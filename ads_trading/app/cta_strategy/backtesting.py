@@ -1,13 +1,14 @@
-from collections import defaultdict
 from datetime import date, datetime, timedelta
 from typing import Callable
-from itertools import product
-from functools import lru_cache
+from itertools import chain, product
+from functools import lru_cache, partial
+from threading import Event
 from time import time
 import multiprocessing
+from multiprocessing.pool import Pool
 import random
 import traceback
-from typing import Type, Dict, List
+from typing import Any, Type, Dict, Iterator, List, Tuple
 import numpy as np
 from pandas import DataFrame
 import plotly.graph_objects as go
@@ -21,7 +22,11 @@ from howtrader.trader.object import OrderData, TradeData, BarData, TickData
 from howtrader.trader.utility import round_to
 from decimal import Decimal
 
+from ads_trading.trader.columnar import BarArray, BarCache, TradeLedger
+from ads_trading.trader.statistics import DailyStatistics
+
 database: BaseDatabase = get_database()
+bar_cache: BarCache = BarCache(database)
 
 from .base import (
     BacktestingMode,
@@ -29,6 +34,7 @@ from .base import (
     STOPORDER_PREFIX,
     StopOrder,
     StopOrderStatus,
+    SortedOrderBook,
     INTERVAL_DELTA_MAP
 )
 from .template import CtaTemplate
@@ -134,6 +140,13 @@ class BacktestingEngine:
         self.callback: Callable = None
         self.history_data: list = []
 
+        self.columnar: bool = False
+        self.bar_array: BarArray = None
+        self.bar_needed: bool = True
+        self.limit_book: SortedOrderBook = SortedOrderBook()
+        self.stop_book: SortedOrderBook = SortedOrderBook()
+        self.submitting_orders: List[Tuple[int, OrderData]] = []
+
         self.stop_order_count: int = 0
         self.stop_orders: Dict[str, StopOrder] = {}
         self.active_stop_orders: Dict[str, StopOrder] = {}
@@ -150,6 +163,11 @@ class BacktestingEngine:
         self.daily_results: Dict[date, DailyResult] = {}
         self.daily_df: DataFrame = None
 
+        # Traceback of strategy exception which stopped backtesting
+        self.error: str = ""
+
+        self.optimization_cancelled: Event = Event()
+
     def clear_data(self) -> None:
         """
         Clear all data of last backtesting.
@@ -167,11 +185,18 @@ class BacktestingEngine:
         self.limit_orders.clear()
         self.active_limit_orders.clear()
 
+        self.limit_book = SortedOrderBook()
+        self.stop_book = SortedOrderBook()
+        self.submitting_orders = []
+
         self.trade_count = 0
         self.trades.clear()
 
         self.logs.clear()
         self.daily_results.clear()
+        self.daily_df = None
+
+        self.error = ""
 
     def set_parameters(
         self,
@@ -186,9 +211,15 @@ class BacktestingEngine:
         end: datetime = None,
         mode: BacktestingMode = BacktestingMode.BAR,
         inverse: bool = False,
-        annual_days: int = 365
+        annual_days: int = 365,
+        columnar: bool = False,
+        stream: bool = False
     ):
-        """"""
+        """
+        columnar: run bar mode backtesting on NumPy arrays instead of BarData list.
+        stream: query history data from database in chunks during backtesting
+        instead of loading the whole history into memory.
+        """
         self.mode = mode
         self.vt_symbol = vt_symbol
         self.interval = interval
@@ -206,6 +237,8 @@ class BacktestingEngine:
         self.mode = mode
         self.inverse = inverse
         self.annual_days = annual_days
+        self.columnar = columnar
+        self.stream = stream
 
     def add_strategy(self, strategy_class: Type[CtaTemplate], setting: dict) -> None:
         """"""
@@ -227,6 +260,23 @@ class BacktestingEngine:
 
         self.history_data.clear()       # Clear previously loaded history data
 
+        # Map bar arrays from cache file for columnar backtesting
+        if self.columnar and self.mode == BacktestingMode.BAR:
+            self.bar_array = load_bar_array(
+                self.symbol,
+                self.exchange,
+                self.interval,
+                self.start,
+                self.end
+            )
+            self.output(f"loading data finished, total counts：{len(self.bar_array)}")
+            return
+
+        # History data is queried in chunks while running backtesting
+        if self.stream:
+            self.output("loading data skipped, history data will be streamed from database")
+            return
+
         # Load 30 days of data each time and allow for progress update
         progress_delta = timedelta(days=30)
         total_delta = self.end - self.start
@@ -269,6 +319,10 @@ class BacktestingEngine:
 
     def run_backtesting(self) -> None:
         """"""
+        if self.columnar and self.mode == BacktestingMode.BAR:
+            self.run_columnar_backtesting()
+            return
+
         if self.mode == BacktestingMode.BAR:
             func = self.new_bar
         else:
@@ -276,11 +330,16 @@ class BacktestingEngine:
 
         self.strategy.on_init()
 
+        if self.stream:
+            history: Iterator = self.iter_history_data()
+        else:
+            history: Iterator = iter(self.history_data)
+
         # Use the first [days] of history data for initializing strategy
         day_count: int = 0
-        ix: int = 0
+        data: Any = None
 
-        for ix, data in enumerate(self.history_data):
+        for data in history:
             if self.datetime and data.datetime.day != self.datetime.day:
                 day_count += 1
                 if day_count >= self.days:
@@ -291,8 +350,9 @@ class BacktestingEngine:
             try:
                 self.callback(data)
             except Exception:
+                self.error = traceback.format_exc()
                 self.output("raise exception, stop backtesting")
-                self.output(traceback.format_exc())
+                self.output(self.error)
                 return
 
         self.strategy.inited = True
@@ -302,13 +362,111 @@ class BacktestingEngine:
         self.strategy.trading = True
         self.output("start backtesting")
 
-        # Use the rest of history data for running backtesting
-        for data in self.history_data[ix:]:
+        # Use the rest of history data for running backtesting, which starts
+        # from the last data used above (same as slicing history data list)
+        if data is not None:
+            history = chain([data], history)
+
+        for data in history:
             try:
                 func(data)
             except Exception:
+                self.error = traceback.format_exc()
                 self.output("raise exception, stop backtesting")
-                self.output(traceback.format_exc())
+                self.output(self.error)
+                return
+
+        self.strategy.on_stop()
+        self.output("finish backtesting")
+
+    def iter_history_data(self) -> Iterator:
+        """
+        Query history data from database in chunks.
+        """
+        # Database connectors of howtrader can not query in chunks,
+        # load the whole range at once instead.
+        if not hasattr(database, "iter_bar_data"):
+            if self.mode == BacktestingMode.BAR:
+                data: list = database.load_bar_data(
+                    self.symbol,
+                    self.exchange,
+                    self.interval,
+                    self.start,
+                    self.end
+                )
+            else:
+                data: list = database.load_tick_data(
+                    self.symbol,
+                    self.exchange,
+                    self.start,
+                    self.end
+                )
+            return iter(sorted(data, key=lambda d: d.datetime))
+
+        if self.mode == BacktestingMode.BAR:
+            return database.iter_bar_data(
+                self.symbol,
+                self.exchange,
+                self.interval,
+                self.start,
+                self.end
+            )
+        else:
+            return database.iter_tick_data(
+                self.symbol,
+                self.exchange,
+                self.start,
+                self.end
+            )
+
+    def run_columnar_backtesting(self) -> None:
+        """
+        Run bar mode backtesting on bar array. BarData objects are only
+        created for the strategy callbacks that need them.
+        """
+        # Only strategy with on_bar implemented needs bar data during trading
+        self.bar_needed = type(self.strategy).on_bar is not CtaTemplate.on_bar
+
+        self.strategy.on_init()
+
+        # Use the first [days] of history data for initializing strategy
+        day_count: int = 0
+        ix: int = 0
+        total: int = len(self.bar_array)
+
+        for ix in range(total):
+            dt: datetime = self.bar_array.get_datetime(ix)
+
+            if self.datetime and dt.day != self.datetime.day:
+                day_count += 1
+                if day_count >= self.days:
+                    break
+
+            self.datetime = dt
+
+            try:
+                self.callback(self.bar_array.get_bar(ix))
+            except Exception:
+                self.error = traceback.format_exc()
+                self.output("raise exception, stop backtesting")
+                self.output(self.error)
+                return
+
+        self.strategy.inited = True
+        self.output("initialize strategy")
+
+        self.strategy.on_start()
+        self.strategy.trading = True
+        self.output("start backtesting")
+
+        # Use the rest of history data for running backtesting
+        for ix in range(ix, total):
+            try:
+                self.new_bar_columnar(ix)
+            except Exception:
+                self.error = traceback.format_exc()
+                self.output("raise exception, stop backtesting")
+                self.output(self.error)
                 return
 
         self.strategy.on_stop()
@@ -322,35 +480,48 @@ class BacktestingEngine:
             self.output("there is no trades，can't calculate")
             return
 
-        # Add trade data into daily reuslt.
-        for trade in self.trades.values():
-            d: date = trade.datetime.date()
-            daily_result: DailyResult = self.daily_results[d]
-            daily_result.add_trade(trade)
-
-        # Calculate daily result by iteration.
-        pre_close = 0
-        start_pos = 0
-
-        for daily_result in self.daily_results.values():
-            daily_result.calculate_pnl(
-                pre_close,
-                start_pos,
-                self.size,
-                self.rate,
-                self.slippage,
-                self.inverse
-            )
+        # Calculate daily result with columnar trade ledger.
+        trades: List[TradeData] = list(self.trades.values())
+        ledger: TradeLedger = TradeLedger.from_trades(trades, [self.vt_symbol])
+
+        daily_results: List[DailyResult] = list(self.daily_results.values())
+        dates: np.ndarray = np.array([r.date for r in daily_results], dtype="datetime64[D]")
+        close: np.ndarray = np.array([[r.close_price] for r in daily_results], dtype="f8")
+
+        pnl: Dict[str, np.ndarray] = ledger.calculate_pnl(
+            dates,
+            close,
+            [self.size],
+            [self.rate],
+            [self.slippage],
+            self.inverse
+        )
+
+        # Split trades by date, which are sorted by datetime
+        trade_ends: np.ndarray = np.cumsum(pnl["trade_count"][:, 0])
+        trade_starts: np.ndarray = trade_ends - pnl["trade_count"][:, 0]
 
-            pre_close = daily_result.close_price
-            start_pos = daily_result.end_pos
+        # Generate dataframe with the same columns as daily result
+        results: dict = {
+            "date": [r.date for r in daily_results],
+            "close_price": close[:, 0],
+            "pre_close": pnl["pre_close"][:, 0],
+            "trades": [trades[i:j] for i, j in zip(trade_starts.tolist(), trade_ends.tolist())],
+        }
 
-        # Generate dataframe
-        results = defaultdict(list)
+        fields: list = [
+            "pre_close", "trade_count", "start_pos", "end_pos", "turnover",
+            "commission", "slippage", "trading_pnl", "holding_pnl",
+            "total_pnl", "net_pnl"
+        ]
+        for key in fields[1:]:
+            results[key] = pnl[key][:, 0]
 
-        for daily_result in self.daily_results.values():
-            for key, value in daily_result.__dict__.items():
-                results[key].append(value)
+        # Keep daily result objects in sync with dataframe
+        for i, daily_result in enumerate(daily_results):
+            daily_result.trades = results["trades"][i]
+            for key in fields:
+                setattr(daily_result, key, results[key][i].item())
 
         self.daily_df = DataFrame.from_dict(results).set_index("date")
 
@@ -394,61 +565,50 @@ class BacktestingEngine:
             sharpe_ratio: float = 0
             return_drawdown_ratio: float = 0
         else:
-            # Calculate balance related time series data
-            df["balance"] = df["net_pnl"].cumsum() + self.capital
-            df["return"] = np.log(df["balance"] / df["balance"].shift(1)).fillna(0)
-            df["highlevel"] = (
-                df["balance"].rolling(
-                    min_periods=1, window=len(df), center=False).max()
-            )
-            df["drawdown"] = df["balance"] - df["highlevel"]
-            df["ddpercent"] = df["drawdown"] / df["highlevel"] * 100
+            daily_statistics: DailyStatistics = self.get_daily_statistics(df)
 
-            # Calculate statistics value
-            start_date = df.index[0]
-            end_date = df.index[-1]
+            # Balance related time series data is only needed for output
+            if output:
+                df["balance"] = daily_statistics.balance
+                df["return"] = daily_statistics.returns
+                df["highlevel"] = daily_statistics.highlevel
+                df["drawdown"] = daily_statistics.drawdown
+                df["ddpercent"] = daily_statistics.ddpercent
 
-            total_days: int = len(df)
-            profit_days: int = len(df[df["net_pnl"] > 0])
-            loss_days: int = len(df[df["net_pnl"] < 0])
-
-            end_balance = df["balance"].iloc[-1]
-            max_drawdown = df["drawdown"].min()
-            max_ddpercent = df["ddpercent"].min()
-            max_drawdown_end = df["drawdown"].idxmin()
-
-            if isinstance(max_drawdown_end, date):
-                max_drawdown_start = df["balance"][:max_drawdown_end].idxmax()
-                max_drawdown_duration = (max_drawdown_end - max_drawdown_start).days
-            else:
-                max_drawdown_duration = 0
+            # Calculate statistics value
+            start_date = daily_statistics.start_date
+            end_date = daily_statistics.end_date
 
-            total_net_pnl = df["net_pnl"].sum()
-            daily_net_pnl = total_net_pnl / total_days
+            total_days: int = daily_statistics.total_days
+            profit_days: int = daily_statistics.profit_days
+            loss_days: int = daily_statistics.loss_days
 
-            total_commission = df["commission"].sum()
-            daily_commission = total_commission / total_days
+            end_balance = daily_statistics.end_balance
+            max_drawdown = daily_statistics.max_drawdown
+            max_ddpercent = daily_statistics.max_ddpercent
+            max_drawdown_duration = daily_statistics.max_drawdown_duration
 
-            total_slippage = df["slippage"].sum()
-            daily_slippage = total_slippage / total_days
+            total_net_pnl = daily_statistics.total_net_pnl
+            daily_net_pnl = daily_statistics.daily_net_pnl
 
-            total_turnover = df["turnover"].sum()
-            daily_turnover = total_turnover / total_days
+            total_commission = daily_statistics.total_commission
+            daily_commission = daily_statistics.daily_commission
 
-            total_trade_count = df["trade_count"].sum()
-            daily_trade_count = total_trade_count / total_days
+            total_slippage = daily_statistics.total_slippage
+            daily_slippage = daily_statistics.daily_slippage
 
-            total_return = (end_balance / self.capital - 1) * 100
-            annual_return = total_return / total_days * self.annual_days
-            daily_return = df["return"].mean() * 100
-            return_std = df["return"].std() * 100
+            total_turnover = daily_statistics.total_turnover
+            daily_turnover = daily_statistics.daily_turnover
 
-            if return_std:
-                sharpe_ratio = daily_return / return_std * np.sqrt(365)
-            else:
-                sharpe_ratio = 0
+            total_trade_count = daily_statistics.total_trade_count
+            daily_trade_count = daily_statistics.daily_trade_count
 
-            return_drawdown_ratio = -total_return / max_ddpercent
+            total_return = daily_statistics.total_return
+            annual_return = daily_statistics.annual_return
+            daily_return = daily_statistics.daily_return
+            return_std = daily_statistics.return_std
+            sharpe_ratio = daily_statistics.sharpe_ratio
+            return_drawdown_ratio = daily_statistics.return_drawdown_ratio
 
         # Output
         if output:
@@ -524,6 +684,38 @@ class BacktestingEngine:
         self.output("finish calculating strategy's performance")
         return statistics
 
+    def get_daily_statistics(self, df: DataFrame) -> DailyStatistics:
+        """
+        Create statistics kernel from arrays of daily result DataFrame.
+        """
+        return DailyStatistics(
+            df.index.values,
+            df["net_pnl"].values,
+            df["commission"].values,
+            df["slippage"].values,
+            df["turnover"].values,
+            df["trade_count"].values,
+            capital=self.capital,
+            annual_days=self.annual_days,
+            sharpe_days=365
+        )
+
+    def calculate_target(self, target_name: str, df: DataFrame = None) -> float:
+        """
+        Calculate value of target statistic only, used in optimization.
+        """
+        if df is None:
+            df = self.daily_df
+
+        if df is None:
+            return 0
+
+        value = self.get_daily_statistics(df).get(target_name)
+
+        if value in (np.inf, -np.inf):
+            value = 0
+        return np.nan_to_num(value)
+
     def show_chart(self, df: DataFrame = None):
         """"""
         # Check DataFrame input exterior
@@ -534,6 +726,12 @@ class BacktestingEngine:
         if df is None:
             return
 
+        # Balance columns are not added if statistics calculated without output
+        if "balance" not in df:
+            daily_statistics: DailyStatistics = self.get_daily_statistics(df)
+            df["balance"] = daily_statistics.balance
+            df["drawdown"] = daily_statistics.drawdown
+
         fig = make_subplots(
             rows=4,
             cols=1,
@@ -566,7 +764,13 @@ class BacktestingEngine:
         fig.update_layout(height=1000, width=1000)
         fig.show()
 
-    def run_optimization(self, optimization_setting: OptimizationSetting, output=True):
+    def run_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        output=True,
+        max_workers: int = 0,
+        chunk_size: int = 0
+    ):
         """
         target name: end_balance, max_drawdown, max_ddpercent, max_drawdown_duration, total_net_pnl
         daily_net_pnl, total_commission, daily_commission, total_slippage, daily_slippage, total_turnover, daily_turnover
@@ -584,36 +788,18 @@ class BacktestingEngine:
             self.output("optimized target is not set, please check your target name")
             return
 
-        # Use multiprocessing pool for running backtesting with different setting
-        # Force to use spawn method to create new process (instead of fork on Linux)
-        ctx = multiprocessing.get_context("spawn")
-        pool = ctx.Pool(multiprocessing.cpu_count())
+        # Each worker process loads history data once and receives settings in chunks
+        self.optimization_cancelled.clear()
 
-        results = []
-        for setting in settings:
-            result = (pool.apply_async(optimize, (
-                target_name,
-                self.strategy_class,
-                setting,
-                self.vt_symbol,
-                self.interval,
-                self.start,
-                self.rate,
-                self.slippage,
-                self.size,
-                self.pricetick,
-                self.capital,
-                self.end,
-                self.mode,
-                self.inverse
-            )))
-            results.append(result)
-
-        pool.close()
-        pool.join()
+        executor: OptimizationExecutor = OptimizationExecutor(self, target_name, max_workers, chunk_size)
+        executor.start(len(settings))
+
+        try:
+            result_values = executor.run(settings, statistics=True)
+        finally:
+            executor.close()
 
         # Sort results and output
-        result_values = [result.get() for result in results]
         result_values.sort(reverse=True, key=lambda result: result[1])
 
         if output:
@@ -623,7 +809,14 @@ class BacktestingEngine:
 
         return result_values
 
-    def run_ga_optimization(self, optimization_setting: OptimizationSetting, population_size=100, ngen_size=30, output=True) -> list:
+    def run_ga_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        population_size=100,
+        ngen_size=30,
+        output=True,
+        max_workers: int = 0
+    ) -> list:
         """
         target name: end_balance, max_drawdown, max_ddpercent, max_drawdown_duration, total_net_pnl
         daily_net_pnl, total_commission, daily_commission, total_slippage, daily_slippage, total_turnover, daily_turnover
@@ -655,46 +848,6 @@ class BacktestingEngine:
                     individual[i] = paramlist[i]
             return individual,
 
-        # Create ga object function
-        global ga_target_name
-        global ga_strategy_class
-        global ga_setting
-        global ga_vt_symbol
-        global ga_interval
-        global ga_start
-        global ga_rate
-        global ga_slippage
-        global ga_size
-        global ga_pricetick
-        global ga_capital
-        global ga_end
-        global ga_mode
-        global ga_inverse
-
-        ga_target_name = target_name
-        ga_strategy_class = self.strategy_class
-        ga_setting = settings[0]
-        ga_vt_symbol = self.vt_symbol
-        ga_interval = self.interval
-        ga_start = self.start
-        ga_rate = self.rate
-        ga_slippage = self.slippage
-        ga_size = self.size
-        ga_pricetick = self.pricetick
-        ga_capital = self.capital
-        ga_end = self.end
-        ga_mode = self.mode
-        ga_inverse = self.inverse
-
-        # Set up genetic algorithem
-        toolbox = base.Toolbox()
-        toolbox.register("individual", tools.initIterate, creator.Individual, generate_parameter)
-        toolbox.register("population", tools.initRepeat, list, toolbox.individual)
-        toolbox.register("mate", tools.cxTwoPoint)
-        toolbox.register("mutate", mutate_individual, indpb=1)
-        toolbox.register("evaluate", ga_optimize)
-        toolbox.register("select", tools.selNSGA2)
-
         total_size = len(settings)
         pop_size = population_size                      # number of individuals in each generation
         lambda_ = pop_size                              # number of children to produce at each generation
@@ -704,6 +857,22 @@ class BacktestingEngine:
         mutpb = 1 - cxpb    # probability that an offspring is produced by mutation
         ngen = ngen_size    # number of generation
 
+        # Evaluate individuals of each generation in worker processes
+        self.optimization_cancelled.clear()
+
+        executor: OptimizationExecutor = OptimizationExecutor(self, target_name, max_workers)
+        executor.start(min(total_size, pop_size + lambda_ * ngen))
+
+        # Set up genetic algorithem
+        toolbox = base.Toolbox()
+        toolbox.register("individual", tools.initIterate, creator.Individual, generate_parameter)
+        toolbox.register("population", tools.initRepeat, list, toolbox.individual)
+        toolbox.register("mate", tools.cxTwoPoint)
+        toolbox.register("mutate", mutate_individual, indpb=1)
+        toolbox.register("evaluate", executor.evaluate)
+        toolbox.register("map", executor.map)
+        toolbox.register("select", tools.selNSGA2)
+
         pop = toolbox.population(pop_size)
         hof = tools.ParetoFront()               # end result of pareto front
 
@@ -714,10 +883,6 @@ class BacktestingEngine:
         stats.register("min", np.min, axis=0)
         stats.register("max", np.max, axis=0)
 
-        # Multiprocessing is not supported yet.
-        # pool = multiprocessing.Pool(multiprocessing.cpu_count())
-        # toolbox.register("map", pool.map)
-
         # Run ga optimization
         self.output(f"total size：{total_size}")
         self.output(f"population size：{pop_size}")
@@ -728,17 +893,22 @@ class BacktestingEngine:
 
         start = time()
 
-        algorithms.eaMuPlusLambda(
-            pop,
-            toolbox,
-            mu,
-            lambda_,
-            cxpb,
-            mutpb,
-            ngen,
-            stats,
-            halloffame=hof
-        )
+        try:
+            algorithms.eaMuPlusLambda(
+                pop,
+                toolbox,
+                mu,
+                lambda_,
+                cxpb,
+                mutpb,
+                ngen,
+                stats,
+                halloffame=hof
+            )
+        except OptimizationCancelled:
+            self.output("optimization cancelled, return result of finished generations")
+        finally:
+            executor.close()
 
         end = time()
         cost = int((end - start))
@@ -750,11 +920,17 @@ class BacktestingEngine:
 
         for parameter_values in hof:
             setting = dict(parameter_values)
-            target_value = ga_optimize(parameter_values)[0]
+            target_value = executor.cache[tuple(parameter_values)][0]
             results.append((setting, target_value, {}))
 
         return results
 
+    def cancel_optimization(self) -> None:
+        """
+        Stop running optimization, results finished so far are returned.
+        """
+        self.optimization_cancelled.set()
+
     def update_daily_close(self, price: float):
         """"""
         d = self.datetime.date()
@@ -776,6 +952,37 @@ class BacktestingEngine:
 
         self.update_daily_close(bar.close_price)
 
+    def new_bar_columnar(self, ix: int) -> None:
+        """"""
+        if self.bar_needed:
+            bar: BarData = self.bar_array.get_bar(ix)
+            self.bar = bar
+            self.datetime = bar.datetime
+
+            open_price: float = bar.open_price
+            high_price: float = bar.high_price
+            low_price: float = bar.low_price
+        else:
+            bar: BarData = None
+            self.datetime = self.bar_array.get_datetime(ix)
+
+            row: tuple = self.bar_array.data[ix].tolist()
+            open_price, high_price, low_price = row[1:4]
+
+        if self.active_limit_orders:
+            self.cross_limit_order_columnar(open_price, high_price, low_price)
+        else:
+            self.submitting_orders = []
+
+        if self.active_stop_orders:
+            self.cross_stop_order_columnar(open_price, high_price, low_price)
+
+        if bar:
+            self.strategy.on_bar(bar)
+            self.update_daily_close(bar.close_price)
+        else:
+            self.update_daily_close(float(self.bar_array.close[ix]))
+
     def new_tick(self, tick: TickData):
         """"""
         self.tick = tick
@@ -815,40 +1022,105 @@ class BacktestingEngine:
             if not long_cross and not short_cross:
                 continue
 
-            # Push order udpate with status "all traded" (filled).
-            order.traded = order.volume
-            order.status = Status.ALLTRADED
-            self.strategy.on_order(order)
+            if long_cross:
+                best_price: Decimal = Decimal(str(long_best_price))
+            else:
+                best_price: Decimal = Decimal(str(short_best_price))
+
+            self.fill_limit_order(order, long_cross, best_price)
 
-            self.active_limit_orders.pop(order.vt_orderid)
+    def fill_limit_order(self, order: OrderData, long_cross: bool, best_price: Decimal) -> None:
+        """
+        Fill crossed limit order at best price.
+        """
+        # Push order udpate with status "all traded" (filled).
+        order.traded = order.volume
+        order.status = Status.ALLTRADED
+        self.strategy.on_order(order)
 
-            # Push trade update
-            self.trade_count += 1
+        self.active_limit_orders.pop(order.vt_orderid)
+        if self.columnar:
+            self.limit_book.remove(order.vt_orderid)
 
-            if long_cross:
-                trade_price = min(order.price, Decimal(str(long_best_price)))
-                pos_change = order.volume
-            else:
-                trade_price = max(order.price, Decimal(str(short_best_price)))
-                pos_change = -order.volume
-
-            trade = TradeData(
-                symbol=order.symbol,
-                exchange=order.exchange,
-                orderid=order.orderid,
-                tradeid=str(self.trade_count),
-                direction=order.direction,
-                offset=order.offset,
-                price=trade_price,
-                volume=order.volume,
-                datetime=self.datetime,
-                gateway_name=self.gateway_name,
-            )
+        # Push trade update
+        self.trade_count += 1
+
+        if long_cross:
+            trade_price = min(order.price, best_price)
+            pos_change = order.volume
+        else:
+            trade_price = max(order.price, best_price)
+            pos_change = -order.volume
+
+        trade = TradeData(
+            symbol=order.symbol,
+            exchange=order.exchange,
+            orderid=order.orderid,
+            tradeid=str(self.trade_count),
+            direction=order.direction,
+            offset=order.offset,
+            price=trade_price,
+            volume=order.volume,
+            datetime=self.datetime,
+            gateway_name=self.gateway_name,
+        )
+
+        self.strategy.pos += pos_change
+        self.strategy.on_trade(trade)
+
+        self.trades[trade.vt_tradeid] = trade
+
+    def cross_limit_order_columnar(
+        self,
+        open_price: float,
+        high_price: float,
+        low_price: float
+    ) -> None:
+        """
+        Cross limit order with bar prices, only visiting orders which are
+        crossed or waiting for "not traded" status update.
+        """
+        visit_orders: Dict[int, OrderData] = {}
+
+        for seq, order in self.submitting_orders:
+            if order.status == Status.SUBMITTING and order.vt_orderid in self.active_limit_orders:
+                visit_orders[seq] = order
+        self.submitting_orders = []
+
+        if low_price > 0:
+            for seq in self.limit_book.select(Direction.LONG, low_price, True):
+                visit_orders[seq] = self.limit_book.orders[seq]
 
-            self.strategy.pos += pos_change
-            self.strategy.on_trade(trade)
+        if high_price > 0:
+            for seq in self.limit_book.select(Direction.SHORT, high_price, False):
+                visit_orders[seq] = self.limit_book.orders[seq]
 
-            self.trades[trade.vt_tradeid] = trade
+        best_price: Decimal = None
+
+        # Keep the same callback sequence as sending order sequence
+        for seq in sorted(visit_orders):
+            order: OrderData = visit_orders[seq]
+
+            # Skip order cancelled by previous callback
+            if order.vt_orderid not in self.active_limit_orders:
+                continue
+
+            # Push order update with status "not traded" (pending).
+            if order.status == Status.SUBMITTING:
+                order.status = Status.NOTTRADED
+                self.strategy.on_order(order)
+
+            # Check whether limit orders can be filled.
+            long_cross = (Direction.LONG == order.direction and order.price >= low_price > 0)
+            short_cross = (Direction.SHORT == order.direction and order.price <= high_price and high_price > 0)
+
+            if not long_cross and not short_cross:
+                continue
+
+            if best_price is None:
+                best_price = Decimal(str(open_price))
+
+            self.fill_limit_order(order, long_cross, best_price)
 
     def cross_stop_order(self):
         """
@@ -880,63 +1152,100 @@ class BacktestingEngine:
             if not long_cross and not short_cross:
                 continue
 
-            # Create order data.
-            self.limit_order_count += 1
-
-            order: OrderData = OrderData(
-                symbol=self.symbol,
-                exchange=self.exchange,
-                orderid=str(self.limit_order_count),
-                direction=stop_order.direction,
-                offset=stop_order.offset,
-                price=stop_order.price,
-                volume=stop_order.volume,
-                traded=stop_order.volume,
-                status=Status.ALLTRADED,
-                gateway_name=self.gateway_name,
-                datetime=self.datetime
-            )
-
-            self.limit_orders[order.vt_orderid] = order
-
-            # Create trade data.
             if long_cross:
-                trade_price = max(stop_order.price, Decimal(str(long_best_price)))
-                pos_change = order.volume
+                best_price: Decimal = Decimal(str(long_best_price))
             else:
-                trade_price = min(stop_order.price, Decimal(str(short_best_price)))
-                pos_change = -order.volume
-
-            self.trade_count += 1
-
-            trade = TradeData(
-                symbol=order.symbol,
-                exchange=order.exchange,
-                orderid=order.orderid,
-                tradeid=str(self.trade_count),
-                direction=order.direction,
-                offset=order.offset,
-                price=trade_price,
-                volume=order.volume,
-                datetime=self.datetime,
-                gateway_name=self.gateway_name,
-            )
+                best_price: Decimal = Decimal(str(short_best_price))
+
+            self.trigger_stop_order(stop_order, long_cross, best_price)
+
+    def trigger_stop_order(self, stop_order: StopOrder, long_cross: bool, best_price: Decimal) -> None:
+        """
+        Trigger crossed stop order and fill it at best price.
+        """
+        # Create order data.
+        self.limit_order_count += 1
+
+        order: OrderData = OrderData(
+            symbol=self.symbol,
+            exchange=self.exchange,
+            orderid=str(self.limit_order_count),
+            direction=stop_order.direction,
+            offset=stop_order.offset,
+            price=stop_order.price,
+            volume=stop_order.volume,
+            traded=stop_order.volume,
+            status=Status.ALLTRADED,
+            gateway_name=self.gateway_name,
+            datetime=self.datetime
+        )
+
+        self.limit_orders[order.vt_orderid] = order
+
+        # Create trade data.
+        if long_cross:
+            trade_price = max(stop_order.price, best_price)
+            pos_change = order.volume
+        else:
+            trade_price = min(stop_order.price, best_price)
+            pos_change = -order.volume
+
+        self.trade_count += 1
+
+        trade = TradeData(
+            symbol=order.symbol,
+            exchange=order.exchange,
+            orderid=order.orderid,
+            tradeid=str(self.trade_count),
+            direction=order.direction,
+            offset=order.offset,
+            price=trade_price,
+            volume=order.volume,
+            datetime=self.datetime,
+            gateway_name=self.gateway_name,
+        )
+
+        self.trades[trade.vt_tradeid] = trade
+
+        # Update stop order.
+        stop_order.vt_orderids.append(order.vt_orderid)
+        stop_order.status = StopOrderStatus.TRIGGERED
+
+        if stop_order.stop_orderid in self.active_stop_orders:
+            self.active_stop_orders.pop(stop_order.stop_orderid)
 
-            self.trades[trade.vt_tradeid] = trade
+        if self.columnar:
+            self.stop_book.remove(stop_order.stop_orderid)
 
-            # Update stop order.
-            stop_order.vt_orderids.append(order.vt_orderid)
-            stop_order.status = StopOrderStatus.TRIGGERED
+        # Push update to strategy.
+        self.strategy.on_stop_order(stop_order)
+        self.strategy.on_order(order)
 
-            if stop_order.stop_orderid in self.active_stop_orders:
-                self.active_stop_orders.pop(stop_order.stop_orderid)
+        self.strategy.pos += pos_change
+        self.strategy.on_trade(trade)
 
-            # Push update to strategy.
-            self.strategy.on_stop_order(stop_order)
-            self.strategy.on_order(order)
+    def cross_stop_order_columnar(
+        self,
+        open_price: float,
+        high_price: float,
+        low_price: float
+    ) -> None:
+        """
+        Cross stop order with bar prices, only visiting triggered orders.
+        """
+        seqs: List[int] = (
+            self.stop_book.select(Direction.LONG, high_price, False)
+            + self.stop_book.select(Direction.SHORT, low_price, True)
+        )
+        if not seqs:
+            return
+
+        stop_orders: List[StopOrder] = [self.stop_book.orders[seq] for seq in sorted(seqs)]
+        best_price: Decimal = Decimal(str(open_price))
 
-            self.strategy.pos += pos_change
-            self.strategy.on_trade(trade)
+        for stop_order in stop_orders:
+            long_cross: bool = stop_order.direction == Direction.LONG
+            self.trigger_stop_order(stop_order, long_cross, best_price)
 
     def load_bar(
         self,
@@ -1001,6 +1310,9 @@ class BacktestingEngine:
         self.active_stop_orders[stop_order.stop_orderid] = stop_order
         self.stop_orders[stop_order.stop_orderid] = stop_order
 
+        if self.columnar:
+            self.stop_book.add(stop_order.stop_orderid, direction, price, stop_order)
+
         return stop_order.stop_orderid
 
     def send_limit_order(
@@ -1029,6 +1341,10 @@ class BacktestingEngine:
         self.active_limit_orders[order.vt_orderid] = order
         self.limit_orders[order.vt_orderid] = order
 
+        if self.columnar:
+            seq: int = self.limit_book.add(order.vt_orderid, direction, price, order)
+            self.submitting_orders.append((seq, order))
+
         return order.vt_orderid
 
     def cancel_order(self, strategy: CtaTemplate, vt_orderid: str) -> None:
@@ -1045,6 +1361,8 @@ class BacktestingEngine:
         if vt_orderid not in self.active_stop_orders:
             return None
         stop_order = self.active_stop_orders.pop(vt_orderid)
+        if self.columnar:
+            self.stop_book.remove(vt_orderid)
 
         stop_order.status = StopOrderStatus.CANCELLED
         self.strategy.on_stop_order(stop_order)
@@ -1054,6 +1372,8 @@ class BacktestingEngine:
         if vt_orderid not in self.active_limit_orders:
             return None
         order = self.active_limit_orders.pop(vt_orderid)
+        if self.columnar:
+            self.limit_book.remove(vt_orderid)
 
         order.status = Status.CANCELLED
         self.strategy.on_order(order)
@@ -1156,64 +1476,284 @@ class DailyResult:
         self.total_pnl = 0
         self.net_pnl = 0
 
-    def add_trade(self, trade: TradeData):
-        """"""
-        self.trades.append(trade)
 
-    def calculate_pnl(
+class OptimizationCancelled(Exception):
+    """
+    Raised to stop genetic algorithm when optimization is cancelled.
+    """
+    pass
+
+
+class OptimizationExecutor:
+    """
+    Process pool for running backtesting with different settings.
+
+    Each worker process loads history data once in pool initializer and then
+    reuses the same engine for every setting, which are sent in chunks to
+    keep IPC low.
+    """
+
+    def __init__(
         self,
-        pre_close: float,
-        start_pos: float,
-        size: float,
-        rate: float,
-        slippage: float,
-        inverse: bool
-    ):
+        engine: BacktestingEngine,
+        target_name: str,
+        max_workers: int = 0,
+        chunk_size: int = 0
+    ) -> None:
         """"""
-        # If no pre_close provided on the first day,
-        # use value 1 to avoid zero division error
-        if pre_close:
-            self.pre_close = pre_close
+        self.engine: BacktestingEngine = engine
+        self.target_name: str = target_name
+        self.max_workers: int = max_workers or multiprocessing.cpu_count()
+        self.chunk_size: int = chunk_size
+
+        self.pool: Pool = None
+        self.cache: Dict[tuple, tuple] = {}
+        self.failed: List[str] = []
+
+        self.total: int = 0
+        self.finished: int = 0
+        self.start_time: float = 0
+        self.output_time: float = 0
+
+    def start(self, total: int) -> None:
+        """
+        Start worker processes, total is used for estimating progress.
+        """
+        engine: BacktestingEngine = self.engine
+
+        parameters: dict = {
+            "vt_symbol": engine.vt_symbol,
+            "interval": engine.interval,
+            "start": engine.start,
+            "rate": engine.rate,
+            "slippage": engine.slippage,
+            "size": engine.size,
+            "pricetick": engine.pricetick,
+            "capital": engine.capital,
+            "end": engine.end,
+            "mode": engine.mode,
+            "inverse": engine.inverse,
+            "annual_days": engine.annual_days,
+            "columnar": engine.columnar
+        }
+
+        # Force to use spawn method to create new process (instead of fork on Linux)
+        ctx = multiprocessing.get_context("spawn")
+        self.pool = ctx.Pool(
+            self.max_workers,
+            initializer=init_optimization_worker,
+            initargs=(engine.strategy_class, parameters)
+        )
+
+        self.total = total
+        self.finished = 0
+        self.start_time = time()
+        self.output_time = 0
+
+    def close(self) -> None:
+        """
+        Stop worker processes.
+        """
+        if not self.pool:
+            return
+
+        if self.engine.optimization_cancelled.is_set():
+            self.pool.terminate()
         else:
-            self.pre_close = 1
+            self.pool.close()
+        self.pool.join()
+        self.pool = None
+
+    def run(self, settings: List[dict], statistics: bool = False) -> list:
+        """
+        Run backtesting of settings in worker processes.
+        Return list of (setting str, target value, statistics).
+
+        Settings stopped by strategy exception are logged and skipped,
+        and saved in failed list.
+        """
+        self.failed = []
 
-        # Holding pnl is the pnl from holding position at day start
-        self.start_pos = start_pos
-        self.end_pos = start_pos
+        if not settings:
+            return []
 
-        if not inverse:     # For normal contract
-            self.holding_pnl = self.start_pos * (self.close_price - self.pre_close) * size
-        else:               # For crypto currency inverse contract
-            self.holding_pnl = self.start_pos * (1 / self.pre_close - 1 / self.close_price) * size
+        chunk_size: int = self.chunk_size
+        if not chunk_size:
+            chunk_size = max(1, len(settings) // (self.max_workers * 4))
 
-        # Trading pnl is the pnl from new trade during the day
-        self.trade_count = len(self.trades)
+        chunks: List[List[dict]] = [
+            settings[i:i + chunk_size] for i in range(0, len(settings), chunk_size)
+        ]
 
-        for trade in self.trades:
-            if trade.direction == Direction.LONG:
-                pos_change = float(trade.volume)
-            else:
-                pos_change = -float(trade.volume)
+        func: Callable = partial(
+            run_optimization_chunk,
+            target_name=self.target_name,
+            statistics=statistics
+        )
+        iterator = self.pool.imap_unordered(func, chunks)
 
-            self.end_pos += pos_change
+        results: list = []
 
-            # For normal contract
-            if not inverse:
-                turnover = float(trade.volume) * size * float(trade.price)
-                self.trading_pnl += pos_change * (self.close_price - float(trade.price)) * size
-                self.slippage += float(trade.volume) * size * slippage
-            # For crypto currency inverse contract
-            else:
-                turnover = float(trade.volume) * size / float(trade.price)
-                self.trading_pnl += pos_change * (1 / float(trade.price) - 1 / self.close_price) * size
-                self.slippage += float(trade.volume) * size * slippage / (float(trade.price) ** 2)
+        for _ in chunks:
+            # Check cancel request while waiting for next chunk
+            while True:
+                if self.engine.optimization_cancelled.is_set():
+                    self.engine.output("optimization cancelled")
+                    return results
+
+                try:
+                    chunk_results: list = iterator.next(timeout=0.5)
+                    break
+                except multiprocessing.TimeoutError:
+                    continue
+
+            for setting_str, target_value, statistics in chunk_results:
+                if target_value is None:
+                    self.engine.output(f"backtesting failed, setting skipped：{setting_str}\n{statistics}")
+                    self.failed.append(setting_str)
+                else:
+                    results.append((setting_str, target_value, statistics))
+
+            self.update_progress(len(chunk_results))
+
+        return results
+
+    def map(self, func: Callable, individuals: list) -> List[tuple]:
+        """
+        Map function registered into deap toolbox, evaluate all individuals of
+        a generation in one batch. Func is ignored since evaluation is always
+        done by worker processes.
+        """
+        keys: List[tuple] = [tuple(individual) for individual in individuals]
+
+        settings: Dict[str, tuple] = {}
+        for key in keys:
+            if key not in self.cache:
+                settings[str(dict(key))] = key
+
+        results: list = self.run([dict(key) for key in settings.values()])
+
+        for setting_str, target_value, _ in results:
+            self.cache[settings[setting_str]] = (target_value,)
+
+        # Failed setting gets worst fitness and is never selected
+        for setting_str in self.failed:
+            self.cache[settings[setting_str]] = (-np.inf,)
+
+        if self.engine.optimization_cancelled.is_set():
+            raise OptimizationCancelled()
+
+        return [self.cache[key] for key in keys]
+
+    def evaluate(self, individual: list) -> tuple:
+        """
+        Evaluate single individual.
+        """
+        return self.map(None, [individual])[0]
+
+    def update_progress(self, count: int) -> None:
+        """
+        Output progress and estimated remaining time.
+        """
+        self.finished += count
+        now: float = time()
+
+        # Output no more than once per second
+        if now - self.output_time < 1 and self.finished < self.total:
+            return
+        self.output_time = now
+
+        total: int = max(self.total, self.finished)
+        cost: float = now - self.start_time
+        eta: float = cost / self.finished * (total - self.finished)
+
+        progress: float = self.finished / total
+        progress_bar: str = "#" * int(progress * 10)
+        self.engine.output(
+            f"optimization progress：{progress_bar} [{progress:.0%}] "
+            f"{self.finished}/{total}, cost {cost:.0f}s, ETA {eta:.0f}s"
+        )
+
+
+# Backtesting engine of optimization worker process
+worker_engine: BacktestingEngine = None
+worker_error: str = ""
+
+
+def init_optimization_worker(strategy_class: Type[CtaTemplate], parameters: dict) -> None:
+    """
+    Initializer of optimization worker process, load history data only once.
+    """
+    global worker_engine, worker_error
+
+    # Exception raised in pool initializer makes pool restart worker forever,
+    # so keep it and raise when running settings instead.
+    try:
+        engine: BacktestingEngine = BacktestingEngine()
+        engine.output = quiet_output
+        engine.set_parameters(**parameters)
+        engine.strategy_class = strategy_class
+        engine.load_data()
+
+        worker_engine = engine
+    except Exception:
+        worker_error = traceback.format_exc()
+
+
+def run_optimization_chunk(settings: List[dict], target_name: str, statistics: bool) -> list:
+    """
+    Run backtesting of settings with the warm engine of worker process.
+    """
+    if not worker_engine:
+        raise RuntimeError(f"optimization worker failed to load data:\n{worker_error}")
+
+    results: list = []
+
+    for setting in settings:
+        result: tuple = evaluate_setting(worker_engine, setting, target_name, statistics)
+        results.append(result)
 
-            self.turnover += turnover
-            self.commission += turnover * rate
+    return results
 
-        # Net pnl takes account of commission and slippage cost
-        self.total_pnl = self.trading_pnl + self.holding_pnl
-        self.net_pnl = self.total_pnl - self.commission - self.slippage
+
+def evaluate_setting(
+    engine: BacktestingEngine,
+    setting: dict,
+    target_name: str,
+    statistics: bool = True
+) -> tuple:
+    """
+    Run backtesting of one setting with history data already loaded.
+    Only target value is calculated if statistics is not required.
+
+    If strategy raised exception, target value is None and traceback is
+    returned in place of statistics, since result of truncated backtesting
+    is not comparable.
+    """
+    engine.clear_data()
+    engine.add_strategy(engine.strategy_class, setting)
+    engine.run_backtesting()
+
+    if engine.error:
+        return (str(setting), None, engine.error)
+
+    engine.calculate_result()
+
+    if not statistics:
+        target_value = engine.calculate_target(target_name)
+        return (str(setting), target_value, None)
+
+    result: dict = engine.calculate_statistics(output=False)
+
+    target_value = result[target_name]
+    return (str(setting), target_value, result)
+
+
+def quiet_output(msg: str) -> None:
+    """
+    Output function of worker engine, progress is reported by main process.
+    """
+    pass
 
 
 def optimize(
@@ -1230,10 +1770,11 @@ def optimize(
     capital: int,
     end: datetime,
     mode: BacktestingMode,
-    inverse: bool
+    inverse: bool,
+    columnar: bool = False
 ):
     """
-    Function for running in multiprocessing.pool
+    Run backtesting of one setting in a new engine.
     """
     engine = BacktestingEngine()
 
@@ -1248,46 +1789,13 @@ def optimize(
         capital=capital,
         end=end,
         mode=mode,
-        inverse=inverse
+        inverse=inverse,
+        columnar=columnar
     )
 
-    engine.add_strategy(strategy_class, setting)
+    engine.strategy_class = strategy_class
     engine.load_data()
-    engine.run_backtesting()
-    engine.calculate_result()
-    statistics = engine.calculate_statistics(output=False)
-
-    target_value = statistics[target_name]
-    return (str(setting), target_value, statistics)
-
-
-@lru_cache(maxsize=1000000)
-def _ga_optimize(parameter_values: tuple):
-    """"""
-    setting = dict(parameter_values)
-
-    result = optimize(
-        ga_target_name,
-        ga_strategy_class,
-        setting,
-        ga_vt_symbol,
-        ga_interval,
-        ga_start,
-        ga_rate,
-        ga_slippage,
-        ga_size,
-        ga_pricetick,
-        ga_capital,
-        ga_end,
-        ga_mode,
-        ga_inverse
-    )
-    return (result[1],)
-
-
-def ga_optimize(parameter_values: list):
-    """"""
-    return _ga_optimize(tuple(parameter_values))
+    return evaluate_setting(engine, setting, target_name)
 
 
 @lru_cache(maxsize=999)
@@ -1304,6 +1812,21 @@ def load_bar_data(
     )
 
 
+def load_bar_array(
+    symbol: str,
+    exchange: Exchange,
+    interval: Interval,
+    start: datetime,
+    end: datetime
+) -> BarArray:
+    """
+    Load bar array through on-disk columnar cache.
+    """
+    return bar_cache.load(
+        symbol, exchange, interval, start, end
+    )
+
+
 @lru_cache(maxsize=999)
 def load_tick_data(
     symbol: str,
@@ -1316,18 +1839,3 @@ def load_tick_data(
         symbol, exchange, start, end
     )
 
-
-# GA related global value
-ga_end = None
-ga_mode = None
-ga_target_name = None
-ga_strategy_class = None
-ga_setting = None
-ga_vt_symbol = None
-ga_interval = None
-ga_start = None
-ga_rate = None
-ga_slippage = None
-ga_size = None
-ga_pricetick = None
-ga_capital = None
@@ -2,10 +2,11 @@
 Defines constants and objects used in CtaStrategy App.
 """
 
+from bisect import bisect_left, bisect_right, insort
 from dataclasses import dataclass, field
 from enum import Enum
 from datetime import datetime, timedelta
-from typing import Dict
+from typing import Any, Dict, List, Tuple
 from decimal import Decimal
 
 from howtrader.trader.constant import Direction, Offset, Interval
@@ -46,6 +47,78 @@ class StopOrder:
     status: StopOrderStatus = StopOrderStatus.WAITING
 
 
+class SortedOrderBook:
+    """
+    Active orders sorted by price of each direction, used to find crossed
+    orders with binary search in columnar backtesting and to find
+    triggered stop orders of each symbol in live trading.
+    """
+
+    def __init__(self) -> None:
+        """"""
+        self.count: int = 0
+        self.long_keys: List[Tuple[Decimal, int]] = []
+        self.short_keys: List[Tuple[Decimal, int]] = []
+
+        self.orders: Dict[int, Any] = {}
+        self.keys: Dict[str, Tuple[Direction, Tuple[Decimal, int]]] = {}
+
+    def add(self, orderid: str, direction: Direction, price: Decimal, order: Any) -> int:
+        """
+        Add order into book and return its sequence number.
+        """
+        self.count += 1
+        key: Tuple[Decimal, int] = (price, self.count)
+
+        if direction == Direction.LONG:
+            insort(self.long_keys, key)
+        elif direction == Direction.SHORT:
+            insort(self.short_keys, key)
+
+        self.orders[self.count] = order
+        self.keys[orderid] = (direction, key)
+        return self.count
+
+    def remove(self, orderid: str) -> None:
+        """
+        Remove order from book if exists.
+        """
+        item: tuple = self.keys.pop(orderid, None)
+        if not item:
+            return
+        direction, key = item
+
+        if direction == Direction.LONG:
+            keys: list = self.long_keys
+        elif direction == Direction.SHORT:
+            keys: list = self.short_keys
+        else:
+            keys: list = []
+
+        ix: int = bisect_left(keys, key)
+        if ix < len(keys) and keys[ix] == key:
+            del keys[ix]
+
+        self.orders.pop(key[1], None)
+
+    def select(self, direction: Direction, price: float, above: bool) -> List[int]:
+        """
+        Get sequence numbers of orders with price >= given price (above)
+        or price <= given price (not above).
+        """
+        if direction == Direction.LONG:
+            keys: list = self.long_keys
+        else:
+            keys: list = self.short_keys
+
+        if above:
+            ix: int = bisect_left(keys, (price,))
+            return [key[1] for key in keys[ix:]]
+        else:
+            ix: int = bisect_right(keys, (price, float("inf")))
+            return [key[1] for key in keys[:ix]]
+
+
 EVENT_CTA_LOG = "eCtaLog"
 EVENT_CTA_STRATEGY = "eCtaStrategy"
 EVENT_CTA_STOPORDER = "eCtaStopOrder"
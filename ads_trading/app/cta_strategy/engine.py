@@ -48,6 +48,8 @@ from howtrader.trader.utility import load_json, save_json, extract_vt_symbol, ro
 from howtrader.trader.converter import OffsetConverter
 from howtrader.trader.database import BaseDatabase, get_database
 
+from ads_trading.trader.utility import JsonWriter
+
 from .base import (
     APP_NAME,
     EVENT_CTA_LOG,
@@ -56,6 +58,7 @@ from .base import (
     EngineType,
     StopOrder,
     StopOrderStatus,
+    SortedOrderBook,
     STOPORDER_PREFIX
 )
 from .template import CtaTemplate
@@ -101,6 +104,7 @@ class CtaEngine(BaseEngine):
 
         self.stop_order_count: int = 0   # for generating stop_orderid
         self.stop_orders: Dict[str, StopOrder] = {}       # stop_orderid: stop_order
+        self.stop_books: Dict[str, SortedOrderBook] = {}  # vt_symbol: stop orders sorted by price
 
         self.init_executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1)
 
@@ -112,6 +116,7 @@ class CtaEngine(BaseEngine):
 
         self.database: BaseDatabase = get_database()
         self.sync_strategy_data_lock = threading.Lock()
+        self.data_writer: JsonWriter = JsonWriter(self.data_filename, interval=0.5, save_func=save_json)
 
     def init_engine(self) -> None:
         """"""
@@ -124,6 +129,7 @@ class CtaEngine(BaseEngine):
     def close(self) -> None:
         """"""
         self.stop_all_strategies()
+        self.data_writer.close()
 
     def register_event(self) -> None:
         """"""
@@ -216,65 +222,75 @@ class CtaEngine(BaseEngine):
         self.offset_converter.update_position(position)
 
     def check_stop_order(self, tick: TickData) -> None:
-        """"""
-        for stop_order in list(self.stop_orders.values()):
-            if stop_order.vt_symbol != tick.vt_symbol:
-                continue
+        """
+        Only stop orders of tick symbol with price crossed by last price
+        are visited, in the order they were sent.
+        """
+        stop_book: Optional[SortedOrderBook] = self.stop_books.get(tick.vt_symbol, None)
+        if not stop_book:
+            return
 
-            long_triggered = (
-                stop_order.direction == Direction.LONG and tick.last_price >= stop_order.price
-            )
-            short_triggered = (
-                stop_order.direction == Direction.SHORT and tick.last_price <= stop_order.price
-            )
+        seqs: List[int] = (
+            stop_book.select(Direction.LONG, tick.last_price, False)
+            + stop_book.select(Direction.SHORT, tick.last_price, True)
+        )
+        if not seqs:
+            return
 
-            if long_triggered or short_triggered:
-                strategy: CtaTemplate = self.strategies[stop_order.strategy_name]
+        stop_orders: List[StopOrder] = [stop_book.orders[seq] for seq in sorted(seqs)]
 
-                # To get excuted immediately after stop order is
-                # triggered, use limit price if available, otherwise
-                # use ask_price_5 or bid_price_5
-                if stop_order.direction == Direction.LONG:
-                    if tick.limit_up:
-                        price = tick.limit_up
-                    else:
-                        price = tick.ask_price_5
+        for stop_order in stop_orders:
+            # Stop order may be cancelled in callback of previous one
+            if stop_order.stop_orderid not in self.stop_orders:
+                continue
+
+            strategy: CtaTemplate = self.strategies[stop_order.strategy_name]
+
+            # To get excuted immediately after stop order is
+            # triggered, use limit price if available, otherwise
+            # use ask_price_5 or bid_price_5
+            if stop_order.direction == Direction.LONG:
+                if tick.limit_up:
+                    price = tick.limit_up
                 else:
-                    if tick.limit_down:
-                        price = tick.limit_down
-                    else:
-                        price = tick.bid_price_5
-
-                contract: Optional[ContractData] = self.main_engine.get_contract(stop_order.vt_symbol)
-
-                vt_orderids: list = self.send_limit_order(
-                    strategy,
-                    contract,
-                    stop_order.direction,
-                    stop_order.offset,
-                    Decimal(str(price)),
-                    stop_order.volume,
-                    stop_order.lock,
-                    stop_order.net
-                )
+                    price = tick.ask_price_5
+            else:
+                if tick.limit_down:
+                    price = tick.limit_down
+                else:
+                    price = tick.bid_price_5
+
+            contract: Optional[ContractData] = self.main_engine.get_contract(stop_order.vt_symbol)
+
+            vt_orderids: list = self.send_limit_order(
+                strategy,
+                contract,
+                stop_order.direction,
+                stop_order.offset,
+                Decimal(str(price)),
+                stop_order.volume,
+                stop_order.lock,
+                stop_order.net
+            )
 
-                # Update stop order status if placed successfully
-                if vt_orderids:
-                    # Remove from relation map.
-                    self.stop_orders.pop(stop_order.stop_orderid)
+            # Update stop order status if placed successfully
+            if vt_orderids:
+                # Remove from relation map.
+                self.stop_orders.pop(stop_order.stop_orderid)
+                stop_book.remove(stop_order.stop_orderid)
 
-                    strategy_vt_orderids: list = self.strategy_orderid_map[strategy.strategy_name]
-                    if stop_order.stop_orderid in strategy_vt_orderids:
-                        strategy_vt_orderids.remove(stop_order.stop_orderid)
+                strategy_vt_orderids: list = self.strategy_orderid_map[strategy.strategy_name]
+                if stop_order.stop_orderid in strategy_vt_orderids:
+                    strategy_vt_orderids.remove(stop_order.stop_orderid)
 
-                    # Change stop order status to cancelled and update to strategy.
-                    stop_order.status = StopOrderStatus.TRIGGERED
-                    stop_order.vt_orderids = vt_orderids
+                # Change stop order status to cancelled and update to strategy.
+                stop_order.status = StopOrderStatus.TRIGGERED
+                stop_order.vt_orderids = vt_orderids
 
-                    self.call_strategy_func(
-                        strategy, strategy.on_stop_order, stop_order
-                    )
-                    self.put_stop_order_event(stop_order)
+                self.call_strategy_func(
+                    strategy, strategy.on_stop_order, stop_order
+                )
+                self.put_stop_order_event(stop_order)
 
     def send_server_order(
         self,
@@ -414,6 +430,12 @@ class CtaEngine(BaseEngine):
 
         self.stop_orders[stop_orderid] = stop_order
 
+        stop_book: Optional[SortedOrderBook] = self.stop_books.get(stop_order.vt_symbol, None)
+        if not stop_book:
+            stop_book = SortedOrderBook()
+            self.stop_books[stop_order.vt_symbol] = stop_book
+        stop_book.add(stop_orderid, direction, price, stop_order)
+
         vt_orderids: list = self.strategy_orderid_map[strategy.strategy_name]
         vt_orderids.add(stop_orderid)
 
@@ -445,6 +467,7 @@ class CtaEngine(BaseEngine):
 
         # Remove from relation map.
         self.stop_orders.pop(stop_orderid)
+        self.stop_books[stop_order.vt_symbol].remove(stop_orderid)
 
         vt_orderids: list = self.strategy_orderid_map[strategy.strategy_name]
         if stop_orderid in vt_orderids:
@@ -863,14 +886,22 @@ class CtaEngine(BaseEngine):
     def sync_strategy_data(self, strategy: CtaTemplate) -> None:
         """
         Sync strategy data into json file.
+
+        The file is written by background writer, so frequent syncs
+        on trades are coalesced and do not block the event thread.
         """
         data: dict = strategy.get_variables()
         data.pop("inited")      # Strategy status (inited, trading) should not be synced.
         data.pop("trading")
-        self.sync_strategy_data_lock.acquire()
-        self.strategy_data[strategy.strategy_name] = data
-        save_json(self.data_filename, self.strategy_data)
-        self.sync_strategy_data_lock.release()
+
+        # Copy list or dict variables which strategy may change before written
+        data = {name: copy(value) for name, value in data.items()}
+
+        # Data of each strategy is replaced rather than changed, so a
+        # shallow copy is a consistent snapshot for the writer.
+        with self.sync_strategy_data_lock:
+            self.strategy_data[strategy.strategy_name] = data
+            self.data_writer.save(dict(self.strategy_data))
 
     def get_all_strategy_class_names(self) -> list:
         """
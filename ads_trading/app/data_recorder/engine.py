@@ -1,8 +1,10 @@
 import sys
-from threading import Thread
+from threading import Event as ThreadEvent, Lock, Thread
 from queue import Queue, Empty
 from copy import copy
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from time import time
 from typing import Any, Dict, List
 
 from howtrader.event import Event, EventEngine
@@ -38,9 +40,21 @@ class RecorderEngine(BaseEngine):
         """"""
         super().__init__(main_engine, event_engine, APP_NAME)
 
-        self.queue: Queue = Queue()
+        # Max number of flushed batches waiting to be saved
+        self.queue_size: int = 100
+        # Flush immediately once this many rows are buffered
+        self.batch_size: int = 5000
+        # Max rows buffered for each symbol, the oldest is dropped beyond it
+        self.buffer_size: int = 10000
+        # Retry saving failed batch before dropping it
+        self.max_retries: int = 5
+        self.retry_interval: float = 1
+
+        self.queue: Queue = Queue(maxsize=self.queue_size)
         self.thread: Thread = Thread(target=self.run)
         self.active: bool = False
+        # Set when closing, so writer stops waiting for database recovering
+        self.closing: ThreadEvent = ThreadEvent()
 
         self.tick_recordings: Dict[str, Dict] = {}
         self.bar_recordings: Dict[str, Dict] = {}
@@ -49,8 +63,23 @@ class RecorderEngine(BaseEngine):
         self.timer_count: int = 0
         self.timer_interval: int = 10
 
-        self.ticks: Dict[str, List[TickData]] = defaultdict(list)
-        self.bars: Dict[str, List[BarData]] = defaultdict(list)
+        # Buffered data of each symbol, coalesced by datetime
+        self.ticks: Dict[str, OrderedDict[datetime, TickData]] = defaultdict(OrderedDict)
+        self.bars: Dict[str, OrderedDict[datetime, BarData]] = defaultdict(OrderedDict)
+        self.buffer_count: int = 0
+
+        self.metrics: Dict[str, float] = {
+            "recorded": 0,          # rows put into buffer
+            "coalesced": 0,         # rows replaced by newer data of same datetime
+            "saved": 0,             # rows saved into database
+            "dropped": 0,           # rows dropped by buffer limit or failed saving
+            "retried": 0,           # saving retried after database error
+            "lag": 0,               # seconds from flushing to saved of last batch
+            "max_lag": 0,
+        }
+        # Metrics are updated from both event thread and writer thread
+        self.metrics_lock: Lock = Lock()
+        self.logged_dropped: int = 0
 
         self.database: BaseDatabase = get_database()
 
@@ -75,28 +104,114 @@ class RecorderEngine(BaseEngine):
 
     def run(self) -> None:
         """"""
-        while self.active:
+        # Keep saving until queue is drained after closed
+        while self.active or not self.queue.empty():
             try:
                 task: Any = self.queue.get(timeout=1)
-                task_type, data = task
-
-                if task_type == "tick":
-                    self.database.save_tick_data(data)
-                elif task_type == "bar":
-                    self.database.save_bar_data(data)
-
             except Empty:
                 continue
 
-            except Exception:
-                self.active = False
+            task_type, data, flush_time = task
+            count: int = self.count_task(task_type, data)
+
+            for n in range(self.max_retries + 1):
+                try:
+                    self.save_task(task_type, data)
+                    break
+                except Exception:
+                    info = sys.exc_info()
+                    event: Event = Event(EVENT_RECORDER_EXCEPTION, info)
+                    self.event_engine.put(event)
+
+                    # Do not wait for database recovering when closing
+                    if n == self.max_retries or self.closing.is_set():
+                        failed: int = self.count_task(task_type, data)
+                        with self.metrics_lock:
+                            self.metrics["dropped"] += failed
+                        count -= failed
+                        break
+
+                    with self.metrics_lock:
+                        self.metrics["retried"] += 1
+                    self.closing.wait(min(self.retry_interval * 2 ** n, 30))
+
+            lag: float = time() - flush_time
+            with self.metrics_lock:
+                self.metrics["saved"] += count
+                self.metrics["lag"] = lag
+                self.metrics["max_lag"] = max(lag, self.metrics["max_lag"])
+
+    def save_task(self, task_type: str, data: Any) -> None:
+        """
+        Save one flushed batch. Bars of each symbol are removed from the batch
+        once saved, so retrying continues from the failed symbol.
+        """
+        if task_type == "tick":
+            self.database.save_tick_data(data)
+        elif task_type == "bar":
+            while data:
+                vt_symbol: str = next(iter(data))
+                self.database.save_bar_data(data[vt_symbol])
+                data.pop(vt_symbol)
+
+    def count_task(self, task_type: str, data: Any) -> int:
+        """"""
+        if task_type == "tick":
+            return len(data)
+        return sum(len(bars) for bars in data.values())
+
+    def flush(self, block: bool = False) -> None:
+        """
+        Put all buffered data into queue as one tick batch and one bar batch.
+        Data is kept in buffer if queue is full, until next flush, unless
+        block is set to wait for queue space (when closing).
+        """
+        if not self.buffer_count:
+            return
+
+        # Each flush puts at most 2 batches
+        if not block and self.queue.qsize() > self.queue_size - 2:
+            return
+
+        flush_time: float = time()
 
-                info = sys.exc_info()
-                event: Event = Event(EVENT_RECORDER_EXCEPTION, info)
-                self.event_engine.put(event)
+        if self.bars:
+            bars: Dict[str, List[BarData]] = {
+                vt_symbol: list(buf.values()) for vt_symbol, buf in self.bars.items()
+            }
+            self.queue.put(("bar", bars, flush_time))
+            self.bars.clear()
+
+        if self.ticks:
+            ticks: List[TickData] = []
+            for buf in self.ticks.values():
+                ticks.extend(buf.values())
+            self.queue.put(("tick", ticks, flush_time))
+            self.ticks.clear()
+
+        self.buffer_count = 0
+
+    def check_dropped(self) -> None:
+        """"""
+        dropped: int = self.metrics["dropped"]
+        if dropped > self.logged_dropped:
+            self.write_log(f"数据写入跟不上行情，累计丢弃{dropped}条，待写入批次{self.queue.qsize()}")
+            self.logged_dropped = dropped
+
+    def get_metrics(self) -> Dict[str, float]:
+        """"""
+        with self.metrics_lock:
+            metrics: Dict[str, float] = dict(self.metrics)
+        metrics["buffered"] = self.buffer_count
+        metrics["queue_size"] = self.queue.qsize()
+        return metrics
 
     def close(self) -> None:
         """"""
+        # Wait for writer to make room for final batches instead of losing them,
+        # batches failed during closing are dropped without retrying
+        self.closing.set()
+        self.flush(block=True)
         self.active = False
 
         if self.thread.is_alive():
@@ -210,13 +325,8 @@ class RecorderEngine(BaseEngine):
             return
         self.timer_count = 0
 
-        for bars in self.bars.values():
-            self.queue.put(("bar", bars))
-        self.bars.clear()
-
-        for ticks in self.ticks.values():
-            self.queue.put(("tick", ticks))
-        self.ticks.clear()
+        self.flush()
+        self.check_dropped()
 
     def process_tick_event(self, event: Event) -> None:
         """"""
@@ -269,11 +379,34 @@ class RecorderEngine(BaseEngine):
 
     def record_tick(self, tick: TickData) -> None:
         """"""
-        self.ticks[tick.vt_symbol].append(tick)
+        self.buffer_data(self.ticks[tick.vt_symbol], tick)
 
     def record_bar(self, bar: BarData) -> None:
         """"""
-        self.bars[bar.vt_symbol].append(bar)
+        self.buffer_data(self.bars[bar.vt_symbol], bar)
+
+    def buffer_data(self, buf: OrderedDict, data: Any) -> None:
+        """
+        Data with same datetime of a symbol is coalesced into the latest one.
+        """
+        coalesced: bool = data.datetime in buf
+        if not coalesced:
+            self.buffer_count += 1
+
+        buf[data.datetime] = data
+
+        dropped: bool = len(buf) > self.buffer_size
+        if dropped:
+            buf.popitem(last=False)
+            self.buffer_count -= 1
+
+        with self.metrics_lock:
+            self.metrics["recorded"] += 1
+            self.metrics["coalesced"] += coalesced
+            self.metrics["dropped"] += dropped
+
+        if self.buffer_count >= self.batch_size:
+            self.flush()
 
     def get_bar_generator(self, vt_symbol: str) -> BarGenerator:
         """"""
@@ -1,4 +1,5 @@
-from typing import Any, Dict, Set, Optional
+from collections import defaultdict
+from typing import Any, Dict, List, Set, Optional, Tuple
 from datetime import datetime
 
 from howtrader.event import Event
@@ -11,7 +12,8 @@ from howtrader.trader.event import (
     EVENT_ORDER,
     EVENT_CONTRACT,
     EVENT_TIMER,
-    EVENT_TRADE
+    EVENT_TRADE,
+    EVENT_TICK
 )
 from howtrader.trader.object import (
     ContractData,
@@ -51,6 +53,11 @@ class PortfolioEngine(BaseEngine):
         self.contract_results: Dict[str, ContractResult] = {}
         self.portfolio_results: Dict[str, PortfolioResult] = {}
 
+        # Results changed by trade or tick since last calculation
+        self.symbol_results: Dict[str, List[ContractResult]] = defaultdict(list)
+        self.dirty_results: Dict[Tuple[str, str], ContractResult] = {}
+        self.tick_prices: Dict[str, Tuple[float, float]] = {}
+
         self.timer_count: int = 0
         self.timer_interval: int = 5
 
@@ -65,6 +72,7 @@ class PortfolioEngine(BaseEngine):
         self.event_engine.register(EVENT_TRADE, self.process_trade_event)
         self.event_engine.register(EVENT_TIMER, self.process_timer_event)
         self.event_engine.register(EVENT_CONTRACT, self.process_contract_event)
+        self.event_engine.register(EVENT_TICK, self.process_tick_event)
 
     def process_order_event(self, event: Event) -> None:
         """"""
@@ -89,9 +97,10 @@ class PortfolioEngine(BaseEngine):
         contract_result: Optional[ContractResult] = self.contract_results.get(key, None)
         if not contract_result:
             contract_result: ContractResult = ContractResult(self, reference, vt_symbol)
-            self.contract_results[key] = contract_result
+            self.add_contract_result(contract_result)
 
         contract_result.update_trade(trade)
+        self.dirty_results[key] = contract_result
 
         # 添加成交数据
         trade.reference = reference
@@ -108,30 +117,57 @@ class PortfolioEngine(BaseEngine):
         req: SubscribeRequest = SubscribeRequest(contract.symbol, contract.exchange)
         self.main_engine.subscribe(req, contract.gateway_name)
 
-    def process_timer_event(self, event: Event) -> None:
+    def process_tick_event(self, event: Event) -> None:
         """"""
+        tick: TickData = event.data
+
+        # 价格未变化时不需要重新计算，没有结果的合约也记录价格，
+        # 新成交的结果已按当前价格计算
+        prices: Tuple[float, float] = (tick.last_price, tick.pre_close)
+        if self.tick_prices.get(tick.vt_symbol, None) == prices:
+            return
+        self.tick_prices[tick.vt_symbol] = prices
+
+        contract_results: Optional[List[ContractResult]] = self.symbol_results.get(tick.vt_symbol, None)
+        if not contract_results:
+            return
+
+        for contract_result in contract_results:
+            self.dirty_results[(contract_result.reference, contract_result.vt_symbol)] = contract_result
+
+    def process_timer_event(self, event: Event) -> None:
+        """
+        只重新计算有变化的合约结果，组合结果按差值增量更新，
+        并将本次更新的结果合并为一个事件推送。
+        """
         self.timer_count += 1
         if self.timer_count < self.timer_interval:
             return
         self.timer_count = 0
 
-        for portfolio_result in self.portfolio_results.values():
-            portfolio_result.clear_pnl()
+        if not self.dirty_results:
+            return
+
+        contract_results: List[ContractResult] = list(self.dirty_results.values())
+        self.dirty_results.clear()
+
+        portfolio_results: Dict[str, PortfolioResult] = {}
+
+        for contract_result in contract_results:
+            trading_pnl: float = contract_result.trading_pnl
+            holding_pnl: float = contract_result.holding_pnl
+            total_pnl: float = contract_result.total_pnl
 
-        for contract_result in self.contract_results.values():
             contract_result.calculate_pnl()
 
             portfolio_result: PortfolioResult = self.get_portfolio_result(contract_result.reference)
-            portfolio_result.trading_pnl += contract_result.trading_pnl
-            portfolio_result.holding_pnl += contract_result.holding_pnl
-            portfolio_result.total_pnl += contract_result.total_pnl
+            portfolio_result.trading_pnl += contract_result.trading_pnl - trading_pnl
+            portfolio_result.holding_pnl += contract_result.holding_pnl - holding_pnl
+            portfolio_result.total_pnl += contract_result.total_pnl - total_pnl
+            portfolio_results[portfolio_result.reference] = portfolio_result
 
-            event: Event = Event(EVENT_PM_CONTRACT, contract_result)
-            self.event_engine.put(event)
-
-        for portfolio_result in self.portfolio_results.values():
-            event: Event = Event(EVENT_PM_PORTFOLIO, portfolio_result)
-            self.event_engine.put(event)
+        self.event_engine.put(Event(EVENT_PM_CONTRACT, contract_results))
+        self.event_engine.put(Event(EVENT_PM_PORTFOLIO, list(portfolio_results.values())))
 
     def process_contract_event(self, event: Event) -> None:
         """"""
@@ -164,12 +200,12 @@ class PortfolioEngine(BaseEngine):
                 date_changed: bool = True
 
             self.result_symbols.add(vt_symbol)
-            self.contract_results[(reference, vt_symbol)] = ContractResult(
+            self.add_contract_result(ContractResult(
                 self,
                 reference,
                 vt_symbol,
                 pos
-            )
+            ))
 
         # 当数据改变时重新保存
         if date_changed:
@@ -222,6 +258,15 @@ class PortfolioEngine(BaseEngine):
         self.save_data()
         self.save_order()
 
+    def add_contract_result(self, contract_result: ContractResult) -> None:
+        """"""
+        key: Tuple[str, str] = (contract_result.reference, contract_result.vt_symbol)
+        self.contract_results[key] = contract_result
+        self.symbol_results[contract_result.vt_symbol].append(contract_result)
+
+        # 新结果需要推送到界面
+        self.dirty_results[key] = contract_result
+
     def get_portfolio_result(self, reference: str) -> PortfolioResult:
         """"""
         portfolio_result: Optional[PortfolioResult] = self.portfolio_results.get(reference, None)
@@ -174,8 +174,13 @@ class PortfolioManager(QtWidgets.QWidget):
 
     def process_contract_event(self, event: Event) -> None:
         """"""
-        contract_result: ContractResult = event.data
+        contract_results: List[ContractResult] = event.data
 
+        for contract_result in contract_results:
+            self.update_contract_result(contract_result)
+
+    def update_contract_result(self, contract_result: ContractResult) -> None:
+        """"""
         contract_item: QtWidgets.QTreeWidgetItem = self.get_contract_item(
             contract_result.reference,
             contract_result.vt_symbol
@@ -192,8 +197,13 @@ class PortfolioManager(QtWidgets.QWidget):
 
     def process_portfolio_event(self, event: Event) -> None:
         """"""
-        portfolio_result: PortfolioResult = event.data
+        portfolio_results: List[PortfolioResult] = event.data
 
+        for portfolio_result in portfolio_results:
+            self.update_portfolio_result(portfolio_result)
+
+    def update_portfolio_result(self, portfolio_result: PortfolioResult) -> None:
+        """"""
         portfolio_item: QtWidgets.QTreeWidgetItem = self.get_portfolio_item(portfolio_result.reference)
         portfolio_item.setText(4, str(portfolio_result.trading_pnl))
         portfolio_item.setText(5, str(portfolio_result.holding_pnl))
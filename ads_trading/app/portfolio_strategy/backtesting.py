@@ -1,4 +1,4 @@
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
 from typing import Dict, List, Set, Tuple, Optional
 from functools import lru_cache, partial
@@ -21,6 +21,9 @@ from howtrader.trader.optimize import (
     run_ga_optimization
 )
 
+from ads_trading.trader.columnar import BarArray, BarCache, BarPanel, TradeLedger
+from ads_trading.trader.statistics import DailyStatistics
+
 from .template import StrategyTemplate
 
 
@@ -60,6 +63,10 @@ class BacktestingEngine:
         self.history_data: Dict[Tuple, BarData] = {}
         self.dts: Set[datetime] = set()
 
+        self.columnar: bool = False
+        self.bar_panel: BarPanel = None
+        self.day_ends: np.ndarray = None
+
         self.limit_order_count: int = 0
         self.limit_orders: Dict[str, OrderData] = {}
         self.active_limit_orders: Dict[str, OrderData] = {}
@@ -102,9 +109,13 @@ class BacktestingEngine:
         priceticks: Dict[str, float],
         capital: int = 0,
         end: datetime = None,
-        risk_free: float = 0
+        risk_free: float = 0,
+        columnar: bool = False
     ) -> None:
-        """"""
+        """
+        columnar: replay history data from bar panel of aligned NumPy arrays
+        instead of BarData dict.
+        """
         self.vt_symbols = vt_symbols
         self.interval = interval
 
@@ -117,6 +128,7 @@ class BacktestingEngine:
         self.end = end
         self.capital = capital
         self.risk_free = risk_free
+        self.columnar = columnar
 
     def add_strategy(self, strategy_class: type, setting: dict) -> None:
         """"""
@@ -140,6 +152,21 @@ class BacktestingEngine:
         self.history_data.clear()
         self.dts.clear()
 
+        # Load bar arrays of all symbols in parallel and align into panel
+        if self.columnar:
+            self.bar_panel = load_bar_panel(
+                self.vt_symbols,
+                self.interval,
+                self.start,
+                self.end
+            )
+
+            for bar_array in self.bar_panel.bar_arrays:
+                self.output(f"{bar_array.vt_symbol}历史数据加载完成，数据量：{len(bar_array)}")
+
+            self.output("所有历史数据加载完成")
+            return
+
         # Load 30 days of data each time and allow for progress update
         progress_delta: timedelta = timedelta(days=30)
         total_delta: timedelta = self.end - self.start
@@ -180,6 +207,10 @@ class BacktestingEngine:
 
     def run_backtesting(self) -> None:
         """"""
+        if self.columnar:
+            self.run_panel_backtesting()
+            return
+
         self.strategy.on_init()
 
         # Generate sorted datetime list
@@ -221,6 +252,54 @@ class BacktestingEngine:
 
         self.output("历史数据回放结束")
 
+    def run_panel_backtesting(self) -> None:
+        """
+        Replay rows of bar panel, strategy receives bar views of the row.
+        """
+        self.strategy.on_init()
+
+        # Daily close only needs to be updated by the last row of each day
+        dates: np.ndarray = self.bar_panel.get_dates()
+        self.day_ends = np.append(dates[1:] != dates[:-1], True)
+
+        # Use the first [days] of history data for initializing strategy
+        day_count: int = 0
+        ix: int = 0
+        total: int = len(self.bar_panel)
+
+        for ix in range(total):
+            dt: datetime = self.bar_panel.get_datetime(ix)
+
+            if self.datetime and dt.day != self.datetime.day:
+                day_count += 1
+                if day_count >= self.days:
+                    break
+
+            try:
+                self.new_bars_panel(ix)
+            except Exception:
+                self.output("触发异常，回测终止")
+                self.output(traceback.format_exc())
+                return
+
+        self.strategy.inited = True
+        self.output("策略初始化完成")
+
+        self.strategy.on_start()
+        self.strategy.trading = True
+        self.output("开始回放历史数据")
+
+        # Use the rest of history data for running backtesting
+        for ix in range(ix, total):
+            try:
+                self.new_bars_panel(ix)
+            except Exception:
+                self.output("触发异常，回测终止")
+                self.output(traceback.format_exc())
+                return
+
+        self.output("历史数据回放结束")
+
     def calculate_result(self) -> DataFrame:
         """"""
         self.output("开始计算逐日盯市盈亏")
@@ -229,40 +308,73 @@ class BacktestingEngine:
             self.output("成交记录为空，无法计算")
             return
 
-        # Add trade data into daily reuslt.
-        for trade in self.trades.values():
-            d: date = trade.datetime.date()
-            daily_result: PortfolioDailyResult = self.daily_results[d]
-            daily_result.add_trade(trade)
-
-        # Calculate daily result by iteration.
-        pre_closes: dict = {}
-        start_poses: dict = {}
-
-        for daily_result in self.daily_results.values():
-            daily_result.calculate_pnl(
-                pre_closes,
-                start_poses,
-                self.sizes,
-                self.rates,
-                self.slippages,
-            )
+        # Symbols of contract results are added in the same order every day
+        daily_results: List[PortfolioDailyResult] = list(self.daily_results.values())
+        vt_symbols: List[str] = list(daily_results[-1].contract_results)
 
-            pre_closes = daily_result.close_prices
-            start_poses = daily_result.end_poses
+        # Calculate contract results with columnar trade ledger.
+        ledger: TradeLedger = TradeLedger.from_trades(list(self.trades.values()), vt_symbols)
 
-        # Generate dataframe
-        results: dict = defaultdict(list)
+        dates: np.ndarray = np.array([r.date for r in daily_results], dtype="datetime64[D]")
+        close: np.ndarray = np.array(
+            [[r.close_prices.get(vt_symbol, np.nan) for vt_symbol in vt_symbols] for r in daily_results],
+            dtype="f8"
+        )
+        exists: np.ndarray = np.array(
+            [[vt_symbol in r.contract_results for vt_symbol in vt_symbols] for r in daily_results],
+            dtype=bool
+        )
 
-        for daily_result in self.daily_results.values():
-            fields: list = [
-                "date", "trade_count", "turnover",
-                "commission", "slippage", "trading_pnl",
-                "holding_pnl", "total_pnl", "net_pnl"
-            ]
+        pnl: Dict[str, np.ndarray] = ledger.calculate_pnl(
+            dates,
+            close,
+            [self.sizes[vt_symbol] for vt_symbol in vt_symbols],
+            [self.rates[vt_symbol] for vt_symbol in vt_symbols],
+            [self.slippages[vt_symbol] for vt_symbol in vt_symbols]
+        )
+
+        # Generate dataframe, contract results are summed symbol by symbol
+        results: dict = {"date": [r.date for r in daily_results]}
+
+        fields: list = [
+            "trade_count", "turnover",
+            "commission", "slippage", "trading_pnl",
+            "holding_pnl", "total_pnl", "net_pnl"
+        ]
+        for key in fields:
+            values: np.ndarray = np.where(exists, pnl[key], 0)
+
+            total: np.ndarray = np.zeros(len(daily_results), dtype=values.dtype)
+            for column in range(len(vt_symbols)):
+                total = total + values[:, column]
+
+            results[key] = total
+
+        # Keep daily result objects in sync with dataframe
+        trades: List[TradeData] = list(self.trades.values())
+        trade_ends: np.ndarray = np.cumsum(pnl["trade_count"].sum(axis=1))
+        trade_starts: np.ndarray = trade_ends - pnl["trade_count"].sum(axis=1)
+
+        contract_fields: list = fields + ["pre_close", "start_pos", "end_pos"]
+
+        for i, daily_result in enumerate(daily_results):
             for key in fields:
-                value = getattr(daily_result, key)
-                results[key].append(value)
+                setattr(daily_result, key, results[key][i].item())
+
+            day_trades: List[TradeData] = trades[trade_starts[i]:trade_ends[i]]
+
+            for column, vt_symbol in enumerate(vt_symbols):
+                contract_result: Optional[ContractDailyResult] = daily_result.contract_results.get(vt_symbol, None)
+                if not contract_result:
+                    continue
+
+                contract_result.trades = [trade for trade in day_trades if trade.vt_symbol == vt_symbol]
+                for key in contract_fields:
+                    setattr(contract_result, key, pnl[key][i, column].item())
+
+                daily_result.pre_closes[vt_symbol] = contract_result.pre_close
+                daily_result.start_poses[vt_symbol] = contract_result.start_pos
+                daily_result.end_poses[vt_symbol] = contract_result.end_pos
 
         self.daily_df: DataFrame = DataFrame.from_dict(results).set_index("date")
 
@@ -306,62 +418,52 @@ class BacktestingEngine:
             sharpe_ratio: float = 0
             return_drawdown_ratio: float = 0
         else:
-            # Calculate balance related time series data
-            df["balance"] = df["net_pnl"].cumsum() + self.capital
-            df["return"] = np.log(df["balance"] / df["balance"].shift(1)).fillna(0)
-            df["highlevel"] = (
-                df["balance"].rolling(
-                    min_periods=1, window=len(df), center=False).max()
-            )
-            df["drawdown"] = df["balance"] - df["highlevel"]
-            df["ddpercent"] = df["drawdown"] / df["highlevel"] * 100
-
-            # Calculate statistics value
-            start_date = df.index[0]
-            end_date = df.index[-1]
+            daily_statistics: DailyStatistics = self.get_daily_statistics(df)
 
-            total_days: int = len(df)
-            profit_days: int = len(df[df["net_pnl"] > 0])
-            loss_days: int = len(df[df["net_pnl"] < 0])
+            # Balance related time series data is only needed for output
+            if output:
+                df["balance"] = daily_statistics.balance
+                df["return"] = daily_statistics.returns
+                df["highlevel"] = daily_statistics.highlevel
+                df["drawdown"] = daily_statistics.drawdown
+                df["ddpercent"] = daily_statistics.ddpercent
 
-            end_balance = df["balance"].iloc[-1]
-            max_drawdown = df["drawdown"].min()
-            max_ddpercent = df["ddpercent"].min()
-            max_drawdown_end = df["drawdown"].idxmin()
+            # Calculate statistics value
+            start_date = daily_statistics.start_date
+            end_date = daily_statistics.end_date
 
-            if isinstance(max_drawdown_end, date):
-                max_drawdown_start = df["balance"][:max_drawdown_end].idxmax()
-                max_drawdown_duration: int = (max_drawdown_end - max_drawdown_start).days
-            else:
-                max_drawdown_duration: int = 0
+            total_days: int = daily_statistics.total_days
+            profit_days: int = daily_statistics.profit_days
+            loss_days: int = daily_statistics.loss_days
 
-            total_net_pnl: float = df["net_pnl"].sum()
-            daily_net_pnl: float = total_net_pnl / total_days
+            end_balance = daily_statistics.end_balance
+            max_drawdown = daily_statistics.max_drawdown
+            max_ddpercent = daily_statistics.max_ddpercent
+            max_drawdown_duration: int = daily_statistics.max_drawdown_duration
 
-            total_commission: float = df["commission"].sum()
-            daily_commission: float = total_commission / total_days
+            total_net_pnl: float = daily_statistics.total_net_pnl
+            daily_net_pnl: float = daily_statistics.daily_net_pnl
 
-            total_slippage: float = df["slippage"].sum()
-            daily_slippage: float = total_slippage / total_days
+            total_commission: float = daily_statistics.total_commission
+            daily_commission: float = daily_statistics.daily_commission
 
-            total_turnover: float = df["turnover"].sum()
-            daily_turnover: float = total_turnover / total_days
+            total_slippage: float = daily_statistics.total_slippage
+            daily_slippage: float = daily_statistics.daily_slippage
 
-            total_trade_count: int = df["trade_count"].sum()
-            daily_trade_count: int = total_trade_count / total_days
+            total_turnover: float = daily_statistics.total_turnover
+            daily_turnover: float = daily_statistics.daily_turnover
 
-            total_return: float = (end_balance / self.capital - 1) * 100
-            annual_return: float = total_return / total_days * 240
-            daily_return: float = df["return"].mean() * 100
-            return_std: float = df["return"].std() * 100
+            total_trade_count: int = daily_statistics.total_trade_count
+            daily_trade_count: int = daily_statistics.daily_trade_count
 
-            if return_std:
-                daily_risk_free: float = self.risk_free / np.sqrt(240)
-                sharpe_ratio: float = (daily_return - daily_risk_free) / return_std * np.sqrt(240)
-            else:
-                sharpe_ratio: float = 0
+            total_return: float = daily_statistics.total_return
+            annual_return: float = daily_statistics.annual_return
+            daily_return: float = daily_statistics.daily_return
+            return_std: float = daily_statistics.return_std
+            sharpe_ratio: float = daily_statistics.sharpe_ratio
 
-            return_drawdown_ratio: float = -total_net_pnl / max_drawdown
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return_drawdown_ratio: float = -total_net_pnl / max_drawdown
 
         # Output
         if output:
@@ -437,6 +539,21 @@ class BacktestingEngine:
         self.output("策略统计指标计算完成")
         return statistics
 
+    def get_daily_statistics(self, df: DataFrame) -> DailyStatistics:
+        """
+        Create statistics kernel from arrays of daily result DataFrame.
+        """
+        return DailyStatistics(
+            df.index.values,
+            df["net_pnl"].values,
+            df["commission"].values,
+            df["slippage"].values,
+            df["turnover"].values,
+            df["trade_count"].values,
+            capital=self.capital,
+            risk_free=self.risk_free
+        )
+
     def show_chart(self, df: DataFrame = None) -> None:
         """"""
         # Check DataFrame input exterior
@@ -447,6 +564,12 @@ class BacktestingEngine:
         if df is None:
             return
 
+        # Balance columns are not added if statistics calculated without output
+        if "balance" not in df:
+            daily_statistics: DailyStatistics = self.get_daily_statistics(df)
+            df["balance"] = daily_statistics.balance
+            df["drawdown"] = daily_statistics.drawdown
+
         fig = make_subplots(
             rows=4,
             cols=1,
@@ -573,70 +696,132 @@ class BacktestingEngine:
         if self.strategy.inited:
             self.update_daily_close(self.bars, dt)
 
+    def new_bars_panel(self, ix: int) -> None:
+        """"""
+        panel: BarPanel = self.bar_panel
+
+        bars: Dict[str, BarData] = panel.get_bars(ix)
+        self.datetime = panel.get_datetime(ix)
+
+        if self.active_limit_orders:
+            self.cross_limit_order_panel(ix)
+
+        self.strategy.on_bars(bars)
+
+        if self.strategy.inited:
+            self.update_daily_close_panel(ix)
+
+    def update_daily_close_panel(self, ix: int) -> None:
+        """"""
+        d: date = self.datetime.date()
+        daily_result: Optional[PortfolioDailyResult] = self.daily_results.get(d, None)
+
+        # Close prices updated by other rows of the day are overwritten
+        if daily_result and not self.day_ends[ix]:
+            return
+
+        panel: BarPanel = self.bar_panel
+        columns: List[int] = np.flatnonzero(panel.started[ix]).tolist()
+        closes: List[float] = panel.close[ix].tolist()
+
+        close_prices: dict = {panel.vt_symbols[column]: closes[column] for column in columns}
+
+        if daily_result:
+            daily_result.update_close_prices(close_prices)
+        else:
+            self.daily_results[d] = PortfolioDailyResult(d, close_prices)
+
     def cross_limit_order(self) -> None:
         """
         Cross limit order with last bar/tick data.
         """
         for order in list(self.active_limit_orders.values()):
             bar: BarData = self.bars[order.vt_symbol]
+            self.cross_order(order, bar.open_price, bar.high_price, bar.low_price)
 
-            long_cross_price: float = bar.low_price
-            short_cross_price: float = bar.high_price
-            long_best_price: float = bar.open_price
-            short_best_price: float = bar.open_price
-
-            # Push order update with status "not traded" (pending).
-            if order.status == Status.SUBMITTING:
-                order.status = Status.NOTTRADED
-                self.strategy.update_order(order)
-
-            # Check whether limit orders can be filled.
-            long_cross: bool = (
-                order.direction == Direction.LONG
-                and order.price >= long_cross_price
-                and long_cross_price > 0
-            )
+    def cross_limit_order_panel(self, ix: int) -> None:
+        """
+        Cross limit order with row of bar panel.
+        """
+        panel: BarPanel = self.bar_panel
 
-            short_cross: bool = (
-                order.direction == Direction.SHORT
-                and order.price <= short_cross_price
-                and short_cross_price > 0
-            )
+        for order in list(self.active_limit_orders.values()):
+            column: int = panel.columns[order.vt_symbol]
 
-            if not long_cross and not short_cross:
-                continue
+            self.cross_order(
+                order,
+                float(panel.open[ix, column]),
+                float(panel.high[ix, column]),
+                float(panel.low[ix, column])
+            )
 
-            # Push order update with status "all traded" (filled).
-            order.traded = order.volume
-            order.status = Status.ALLTRADED
+    def cross_order(
+        self,
+        order: OrderData,
+        open_price: float,
+        high_price: float,
+        low_price: float
+    ) -> None:
+        """
+        Cross limit order with bar prices of its symbol.
+        """
+        long_cross_price: float = low_price
+        short_cross_price: float = high_price
+        long_best_price: float = open_price
+        short_best_price: float = open_price
+
+        # Push order update with status "not traded" (pending).
+        if order.status == Status.SUBMITTING:
+            order.status = Status.NOTTRADED
             self.strategy.update_order(order)
 
-            if order.vt_orderid in self.active_limit_orders:
-                self.active_limit_orders.pop(order.vt_orderid)
-
-            # Push trade update
-            self.trade_count += 1
-
-            if long_cross:
-                trade_price = min(order.price, long_best_price)
-            else:
-                trade_price = max(order.price, short_best_price)
-
-            trade: TradeData = TradeData(
-                symbol=order.symbol,
-                exchange=order.exchange,
-                orderid=order.orderid,
-                tradeid=str(self.trade_count),
-                direction=order.direction,
-                offset=order.offset,
-                price=trade_price,
-                volume=order.volume,
-                datetime=self.datetime,
-                gateway_name=self.gateway_name,
-            )
+        # Check whether limit orders can be filled.
+        long_cross: bool = (
+            order.direction == Direction.LONG
+            and order.price >= long_cross_price
+            and long_cross_price > 0
+        )
 
-            self.strategy.update_trade(trade)
-            self.trades[trade.vt_tradeid] = trade
+        short_cross: bool = (
+            order.direction == Direction.SHORT
+            and order.price <= short_cross_price
+            and short_cross_price > 0
+        )
+
+        if not long_cross and not short_cross:
+            return
+
+        # Push order update with status "all traded" (filled).
+        order.traded = order.volume
+        order.status = Status.ALLTRADED
+        self.strategy.update_order(order)
+
+        if order.vt_orderid in self.active_limit_orders:
+            self.active_limit_orders.pop(order.vt_orderid)
+
+        # Push trade update
+        self.trade_count += 1
+
+        if long_cross:
+            trade_price = min(order.price, long_best_price)
+        else:
+            trade_price = max(order.price, short_best_price)
+
+        trade: TradeData = TradeData(
+            symbol=order.symbol,
+            exchange=order.exchange,
+            orderid=order.orderid,
+            tradeid=str(self.trade_count),
+            direction=order.direction,
+            offset=order.offset,
+            price=trade_price,
+            volume=order.volume,
+            datetime=self.datetime,
+            gateway_name=self.gateway_name,
+        )
+
+        self.strategy.update_trade(trade)
+        self.trades[trade.vt_tradeid] = trade
 
     def load_bars(
         self,
@@ -773,54 +958,6 @@ class ContractDailyResult:
         self.total_pnl: float = 0
         self.net_pnl: float = 0
 
-    def add_trade(self, trade: TradeData) -> None:
-        """"""
-        self.trades.append(trade)
-
-    def calculate_pnl(
-        self,
-        pre_close: float,
-        start_pos: float,
-        size: int,
-        rate: float,
-        slippage: float
-    ) -> None:
-        """"""
-        # If no pre_close provided on the first day,
-        # use value 1 to avoid zero division error
-        if pre_close:
-            self.pre_close = pre_close
-        else:
-            self.pre_close = 1
-
-        # Holding pnl is the pnl from holding position at day start
-        self.start_pos = start_pos
-        self.end_pos = start_pos
-
-        self.holding_pnl = self.start_pos * (self.close_price - self.pre_close) * size
-
-        # Trading pnl is the pnl from new trade during the day
-        self.trade_count = len(self.trades)
-
-        for trade in self.trades:
-            if trade.direction == Direction.LONG:
-                pos_change = trade.volume
-            else:
-                pos_change = -trade.volume
-
-            self.end_pos += pos_change
-
-            turnover: float = trade.volume * size * trade.price
-
-            self.trading_pnl += pos_change * (self.close_price - trade.price) * size
-            self.slippage += trade.volume * size * slippage
-            self.turnover += turnover
-            self.commission += turnover * rate
-
-        # Net pnl takes account of commission and slippage cost
-        self.total_pnl = self.trading_pnl + self.holding_pnl
-        self.net_pnl = self.total_pnl - self.commission - self.slippage
-
     def update_close_price(self, close_price: float) -> None:
         """"""
         self.close_price = close_price
@@ -851,42 +988,6 @@ class PortfolioDailyResult:
         self.total_pnl: float = 0
         self.net_pnl: float = 0
 
-    def add_trade(self, trade: TradeData) -> None:
-        """"""
-        contract_result: ContractDailyResult = self.contract_results[trade.vt_symbol]
-        contract_result.add_trade(trade)
-
-    def calculate_pnl(
-        self,
-        pre_closes: Dict[str, float],
-        start_poses: Dict[str, float],
-        sizes: Dict[str, float],
-        rates: Dict[str, float],
-        slippages: Dict[str, float],
-    ) -> None:
-        """"""
-        self.pre_closes = pre_closes
-
-        for vt_symbol, contract_result in self.contract_results.items():
-            contract_result.calculate_pnl(
-                pre_closes.get(vt_symbol, 0),
-                start_poses.get(vt_symbol, 0),
-                sizes[vt_symbol],
-                rates[vt_symbol],
-                slippages[vt_symbol]
-            )
-
-            self.trade_count += contract_result.trade_count
-            self.turnover += contract_result.turnover
-            self.commission += contract_result.commission
-            self.slippage += contract_result.slippage
-            self.trading_pnl += contract_result.trading_pnl
-            self.holding_pnl += contract_result.holding_pnl
-            self.total_pnl += contract_result.total_pnl
-            self.net_pnl += contract_result.net_pnl
-
-            self.end_poses[vt_symbol] = contract_result.end_pos
-
     def update_close_prices(self, close_prices: Dict[str, float]) -> None:
         """"""
         self.close_prices = close_prices
@@ -914,6 +1015,42 @@ def load_bar_data(
     )
 
 
+def load_bar_array(
+    vt_symbol: str,
+    interval: Interval,
+    start: datetime,
+    end: datetime
+) -> BarArray:
+    """
+    Load bar array through on-disk columnar cache.
+    """
+    symbol, exchange = extract_vt_symbol(vt_symbol)
+
+    bar_cache: BarCache = BarCache(get_database())
+
+    return bar_cache.load(
+        symbol, exchange, interval, start, end
+    )
+
+
+def load_bar_panel(
+    vt_symbols: List[str],
+    interval: Interval,
+    start: datetime,
+    end: datetime
+) -> BarPanel:
+    """
+    Load bar arrays of all symbols in parallel threads and align into panel.
+    """
+    with ThreadPoolExecutor(min(len(vt_symbols), 16) or 1) as executor:
+        bar_arrays: List[BarArray] = list(executor.map(
+            lambda vt_symbol: load_bar_array(vt_symbol, interval, start, end),
+            vt_symbols
+        ))
+
+    return BarPanel.from_bar_arrays(bar_arrays)
+
+
 def evaluate(
     target_name: str,
     strategy_class: StrategyTemplate,
@@ -926,6 +1063,7 @@ def evaluate(
     priceticks: Dict[str, float],
     capital: int,
     end: datetime,
+    columnar: bool,
     setting: dict
 ) -> tuple:
     """
@@ -943,6 +1081,7 @@ def evaluate(
         priceticks=priceticks,
         capital=capital,
         end=end,
+        columnar=columnar
     )
 
     engine.add_strategy(strategy_class, setting)
@@ -971,7 +1110,8 @@ def wrap_evaluate(engine: BacktestingEngine, target_name: str) -> callable:
         engine.sizes,
         engine.priceticks,
         engine.capital,
-        engine.end
+        engine.end,
+        engine.columnar
     )
     return func
 
@@ -1,7 +1,10 @@
 """"""
 
 from collections import defaultdict
-from typing import Callable, Dict
+from datetime import date
+from heapq import heappush, heappop, heapify
+from time import monotonic
+from typing import Callable, Dict, List, Set, Tuple
 
 from howtrader.event import Event, EventEngine
 from howtrader.trader.object import OrderData, OrderRequest, LogData, TradeData
@@ -25,11 +28,18 @@ class RiskEngine(BaseEngine):
 
         self.active: bool = False
 
-        self.order_flow_count: int = 0
         self.order_flow_limit: int = 50
-
         self.order_flow_clear: int = 1
-        self.order_flow_timer: int = 0
+
+        # Limits of symbol and gateway flow, 0 for no limit
+        self.symbol_flow_limit: int = 0
+        self.gateway_flow_limit: int = 0
+
+        self.order_flow: FlowWindow = FlowWindow(self.order_flow_limit, self.order_flow_clear)
+        self.symbol_flows: Dict[str, FlowWindow] = {}
+        self.gateway_flows: Dict[str, FlowWindow] = {}
+
+        self.trading_day: date = date.today()
 
         self.order_size_limit: int = 100
 
@@ -40,6 +50,7 @@ class RiskEngine(BaseEngine):
         self.order_cancel_counts: Dict[str, int] = defaultdict(int)
 
         self.active_order_limit: int = 50
+        self.active_orderids: Set[str] = set()
 
         self.active_order_books: Dict[str, ActiveOrderBook] = {}
 
@@ -71,6 +82,12 @@ class RiskEngine(BaseEngine):
         self.trade_limit = setting["trade_limit"]
         self.active_order_limit = setting["active_order_limit"]
         self.order_cancel_limit = setting["order_cancel_limit"]
+        self.symbol_flow_limit = setting.get("symbol_flow_limit", self.symbol_flow_limit)
+        self.gateway_flow_limit = setting.get("gateway_flow_limit", self.gateway_flow_limit)
+
+        self.order_flow = FlowWindow(self.order_flow_limit, self.order_flow_clear)
+        self.symbol_flows.clear()
+        self.gateway_flows.clear()
 
         if self.active:
             self.write_log("交易风控功能启动")
@@ -87,6 +104,8 @@ class RiskEngine(BaseEngine):
             "trade_limit": self.trade_limit,
             "active_order_limit": self.active_order_limit,
             "order_cancel_limit": self.order_cancel_limit,
+            "symbol_flow_limit": self.symbol_flow_limit,
+            "gateway_flow_limit": self.gateway_flow_limit,
         }
         return setting
 
@@ -116,6 +135,11 @@ class RiskEngine(BaseEngine):
         order_book = self.get_order_book(order.vt_symbol)
         order_book.update_order(order)
 
+        if order.is_active():
+            self.active_orderids.add(order.vt_orderid)
+        else:
+            self.active_orderids.discard(order.vt_orderid)
+
         if order.status != Status.CANCELLED:
             return
         self.order_cancel_counts[order.vt_symbol] += 1
@@ -126,12 +150,14 @@ class RiskEngine(BaseEngine):
         self.trade_count += trade.volume
 
     def process_timer_event(self, event: Event) -> None:
-        """"""
-        self.order_flow_timer += 1
+        """清空上一交易日的成交和撤单统计"""
+        today: date = date.today()
+        if today == self.trading_day:
+            return
+        self.trading_day = today
 
-        if self.order_flow_timer >= self.order_flow_clear:
-            self.order_flow_count = 0
-            self.order_flow_timer = 0
+        self.trade_count = 0
+        self.order_cancel_counts.clear()
 
     def write_log(self, msg: str) -> None:
         """"""
@@ -161,13 +187,22 @@ class RiskEngine(BaseEngine):
             return False
 
         # Check flow count
-        if self.order_flow_count >= self.order_flow_limit:
-            self.write_log(
-                f"委托流数量{self.order_flow_count}，超过限制每{self.order_flow_clear}秒{self.order_flow_limit}次")
-            return False
+        now: float = monotonic()
+
+        flows: List[FlowWindow] = [self.order_flow]
+        if self.symbol_flow_limit:
+            flows.append(self.get_flow(self.symbol_flows, req.vt_symbol, self.symbol_flow_limit))
+        if self.gateway_flow_limit:
+            flows.append(self.get_flow(self.gateway_flows, gateway_name, self.gateway_flow_limit))
+
+        for flow in flows:
+            if not flow.check(now):
+                self.write_log(
+                    f"委托流数量{flow.get_count(now)}，超过限制每{flow.interval}秒{flow.limit}次")
+                return False
 
         # Check all active orders
-        active_order_count: int = len(self.main_engine.get_all_active_orders())
+        active_order_count: int = len(self.active_orderids)
         if active_order_count >= self.active_order_limit:
             self.write_log(
                 f"当前活动委托次数{active_order_count}，超过限制{self.active_order_limit}")
@@ -193,9 +228,34 @@ class RiskEngine(BaseEngine):
                 return False
 
         # Add flow count if pass all checks
-        self.order_flow_count += 1
+        for flow in flows:
+            flow.add(now)
         return True
 
+    def get_flow(self, flows: Dict[str, "FlowWindow"], key: str, limit: int) -> "FlowWindow":
+        """"""
+        flow: FlowWindow = flows.get(key, None)
+        if not flow:
+            flow = FlowWindow(limit, self.order_flow_clear)
+            flows[key] = flow
+        return flow
+
+    def get_flow_utilization(self, vt_symbol: str = "", gateway_name: str = "") -> float:
+        """
+        获取委托流控使用率，取全局、合约、接口中的最大值，
+        策略可以在达到1之前主动降低委托频率。
+        """
+        now: float = monotonic()
+        utilization: float = self.order_flow.get_utilization(now)
+
+        if vt_symbol and vt_symbol in self.symbol_flows:
+            utilization = max(utilization, self.symbol_flows[vt_symbol].get_utilization(now))
+
+        if gateway_name and gateway_name in self.gateway_flows:
+            utilization = max(utilization, self.gateway_flows[gateway_name].get_utilization(now))
+
+        return utilization
+
     def get_order_book(self, vt_symbol: str) -> "ActiveOrderBook":
         """"""
         order_book: ActiveOrderBook = self.active_order_books.get(vt_symbol, None)
@@ -205,8 +265,52 @@ class RiskEngine(BaseEngine):
         return order_book
 
 
+class FlowWindow:
+    """
+    委托流控滑动窗口
+
+    环形缓冲区保存最近limit笔委托的时间，最早一笔仍在窗口内时说明
+    窗口内已有limit笔委托，检查和记录都只访问一个位置。
+    """
+
+    def __init__(self, limit: int, interval: float) -> None:
+        """"""
+        self.limit: int = limit
+        self.interval: float = interval
+
+        self.times: List[float] = [float("-inf")] * max(limit, 1)
+        self.index: int = 0
+
+    def check(self, now: float) -> bool:
+        """检查是否可以再发出一笔委托"""
+        if self.limit <= 0:
+            return False
+        return self.times[self.index] + self.interval <= now
+
+    def add(self, now: float) -> None:
+        """记录一笔委托"""
+        self.times[self.index] = now
+        self.index = (self.index + 1) % len(self.times)
+
+    def get_count(self, now: float) -> int:
+        """获取窗口内委托数量"""
+        start: float = now - self.interval
+        return sum(1 for t in self.times if t > start)
+
+    def get_utilization(self, now: float) -> float:
+        """获取窗口使用率"""
+        if self.limit <= 0:
+            return 1
+        return self.get_count(now) / self.limit
+
+
 class ActiveOrderBook:
-    """活动委托簿"""
+    """
+    活动委托簿
+
+    买卖价格分别保存在堆中，撤销或成交的委托不立即从堆中删除，
+    而是在查询最优价格时跳过，使更新和查询都不需要遍历全部委托。
+    """
 
     def __init__(self, vt_symbol: str) -> None:
         """"""
@@ -215,27 +319,51 @@ class ActiveOrderBook:
         self.bid_prices: Dict[str, float] = {}
         self.ask_prices: Dict[str, float] = {}
 
+        # Bid prices are negated for max heap
+        self.bid_heap: List[Tuple[float, str]] = []
+        self.ask_heap: List[Tuple[float, str]] = []
+
     def update_order(self, order: OrderData) -> None:
         """更新委托数据"""
         if order.is_active():
             if order.direction == Direction.LONG:
-                self.bid_prices[order.vt_orderid] = order.price
+                if self.bid_prices.get(order.vt_orderid, None) != order.price:
+                    self.bid_prices[order.vt_orderid] = order.price
+                    self.push(self.bid_heap, self.bid_prices, -1, order.vt_orderid)
             else:
-                self.ask_prices[order.vt_orderid] = order.price
+                if self.ask_prices.get(order.vt_orderid, None) != order.price:
+                    self.ask_prices[order.vt_orderid] = order.price
+                    self.push(self.ask_heap, self.ask_prices, 1, order.vt_orderid)
         else:
             if order.vt_orderid in self.bid_prices:
                 self.bid_prices.pop(order.vt_orderid)
             elif order.vt_orderid in self.ask_prices:
                 self.ask_prices.pop(order.vt_orderid)
 
+    def push(self, heap: list, prices: dict, sign: int, vt_orderid: str) -> None:
+        """添加价格到堆中，过期记录过多时重建堆"""
+        heappush(heap, (sign * prices[vt_orderid], vt_orderid))
+
+        if len(heap) > 2 * len(prices) + 64:
+            heap[:] = [(sign * price, orderid) for orderid, price in prices.items()]
+            heapify(heap)
+
     def get_best_bid(self) -> float:
         """获取最高买价"""
-        if not self.bid_prices:
-            return 0
-        return max(self.bid_prices.values())
+        heap: list = self.bid_heap
+        while heap:
+            price, vt_orderid = heap[0]
+            if self.bid_prices.get(vt_orderid, None) == -price:
+                return -price
+            heappop(heap)
+        return 0
 
     def get_best_ask(self) -> float:
         """获取最低卖价"""
-        if not self.ask_prices:
-            return 0
-        return min(self.ask_prices.values())
+        heap: list = self.ask_heap
+        while heap:
+            price, vt_orderid = heap[0]
+            if self.ask_prices.get(vt_orderid, None) == price:
+                return price
+            heappop(heap)
+        return 0
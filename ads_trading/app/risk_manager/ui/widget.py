@@ -28,6 +28,8 @@ class RiskManager(QtWidgets.QDialog):
 
         self.flow_limit_spin = RiskManagerSpinBox()
         self.flow_clear_spin = RiskManagerSpinBox()
+        self.symbol_flow_spin = RiskManagerSpinBox()
+        self.gateway_flow_spin = RiskManagerSpinBox()
         self.size_limit_spin = RiskManagerSpinBox()
         self.trade_limit_spin = RiskManagerSpinBox()
         self.active_limit_spin = RiskManagerSpinBox()
@@ -40,7 +42,9 @@ class RiskManager(QtWidgets.QDialog):
         form = QtWidgets.QFormLayout()
         form.addRow("风控运行状态", self.active_combo)
         form.addRow("委托流控上限（笔）", self.flow_limit_spin)
-        form.addRow("委托流控清空（秒）", self.flow_clear_spin)
+        form.addRow("委托流控窗口（秒）", self.flow_clear_spin)
+        form.addRow("合约流控上限（笔，0不限）", self.symbol_flow_spin)
+        form.addRow("接口流控上限（笔，0不限）", self.gateway_flow_spin)
         form.addRow("单笔委托上限（数量）", self.size_limit_spin)
         form.addRow("总成交上限（笔）", self.trade_limit_spin)
         form.addRow("活动委托上限（笔）", self.active_limit_spin)
@@ -69,6 +73,8 @@ class RiskManager(QtWidgets.QDialog):
             "trade_limit": self.trade_limit_spin.value(),
             "active_order_limit": self.active_limit_spin.value(),
             "order_cancel_limit": self.cancel_limit_spin.value(),
+            "symbol_flow_limit": self.symbol_flow_spin.value(),
+            "gateway_flow_limit": self.gateway_flow_spin.value(),
         }
 
         self.rm_engine.update_setting(setting)
@@ -90,6 +96,8 @@ class RiskManager(QtWidgets.QDialog):
         self.trade_limit_spin.setValue(setting["trade_limit"])
         self.active_limit_spin.setValue(setting["active_order_limit"])
         self.cancel_limit_spin.setValue(setting["order_cancel_limit"])
+        self.symbol_flow_spin.setValue(setting["symbol_flow_limit"])
+        self.gateway_flow_spin.setValue(setting["gateway_flow_limit"])
 
     def exec_(self) -> None:
         """"""
@@ -3,7 +3,6 @@ from datetime import date, datetime
 from typing import Callable, Type, Dict, List
 from functools import partial
 
-import numpy as np
 from pandas import DataFrame
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -23,6 +22,8 @@ from howtrader.trader.optimize import (
     run_ga_optimization
 )
 
+from ads_trading.trader.statistics import DailyStatistics
+
 from .template import SpreadStrategyTemplate, SpreadAlgoTemplate
 from .base import SpreadData, BacktestingMode, load_bar_data, load_tick_data
 
@@ -44,6 +45,7 @@ class BacktestingEngine:
         self.pricetick = 0
         self.capital = 1_000_000
         self.mode = BacktestingMode.BAR
+        self.cache = False
 
         self.strategy_class: Type[SpreadStrategyTemplate] = None
         self.strategy: SpreadStrategyTemplate = None
@@ -104,9 +106,12 @@ class BacktestingEngine:
         pricetick: float,
         capital: int = 0,
         end: datetime = None,
-        mode: BacktestingMode = BacktestingMode.BAR
+        mode: BacktestingMode = BacktestingMode.BAR,
+        cache: bool = False
     ):
-        """"""
+        """
+        cache: load bar data through on-disk leg bar cache and spread cache.
+        """
         self.spread = spread
         self.interval = Interval(interval)
         self.rate = rate
@@ -117,6 +122,7 @@ class BacktestingEngine:
         self.capital = capital
         self.end = end
         self.mode = mode
+        self.cache = cache
 
     def add_strategy(self, strategy_class: type, setting: dict):
         """"""
@@ -146,7 +152,8 @@ class BacktestingEngine:
                 self.interval,
                 self.start,
                 self.end,
-                self.pricetick
+                self.pricetick,
+                self.cache
             )
         else:
             self.history_data = load_tick_data(
@@ -271,57 +278,50 @@ class BacktestingEngine:
             sharpe_ratio = 0
             return_drawdown_ratio = 0
         else:
-            # Calculate balance related time series data
-            df["balance"] = df["net_pnl"].cumsum() + self.capital
-            df["return"] = np.log(df["balance"] / df["balance"].shift(1)).fillna(0)
-            df["highlevel"] = (
-                df["balance"].rolling(
-                    min_periods=1, window=len(df), center=False).max()
-            )
-            df["drawdown"] = df["balance"] - df["highlevel"]
-            df["ddpercent"] = df["drawdown"] / df["highlevel"] * 100
-
-            # Calculate statistics value
-            start_date = df.index[0]
-            end_date = df.index[-1]
+            daily_statistics: DailyStatistics = self.get_daily_statistics(df)
 
-            total_days = len(df)
-            profit_days = len(df[df["net_pnl"] > 0])
-            loss_days = len(df[df["net_pnl"] < 0])
+            # Balance related time series data is only needed for output
+            if output:
+                df["balance"] = daily_statistics.balance
+                df["return"] = daily_statistics.returns
+                df["highlevel"] = daily_statistics.highlevel
+                df["drawdown"] = daily_statistics.drawdown
+                df["ddpercent"] = daily_statistics.ddpercent
 
-            end_balance = df["balance"].iloc[-1]
-            max_drawdown = df["drawdown"].min()
-            max_ddpercent = df["ddpercent"].min()
-            max_drawdown_end = df["drawdown"].idxmin()
-            max_drawdown_start = df["balance"][:max_drawdown_end].idxmax()
-            max_drawdown_duration = (max_drawdown_end - max_drawdown_start).days
+            # Calculate statistics value
+            start_date = daily_statistics.start_date
+            end_date = daily_statistics.end_date
 
-            total_net_pnl = df["net_pnl"].sum()
-            daily_net_pnl = total_net_pnl / total_days
+            total_days = daily_statistics.total_days
+            profit_days = daily_statistics.profit_days
+            loss_days = daily_statistics.loss_days
 
-            total_commission = df["commission"].sum()
-            daily_commission = total_commission / total_days
+            end_balance = daily_statistics.end_balance
+            max_drawdown = daily_statistics.max_drawdown
+            max_ddpercent = daily_statistics.max_ddpercent
+            max_drawdown_duration = daily_statistics.max_drawdown_duration
 
-            total_slippage = df["slippage"].sum()
-            daily_slippage = total_slippage / total_days
+            total_net_pnl = daily_statistics.total_net_pnl
+            daily_net_pnl = daily_statistics.daily_net_pnl
 
-            total_turnover = df["turnover"].sum()
-            daily_turnover = total_turnover / total_days
+            total_commission = daily_statistics.total_commission
+            daily_commission = daily_statistics.daily_commission
 
-            total_trade_count = df["trade_count"].sum()
-            daily_trade_count = total_trade_count / total_days
+            total_slippage = daily_statistics.total_slippage
+            daily_slippage = daily_statistics.daily_slippage
 
-            total_return = (end_balance / self.capital - 1) * 100
-            annual_return = total_return / total_days * 240
-            daily_return = df["return"].mean() * 100
-            return_std = df["return"].std() * 100
+            total_turnover = daily_statistics.total_turnover
+            daily_turnover = daily_statistics.daily_turnover
 
-            if return_std:
-                sharpe_ratio = daily_return / return_std * np.sqrt(240)
-            else:
-                sharpe_ratio = 0
+            total_trade_count = daily_statistics.total_trade_count
+            daily_trade_count = daily_statistics.daily_trade_count
 
-            return_drawdown_ratio = -total_return / max_ddpercent
+            total_return = daily_statistics.total_return
+            annual_return = daily_statistics.annual_return
+            daily_return = daily_statistics.daily_return
+            return_std = daily_statistics.return_std
+            sharpe_ratio = daily_statistics.sharpe_ratio
+            return_drawdown_ratio = daily_statistics.return_drawdown_ratio
 
         # Output
         if output:
@@ -390,6 +390,20 @@ class BacktestingEngine:
 
         return statistics
 
+    def get_daily_statistics(self, df: DataFrame) -> DailyStatistics:
+        """
+        Create statistics kernel from arrays of daily result DataFrame.
+        """
+        return DailyStatistics(
+            df.index.values,
+            df["net_pnl"].values,
+            df["commission"].values,
+            df["slippage"].values,
+            df["turnover"].values,
+            df["trade_count"].values,
+            capital=self.capital
+        )
+
     def show_chart(self, df: DataFrame = None):
         """"""
         # Check DataFrame input exterior
@@ -400,6 +414,12 @@ class BacktestingEngine:
         if df is None:
             return
 
+        # Balance columns are not added if statistics calculated without output
+        if "balance" not in df:
+            daily_statistics: DailyStatistics = self.get_daily_statistics(df)
+            df["balance"] = daily_statistics.balance
+            df["drawdown"] = daily_statistics.drawdown
+
         fig = make_subplots(
             rows=4,
             cols=1,
@@ -1,15 +1,26 @@
+import ast
+import hashlib
+import os
 from collections import defaultdict
-from typing import Dict, List
+from functools import reduce
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
 from datetime import datetime
 from enum import Enum
 from tzlocal import get_localzone
 
+import numpy as np
+import simplejson
+
 from howtrader.trader.object import (
-    HistoryRequest, TickData, PositionData, TradeData, ContractData, BarData
+    TickData, PositionData, TradeData, ContractData, BarData
 )
 from howtrader.trader.constant import Direction, Offset, Exchange, Interval
-from howtrader.trader.utility import floor_to, ceil_to, round_to, extract_vt_symbol
-from howtrader.trader.database import BaseDatabase, get_database
+from howtrader.trader.utility import floor_to, ceil_to, round_to, extract_vt_symbol, get_folder_path
+from howtrader.trader.database import BaseDatabase, DB_TZ, get_database
+
+from ads_trading.trader.columnar import BarArray, BarCache, from_timestamp_us
+from ads_trading.trader.database import convert_tz
 
 
 EVENT_SPREAD_DATA = "eSpreadData"
@@ -18,6 +29,12 @@ EVENT_SPREAD_LOG = "eSpreadLog"
 EVENT_SPREAD_ALGO = "eSpreadAlgo"
 EVENT_SPREAD_STRATEGY = "eSpreadStrategy"
 
+SPREAD_DTYPE: np.dtype = np.dtype([
+    ("datetime", "datetime64[us]"),
+    ("price", "f8"),
+    ("value", "f8"),
+])
+
 LOCAL_TZ = get_localzone()
 
 
@@ -57,8 +74,17 @@ class LegData:
         self.min_volume = contract.min_volume
         self.pricetick = contract.pricetick
 
-    def update_tick(self, tick: TickData):
-        """"""
+    def update_tick(self, tick: TickData) -> bool:
+        """
+        Update tick data and return whether top of book quote is changed.
+        """
+        changed: bool = (
+            tick.bid_price_1 != self.bid_price
+            or tick.ask_price_1 != self.ask_price
+            or tick.bid_volume_1 != self.bid_volume
+            or tick.ask_volume_1 != self.ask_volume
+        )
+
         self.bid_price = tick.bid_price_1
         self.ask_price = tick.ask_price_1
         self.bid_volume = tick.bid_volume_1
@@ -67,6 +93,8 @@ class LegData:
 
         self.tick = tick
 
+        return changed
+
     def update_position(self, position: PositionData):
         """"""
         if position.direction == Direction.NET:
@@ -129,6 +157,99 @@ class LegData:
             self.net_pos = self.long_pos - self.short_pos
 
 
+class SpreadFormula:
+    """
+    Spread price formula compiled into function of leg prices.
+
+    Variables in formula are replaced by items of price sequence in the
+    order of variables, so the same function calculates one price from a
+    list of floats, or whole price series from 2-D array of (variable, time)
+    if formula only contains arithmetic operations.
+
+    Only formula string is pickled, function is compiled again when
+    unpickled, so it can be sent to optimization processes.
+    """
+
+    # Nodes which also work with NumPy arrays
+    ARRAY_NODES = (
+        ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load,
+        ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd
+    )
+
+    def __init__(self, formula: str, variables: List[str]) -> None:
+        """"""
+        self.formula: str = formula
+        self.variables: List[str] = list(variables)
+
+        self.func: Callable = None
+        self.vectorized: bool = False
+
+        self.compile()
+
+    def __getstate__(self) -> dict:
+        """"""
+        return {"formula": self.formula, "variables": self.variables}
+
+    def __setstate__(self, state: dict) -> None:
+        """"""
+        self.__init__(state["formula"], state["variables"])
+
+    def __call__(self, prices: Sequence[float]) -> float:
+        """
+        Calculate spread price with leg prices in order of variables.
+        """
+        return self.func(prices)
+
+    def compile(self) -> None:
+        """
+        Replace variable names with subscripts of price sequence argument.
+        """
+        tree: ast.Expression = ast.parse(self.formula.strip(), mode="eval")
+
+        self.vectorized = all(isinstance(node, self.ARRAY_NODES) for node in ast.walk(tree))
+
+        indexes: Dict[str, int] = {variable: i for i, variable in enumerate(self.variables)}
+
+        class VariableTransformer(ast.NodeTransformer):
+            def visit_Name(self, node: ast.Name) -> ast.AST:
+                if node.id not in indexes:
+                    return node
+
+                # Parsed subscript has the right slice node on every Python version
+                return ast.parse(f"_prices[{indexes[node.id]}]", mode="eval").body
+
+        body: ast.AST = VariableTransformer().visit(tree).body
+        args: ast.arguments = ast.arguments(
+            posonlyargs=[],
+            args=[ast.arg(arg="_prices")],
+            kwonlyargs=[],
+            kw_defaults=[],
+            defaults=[]
+        )
+
+        expression: ast.Expression = ast.Expression(body=ast.Lambda(args=args, body=body))
+        ast.fix_missing_locations(expression)
+
+        code = compile(expression, f"<spread formula: {self.formula}>", "eval")
+        self.func = eval(code, {})
+
+    def evaluate(self, data: Dict[str, float]) -> float:
+        """
+        Calculate spread price with dict of variable prices.
+        """
+        return self.func([data[variable] for variable in self.variables])
+
+    def calculate_array(self, prices: np.ndarray) -> np.ndarray:
+        """
+        Calculate spread price series with 2-D array of (variable, time).
+        """
+        if self.vectorized:
+            result = self.func(prices)
+            return np.broadcast_to(np.asarray(result, dtype="f8"), prices.shape[1:]).copy()
+
+        return np.array([self.func(column) for column in prices.T.tolist()], dtype="f8")
+
+
 class SpreadData:
     """"""
 
@@ -195,12 +316,9 @@ class SpreadData:
         self.variable_directions = variable_directions
         self.price_formula = price_formula
 
-        # 实盘时编译公式，加速计算
-        if compile_formula:
-            self.price_code = compile(price_formula, __name__, "eval")
-        # 回测时不编译公式，从而支持多进程优化
-        else:
-            self.price_code = price_formula
+        # 公式编译为按变量顺序读取价格的函数，可以pickle从而支持多进程优化
+        self.formula: SpreadFormula = SpreadFormula(price_formula, list(variable_symbols))
+        self.price_code = price_formula
 
         self.variable_legs = {}
         for variable, vt_symbol in variable_symbols.items():
@@ -217,8 +335,8 @@ class SpreadData:
         self.clear_price()
 
         # Go through all legs to calculate price
-        bid_data = {}
-        ask_data = {}
+        bid_prices: List[float] = []
+        ask_prices: List[float] = []
         volume_inited = False
 
         for variable, leg in self.variable_legs.items():
@@ -227,14 +345,14 @@ class SpreadData:
                 self.clear_price()
                 return False
 
-            # Generate price dict for calculating spread bid/ask
+            # Generate price list for calculating spread bid/ask
             variable_direction = self.variable_directions[variable]
             if variable_direction > 0:
-                bid_data[variable] = leg.bid_price
-                ask_data[variable] = leg.ask_price
+                bid_prices.append(leg.bid_price)
+                ask_prices.append(leg.ask_price)
             else:
-                bid_data[variable] = leg.ask_price
-                ask_data[variable] = leg.bid_price
+                bid_prices.append(leg.ask_price)
+                ask_prices.append(leg.bid_price)
 
             # Calculate volume
             trading_multiplier = self.trading_multipliers[leg.vt_symbol]
@@ -274,8 +392,8 @@ class SpreadData:
                 self.ask_volume = min(self.ask_volume, adjusted_ask_volume)
 
         # Calculate spread price
-        self.bid_price = self.parse_formula(self.price_code, bid_data)
-        self.ask_price = self.parse_formula(self.price_code, ask_data)
+        self.bid_price = self.formula(bid_prices)
+        self.ask_price = self.formula(ask_prices)
 
         # Round price to pricetick
         if self.pricetick:
@@ -379,9 +497,10 @@ class SpreadData:
 
     def parse_formula(self, formula: str, data: Dict[str, float]):
         """"""
-        locals().update(data)
-        value = eval(formula)
-        return value
+        if formula == self.price_formula:
+            return self.formula.evaluate(data)
+
+        return eval(formula, {}, data)
 
 
 class BacktestingMode(Enum):
@@ -394,73 +513,193 @@ def load_bar_data(
     interval: Interval,
     start: datetime,
     end: datetime,
-    pricetick: float = 0
+    pricetick: float = 0,
+    cache: bool = False
 ):
     """"""
-    database: BaseDatabase = get_database()
+    data: np.ndarray = load_spread_array(spread, interval, start, end, cache)
 
-    # Load bar data of each spread leg
-    leg_bars: Dict[str, Dict] = {}
+    # Generate spread bar data
+    spread_bars: List[BarData] = []
+
+    timestamps: List[int] = data["datetime"].view("int64").tolist()
+    prices: List[float] = data["price"].tolist()
+    values: List[float] = data["value"].tolist()
 
-    for vt_symbol in spread.legs.keys():
-        symbol, exchange = extract_vt_symbol(vt_symbol)
+    for timestamp, spread_price, spread_value in zip(timestamps, prices, values):
+        if pricetick:
+            spread_price = round_to(spread_price, pricetick)
 
-        # First, try to query history from RQData
-        bar_data: List[BarData] = query_bar_from_rq(
-            symbol, exchange, interval, start, end
+        spread_bar = BarData(
+            symbol=spread.name,
+            exchange=Exchange.LOCAL,
+            datetime=from_timestamp_us(timestamp, DB_TZ),
+            interval=interval,
+            open_price=spread_price,
+            high_price=spread_price,
+            low_price=spread_price,
+            close_price=spread_price,
+            gateway_name="SPREAD",
         )
+        spread_bar.value = spread_value
+        spread_bars.append(spread_bar)
 
-        # If failed, query history from database
-        if not bar_data:
-            bar_data = database.load_bar_data(
-                symbol, exchange, interval, start, end
-            )
+    return spread_bars
 
-        bars: Dict[datetime, BarData] = {bar.datetime: bar for bar in bar_data}
-        leg_bars[vt_symbol] = bars
 
-    # Calculate spread bar data
-    spread_bars: List[BarData] = []
+def load_spread_array(
+    spread: SpreadData,
+    interval: Interval,
+    start: datetime,
+    end: datetime,
+    cache: bool = False
+) -> np.ndarray:
+    """
+    Load spread price and value series of SPREAD_DTYPE.
 
-    for dt in bars.keys():
-        spread_price = 0
-        spread_value = 0
-        spread_available = True
+    With cache enabled, leg bars are loaded through BarCache, and series of
+    finished range is cached on disk by hash of spread definition, interval,
+    range and leg bar caches, so repeated backtesting loads it without leg
+    data. Leg cache cleared or extended gives a new cache file.
+    """
+    start = BarCache.convert_datetime(start)
+    end = BarCache.convert_datetime(end)
 
-        leg_data = {}
-        for variable, leg in spread.variable_legs.items():
-            leg_bar = leg_bars[leg.vt_symbol].get(dt, None)
+    database: BaseDatabase = get_database()
 
-            if leg_bar:
-                # 缓存该腿当前的价格
-                leg_data[variable] = leg_bar.close_price
+    if not cache:
+        bar_arrays: List[BarArray] = []
 
-                # 基于交易乘数累计价值
-                trading_multiplier = spread.trading_multipliers[leg.vt_symbol]
-                spread_value += trading_multiplier * leg_bar.close_price
-            else:
-                spread_available = False
-
-        if spread_available:
-            spread_price = spread.parse_formula(spread.price_code, leg_data)
-            if pricetick:
-                spread_price = round_to(spread_price, pricetick)
-
-            spread_bar = BarData(
-                symbol=spread.name,
-                exchange=exchange.LOCAL,
-                datetime=dt,
-                interval=interval,
-                open_price=spread_price,
-                high_price=spread_price,
-                low_price=spread_price,
-                close_price=spread_price,
-                gateway_name="SPREAD",
+        for leg in spread.variable_legs.values():
+            symbol, exchange = extract_vt_symbol(leg.vt_symbol)
+            bars: List[BarData] = database.load_bar_data(
+                symbol, exchange, interval, convert_tz(start), convert_tz(end)
             )
-            spread_bar.value = spread_value
-            spread_bars.append(spread_bar)
+            bar_arrays.append(BarArray.from_bars(bars, symbol, exchange, interval))
 
-    return spread_bars
+        return calculate_spread_array(spread, bar_arrays)
+
+    bar_cache: BarCache = BarCache(database)
+
+    path: Optional[Path] = get_spread_cache_path(spread, interval, start, end, bar_cache)
+    if path and path.exists():
+        return np.load(path)
+
+    # Load columnar bar data of each spread leg
+    bar_arrays: List[BarArray] = []
+
+    for leg in spread.variable_legs.values():
+        symbol, exchange = extract_vt_symbol(leg.vt_symbol)
+        bar_arrays.append(bar_cache.load(symbol, exchange, interval, start, end))
+
+    data: np.ndarray = calculate_spread_array(spread, bar_arrays)
+
+    # Range not finished yet may still get new bars
+    if end < datetime.now(DB_TZ):
+        # Leg caches may be created or extended by loading
+        path = get_spread_cache_path(spread, interval, start, end, bar_cache)
+
+        if path:
+            temp_path: Path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(temp_path, mode="wb") as f:
+                np.save(f, data)
+            os.replace(temp_path, path)
+
+    return data
+
+
+def clear_spread_cache(spread: SpreadData = None) -> None:
+    """
+    Delete cache files of spread, or all spreads if not given.
+    Call after overwriting leg history in database.
+    """
+    pattern: str = f"{get_spread_key(spread)}_*.npy" if spread else "*.npy"
+
+    for path in get_folder_path("spread_cache").glob(pattern):
+        path.unlink()
+
+
+def calculate_spread_array(spread: SpreadData, bar_arrays: List[BarArray]) -> np.ndarray:
+    """
+    Inner join bar arrays of variable legs on datetime and calculate spread
+    price and value series.
+    """
+    # Sorted merge of unique timestamps of all legs
+    timestamp: np.ndarray = np.empty(0, dtype="int64")
+    if bar_arrays:
+        timestamp = reduce(
+            lambda x, y: np.intersect1d(x, y, assume_unique=True),
+            [bar_array.timestamp for bar_array in bar_arrays]
+        )
+
+    prices: np.ndarray = np.empty((len(bar_arrays), len(timestamp)))
+    for i, bar_array in enumerate(bar_arrays):
+        rows: np.ndarray = np.searchsorted(bar_array.timestamp, timestamp)
+        prices[i] = bar_array.close[rows]
+
+    data: np.ndarray = np.empty(len(timestamp), dtype=SPREAD_DTYPE)
+    data["datetime"] = timestamp.view("datetime64[us]")
+    data["price"] = spread.formula.calculate_array(prices)
+
+    # Accumulate value leg by leg, same as summing in Python
+    value: np.ndarray = np.zeros(len(timestamp))
+    for i, leg in enumerate(spread.variable_legs.values()):
+        value += spread.trading_multipliers[leg.vt_symbol] * prices[i]
+    data["value"] = value
+
+    return data
+
+
+def get_spread_key(spread: SpreadData) -> str:
+    """
+    Get hash of spread definition.
+    """
+    definition: dict = {
+        "variable_symbols": spread.variable_symbols,
+        "price_formula": spread.price_formula,
+        "trading_multipliers": spread.trading_multipliers
+    }
+    return get_hash(definition)
+
+
+def get_spread_cache_path(
+    spread: SpreadData,
+    interval: Interval,
+    start: datetime,
+    end: datetime,
+    bar_cache: BarCache
+) -> Optional[Path]:
+    """
+    Get path of spread cache file. File name only contains hashes, since
+    spread name may not be a valid file name.
+
+    None is returned if any leg has no bar cache yet, as the leg data may
+    be downloaded later.
+    """
+    leg_metas: List[dict] = []
+    for leg in spread.variable_legs.values():
+        symbol, exchange = extract_vt_symbol(leg.vt_symbol)
+        leg_meta: Optional[dict] = bar_cache.get_meta(symbol, exchange, interval)
+        if not leg_meta:
+            return None
+        leg_metas.append(leg_meta)
+
+    definition: dict = {
+        "interval": interval.value,
+        "start": start.timestamp(),
+        "end": end.timestamp(),
+        "legs": leg_metas
+    }
+
+    return get_folder_path("spread_cache").joinpath(
+        f"{get_spread_key(spread)}_{get_hash(definition)}.npy"
+    )
+
+
+def get_hash(definition: dict) -> str:
+    """"""
+    text: str = simplejson.dumps(definition, sort_keys=True)
+    return hashlib.sha1(text.encode("UTF-8")).hexdigest()[:16]
 
 
 def load_tick_data(
@@ -474,24 +713,3 @@ def load_tick_data(
         spread.name, Exchange.LOCAL, start, end
     )
 
-
-def query_bar_from_rq(
-    symbol: str,
-    exchange: Exchange,
-    interval: Interval,
-    start: datetime,
-    end: datetime
-):
-    """
-    Query bar data from RQData, remove deprecated
-    """
-    # datafeed: BaseDatafeed = get_datafeed()
-    # req = HistoryRequest(
-    #     symbol=symbol,
-    #     exchange=exchange,
-    #     interval=interval,
-    #     start=start,
-    #     end=end
-    # )
-    # data = datafeed.query_bar_history(req)
-    # return data
\ No newline at end of file
@@ -1,7 +1,8 @@
 import traceback
 import importlib
 import os
-from typing import List, Dict, Set, Callable, Any, Type
+from time import perf_counter
+from typing import List, Dict, Callable, Any, Type
 from collections import defaultdict
 from copy import copy
 from pathlib import Path
@@ -23,6 +24,8 @@ from howtrader.trader.constant import (
 )
 from howtrader.trader.converter import OffsetConverter
 
+from ads_trading.trader.utility import JsonWriter, RecentIds
+
 from .base import (
     LegData, SpreadData,
     EVENT_SPREAD_DATA, EVENT_SPREAD_POS,
@@ -106,7 +109,16 @@ class SpreadDataEngine:
         self.symbol_spread_map: Dict[str, List[SpreadData]] = defaultdict(list)
         self.order_spread_map: Dict[str, SpreadData] = {}
 
-        self.tradeid_history: Set[str] = set()
+        self.tradeid_history: RecentIds = RecentIds()
+        self.pos_writer: JsonWriter = None
+
+        self.metrics: Dict[str, float] = {
+            "tick": 0,              # Leg ticks received
+            "unchanged": 0,         # Leg ticks with same top of book quote
+            "calculated": 0,        # Spread prices calculated
+            "tick_time": 0,         # Total seconds of processing leg ticks
+            "max_tick_time": 0
+        }
 
     def start(self):
         """"""
@@ -114,11 +126,15 @@ class SpreadDataEngine:
         self.load_pos()
         self.register_event()
 
+        self.pos_writer = JsonWriter(self.pos_filename, save_func=save_json)
+
         self.write_log("价差数据引擎启动成功")
 
     def stop(self):
         """"""
-        pass
+        if self.pos_writer:
+            self.pos_writer.close()
+            self.pos_writer = None
 
     def load_setting(self) -> None:
         """"""
@@ -165,13 +181,16 @@ class SpreadDataEngine:
         save_json(self.setting_filename, setting)
 
     def save_pos(self) -> None:
-        """保存价差持仓"""
+        """保存价差持仓，在后台线程写入文件"""
         pos_data = {}
 
         for spread in self.spreads.values():
-            pos_data[spread.name] = spread.leg_pos
+            pos_data[spread.name] = dict(spread.leg_pos)
 
-        save_json(self.pos_filename, pos_data)
+        if self.pos_writer:
+            self.pos_writer.save(pos_data)
+        else:
+            save_json(self.pos_filename, pos_data)
 
     def load_pos(self) -> None:
         """加载价差持仓"""
@@ -196,12 +215,27 @@ class SpreadDataEngine:
         leg = self.legs.get(tick.vt_symbol, None)
         if not leg:
             return
-        leg.update_tick(tick)
 
-        for spread in self.symbol_spread_map[tick.vt_symbol]:
-            # 只有能成功计算出价差盘口时，才会送事件
-            if spread.calculate_price():
-                self.put_data_event(spread)
+        start: float = perf_counter()
+        self.metrics["tick"] += 1
+
+        # 盘口未变化时价差也不会变化，无需重新计算
+        if leg.update_tick(tick):
+            for spread in self.symbol_spread_map[tick.vt_symbol]:
+                self.metrics["calculated"] += 1
+
+                # 只有能成功计算出价差盘口时，才会送事件
+                if spread.calculate_price():
+                    self.put_data_event(spread)
+        else:
+            self.metrics["unchanged"] += 1
+
+        # 只有价差腿的行情才推送给算法引擎
+        self.spread_engine.algo_engine.process_tick_event(event)
+
+        tick_time: float = perf_counter() - start
+        self.metrics["tick_time"] += tick_time
+        self.metrics["max_tick_time"] = max(tick_time, self.metrics["max_tick_time"])
 
     def process_position_event(self, event: Event) -> None:
         """"""
@@ -220,9 +254,8 @@ class SpreadDataEngine:
         """"""
         trade = event.data
 
-        if trade.vt_tradeid in self.tradeid_history:
+        if not self.tradeid_history.add(trade.vt_tradeid):
             return
-        self.tradeid_history.add(trade.vt_tradeid)
 
         # 查询该笔成交，对应的价差，并更新计算价差持仓
         spread = self.order_spread_map.get(trade.vt_orderid, None)
@@ -334,7 +367,10 @@ class SpreadDataEngine:
             self.save_setting()
 
         self.write_log("价差创建成功：{}".format(name))
-        self.put_data_event(spread)
+
+        # 价差腿可能已收到行情，盘口不变时不会再触发计算，因此创建后立即计算一次
+        if spread.calculate_price():
+            self.put_data_event(spread)
 
     def remove_spread(self, name: str) -> None:
         """"""
@@ -362,6 +398,19 @@ class SpreadDataEngine:
         """更新委托号对应的价差映射关系"""
         self.order_spread_map[vt_orderid] = spread
 
+    def get_metrics(self) -> Dict[str, float]:
+        """"""
+        metrics: Dict[str, float] = dict(self.metrics)
+        # howtrader的事件引擎没有get_queue_size，直接读取队列长度
+        metrics["queue_size"] = self.event_engine._queue.qsize()
+
+        if metrics["tick"]:
+            metrics["avg_tick_time"] = metrics["tick_time"] / metrics["tick"]
+        else:
+            metrics["avg_tick_time"] = 0
+
+        return metrics
+
 
 class SpreadAlgoEngine:
     """"""
@@ -377,14 +426,13 @@ class SpreadAlgoEngine:
 
         self.write_log = spread_engine.write_log
 
-        self.spreads: Dict[str: SpreadData] = {}
         self.algos: Dict[str: SpreadAlgoTemplate] = {}
 
         self.order_algo_map: Dict[str: SpreadAlgoTemplate] = {}
         self.symbol_algo_map: Dict[str: SpreadAlgoTemplate] = defaultdict(list)
 
         self.algo_count: int = 0
-        self.vt_tradeids: Set = set()
+        self.vt_tradeids: RecentIds = RecentIds()
 
     def start(self):
         """"""
@@ -399,22 +447,15 @@ class SpreadAlgoEngine:
 
     def register_event(self):
         """"""
-        self.event_engine.register(EVENT_TICK, self.process_tick_event)
         self.event_engine.register(EVENT_ORDER, self.process_order_event)
         self.event_engine.register(EVENT_TRADE, self.process_trade_event)
         self.event_engine.register(EVENT_POSITION, self.process_position_event)
         self.event_engine.register(EVENT_TIMER, self.process_timer_event)
-        self.event_engine.register(
-            EVENT_SPREAD_DATA, self.process_spread_event
-        )
-
-    def process_spread_event(self, event: Event):
-        """"""
-        spread: SpreadData = event.data
-        self.spreads[spread.name] = spread
 
     def process_tick_event(self, event: Event):
-        """"""
+        """
+        Called by data engine with tick of spread leg after spread updated.
+        """
         tick = event.data
         algos = self.symbol_algo_map[tick.vt_symbol]
         if not algos:
@@ -442,9 +483,8 @@ class SpreadAlgoEngine:
         trade = event.data
 
         # Filter duplicate trade push
-        if trade.vt_tradeid in self.vt_tradeids:
+        if not self.vt_tradeids.add(trade.vt_tradeid):
             return
-        self.vt_tradeids.add(trade.vt_tradeid)
 
         self.offset_converter.update_trade(trade)
 
@@ -480,7 +520,7 @@ class SpreadAlgoEngine:
         extra: dict
     ) -> str:
         # Find spread object
-        spread = self.spreads.get(spread_name, None)
+        spread = self.data_engine.get_spread(spread_name)
         if not spread:
             self.write_log("创建价差算法失败，找不到价差：{}".format(spread_name))
             return ""
@@ -639,7 +679,7 @@ class SpreadStrategyEngine:
         self.spread_strategy_map: Dict[str: SpreadStrategyTemplate] = defaultdict(
             list)
 
-        self.vt_tradeids: Set = set()
+        self.vt_tradeids: RecentIds = RecentIds()
 
         self.load_strategy_class()
 
@@ -777,6 +817,11 @@ class SpreadStrategyEngine:
     def process_trade_event(self, event: Event):
         """"""
         trade = event.data
+
+        # Filter duplicate trade push
+        if not self.vt_tradeids.add(trade.vt_tradeid):
+            return
+
         strategy = self.order_strategy_map.get(trade.vt_orderid, None)
 
         if strategy:
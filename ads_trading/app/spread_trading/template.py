@@ -352,7 +352,7 @@ class SpreadAlgoTemplate:
                 data[variable] = leg_cost / leg_traded
 
         if data:
-            self.traded_price = spread.parse_formula(spread.price_code, data)
+            self.traded_price = spread.formula.evaluate(data)
             self.traded_price = round_to(self.traded_price, spread.pricetick)
         else:
             self.traded_price = 0
@@ -131,6 +131,12 @@ class EventEngine:
         """
         self._queue.put(event)
 
+    def get_queue_size(self) -> int:
+        """
+        Get number of events waiting to be processed.
+        """
+        return self._queue.qsize()
+
     def register(self, type: str, handler: HandlerType) -> None:
         """
         Register a new handler function for a specific event type. Every
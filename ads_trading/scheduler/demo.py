@@ -1,12 +1,10 @@
 from apscheduler.schedulers.blocking import BlockingScheduler
-import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 import pandas as pd
 import numpy as np
-from ads_trading.trader.dbconnectors.sqlite_database import DBCoinAlphaFactor
-
-API_URL = "https://fapi.binance.com/fapi/v1/exchangeInfo"
-KLINES_URL = "https://fapi.binance.com/fapi/v1/klines"
+from ads_trading.trader.dbconnectors.sqlite_database import SqliteDatabase
+from ads_trading.scheduler.kline_fetcher import BASE_URL, KlineFetcher
+from ads_trading.scheduler.retracement import TIME_RANGES, analyze_panel, build_factors, to_report_rows
 
 
 def safe_strftime(date_obj, format_str='%Y-%m-%d', default='N/A'):
@@ -19,173 +17,13 @@ def safe_strftime(date_obj, format_str='%Y-%m-%d', default='N/A'):
         return default
 
 
-def get_kline_data(symbol_info, interval="1d", limit=1500):
-    """获取K线数据"""
-    try:
-        params = {
-            "symbol": symbol_info,
-            "interval": interval,
-            "limit": limit
-        }
-
-        response = requests.get(
-            url=KLINES_URL,
-            params=params,
-            timeout=30
-        )
-
-        if response.status_code != 200:
-            print(f"❌ 获取{symbol_info}的{interval}K线数据失败: {response.status_code}")
-            return None
-
-        data = response.json()
-
-        # 转换为DataFrame
-        df = pd.DataFrame(data, columns=[
-            'open_time', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_volume', 'trades', 'taker_buy_base',
-            'taker_buy_quote', 'ignore'
-        ])
-
-        # 转换时间戳和价格
-        df['open_time'] = pd.to_datetime(df['open_time'], unit='ms', errors='coerce')
-        df['close_time'] = pd.to_datetime(df['close_time'], unit='ms', errors='coerce')
-
-        # 过滤掉时间戳为NaT的行
-        df = df.dropna(subset=['open_time'])
-
-        # 转换价格列
-        price_columns = ['high', 'low', 'close', 'open']
-        for col in price_columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-
-        # 按时间排序
-        df = df.sort_values('open_time')
-
-        return df
-
-    except Exception as e:
-        print(f"❌ 处理{symbol_info}数据时出错: {e}")
-        return None
-
-
 def analyze_retracement(df, symbol_info, current_time=None):
     """分析回撤数据"""
     if df is None or len(df) == 0:
         print(f"⚠️  {symbol_info}: 无有效数据")
         return None
 
-    if current_time is None:
-        current_time = datetime.now()
-
-    # 定义时间范围 - 添加了六个月、八个月、十个月
-    time_ranges = {
-        '最近一天': timedelta(days=1),
-        '最近一个星期': timedelta(weeks=1),
-        '最近一个月': timedelta(days=30),
-        '最近四个月': timedelta(days=120),
-        '最近六个月': timedelta(days=180),  # 新增
-        '最近八个月': timedelta(days=240),  # 新增
-        '最近十个月': timedelta(days=300),  # 新增
-        '最近一年': timedelta(days=365),
-        '最近二年': timedelta(days=730),
-        '最近三年': timedelta(days=1095)
-    }
-
-    results = []
-
-    for range_name, delta in time_ranges.items():
-        cutoff_time = current_time - delta
-
-        try:
-            # 筛选时间范围内的数据
-            mask = df['open_time'] >= cutoff_time
-            period_df = df[mask]
-
-            if len(period_df) == 0:
-                results.append({
-                    '时间范围': range_name,
-                    '起始时间': safe_strftime(cutoff_time),
-                    '数据点数': 0,
-                    '最高点': None,
-                    '最高点时间': None,
-                    '最低点': None,
-                    '最低点时间': None,
-                    '最高到最低回撤': None,
-                    '当前价格': None,
-                    '从最高点回撤': None,
-                    '从最低点上涨': None
-                })
-                continue
-
-            # 找到最高点和最低点
-            if period_df['high'].isna().all() or period_df['low'].isna().all():
-                results.append({
-                    '时间范围': range_name,
-                    '起始时间': safe_strftime(cutoff_time),
-                    '数据点数': len(period_df),
-                    '最高点': None,
-                    '最高点时间': None,
-                    '最低点': None,
-                    '最低点时间': None,
-                    '最高到最低回撤': None,
-                    '当前价格': None,
-                    '从最高点回撤': None,
-                    '从最低点上涨': None
-                })
-                continue
-
-            max_price = period_df['high'].max()
-            min_price = period_df['low'].min()
-            current_price = period_df.iloc[-1]['close']
-
-            # 找到对应的时间
-            max_idx = period_df['high'].idxmax()
-            min_idx = period_df['low'].idxmin()
-
-            max_time = period_df.loc[max_idx, 'open_time']
-            min_time = period_df.loc[min_idx, 'open_time']
-
-            # 计算回撤
-            if pd.isna(max_price) or max_price <= 0:
-                total_retracement = None
-                current_retracement_from_high = None
-                current_increase_from_low = None
-            else:
-                # 整体回撤幅度（最高到最低）
-                total_retracement = ((max_price - min_price) / max_price * 100) if not pd.isna(min_price) else None
-
-                # 从最高点到当前价格的回撤
-                if not pd.isna(current_price) and max_price > current_price:
-                    current_retracement_from_high = ((max_price - current_price) / max_price * 100)
-                else:
-                    current_retracement_from_high = 0 if not pd.isna(current_price) else None
-
-                # 从最低点到当前价格的涨幅
-                if not pd.isna(min_price) and min_price > 0 and not pd.isna(current_price):
-                    current_increase_from_low = ((current_price - min_price) / min_price * 100)
-                else:
-                    current_increase_from_low = None
-
-            results.append({
-                '时间范围': range_name,
-                '起始时间': safe_strftime(cutoff_time),
-                '数据点数': len(period_df),
-                '最高点': round(max_price, 4) if not pd.isna(max_price) else None,
-                '最高点时间': safe_strftime(max_time),
-                '最低点': round(min_price, 4) if not pd.isna(min_price) else None,
-                '最低点时间': safe_strftime(min_time),
-                '最高到最低回撤': f"{round(total_retracement, 2)}%" if total_retracement is not None else None,
-                '当前价格': round(current_price, 4) if not pd.isna(current_price) else None,
-                '从最高点回撤': f"{round(current_retracement_from_high, 2)}%" if current_retracement_from_high is not None else None,
-                '从最低点上涨': f"{round(current_increase_from_low, 2)}%" if current_increase_from_low is not None else None
-            })
-
-        except Exception as e:
-            print(f"❌ 分析{range_name}时出错: {e}")
-            continue
-
-    return results
+    return to_report_rows(analyze_panel({symbol_info: df}, current_time))
 
 
 def print_analysis_report(symbol_info, results, df):
@@ -342,73 +180,63 @@ def print_key_insights(results):
                 print(f"📊 回撤特征: 短期{st_val:.1f}% / 中期{mt_val:.1f}% / 长期{lt_val:.1f}% - 震荡整理")
 
 
-def job1():
-    """主作业函数"""
-    print(f"\n🕒 执行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+def job1(base_url=None, max_workers=10):
+    """主作业函数
+
+    先并发获取所有交易对的K线，再向量化分析回撤，最后批量保存因子数据
+    """
+    current_time = datetime.now()
+    print(f"\n🕒 执行时间: {current_time.strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 60)
 
+    fetcher = KlineFetcher(base_url or BASE_URL, max_workers)
+
     try:
-        # 获取交易所信息
-        response = requests.get(API_URL, timeout=10)
+        # 获取所有交易对
+        symbols = fetcher.get_symbols()
 
-        if response.status_code != 200:
-            print(f"❌ 获取交易所信息失败: {response.status_code}")
+        if not symbols:
+            print(f"❌ 获取交易所信息失败")
             return
 
-        data = response.json()
         print(f"✅ 交易所信息获取成功")
-        print(f"📊 交易对总数: {len(data.get('symbols', []))}")
-
-        # 获取所有交易对
-        symbols = [symbol['symbol'] for symbol in data.get('symbols', [])]
+        print(f"📊 交易对总数: {len(symbols)}")
 
         # 只分析前5个交易对（测试用）
         # symbols_to_analyze = symbols[:5]  # 测试时用前5个
-        symbols_to_analyze = symbols  # 分析所有交易对（慎用，会请求很多次）
+        symbols_to_analyze = symbols  # 分析所有交易对
 
-        for i, symbol_info in enumerate(symbols_to_analyze, 1):
-            print(f"\n{'=' * 60}")
-            print(f"📈 正在分析第{i}个交易对: {symbol_info}")
-            print('=' * 60)
+        # 并发获取日K线数据
+        print(f"📅 获取{len(symbols_to_analyze)}个交易对的日K线数据...")
+        daily_frames = fetcher.get_all_kline_data(symbols_to_analyze, "1d", 1500)
+        print(f"✅ 获取到 {len(daily_frames)} 个交易对的日K线数据")
 
-            try:
-                # 获取日K线数据
-                print(f"📅 获取{symbol_info}的日K线数据...")
-                df_daily = get_kline_data(symbol_info, "1d", 1500)
-
-                if df_daily is not None and len(df_daily) > 0:
-                    # 分析回撤
-                    results = analyze_retracement(df_daily, symbol_info)
-
-                    if results:
-                        # 打印分析报告
-                        print_analysis_report(symbol_info, results, df_daily)
-                    else:
-                        print(f"⚠️  {symbol_info}: 回撤分析失败")
-                else:
-                    print(f"⚠️  {symbol_info}: 无有效日K线数据")
+        # 一次分析所有交易对的全部时间范围
+        panel = analyze_panel(daily_frames, current_time)
 
-                # 获取4小时K线数据
-                print(f"\n⏰ 获取{symbol_info}的4小时K线数据...")
-                df_4h = get_kline_data(symbol_info, "4h", 500)
+        for symbol_info, result in zip(daily_frames, panel.reshape(-1, len(TIME_RANGES))):
+            print_analysis_report(symbol_info, to_report_rows(result), daily_frames[symbol_info])
 
-                if df_4h is not None and len(df_4h) > 0:
-                    print(f"✅  获取到 {len(df_4h)} 条4小时K线数据")
-                    # 这里可以添加4小时级别的分析
-                else:
-                    print(f"⚠️  {symbol_info}: 无有效4小时K线数据")
+        for symbol_info in symbols_to_analyze:
+            if symbol_info not in daily_frames:
+                print(f"⚠️  {symbol_info}: 无有效日K线数据")
 
-            except Exception as e:
-                print(f"❌ 分析{symbol_info}时出错: {e}")
-                continue
+        # 批量保存因子数据
+        factors = build_factors(panel, current_time)
+        if factors:
+            if SqliteDatabase().save_symbol_factor(factors):
+                print(f"\n✅ 已保存 {len(factors)} 条因子数据")
 
-            print(f"\n✅ {symbol_info} 分析完成")
-            print("=" * 60)
+        # 并发获取4小时K线数据
+        print(f"\n⏰ 获取{len(symbols_to_analyze)}个交易对的4小时K线数据...")
+        frames_4h = fetcher.get_all_kline_data(symbols_to_analyze, "4h", 500)
+        print(f"✅  获取到 {len(frames_4h)} 个交易对的4小时K线数据")
+        # 这里可以添加4小时级别的分析
 
-    except requests.exceptions.RequestException as e:
-        print(f"❌ 网络请求失败: {e}")
     except Exception as e:
         print(f"❌ 作业执行失败: {e}")
+    finally:
+        fetcher.close()
 
 
 def main():
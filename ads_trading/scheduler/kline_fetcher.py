@@ -0,0 +1,231 @@
+"""
+币安U本位合约K线并发获取
+使用连接池复用HTTP连接，并按照请求权重限速
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import monotonic, sleep
+from typing import Deque, Dict, List, Optional, Tuple
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "https://fapi.binance.com"
+EXCHANGE_INFO_PATH = "/fapi/v1/exchangeInfo"
+KLINES_PATH = "/fapi/v1/klines"
+
+KLINE_COLUMNS = [
+    'open_time', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_volume', 'trades', 'taker_buy_base',
+    'taker_buy_quote', 'ignore'
+]
+
+
+def get_kline_weight(limit: int) -> int:
+    """K线接口的请求权重随limit变化"""
+    if limit < 100:
+        return 1
+    elif limit < 500:
+        return 2
+    elif limit <= 1000:
+        return 5
+    return 10
+
+
+def to_kline_dataframe(data: list) -> pd.DataFrame:
+    """将K线接口返回的数据转换为DataFrame"""
+    df = pd.DataFrame(data, columns=KLINE_COLUMNS)
+
+    # 转换时间戳和价格
+    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms', errors='coerce')
+    df['close_time'] = pd.to_datetime(df['close_time'], unit='ms', errors='coerce')
+
+    # 过滤掉时间戳为NaT的行
+    df = df.dropna(subset=['open_time'])
+
+    # 转换价格列
+    price_columns = ['high', 'low', 'close', 'open']
+    for col in price_columns:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # 按时间排序
+    df = df.sort_values('open_time')
+
+    return df
+
+
+class WeightLimiter:
+    """
+    滑动窗口请求权重限速器，多个线程共享
+
+    本地记录每次请求消耗的权重，并用交易所返回的已用权重校正，
+    收到429/418时暂停所有请求直到Retry-After结束。
+    """
+
+    def __init__(self, weight_limit: int = 2000, interval: float = 60) -> None:
+        """"""
+        self.weight_limit: int = weight_limit
+        self.interval: float = interval
+
+        self.records: Deque[Tuple[float, int]] = deque()
+        self.used_weight: int = 0
+        self.pause_until: float = 0
+
+        self.lock: Lock = Lock()
+
+    def acquire(self, weight: int) -> None:
+        """阻塞直到窗口内有足够的剩余权重"""
+        weight = min(weight, self.weight_limit)
+
+        while True:
+            with self.lock:
+                now: float = monotonic()
+                self.expire(now)
+
+                wait: float = self.pause_until - now
+                if wait <= 0:
+                    if self.used_weight + weight <= self.weight_limit:
+                        self.records.append((now, weight))
+                        self.used_weight += weight
+                        return
+
+                    wait = self.records[0][0] + self.interval - now
+
+            sleep(max(wait, 0.001))
+
+    def update(self, used_weight: int) -> None:
+        """用交易所返回的已用权重校正本地记录"""
+        with self.lock:
+            now: float = monotonic()
+            self.expire(now)
+
+            if used_weight > self.used_weight:
+                self.records.append((now, used_weight - self.used_weight))
+                self.used_weight = used_weight
+
+    def pause(self, seconds: float) -> None:
+        """暂停所有请求"""
+        with self.lock:
+            self.pause_until = max(self.pause_until, monotonic() + seconds)
+
+    def expire(self, now: float) -> None:
+        """移除超出窗口的记录"""
+        while self.records and self.records[0][0] + self.interval <= now:
+            _, weight = self.records.popleft()
+            self.used_weight -= weight
+
+
+class KlineFetcher:
+    """
+    K线并发获取器
+
+    所有线程共享同一个Session连接池和权重限速器，
+    base_url可以指向本地HTTP服务用于测试。
+    """
+
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        max_workers: int = 10,
+        weight_limit: int = 2000,
+        max_retries: int = 3,
+        timeout: float = 30
+    ) -> None:
+        """"""
+        self.base_url: str = base_url
+        self.max_workers: int = max_workers
+        self.max_retries: int = max_retries
+        self.timeout: float = timeout
+
+        self.limiter: WeightLimiter = WeightLimiter(weight_limit)
+
+        self.session: requests.Session = requests.Session()
+        adapter: HTTPAdapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, path: str, params: dict, weight: int) -> Optional[object]:
+        """发送GET请求，处理限速和重试，失败返回None"""
+        for i in range(self.max_retries + 1):
+            self.limiter.acquire(weight)
+
+            try:
+                response: requests.Response = self.session.get(
+                    url=self.base_url + path,
+                    params=params,
+                    timeout=self.timeout
+                )
+            except requests.exceptions.RequestException as e:
+                print(f"❌ 请求{path}失败: {e}")
+                sleep(2 ** i)
+                continue
+
+            used_weight: str = response.headers.get("X-MBX-USED-WEIGHT-1M")
+            if used_weight:
+                self.limiter.update(int(used_weight))
+
+            # 429超出限速，418为限速后继续请求被封禁
+            if response.status_code in (429, 418):
+                retry_after: float = float(response.headers.get("Retry-After", 2 ** i))
+                print(f"⚠️  请求{path}触发限速，{retry_after}秒后重试")
+                self.limiter.pause(retry_after)
+                continue
+
+            if response.status_code != 200:
+                print(f"❌ 请求{path}失败: {response.status_code}")
+                return None
+
+            return response.json()
+
+        return None
+
+    def get_symbols(self) -> List[str]:
+        """获取所有交易对"""
+        data: Optional[dict] = self.request(EXCHANGE_INFO_PATH, {}, 1)
+        if not data:
+            return []
+        return [symbol['symbol'] for symbol in data.get('symbols', [])]
+
+    def get_kline_data(self, symbol: str, interval: str = "1d", limit: int = 1500) -> Optional[pd.DataFrame]:
+        """获取单个交易对的K线数据"""
+        params: dict = {
+            "symbol": symbol,
+            "interval": interval,
+            "limit": limit
+        }
+
+        data: Optional[list] = self.request(KLINES_PATH, params, get_kline_weight(limit))
+        if data is None:
+            print(f"❌ 获取{symbol}的{interval}K线数据失败")
+            return None
+
+        try:
+            return to_kline_dataframe(data)
+        except Exception as e:
+            print(f"❌ 处理{symbol}数据时出错: {e}")
+            return None
+
+    def get_all_kline_data(
+        self,
+        symbols: List[str],
+        interval: str = "1d",
+        limit: int = 1500
+    ) -> Dict[str, pd.DataFrame]:
+        """并发获取多个交易对的K线数据，返回成功获取的结果"""
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            frames = executor.map(
+                lambda symbol: self.get_kline_data(symbol, interval, limit),
+                symbols
+            )
+
+            return {
+                symbol: df
+                for symbol, df in zip(symbols, frames)
+                if df is not None and len(df) > 0
+            }
+
+    def close(self) -> None:
+        """关闭连接池"""
+        self.session.close()
@@ -0,0 +1,248 @@
+"""
+多周期回撤向量化分析
+将所有交易对的K线堆叠为一个面板，一次计算全部时间范围的最高点、最低点和回撤
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ads_trading.trader.dbconnectors.sqlite_database import DBCoinAlphaFactor
+
+# 定义时间范围 - 添加了六个月、八个月、十个月
+TIME_RANGES = {
+    '最近一天': timedelta(days=1),
+    '最近一个星期': timedelta(weeks=1),
+    '最近一个月': timedelta(days=30),
+    '最近四个月': timedelta(days=120),
+    '最近六个月': timedelta(days=180),  # 新增
+    '最近八个月': timedelta(days=240),  # 新增
+    '最近十个月': timedelta(days=300),  # 新增
+    '最近一年': timedelta(days=365),
+    '最近二年': timedelta(days=730),
+    '最近三年': timedelta(days=1095)
+}
+
+RANGE_NAMES = {delta.days: name for name, delta in TIME_RANGES.items()}
+
+# 价格和回撤为NaN表示该时间范围内无有效数据
+RETRACEMENT_DTYPE = np.dtype([
+    ("symbol", "U32"),
+    ("days", "i8"),
+    ("start", "datetime64[us]"),
+    ("count", "i8"),
+    ("highest_price", "f8"),
+    ("highest_time", "datetime64[us]"),
+    ("lowest_price", "f8"),
+    ("lowest_time", "datetime64[us]"),
+    ("current_price", "f8"),
+    ("max_drawdown", "f8"),
+    ("high_drawdown", "f8"),
+    ("low_increase", "f8"),
+])
+
+
+def stack_klines(frames: Dict[str, pd.DataFrame]) -> Tuple[np.ndarray, ...]:
+    """将按时间排序的K线DataFrame堆叠为一维数组，返回分组编号、分组起止位置和时间价格数组"""
+    lengths: np.ndarray = np.array([len(df) for df in frames.values()], dtype=np.int64)
+    ends: np.ndarray = np.cumsum(lengths)
+    starts: np.ndarray = ends - lengths
+    group: np.ndarray = np.repeat(np.arange(len(lengths)), lengths)
+
+    def concat(column: str, dtype: str) -> np.ndarray:
+        """拼接一列数据"""
+        return np.concatenate([df[column].to_numpy(dtype) for df in frames.values()])
+
+    times: np.ndarray = concat("open_time", "datetime64[us]")
+    high: np.ndarray = concat("high", "float64")
+    low: np.ndarray = concat("low", "float64")
+    close: np.ndarray = concat("close", "float64")
+
+    return group, starts, ends, times, high, low, close
+
+
+def suffix_argmax(values: np.ndarray, group: np.ndarray, group_count: int) -> np.ndarray:
+    """
+    计算每个位置到所在分组末尾的最大值位置，最大值相同时取最早的位置，NaN不参与比较
+
+    值先转换为全局排名，再给靠前的分组加上更大的偏移，
+    反向累计最大值就不会跨越分组边界。
+    """
+    n: int = len(values)
+    index: np.ndarray = np.arange(n)
+
+    # 升序排名，数值相同时位置靠前的排名更高
+    order: np.ndarray = np.lexsort((-index, np.where(np.isnan(values), -np.inf, values)))
+    rank: np.ndarray = np.empty(n, dtype=np.int64)
+    rank[order] = index
+
+    offset: np.ndarray = (group_count - 1 - group) * n
+    suffix: np.ndarray = np.maximum.accumulate((offset + rank)[::-1])[::-1]
+    return order[suffix - offset]
+
+
+def analyze_panel(frames: Dict[str, pd.DataFrame], current_time: Optional[datetime] = None) -> np.ndarray:
+    """
+    一次分析所有交易对在全部时间范围的回撤
+
+    frames中每个DataFrame需按open_time升序排列（与get_kline_data一致），
+    返回RETRACEMENT_DTYPE结构化数组，按交易对、时间范围顺序排列，
+    可以reshape为(交易对数量, 时间范围数量)。
+    """
+    if current_time is None:
+        current_time = datetime.now()
+
+    frames = {symbol: df for symbol, df in frames.items() if df is not None and not df.empty}
+    symbols: List[str] = list(frames)
+    deltas: List[timedelta] = list(TIME_RANGES.values())
+
+    result: np.ndarray = np.zeros(len(symbols) * len(deltas), dtype=RETRACEMENT_DTYPE)
+    if not symbols:
+        return result
+
+    group, starts, ends, times, high, low, close = stack_klines(frames)
+    group_count: int = len(symbols)
+
+    cutoffs: np.ndarray = np.array([current_time - delta for delta in deltas], dtype="datetime64[us]")
+
+    # 每个时间范围的数据是分组内时间不早于起始时间的后缀，用分组编号和时间的组合键二分查找起点
+    row_group: np.ndarray = np.repeat(np.arange(group_count), len(deltas))
+    row_cutoff: np.ndarray = np.tile(cutoffs, group_count)
+    row_end: np.ndarray = ends[row_group]
+
+    if len(times):
+        origin: np.datetime64 = times.min()
+        span: int = int((times.max() - origin) // np.timedelta64(1, "us")) + 1
+
+        elapsed: np.ndarray = ((times - origin) // np.timedelta64(1, "us")).astype(np.int64)
+        offset: np.ndarray = np.clip((row_cutoff - origin) // np.timedelta64(1, "us"), 0, span).astype(np.int64)
+        row_start: np.ndarray = np.searchsorted(group * span + elapsed, row_group * span + offset)
+    else:
+        row_start = row_end.copy()
+
+    count: np.ndarray = row_end - row_start
+    has_data: np.ndarray = count > 0
+    position: np.ndarray = np.where(has_data, row_start, 0)
+
+    # 后缀最高点和最低点位置
+    if len(times):
+        high_index: np.ndarray = suffix_argmax(high, group, group_count)[position]
+        low_index: np.ndarray = suffix_argmax(-low, group, group_count)[position]
+        highest: np.ndarray = high[high_index]
+        lowest: np.ndarray = low[low_index]
+        current: np.ndarray = close[np.maximum(row_end - 1, 0)]
+        highest_time: np.ndarray = times[high_index]
+        lowest_time: np.ndarray = times[low_index]
+    else:
+        highest = lowest = current = np.full(len(result), np.nan)
+        highest_time = lowest_time = np.full(len(result), np.datetime64("NaT"), dtype="datetime64[us]")
+
+    valid: np.ndarray = has_data & ~np.isnan(highest) & ~np.isnan(lowest)
+    has_current: np.ndarray = valid & ~np.isnan(current)
+    positive: np.ndarray = valid & (highest > 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        max_drawdown: np.ndarray = (highest - lowest) / highest * 100
+        high_drawdown: np.ndarray = np.where(highest > current, (highest - current) / highest * 100, 0)
+        low_increase: np.ndarray = (current - lowest) / lowest * 100
+
+    result["symbol"] = np.array(symbols)[row_group]
+    result["days"] = np.tile([delta.days for delta in deltas], group_count)
+    result["start"] = row_cutoff
+    result["count"] = count
+    result["highest_price"] = np.where(valid, highest, np.nan)
+    result["highest_time"] = np.where(valid, highest_time, np.datetime64("NaT"))
+    result["lowest_price"] = np.where(valid, lowest, np.nan)
+    result["lowest_time"] = np.where(valid, lowest_time, np.datetime64("NaT"))
+    result["current_price"] = np.where(has_current, current, np.nan)
+    result["max_drawdown"] = np.where(positive, max_drawdown, np.nan)
+    result["high_drawdown"] = np.where(positive & has_current, high_drawdown, np.nan)
+    result["low_increase"] = np.where(positive & has_current & (lowest > 0), low_increase, np.nan)
+
+    return result
+
+
+def format_percent(value: float) -> Optional[str]:
+    """格式化百分比，NaN返回None"""
+    if np.isnan(value):
+        return None
+    return f"{round(value, 2)}%"
+
+
+def format_high_drawdown(value: float) -> Optional[str]:
+    """当前价格不低于最高点时回撤显示为0%"""
+    if value == 0:
+        return "0%"
+    return format_percent(value)
+
+
+def format_price(value: float) -> Optional[float]:
+    """保留4位小数，NaN返回None"""
+    if np.isnan(value):
+        return None
+    return round(value, 4)
+
+
+def format_date(value: np.datetime64) -> Optional[str]:
+    """格式化日期，NaT返回None"""
+    if np.isnat(value):
+        return None
+    return value.astype(datetime).strftime('%Y-%m-%d')
+
+
+def to_report_rows(result: np.ndarray) -> List[dict]:
+    """将分析结果转换为报告使用的字典列表"""
+    rows: List[dict] = []
+
+    for row in result:
+        rows.append({
+            '时间范围': RANGE_NAMES[int(row["days"])],
+            '起始时间': format_date(row["start"]),
+            '数据点数': int(row["count"]),
+            '最高点': format_price(row["highest_price"]),
+            '最高点时间': format_date(row["highest_time"]),
+            '最低点': format_price(row["lowest_price"]),
+            '最低点时间': format_date(row["lowest_time"]),
+            '最高到最低回撤': format_percent(row["max_drawdown"]),
+            '当前价格': format_price(row["current_price"]),
+            '从最高点回撤': format_high_drawdown(row["high_drawdown"]),
+            '从最低点上涨': format_percent(row["low_increase"])
+        })
+
+    return rows
+
+
+def build_factors(result: np.ndarray, create_time: datetime) -> List[DBCoinAlphaFactor]:
+    """由分析结果批量生成因子数据，跳过无有效数据的时间范围"""
+    result = result[~np.isnan(result["highest_price"])]
+
+    columns: zip = zip(
+        result["symbol"].tolist(),
+        result["days"].tolist(),
+        result["start"].tolist(),
+        result["highest_time"].tolist(),
+        result["highest_price"].tolist(),
+        result["lowest_time"].tolist(),
+        result["lowest_price"].tolist(),
+        result["max_drawdown"],
+        result["high_drawdown"]
+    )
+
+    return [
+        DBCoinAlphaFactor(
+            symbol=symbol,
+            create_time=create_time,
+            recent_day=str(days),
+            recent_type="day",
+            start=start,
+            highest_time=highest_time,
+            highest_price=highest_price,
+            lowest_time=lowest_time,
+            lowest_price=lowest_price,
+            max_drawdown=format_percent(max_drawdown) or "N/A",
+            high_drawdown=format_high_drawdown(high_drawdown) or "N/A"
+        )
+        for symbol, days, start, highest_time, highest_price, lowest_time, lowest_price,
+        max_drawdown, high_drawdown in columns
+    ]
@@ -0,0 +1,1074 @@
+"""
+Columnar containers of market data for vectorized processing.
+"""
+
+import os
+from datetime import datetime, tzinfo
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import simplejson
+from dateutil.tz import tzlocal
+
+from .constant import Direction, Exchange, Interval
+from .object import BarData, TradeData
+from .database import BaseDatabase, DB_TZ, convert_tz
+from .utility import get_folder_path
+
+
+BAR_DTYPE: np.dtype = np.dtype([
+    ("datetime", "datetime64[us]"),
+    ("open_price", "f8"),
+    ("high_price", "f8"),
+    ("low_price", "f8"),
+    ("close_price", "f8"),
+    ("volume", "f8"),
+    ("turnover", "f8"),
+    ("open_interest", "f8"),
+])
+
+BAR_FIELDS: List[str] = list(BAR_DTYPE.names[1:])
+
+TICK_FIELDS: List[str] = [
+    "volume", "open_interest", "last_price", "last_volume", "limit_up", "limit_down",
+    "open_price", "high_price", "low_price", "pre_close",
+    "bid_price_1", "bid_price_2", "bid_price_3", "bid_price_4", "bid_price_5",
+    "ask_price_1", "ask_price_2", "ask_price_3", "ask_price_4", "ask_price_5",
+    "bid_volume_1", "bid_volume_2", "bid_volume_3", "bid_volume_4", "bid_volume_5",
+    "ask_volume_1", "ask_volume_2", "ask_volume_3", "ask_volume_4", "ask_volume_5",
+]
+
+TICK_DTYPE: np.dtype = np.dtype([("datetime", "datetime64[us]")] + [(name, "f8") for name in TICK_FIELDS])
+
+TRADE_DTYPE: np.dtype = np.dtype([
+    ("date", "datetime64[D]"),
+    ("column", "i8"),
+    ("price", "f8"),
+    ("volume", "f8"),
+    ("pos_change", "f8"),
+])
+
+
+def to_timestamp_us(dt: datetime) -> int:
+    """
+    Convert datetime into microseconds since epoch (UTC).
+    Naive datetime is treated as local time, same as datetime.timestamp.
+    """
+    seconds: float = dt.replace(microsecond=0).timestamp()
+    return int(seconds) * 1_000_000 + dt.microsecond
+
+
+def from_timestamp_us(value: int, tz: Optional[tzinfo]) -> datetime:
+    """
+    Convert microseconds since epoch (UTC) into datetime with timezone.
+    """
+    seconds, microsecond = divmod(int(value), 1_000_000)
+    dt: datetime = datetime.fromtimestamp(seconds, tz)
+    return dt.replace(microsecond=microsecond)
+
+
+def to_records(rows: List[Sequence], dtype: np.dtype) -> np.ndarray:
+    """
+    Convert rows of (datetime, field values...) queried from database into
+    structured array of dtype. None value is saved as 0.
+    """
+    data: np.ndarray = np.empty(len(rows), dtype=dtype)
+    if not rows:
+        return data
+
+    data["datetime"] = np.array(
+        [to_timestamp_us(row[0]) for row in rows],
+        dtype="int64"
+    ).view("datetime64[us]")
+
+    values: np.ndarray = np.array([row[1:] for row in rows], dtype="f8")
+    values[np.isnan(values)] = 0
+
+    for i, name in enumerate(dtype.names[1:]):
+        data[name] = values[:, i]
+
+    return data
+
+
+class BarArray:
+    """
+    Time series of bar data stored as one NumPy structured array.
+
+    Rows are sorted by datetime, which is saved as UTC datetime64[us].
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        data: np.ndarray,
+        tz: Optional[tzinfo] = None,
+        gateway_name: str = "DB"
+    ) -> None:
+        """"""
+        self.symbol: str = symbol
+        self.exchange: Exchange = exchange
+        self.interval: Interval = interval
+        self.data: np.ndarray = data
+        self.tz: Optional[tzinfo] = tz
+        self.gateway_name: str = gateway_name
+
+        self.vt_symbol: str = f"{symbol}.{exchange.value}" if exchange else symbol
+
+    @classmethod
+    def from_bars(
+        cls,
+        bars: List[BarData],
+        symbol: str = "",
+        exchange: Exchange = None,
+        interval: Interval = None
+    ) -> "BarArray":
+        """
+        Create bar array from list of bar data.
+        """
+        data: np.ndarray = np.empty(len(bars), dtype=BAR_DTYPE)
+
+        tz: Optional[tzinfo] = None
+        gateway_name: str = "DB"
+
+        if bars:
+            first: BarData = bars[0]
+            symbol = first.symbol
+            exchange = first.exchange
+            interval = first.interval
+            tz = first.datetime.tzinfo
+            gateway_name = first.gateway_name
+
+            data["datetime"] = np.array(
+                [to_timestamp_us(bar.datetime) for bar in bars],
+                dtype="int64"
+            ).view("datetime64[us]")
+
+            for name in BAR_FIELDS:
+                data[name] = [getattr(bar, name) or 0 for bar in bars]
+
+        return cls(symbol, exchange, interval, data, tz, gateway_name)
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        df: pd.DataFrame,
+        symbol: str = "",
+        exchange: Exchange = None,
+        interval: Interval = None,
+        gateway_name: str = "DB"
+    ) -> "BarArray":
+        """
+        Create bar array from DataFrame with datetime and bar field columns.
+        Naive datetime is treated as database timezone.
+        """
+        index: pd.DatetimeIndex = pd.DatetimeIndex(df["datetime"])
+        if index.tz is None:
+            index = index.tz_localize(DB_TZ)
+        tz: tzinfo = index.tz
+
+        data: np.ndarray = np.zeros(len(df), dtype=BAR_DTYPE)
+        data["datetime"] = index.tz_convert("UTC").tz_localize(None).values.astype("datetime64[us]")
+
+        for name in BAR_FIELDS:
+            if name in df:
+                data[name] = df[name].fillna(0).values
+
+        return cls(symbol, exchange, interval, data, tz, gateway_name)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Convert into DataFrame with datetime and bar field columns.
+        """
+        index: pd.DatetimeIndex = pd.DatetimeIndex(self.datetime).tz_localize("UTC")
+        index = index.tz_convert(self.tz or tzlocal())
+        if not self.tz:
+            index = index.tz_localize(None)
+
+        df: pd.DataFrame = pd.DataFrame({"datetime": index})
+        for name in BAR_FIELDS:
+            df[name] = self.data[name]
+
+        return df
+
+    def __len__(self) -> int:
+        """"""
+        return len(self.data)
+
+    @property
+    def datetime(self) -> np.ndarray:
+        """
+        Get datetime64[us] time series.
+        """
+        return self.data["datetime"]
+
+    @property
+    def timestamp(self) -> np.ndarray:
+        """
+        Get microseconds since epoch time series.
+        """
+        return self.data["datetime"].view("int64")
+
+    @property
+    def open(self) -> np.ndarray:
+        """
+        Get open price time series.
+        """
+        return self.data["open_price"]
+
+    @property
+    def high(self) -> np.ndarray:
+        """
+        Get high price time series.
+        """
+        return self.data["high_price"]
+
+    @property
+    def low(self) -> np.ndarray:
+        """
+        Get low price time series.
+        """
+        return self.data["low_price"]
+
+    @property
+    def close(self) -> np.ndarray:
+        """
+        Get close price time series.
+        """
+        return self.data["close_price"]
+
+    @property
+    def volume(self) -> np.ndarray:
+        """
+        Get trading volume time series.
+        """
+        return self.data["volume"]
+
+    @property
+    def turnover(self) -> np.ndarray:
+        """
+        Get trading turnover time series.
+        """
+        return self.data["turnover"]
+
+    @property
+    def open_interest(self) -> np.ndarray:
+        """
+        Get open interest time series.
+        """
+        return self.data["open_interest"]
+
+    def get_datetime(self, ix: int) -> datetime:
+        """
+        Get datetime object of bar at index.
+        """
+        return from_timestamp_us(self.timestamp[ix], self.tz)
+
+    def get_bar(self, ix: int) -> BarData:
+        """
+        Materialize bar data object at index.
+        """
+        row: tuple = self.data[ix].tolist()
+
+        return BarData(
+            symbol=self.symbol,
+            exchange=self.exchange,
+            datetime=self.get_datetime(ix),
+            interval=self.interval,
+            open_price=row[1],
+            high_price=row[2],
+            low_price=row[3],
+            close_price=row[4],
+            volume=row[5],
+            turnover=row[6],
+            open_interest=row[7],
+            gateway_name=self.gateway_name
+        )
+
+    def to_bars(self) -> List[BarData]:
+        """
+        Materialize all bar data objects.
+        """
+        return [self.get_bar(ix) for ix in range(len(self.data))]
+
+    def slice(self, start: datetime, end: datetime) -> "BarArray":
+        """
+        Get bars with start <= datetime <= end, found by binary search.
+        The returned bar array shares memory with this one.
+        """
+        timestamp: np.ndarray = self.timestamp
+        left: int = int(np.searchsorted(timestamp, to_timestamp_us(start), side="left"))
+        right: int = int(np.searchsorted(timestamp, to_timestamp_us(end), side="right"))
+
+        return BarArray(
+            self.symbol,
+            self.exchange,
+            self.interval,
+            self.data[left:right],
+            self.tz,
+            self.gateway_name
+        )
+
+
+class BarCache:
+    """
+    On-disk columnar cache of bar data loaded from database.
+
+    Each symbol + exchange + interval is saved as one .npy file of BAR_DTYPE,
+    which is opened with memory mapping, so multiple processes can share
+    the same pages without copying. A .json file next to it records the
+    datetime range and count of cached bars.
+
+    Only the range from the first to the last cached bar is treated as
+    covered. Empty results are not cached, and ranges before the first or
+    after the last bar are queried again, so history downloaded or recorded
+    later is picked up.
+
+    Notice: data updated inside the covered range is not detected, call
+    clear after overwriting history in database.
+    """
+
+    def __init__(self, database: BaseDatabase, folder_name: str = "bar_cache") -> None:
+        """
+        folder_name is a folder in temp path, or an absolute path.
+        """
+        self.database: BaseDatabase = database
+        self.folder_path: Path = get_folder_path(folder_name)
+
+    def get_path(self, symbol: str, exchange: Exchange, interval: Interval) -> Path:
+        """
+        Get path of cache file.
+        """
+        return self.folder_path.joinpath(f"{symbol}_{exchange.value}_{interval.value}.npy")
+
+    def load(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> BarArray:
+        """
+        Load bar array with start <= datetime <= end. Range not covered by
+        cache file yet is queried from database and saved into it first.
+        """
+        start = self.convert_datetime(start)
+        end = min(self.convert_datetime(end), datetime.now(DB_TZ))
+
+        path: Path = self.get_path(symbol, exchange, interval)
+        data, covered = self.read(path)
+
+        if covered:
+            covered_start, covered_end = covered
+
+            left: np.ndarray = data[:0]
+            if start < covered_start:
+                left = self.query(symbol, exchange, interval, start, covered_start)
+                left = left[left["datetime"] < data["datetime"][0]]
+
+            right: np.ndarray = data[:0]
+            if end > covered_end:
+                right = self.query(symbol, exchange, interval, covered_end, end)
+                right = right[right["datetime"] > data["datetime"][-1]]
+
+            if len(left) or len(right):
+                data = np.concatenate([left, data, right])
+                self.write(path, data)
+        else:
+            data = self.query(symbol, exchange, interval, start, end)
+            if len(data):
+                self.write(path, data)
+
+        bar_array: BarArray = BarArray(symbol, exchange, interval, data, DB_TZ)
+        return bar_array.slice(start, end)
+
+    def clear(self, symbol: str, exchange: Exchange, interval: Interval) -> None:
+        """
+        Delete cache file of symbol + exchange + interval.
+        """
+        path: Path = self.get_path(symbol, exchange, interval)
+
+        for p in (path, path.with_suffix(".json")):
+            if p.exists():
+                p.unlink()
+
+    def get_meta(self, symbol: str, exchange: Exchange, interval: Interval) -> Optional[dict]:
+        """
+        Get covered range and bar count of cache file, None if not cached.
+        """
+        meta_path: Path = self.get_path(symbol, exchange, interval).with_suffix(".json")
+
+        try:
+            with open(meta_path, mode="r", encoding="UTF-8") as f:
+                return simplejson.load(f)
+        except FileNotFoundError:
+            return None
+
+    def query(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> np.ndarray:
+        """
+        Query bar data from database and convert into structured array.
+        """
+        bars: List[BarData] = self.database.load_bar_data(
+            symbol,
+            exchange,
+            interval,
+            convert_tz(start),
+            convert_tz(end)
+        )
+        return BarArray.from_bars(bars, symbol, exchange, interval).data
+
+    def read(self, path: Path) -> Tuple[np.ndarray, Optional[Tuple[datetime, datetime]]]:
+        """
+        Open cache file with memory mapping and get its covered range, which
+        is from the first to the last bar in the file.
+        """
+        empty: np.ndarray = np.empty(0, dtype=BAR_DTYPE)
+
+        meta_path: Path = path.with_suffix(".json")
+        if not meta_path.exists() or not path.exists():
+            return empty, None
+
+        # Empty cache written by older version is treated as not cached
+        with open(meta_path, mode="r", encoding="UTF-8") as f:
+            meta: dict = simplejson.load(f)
+
+        if not meta["count"]:
+            return empty, None
+
+        data: np.ndarray = np.load(path, mmap_mode="r")
+
+        timestamp: np.ndarray = data["datetime"].astype("int64")
+        covered: Tuple[datetime, datetime] = (
+            from_timestamp_us(timestamp[0], DB_TZ),
+            from_timestamp_us(timestamp[-1], DB_TZ)
+        )
+        return data, covered
+
+    def write(self, path: Path, data: np.ndarray) -> None:
+        """
+        Save cache file and its meta with atomic replace.
+        """
+        temp_path: Path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, mode="wb") as f:
+            np.save(f, data)
+
+        # File mapped by another process can not be replaced on Windows,
+        # skip saving and query again next time.
+        try:
+            os.replace(temp_path, path)
+        except PermissionError:
+            temp_path.unlink()
+            return
+
+        timestamp: np.ndarray = data["datetime"].astype("int64")
+        meta: dict = {
+            "start": timestamp[0] / 1_000_000,
+            "end": timestamp[-1] / 1_000_000,
+            "count": len(data)
+        }
+
+        meta_path: Path = path.with_suffix(".json")
+        temp_path = meta_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, mode="w", encoding="UTF-8") as f:
+            simplejson.dump(meta, f)
+
+        try:
+            os.replace(temp_path, meta_path)
+        except PermissionError:
+            temp_path.unlink()
+
+    @staticmethod
+    def convert_datetime(dt: datetime) -> datetime:
+        """
+        Naive datetime is treated as database timezone.
+        """
+        if dt.tzinfo is None:
+            return DB_TZ.localize(dt)
+        return dt.astimezone(DB_TZ)
+
+
+class BarPanel:
+    """
+    Bar data of multiple symbols aligned on one datetime axis.
+
+    Each bar field is stored as 2-D array of (datetime, symbol). Missing bars
+    are forward filled with previous close price and zero volume, same as the
+    backfill of portfolio backtesting. Values before the first bar of a symbol
+    are NaN.
+    """
+
+    def __init__(
+        self,
+        bar_arrays: List[BarArray],
+        timestamp: np.ndarray,
+        data: Dict[str, np.ndarray],
+        mask: np.ndarray,
+        tz: Optional[tzinfo] = None
+    ) -> None:
+        """"""
+        self.bar_arrays: List[BarArray] = bar_arrays
+        self.vt_symbols: List[str] = [bar_array.vt_symbol for bar_array in bar_arrays]
+        self.columns: Dict[str, int] = {vt_symbol: i for i, vt_symbol in enumerate(self.vt_symbols)}
+
+        self.timestamp: np.ndarray = timestamp
+        self.data: Dict[str, np.ndarray] = data
+        self.mask: np.ndarray = mask
+        self.tz: Optional[tzinfo] = tz
+
+        self.started: np.ndarray = np.logical_or.accumulate(mask, axis=0)
+
+    @classmethod
+    def from_bar_arrays(cls, bar_arrays: List[BarArray]) -> "BarPanel":
+        """
+        Align bar arrays on union of their datetimes and forward fill.
+        """
+        if bar_arrays:
+            timestamp: np.ndarray = np.unique(np.concatenate([a.timestamp for a in bar_arrays]))
+        else:
+            timestamp: np.ndarray = np.empty(0, dtype="int64")
+
+        shape: Tuple[int, int] = (len(timestamp), len(bar_arrays))
+        data: Dict[str, np.ndarray] = {name: np.full(shape, np.nan) for name in BAR_FIELDS}
+        mask: np.ndarray = np.zeros(shape, dtype=bool)
+
+        for column, bar_array in enumerate(bar_arrays):
+            rows: np.ndarray = np.searchsorted(timestamp, bar_array.timestamp)
+            mask[rows, column] = True
+
+            for name in BAR_FIELDS:
+                data[name][rows, column] = bar_array.data[name]
+
+        # Row of last existing bar for each missing bar
+        last: np.ndarray = np.where(mask, np.arange(shape[0])[:, None], -1)
+        last = np.maximum.accumulate(last, axis=0)
+
+        rows, columns = np.nonzero(~mask & (last >= 0))
+        close: np.ndarray = data["close_price"][last[rows, columns], columns]
+
+        for name in ["open_price", "high_price", "low_price", "close_price"]:
+            data[name][rows, columns] = close
+
+        for name in ["volume", "turnover", "open_interest"]:
+            data[name][rows, columns] = 0
+
+        tz: Optional[tzinfo] = bar_arrays[0].tz if bar_arrays else None
+        return cls(bar_arrays, timestamp, data, mask, tz)
+
+    def __len__(self) -> int:
+        """"""
+        return len(self.timestamp)
+
+    @property
+    def open(self) -> np.ndarray:
+        """
+        Get open price panel.
+        """
+        return self.data["open_price"]
+
+    @property
+    def high(self) -> np.ndarray:
+        """
+        Get high price panel.
+        """
+        return self.data["high_price"]
+
+    @property
+    def low(self) -> np.ndarray:
+        """
+        Get low price panel.
+        """
+        return self.data["low_price"]
+
+    @property
+    def close(self) -> np.ndarray:
+        """
+        Get close price panel.
+        """
+        return self.data["close_price"]
+
+    def get_datetime(self, ix: int) -> datetime:
+        """
+        Get datetime object of row at index.
+        """
+        return from_timestamp_us(self.timestamp[ix], self.tz)
+
+    def get_dates(self) -> np.ndarray:
+        """
+        Get datetime64[D] dates of rows in timezone of panel.
+        """
+        index: pd.DatetimeIndex = pd.DatetimeIndex(self.timestamp.view("datetime64[us]"))
+        index = index.tz_localize("UTC").tz_convert(self.tz or tzlocal())
+        return index.tz_localize(None).values.astype("datetime64[D]")
+
+    def get_bars(self, ix: int) -> Dict[str, "PanelBar"]:
+        """
+        Get views of bars existing in row at index.
+        """
+        dt: datetime = self.get_datetime(ix)
+
+        return {
+            self.vt_symbols[column]: PanelBar(self, ix, column, dt)
+            for column in np.flatnonzero(self.mask[ix]).tolist()
+        }
+
+    def get_bar(self, ix: int, column: int) -> BarData:
+        """
+        Materialize bar data object at row and column.
+        """
+        bar_array: BarArray = self.bar_arrays[column]
+
+        return BarData(
+            symbol=bar_array.symbol,
+            exchange=bar_array.exchange,
+            datetime=self.get_datetime(ix),
+            interval=bar_array.interval,
+            open_price=float(self.open[ix, column]),
+            high_price=float(self.high[ix, column]),
+            low_price=float(self.low[ix, column]),
+            close_price=float(self.close[ix, column]),
+            volume=float(self.data["volume"][ix, column]),
+            turnover=float(self.data["turnover"][ix, column]),
+            open_interest=float(self.data["open_interest"][ix, column]),
+            gateway_name=bar_array.gateway_name
+        )
+
+
+class PanelBar:
+    """
+    Read-only view of one bar in bar panel, which has the same attributes
+    as BarData but reads prices from panel arrays only when accessed.
+    """
+
+    __slots__ = ("panel", "ix", "column", "datetime")
+
+    def __init__(self, panel: BarPanel, ix: int, column: int, dt: datetime) -> None:
+        """"""
+        self.panel: BarPanel = panel
+        self.ix: int = ix
+        self.column: int = column
+        self.datetime: datetime = dt
+
+    def __repr__(self) -> str:
+        """"""
+        return repr(self.to_bar())
+
+    def to_bar(self) -> BarData:
+        """
+        Materialize bar data object.
+        """
+        return self.panel.get_bar(self.ix, self.column)
+
+    @property
+    def symbol(self) -> str:
+        """"""
+        return self.panel.bar_arrays[self.column].symbol
+
+    @property
+    def exchange(self) -> Exchange:
+        """"""
+        return self.panel.bar_arrays[self.column].exchange
+
+    @property
+    def vt_symbol(self) -> str:
+        """"""
+        return self.panel.vt_symbols[self.column]
+
+    @property
+    def interval(self) -> Interval:
+        """"""
+        return self.panel.bar_arrays[self.column].interval
+
+    @property
+    def gateway_name(self) -> str:
+        """"""
+        return self.panel.bar_arrays[self.column].gateway_name
+
+    @property
+    def open_price(self) -> float:
+        """"""
+        return float(self.panel.data["open_price"][self.ix, self.column])
+
+    @property
+    def high_price(self) -> float:
+        """"""
+        return float(self.panel.data["high_price"][self.ix, self.column])
+
+    @property
+    def low_price(self) -> float:
+        """"""
+        return float(self.panel.data["low_price"][self.ix, self.column])
+
+    @property
+    def close_price(self) -> float:
+        """"""
+        return float(self.panel.data["close_price"][self.ix, self.column])
+
+    @property
+    def volume(self) -> float:
+        """"""
+        return float(self.panel.data["volume"][self.ix, self.column])
+
+    @property
+    def turnover(self) -> float:
+        """"""
+        return float(self.panel.data["turnover"][self.ix, self.column])
+
+    @property
+    def open_interest(self) -> float:
+        """"""
+        return float(self.panel.data["open_interest"][self.ix, self.column])
+
+
+class TradeLedger:
+    """
+    Trade data of multiple symbols stored as one NumPy structured array.
+
+    Rows keep the order in which trades are added. Daily results are
+    accumulated in the same order, so they are identical to calculating
+    trade by trade with float numbers.
+    """
+
+    def __init__(self, vt_symbols: List[str], data: np.ndarray) -> None:
+        """"""
+        self.vt_symbols: List[str] = vt_symbols
+        self.data: np.ndarray = data
+
+    @classmethod
+    def from_trades(cls, trades: Sequence[TradeData], vt_symbols: List[str]) -> "TradeLedger":
+        """
+        Create trade ledger from list of trade data. Column of each trade is
+        the index of its vt_symbol in vt_symbols.
+        """
+        columns: Dict[str, int] = {vt_symbol: i for i, vt_symbol in enumerate(vt_symbols)}
+        data: np.ndarray = np.empty(len(trades), dtype=TRADE_DTYPE)
+
+        if trades:
+            data["date"] = np.array([trade.datetime.date() for trade in trades], dtype="datetime64[D]")
+            data["column"] = [columns[trade.vt_symbol] for trade in trades]
+            data["price"] = [float(trade.price) for trade in trades]
+            data["volume"] = [float(trade.volume) for trade in trades]
+
+            # Compare by name, trades may be created with Direction of howtrader
+            long: np.ndarray = np.array([trade.direction.name == Direction.LONG.name for trade in trades])
+            data["pos_change"] = np.where(long, data["volume"], -data["volume"])
+
+        return cls(list(vt_symbols), data)
+
+    def __len__(self) -> int:
+        """"""
+        return len(self.data)
+
+    def calculate_pnl(
+        self,
+        dates: np.ndarray,
+        close: np.ndarray,
+        sizes: Sequence[float],
+        rates: Sequence[float],
+        slippages: Sequence[float],
+        inverse: bool = False
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calculate daily mark-to-market result of each symbol.
+
+        dates: sorted datetime64[D] array of result dates.
+        close: 2-D array of (date, symbol) close prices, NaN if not exists.
+
+        Returns dict of 2-D (date, symbol) arrays with the same fields as
+        daily result objects.
+        """
+        n_days, n_columns = close.shape
+
+        sizes: np.ndarray = np.asarray(sizes, dtype="f8")
+        rates: np.ndarray = np.asarray(rates, dtype="f8")
+        slippages: np.ndarray = np.asarray(slippages, dtype="f8")
+
+        # Trading pnl of each trade with close price of its date
+        rows: np.ndarray = np.searchsorted(dates, self.data["date"])
+        columns: np.ndarray = self.data["column"]
+
+        price: np.ndarray = self.data["price"]
+        volume: np.ndarray = self.data["volume"]
+        pos_change: np.ndarray = self.data["pos_change"]
+        size: np.ndarray = sizes[columns]
+        trade_close: np.ndarray = close[rows, columns]
+
+        if not inverse:     # For normal contract
+            turnover: np.ndarray = volume * size * price
+            trading_pnl: np.ndarray = pos_change * (trade_close - price) * size
+            slippage: np.ndarray = volume * size * slippages[columns]
+        else:               # For crypto currency inverse contract
+            turnover: np.ndarray = volume * size / price
+            trading_pnl: np.ndarray = pos_change * (1 / price - 1 / trade_close) * size
+            slippage: np.ndarray = volume * size * slippages[columns] / (price ** 2)
+
+        commission: np.ndarray = turnover * rates[columns]
+
+        # Sum trades into (date, symbol) cells, bincount adds in row order
+        cells: np.ndarray = rows * n_columns + columns
+        length: int = n_days * n_columns
+
+        def sum_cells(values: np.ndarray) -> np.ndarray:
+            return np.bincount(cells, values, length).reshape(n_days, n_columns)
+
+        result: Dict[str, np.ndarray] = {
+            "trade_count": np.bincount(cells, minlength=length).reshape(n_days, n_columns),
+            "turnover": sum_cells(turnover),
+            "commission": sum_cells(commission),
+            "slippage": sum_cells(slippage),
+            "trading_pnl": sum_cells(trading_pnl),
+        }
+
+        # Position is running sum of trades, carried to dates without trade
+        end_pos: np.ndarray = np.zeros((n_days, n_columns))
+
+        for column in range(n_columns):
+            selected: np.ndarray = columns == column
+            if not selected.any():
+                continue
+
+            pos: np.ndarray = np.cumsum(pos_change[selected])
+            trade_rows: np.ndarray = rows[selected]
+            last: np.ndarray = np.flatnonzero(np.append(trade_rows[1:] != trade_rows[:-1], True))
+
+            ix: np.ndarray = np.full(n_days, -1)
+            ix[trade_rows[last]] = last
+            ix = np.maximum.accumulate(ix)
+
+            end_pos[:, column] = np.where(ix >= 0, pos[ix], 0)
+
+        start_pos: np.ndarray = np.vstack([np.zeros((1, n_columns)), end_pos[:-1]])
+
+        # If no pre_close provided, use value 1 to avoid zero division error
+        pre_close: np.ndarray = np.vstack([np.zeros((1, n_columns)), close[:-1]])
+        pre_close[np.isnan(pre_close) | (pre_close == 0)] = 1
+
+        if not inverse:
+            holding_pnl: np.ndarray = start_pos * (close - pre_close) * sizes
+        else:
+            holding_pnl: np.ndarray = start_pos * (1 / pre_close - 1 / close) * sizes
+
+        result["pre_close"] = pre_close
+        result["start_pos"] = start_pos
+        result["end_pos"] = end_pos
+        result["holding_pnl"] = holding_pnl
+        result["total_pnl"] = result["trading_pnl"] + holding_pnl
+        result["net_pnl"] = result["total_pnl"] - result["commission"] - result["slippage"]
+
+        return result
+
+
+def to_datetime64(dt: datetime) -> np.datetime64:
+    """
+    Convert datetime into UTC datetime64[us].
+    """
+    return np.datetime64(to_timestamp_us(dt), "us")
+
+
+def get_local_time(bar_array: BarArray) -> np.ndarray:
+    """
+    Get wall clock microseconds of bar datetime in timezone of bar array.
+    Bar array without timezone is treated as local time.
+    """
+    tz: tzinfo = bar_array.tz or tzlocal()
+
+    index: pd.DatetimeIndex = pd.DatetimeIndex(bar_array.datetime).tz_localize("UTC").tz_convert(tz)
+    return index.tz_localize(None).values.astype("datetime64[us]").view("int64")
+
+
+def sum_segments(values: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    Sum values[start:end + 1] of each segment by adding one by one from the
+    first value, so that result is the same as accumulating bar by bar.
+    """
+    counts: np.ndarray = ends - starts + 1
+
+    # Sort segments by length, so that active segments are always a prefix
+    order: np.ndarray = np.argsort(-counts, kind="stable")
+    sorted_starts: np.ndarray = starts[order]
+    sorted_counts: np.ndarray = -counts[order]
+
+    sorted_total: np.ndarray = np.zeros(len(starts))
+    for k in range(int(counts.max(initial=0))):
+        active: int = int(np.searchsorted(sorted_counts, -k, side="left"))
+        sorted_total[:active] += values[sorted_starts[:active] + k]
+
+    total: np.ndarray = np.empty(len(starts))
+    total[order] = sorted_total
+    return total
+
+
+def merge_segments(
+    bar_array: BarArray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    timestamp: np.ndarray
+) -> BarArray:
+    """
+    Merge bars of each segment [start, end] into one window bar.
+    """
+    data: np.ndarray = bar_array.data
+    result: np.ndarray = np.empty(len(starts), dtype=BAR_DTYPE)
+
+    result["datetime"] = timestamp.view("datetime64[us]")
+    result["open_price"] = data["open_price"][starts]
+    result["close_price"] = data["close_price"][ends]
+    result["open_interest"] = data["open_interest"][ends]
+
+    if len(starts):
+        # Segments are continuous, so reduceat stops at next start
+        last: int = int(ends[-1]) + 1
+        result["high_price"] = np.maximum.reduceat(data["high_price"][:last], starts)
+        result["low_price"] = np.minimum.reduceat(data["low_price"][:last], starts)
+
+    result["volume"] = sum_segments(data["volume"], starts, ends)
+    result["turnover"] = sum_segments(data["turnover"], starts, ends)
+
+    return BarArray(
+        bar_array.symbol,
+        bar_array.exchange,
+        None,
+        result,
+        bar_array.tz,
+        bar_array.gateway_name
+    )
+
+
+def generate_window_bars(
+    data: Union[BarArray, pd.DataFrame],
+    window: int,
+    interval: Interval = Interval.MINUTE
+) -> Union[BarArray, pd.DataFrame]:
+    """
+    Generate x minute/x hour window bars from 1 minute bars in one pass.
+
+    Result is the same as pushing bars one by one into BarGenerator and
+    collecting bars passed to on_window_bar, including its boundary rules:
+    1. x minute window is finished by bar with (minute + 1) % x == 0
+    2. hour bar is finished by bar of minute 59 or bar of another hour,
+    and x hour window is finished by every x hour bars
+    The unfinished window at the end is not included.
+    """
+    bar_array: BarArray = to_bar_array(data)
+
+    if interval == Interval.MINUTE:
+        result: BarArray = generate_minute_window(bar_array, window)
+    else:
+        result: BarArray = generate_hour_window(bar_array, window)
+
+    if isinstance(data, pd.DataFrame):
+        return result.to_dataframe()
+    return result
+
+
+def generate_minute_window(bar_array: BarArray, window: int) -> BarArray:
+    """"""
+    local: np.ndarray = get_local_time(bar_array)
+    minute: np.ndarray = (local // 60_000_000) % 60
+
+    ends: np.ndarray = np.flatnonzero((minute + 1) % window == 0)
+    starts: np.ndarray = np.concatenate([[0], ends[:-1] + 1]).astype(ends.dtype)[:len(ends)]
+
+    # Window bar datetime is first bar datetime with second/microsecond removed
+    timestamp: np.ndarray = bar_array.timestamp[starts] - local[starts] % 60_000_000
+
+    return merge_segments(bar_array, starts, ends, timestamp)
+
+
+def generate_hour_window(bar_array: BarArray, window: int) -> BarArray:
+    """"""
+    local: np.ndarray = get_local_time(bar_array)
+    minute: np.ndarray = (local // 60_000_000) % 60
+    hour: np.ndarray = (local // 3_600_000_000) % 24
+
+    count: int = len(bar_array)
+    ix: np.ndarray = np.arange(count)
+
+    # Bar of minute 59 finishes hour bar, unless it creates the hour bar.
+    # So within a run of minute 59 bars, creating and finishing alternate.
+    is_59: np.ndarray = minute == 59
+    run_start: np.ndarray = is_59 & ~np.concatenate([[False], is_59[:-1]])
+    run_ix: np.ndarray = np.maximum.accumulate(np.where(run_start, ix, 0))
+    run_pos: np.ndarray = ix - run_ix
+    finished: np.ndarray = is_59 & ((run_pos % 2 == 0) ^ (run_ix == 0))
+
+    # Hour bar is created by first bar, bar after finished one,
+    # or bar of another hour
+    created: np.ndarray = np.zeros(count, dtype=bool)
+    if count:
+        created[0] = True
+        created[1:] = finished[:-1] | (~is_59[1:] & (hour[1:] != hour[:-1]))
+        created[is_59] = ~finished[is_59]
+
+    starts: np.ndarray = np.flatnonzero(created)
+    ends: np.ndarray = np.append(starts[1:] - 1, count - 1).astype(starts.dtype)[:len(starts)]
+
+    # Last hour bar is pushed only if finished by minute 59 bar
+    if len(ends) and not finished[ends[-1]]:
+        starts = starts[:-1]
+        ends = ends[:-1]
+
+    timestamp: np.ndarray = bar_array.timestamp[starts] - local[starts] % 3_600_000_000
+    hour_array: BarArray = merge_segments(bar_array, starts, ends, timestamp)
+
+    if window == 1:
+        return hour_array
+
+    # X hour window is finished by every x hour bars
+    total: int = len(hour_array) // window * window
+    starts = np.arange(0, total, window)
+    ends = starts + window - 1
+
+    return merge_segments(hour_array, starts, ends, hour_array.timestamp[starts])
+
+
+def resample_bars(
+    data: Union[BarArray, pd.DataFrame],
+    minutes: int
+) -> Union[BarArray, pd.DataFrame]:
+    """
+    Resample 1 minute bars into bars of any minutes, aligned to 1970-01-01
+    00:00 local time, e.g. 7 minute, 90 minute or 4 hour bars.
+
+    Window bar datetime is the window start. The window at the end is
+    included only if its last minute bar exists.
+    """
+    bar_array: BarArray = to_bar_array(data)
+
+    local: np.ndarray = get_local_time(bar_array)
+    window_us: int = minutes * 60_000_000
+    bucket: np.ndarray = local // window_us
+
+    count: int = len(bar_array)
+    starts: np.ndarray = np.flatnonzero(np.diff(bucket, prepend=bucket[:1] - 1))
+    ends: np.ndarray = np.append(starts[1:] - 1, count - 1).astype(starts.dtype)[:len(starts)]
+
+    if count and (local[-1] // 60_000_000 + 1) % minutes:
+        starts = starts[:-1]
+        ends = ends[:-1]
+
+    offset: np.ndarray = local[starts] - bar_array.timestamp[starts]
+    timestamp: np.ndarray = bucket[starts] * window_us - offset
+
+    result: BarArray = merge_segments(bar_array, starts, ends, timestamp)
+
+    if isinstance(data, pd.DataFrame):
+        return result.to_dataframe()
+    return result
+
+
+def to_bar_array(data: Union[BarArray, pd.DataFrame]) -> BarArray:
+    """"""
+    if isinstance(data, pd.DataFrame):
+        return BarArray.from_dataframe(data)
+    return data
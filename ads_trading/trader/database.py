@@ -1,10 +1,12 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import List
+from typing import Iterator, List
 from pytz import timezone
 from dataclasses import dataclass
 from typing import Optional
 
+import numpy as np
+
 from .constant import Interval, Exchange
 from .object import BarData, TickData
 from .setting import SETTINGS
@@ -111,6 +113,92 @@ class BaseDatabase(ABC):
         """
         pass
     
+    def iter_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+        batch_size: int = 10000
+    ) -> Iterator[BarData]:
+        """
+        Load bar data from database as iterator sorted by datetime.
+
+        Override this method to query data in chunks of batch_size rows,
+        so that the whole history is never held in memory.
+        """
+        bars: List[BarData] = self.load_bar_data(symbol, exchange, interval, start, end)
+        yield from sorted(bars, key=lambda bar: bar.datetime)
+
+    def iter_bar_records(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+        batch_size: int = 10000
+    ) -> Iterator[np.ndarray]:
+        """
+        Load bar data from database as structured arrays of BAR_DTYPE, each
+        with at most batch_size rows, without creating BarData objects.
+        """
+        from .columnar import BAR_DTYPE, BAR_FIELDS, to_records
+
+        rows: list = []
+        for bar in self.iter_bar_data(symbol, exchange, interval, start, end, batch_size):
+            rows.append([bar.datetime] + [getattr(bar, name) for name in BAR_FIELDS])
+
+            if len(rows) == batch_size:
+                yield to_records(rows, BAR_DTYPE)
+                rows = []
+
+        if rows:
+            yield to_records(rows, BAR_DTYPE)
+
+    def iter_tick_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+        batch_size: int = 10000
+    ) -> Iterator[TickData]:
+        """
+        Load tick data from database as iterator sorted by datetime.
+
+        Override this method to query data in chunks of batch_size rows,
+        so that the whole history is never held in memory.
+        """
+        ticks: List[TickData] = self.load_tick_data(symbol, exchange, start, end)
+        yield from sorted(ticks, key=lambda tick: tick.datetime)
+
+    def iter_tick_records(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+        batch_size: int = 10000
+    ) -> Iterator[np.ndarray]:
+        """
+        Load tick data from database as structured arrays of TICK_DTYPE, each
+        with at most batch_size rows, without creating TickData objects.
+        """
+        from .columnar import TICK_DTYPE, TICK_FIELDS, to_records
+
+        rows: list = []
+        for tick in self.iter_tick_data(symbol, exchange, start, end, batch_size):
+            rows.append([tick.datetime] + [getattr(tick, name) for name in TICK_FIELDS])
+
+            if len(rows) == batch_size:
+                yield to_records(rows, TICK_DTYPE)
+                rows = []
+
+        if rows:
+            yield to_records(rows, TICK_DTYPE)
+
     def save_symbol_factor(self, factors: List[any]) -> bool:
         """
         Save symbol factor data into database.
@@ -1,7 +1,8 @@
 """"""
 from datetime import datetime
-from typing import List
+from typing import Iterator, List
 
+import numpy as np
 from pymongo import ASCENDING, MongoClient, ReplaceOne
 from pymongo.database import Database
 from pymongo.cursor import Cursor
@@ -12,6 +13,17 @@ from ads_trading.trader.constant import Exchange, Interval
 from ads_trading.trader.object import BarData, TickData
 from ads_trading.trader.database import BaseDatabase, BarOverview, DB_TZ
 from ads_trading.trader.setting import SETTINGS
+from ads_trading.trader.columnar import (
+    BAR_DTYPE,
+    BAR_FIELDS,
+    TICK_DTYPE,
+    TICK_FIELDS,
+    to_records
+)
+
+
+# Documents fetched from server in each batch when loading data as iterator
+BATCH_SIZE = 10000
 
 
 class MongodbDatabase(BaseDatabase):
@@ -261,6 +273,146 @@ class MongodbDatabase(BaseDatabase):
 
         return ticks
 
+    def iter_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+        batch_size: int = BATCH_SIZE
+    ) -> Iterator[BarData]:
+        """Load Kline/Bar data as iterator, fetched in server-side batches"""
+        c: Cursor = self.find_bar_data(symbol, exchange, interval, start, end, batch_size)
+
+        for d in c:
+            d["exchange"] = exchange
+            d["interval"] = interval
+            d["gateway_name"] = "DB"
+            d.pop("_id")
+
+            yield BarData(**d)
+
+    def iter_bar_records(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+        batch_size: int = BATCH_SIZE
+    ) -> Iterator[np.ndarray]:
+        """Load Kline/Bar data as structured arrays, fetched in server-side batches"""
+        projection: dict = {"_id": 0, "datetime": 1}
+        projection.update({name: 1 for name in BAR_FIELDS})
+
+        c: Cursor = self.find_bar_data(symbol, exchange, interval, start, end, batch_size, projection)
+        yield from self.iter_records(c, BAR_DTYPE, batch_size)
+
+    def iter_tick_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+        batch_size: int = BATCH_SIZE
+    ) -> Iterator[TickData]:
+        """Load tick data as iterator, fetched in server-side batches"""
+        projection: dict = {"_id": 0, "datetime": 1, "name": 1}
+        projection.update({name: 1 for name in TICK_FIELDS})
+
+        c: Cursor = self.find_tick_data(symbol, exchange, start, end, batch_size, projection)
+
+        for d in c:
+            yield TickData(
+                symbol=symbol,
+                exchange=exchange,
+                gateway_name="DB",
+                **d
+            )
+
+    def iter_tick_records(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+        batch_size: int = BATCH_SIZE
+    ) -> Iterator[np.ndarray]:
+        """Load tick data as structured arrays, fetched in server-side batches"""
+        projection: dict = {"_id": 0, "datetime": 1}
+        projection.update({name: 1 for name in TICK_FIELDS})
+
+        c: Cursor = self.find_tick_data(symbol, exchange, start, end, batch_size, projection)
+        yield from self.iter_records(c, TICK_DTYPE, batch_size)
+
+    def find_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+        batch_size: int,
+        projection: dict = None
+    ) -> Cursor:
+        """Create cursor of bar data sorted by datetime"""
+        filter_: dict = {
+            "symbol": symbol,
+            "exchange": exchange.value,
+            "interval": interval.value,
+            "datetime": {
+                "$gte": start.astimezone(DB_TZ),
+                "$lte": end.astimezone(DB_TZ)
+            }
+        }
+
+        return (
+            self.bar_collection.find(filter_, projection)
+            .sort("datetime", ASCENDING)
+            .batch_size(batch_size)
+        )
+
+    def find_tick_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+        batch_size: int,
+        projection: dict = None
+    ) -> Cursor:
+        """Create cursor of tick data sorted by datetime"""
+        filter_: dict = {
+            "symbol": symbol,
+            "exchange": exchange.value,
+            "datetime": {
+                "$gte": start.astimezone(DB_TZ),
+                "$lte": end.astimezone(DB_TZ)
+            }
+        }
+
+        return (
+            self.tick_collection.find(filter_, projection)
+            .sort("datetime", ASCENDING)
+            .batch_size(batch_size)
+        )
+
+    def iter_records(self, c: Cursor, dtype: np.dtype, batch_size: int) -> Iterator[np.ndarray]:
+        """Convert documents of cursor into structured arrays of dtype"""
+        names: List[str] = list(dtype.names)
+
+        rows: list = []
+        for d in c:
+            rows.append([d.get(name) for name in names])
+
+            if len(rows) == batch_size:
+                yield to_records(rows, dtype)
+                rows = []
+
+        if rows:
+            yield to_records(rows, dtype)
+
     def delete_bar_data(
         self,
         symbol: str,
@@ -1,5 +1,7 @@
 from datetime import datetime
-from typing import List
+from typing import Iterator, List, Type
+
+import numpy as np
 
 from peewee import (
     AutoField,
@@ -11,7 +13,8 @@ from peewee import (
     ModelSelect,
     ModelDelete,
     chunked,
-    fn
+    fn,
+    Expression
 )
 
 from ads_trading.trader.constant import Exchange, Interval
@@ -23,6 +26,13 @@ from ads_trading.trader.database import (
     convert_tz
 )
 from ads_trading.trader.setting import SETTINGS
+from ads_trading.trader.columnar import (
+    BAR_DTYPE,
+    BAR_FIELDS,
+    TICK_DTYPE,
+    TICK_FIELDS,
+    to_records
+)
 
 
 db = PeeweeMySQLDatabase(
@@ -33,6 +43,9 @@ db = PeeweeMySQLDatabase(
     port=SETTINGS["database.port"]
 )
 
+# Rows queried each time when loading data as iterator
+BATCH_SIZE = 10000
+
 
 class DbBarData(Model):
     """Bar Data Model"""
@@ -145,15 +158,15 @@ class MysqlDatabase(BaseDatabase):
         exchange = bar.exchange
         interval = bar.interval
 
-        # convert BarData into dict, and convert datetime
+        # convert BarData into dict without changing bar objects,
+        # so that the same bars can be saved again after failure
         data = []
 
         for bar in bars:
-            bar.datetime = convert_tz(bar.datetime)
-
-            d = bar.__dict__
-            d["exchange"] = d["exchange"].value
-            d["interval"] = d["interval"].value
+            d = dict(bar.__dict__)
+            d["datetime"] = convert_tz(bar.datetime)
+            d["exchange"] = bar.exchange.value
+            d["interval"] = bar.interval.value
             d.pop("gateway_name")
             d.pop("vt_symbol")
             data.append(d)
@@ -175,12 +188,12 @@ class MysqlDatabase(BaseDatabase):
             overview.symbol = symbol
             overview.exchange = exchange.value
             overview.interval = interval.value
-            overview.start = bars[0].datetime
-            overview.end = bars[-1].datetime
+            overview.start = data[0]["datetime"]
+            overview.end = data[-1]["datetime"]
             overview.count = len(bars)
         else:
-            overview.start = min(bars[0].datetime, overview.start)
-            overview.end = max(bars[-1].datetime, overview.end)
+            overview.start = min(data[0]["datetime"], overview.start)
+            overview.end = max(data[-1]["datetime"], overview.end)
 
             s: ModelSelect = DbBarData.select().where(
                 (DbBarData.symbol == symbol)
@@ -195,14 +208,14 @@ class MysqlDatabase(BaseDatabase):
 
     def save_tick_data(self, ticks: List[TickData]) -> bool:
         """Save tick data"""
-        # convert TickData into Dict, and convert timezone
+        # convert TickData into Dict without changing tick objects,
+        # so that the same ticks can be saved again after failure
         data = []
 
         for tick in ticks:
-            tick.datetime = convert_tz(tick.datetime)
-
-            d = tick.__dict__
-            d["exchange"] = d["exchange"].value
+            d = dict(tick.__dict__)
+            d["datetime"] = convert_tz(tick.datetime)
+            d["exchange"] = tick.exchange.value
             d.pop("gateway_name")
             d.pop("vt_symbol")
             data.append(d)
@@ -321,6 +334,158 @@ class MysqlDatabase(BaseDatabase):
 
         return ticks
 
+    def iter_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+        batch_size: int = BATCH_SIZE
+    ) -> Iterator[BarData]:
+        """load bar data as iterator, queried in chunks"""
+        for rows in self.query_bar_rows(symbol, exchange, interval, start, end, batch_size):
+            for row in rows:
+                yield BarData(
+                    symbol=symbol,
+                    exchange=exchange,
+                    datetime=datetime.fromtimestamp(row[0].timestamp(), DB_TZ),
+                    interval=interval,
+                    open_price=row[1],
+                    high_price=row[2],
+                    low_price=row[3],
+                    close_price=row[4],
+                    volume=row[5],
+                    turnover=row[6] or 0,
+                    open_interest=row[7],
+                    gateway_name="DB"
+                )
+
+    def iter_bar_records(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+        batch_size: int = BATCH_SIZE
+    ) -> Iterator[np.ndarray]:
+        """load bar data as structured arrays, queried in chunks"""
+        for rows in self.query_bar_rows(symbol, exchange, interval, start, end, batch_size):
+            yield to_records(rows, BAR_DTYPE)
+
+    def iter_tick_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+        batch_size: int = BATCH_SIZE
+    ) -> Iterator[TickData]:
+        """load tick data as iterator, queried in chunks"""
+        for rows in self.query_tick_rows(symbol, exchange, start, end, batch_size):
+            for row in rows:
+                d = dict(zip(TICK_FIELDS, row[2:]))
+
+                yield TickData(
+                    symbol=symbol,
+                    exchange=exchange,
+                    datetime=datetime.fromtimestamp(row[0].timestamp(), DB_TZ),
+                    name=row[1],
+                    gateway_name="DB",
+                    **d
+                )
+
+    def iter_tick_records(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+        batch_size: int = BATCH_SIZE
+    ) -> Iterator[np.ndarray]:
+        """load tick data as structured arrays, queried in chunks"""
+        for rows in self.query_tick_rows(symbol, exchange, start, end, batch_size):
+            yield to_records([(row[0],) + row[2:] for row in rows], TICK_DTYPE)
+
+    def query_bar_rows(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+        batch_size: int
+    ) -> Iterator[List[tuple]]:
+        """query rows of datetime + BAR_FIELDS in chunks"""
+        start = start.replace(hour=0, minute=0, second=0)
+        end = end.replace(hour=23, minute=59, second=59)
+
+        fields = [DbBarData.datetime] + [getattr(DbBarData, name) for name in BAR_FIELDS]
+        condition = (
+            (DbBarData.symbol == symbol)
+            & (DbBarData.exchange == exchange.value)
+            & (DbBarData.interval == interval.value)
+        )
+        return self.query_rows(DbBarData, fields, condition, start, end, batch_size)
+
+    def query_tick_rows(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+        batch_size: int
+    ) -> Iterator[List[tuple]]:
+        """query rows of datetime + name + TICK_FIELDS in chunks"""
+        start = start.replace(hour=0, minute=0, second=0)
+        end = end.replace(hour=23, minute=59, second=59)
+
+        fields = [DbTickData.datetime, DbTickData.name] + [getattr(DbTickData, name) for name in TICK_FIELDS]
+        condition = (
+            (DbTickData.symbol == symbol)
+            & (DbTickData.exchange == exchange.value)
+        )
+        return self.query_rows(DbTickData, fields, condition, start, end, batch_size)
+
+    def query_rows(
+        self,
+        model: Type[Model],
+        fields: list,
+        condition: Expression,
+        start: datetime,
+        end: datetime,
+        batch_size: int
+    ) -> Iterator[List[tuple]]:
+        """
+        Query raw rows sorted by datetime, at most batch_size rows each time.
+
+        Next chunk continues after datetime of last row, which is unique with
+        condition, so no cursor or read transaction is kept open between
+        chunks.
+        """
+        lower = model.datetime >= start
+
+        while True:
+            s: ModelSelect = (
+                model.select(*fields)
+                .where(condition & lower & (model.datetime <= end))
+                .order_by(model.datetime)
+                .limit(batch_size)
+            )
+            sql, params = s.sql()
+            rows = list(self.db.execute_sql(sql, params).fetchall())
+
+            if not rows:
+                return
+
+            yield rows
+
+            if len(rows) < batch_size:
+                return
+
+            lower = model.datetime > rows[-1][0]
+
     def delete_bar_data(
         self,
         symbol: str,
@@ -1,5 +1,7 @@
 from datetime import datetime
-from typing import List
+from typing import Iterator, List, Sequence, Type
+
+import numpy as np
 
 from peewee import (
     AutoField,
@@ -11,12 +13,20 @@ from peewee import (
     ModelSelect,
     ModelDelete,
     chunked,
-    fn
+    fn,
+    Expression
 )
 
 from ads_trading.trader.constant import Exchange, Interval
 from ads_trading.trader.object import BarData, TickData
 from ads_trading.trader.utility import get_file_path
+from ads_trading.trader.columnar import (
+    BAR_DTYPE,
+    BAR_FIELDS,
+    TICK_DTYPE,
+    TICK_FIELDS,
+    to_records
+)
 from ads_trading.trader.database import (
     BaseDatabase,
     BarOverview,
@@ -25,7 +35,18 @@ from ads_trading.trader.database import (
 )
 
 path = str(get_file_path("database.db"))
-db = PeeweeSqliteDatabase(path)
+db = PeeweeSqliteDatabase(
+    path,
+    pragmas={
+        "journal_mode": "wal",          # readers are not blocked by writing
+        "synchronous": "normal",        # safe with WAL, fsync only at checkpoint
+        "cache_size": -64 * 1024,       # 64MB page cache
+        "temp_store": "memory"
+    }
+)
+
+# Rows sent to one executemany call
+BATCH_SIZE = 10000
 
 
 class DbBarData(Model):
@@ -138,7 +159,7 @@ class DBCoinAlphaFactor(Model):
 
     class Meta:
         database = db
-        indexes = ((("symbol", "create_time"), True),)
+        indexes = ((("symbol", "create_time", "recent_day", "recent_type"), True),)
 
 
 class SqliteDatabase(BaseDatabase):
@@ -155,84 +176,120 @@ class SqliteDatabase(BaseDatabase):
         # 连接数据库并创建表
         self.db.connect()
         self.db.create_tables([DbBarData, DbTickData, DbBarOverview, DBCoinAlphaFactor])
+        self.migrate_factor_index()
+
+    def migrate_factor_index(self) -> None:
+        """
+        旧版本因子表的唯一索引只包含symbol和create_time，
+        同一时间不同时间范围的因子会互相覆盖，需要删除旧索引
+        """
+        for index in self.db.get_indexes(DBCoinAlphaFactor._meta.table_name):
+            if index.unique and index.columns == ["symbol", "create_time"]:
+                self.db.execute_sql(f'DROP INDEX "{index.name}"')
 
     def save_bar_data(self, bars: List[BarData]) -> bool:
         """save bar data"""
+        if not bars:
+            return True
+
         # primary key
         bar = bars[0]
         symbol = bar.symbol
-        exchange = bar.exchange
-        interval = bar.interval
+        exchange = bar.exchange.value
+        interval = bar.interval.value
 
-        # convert BarData into dict, and convert timezone
+        # convert BarData into rows without changing bar objects
         data = []
-
         for bar in bars:
-            bar.datetime = convert_tz(bar.datetime)
-
-            d = bar.__dict__
-            d["exchange"] = d["exchange"].value
-            d["interval"] = d["interval"].value
-            d.pop("gateway_name")
-            d.pop("vt_symbol")
-            data.append(d)
-
-        # use upsert to update data into database
-        with self.db.atomic():
-            for c in chunked(data, 50):
-                DbBarData.insert_many(c).on_conflict_replace().execute()
-
-        # update DbBarOverview data
-        overview: DbBarOverview = DbBarOverview.get_or_none(
-            DbBarOverview.symbol == symbol,
-            DbBarOverview.exchange == exchange.value,
-            DbBarOverview.interval == interval.value,
+            data.append((
+                symbol,
+                exchange,
+                convert_tz(bar.datetime),
+                interval,
+                bar.volume,
+                bar.turnover,
+                bar.open_interest,
+                bar.open_price,
+                bar.high_price,
+                bar.low_price,
+                bar.close_price
+            ))
+
+        start = min(d[2] for d in data)
+        end = max(d[2] for d in data)
+
+        # count existing rows inside range of bars, so that overview count
+        # is updated with rows actually inserted instead of counting all
+        s: ModelSelect = DbBarData.select().where(
+            (DbBarData.symbol == symbol)
+            & (DbBarData.exchange == exchange)
+            & (DbBarData.interval == interval)
+            & (DbBarData.datetime >= start)
+            & (DbBarData.datetime <= end)
         )
 
-        if not overview:
-            overview = DbBarOverview()
-            overview.symbol = symbol
-            overview.exchange = exchange.value
-            overview.interval = interval.value
-            overview.start = bars[0].datetime
-            overview.end = bars[-1].datetime
-            overview.count = len(bars)
-        else:
-            overview.start = min(bars[0].datetime, overview.start)
-            overview.end = max(bars[-1].datetime, overview.end)
-
-            s: ModelSelect = DbBarData.select().where(
-                (DbBarData.symbol == symbol)
-                & (DbBarData.exchange == exchange.value)
-                & (DbBarData.interval == interval.value)
+        with self.db.atomic():
+            before = s.count()
+            self.insert_rows(DbBarData, data)
+            after = s.count()
+
+            # update DbBarOverview data
+            overview: DbBarOverview = DbBarOverview.get_or_none(
+                DbBarOverview.symbol == symbol,
+                DbBarOverview.exchange == exchange,
+                DbBarOverview.interval == interval,
             )
-            overview.count = s.count()
 
-        overview.save()
+            if not overview:
+                overview = DbBarOverview()
+                overview.symbol = symbol
+                overview.exchange = exchange
+                overview.interval = interval
+                overview.start = start
+                overview.end = end
+                overview.count = after
+            else:
+                overview.start = min(start, overview.start)
+                overview.end = max(end, overview.end)
+                overview.count += after - before
+
+            overview.save()
 
         return True
 
     def save_tick_data(self, ticks: List[TickData]) -> bool:
         """save tick data"""
-        # convert tickdata into dict, and convert its timezone
-        data = []
+        if not ticks:
+            return True
 
-        for tick in ticks:
-            tick.datetime = convert_tz(tick.datetime)
+        # convert TickData into rows without changing tick objects
+        names = [field.name for field in DbTickData._meta.sorted_fields[4:]]
 
-            d = tick.__dict__
-            d["exchange"] = d["exchange"].value
-            d.pop("gateway_name")
-            d.pop("vt_symbol")
-            data.append(d)
+        data = []
+        for tick in ticks:
+            row = [tick.symbol, tick.exchange.value, convert_tz(tick.datetime)]
+            row.extend([getattr(tick, name, None) for name in names])
+            data.append(row)
 
-        # use update to update data into database
         with self.db.atomic():
-            for c in chunked(data, 10):
-                DbTickData.insert_many(c).on_conflict_replace().execute()
+            self.insert_rows(DbTickData, data)
 
         return True
 
+    def insert_rows(self, model: Type[Model], data: List[Sequence]) -> None:
+        """
+        Upsert rows of all fields except id with executemany, which skips
+        creating query object for every chunk.
+        """
+        fields = model._meta.sorted_fields[1:]
+        columns = ", ".join([f'"{field.column_name}"' for field in fields])
+        params = ", ".join(["?"] * len(fields))
+        sql = f'INSERT OR REPLACE INTO "{model._meta.table_name}" ({columns}) VALUES ({params})'
+
+        cursor = self.db.cursor()
+        for i in range(0, len(data), BATCH_SIZE):
+            cursor.executemany(sql, data[i:i + BATCH_SIZE])
+
     def save_symbol_factor(self, factors: List[DBCoinAlphaFactor]) -> bool:
         """save symbol factor data"""
         if not factors:
@@ -372,6 +429,153 @@ class SqliteDatabase(BaseDatabase):
 
         return ticks
 
+    def iter_bar_data(
+            self,
+            symbol: str,
+            exchange: Exchange,
+            interval: Interval,
+            start: datetime,
+            end: datetime,
+            batch_size: int = BATCH_SIZE
+    ) -> Iterator[BarData]:
+        """load bar data as iterator, queried in chunks"""
+        for rows in self.query_bar_rows(symbol, exchange, interval, start, end, batch_size):
+            for row in rows:
+                yield BarData(
+                    symbol=symbol,
+                    exchange=exchange,
+                    datetime=datetime.fromtimestamp(row[0].timestamp(), DB_TZ),
+                    interval=interval,
+                    open_price=row[1],
+                    high_price=row[2],
+                    low_price=row[3],
+                    close_price=row[4],
+                    volume=row[5],
+                    turnover=row[6] or 0,
+                    open_interest=row[7],
+                    gateway_name="DB"
+                )
+
+    def iter_bar_records(
+            self,
+            symbol: str,
+            exchange: Exchange,
+            interval: Interval,
+            start: datetime,
+            end: datetime,
+            batch_size: int = BATCH_SIZE
+    ) -> Iterator[np.ndarray]:
+        """load bar data as structured arrays, queried in chunks"""
+        for rows in self.query_bar_rows(symbol, exchange, interval, start, end, batch_size):
+            yield to_records(rows, BAR_DTYPE)
+
+    def iter_tick_data(
+            self,
+            symbol: str,
+            exchange: Exchange,
+            start: datetime,
+            end: datetime,
+            batch_size: int = BATCH_SIZE
+    ) -> Iterator[TickData]:
+        """load tick data as iterator, queried in chunks"""
+        for rows in self.query_tick_rows(symbol, exchange, start, end, batch_size):
+            for row in rows:
+                d = dict(zip(TICK_FIELDS, row[2:]))
+
+                yield TickData(
+                    symbol=symbol,
+                    exchange=exchange,
+                    datetime=datetime.fromtimestamp(row[0].timestamp(), DB_TZ),
+                    name=row[1],
+                    gateway_name="DB",
+                    **d
+                )
+
+    def iter_tick_records(
+            self,
+            symbol: str,
+            exchange: Exchange,
+            start: datetime,
+            end: datetime,
+            batch_size: int = BATCH_SIZE
+    ) -> Iterator[np.ndarray]:
+        """load tick data as structured arrays, queried in chunks"""
+        for rows in self.query_tick_rows(symbol, exchange, start, end, batch_size):
+            yield to_records([(row[0],) + row[2:] for row in rows], TICK_DTYPE)
+
+    def query_bar_rows(
+            self,
+            symbol: str,
+            exchange: Exchange,
+            interval: Interval,
+            start: datetime,
+            end: datetime,
+            batch_size: int
+    ) -> Iterator[List[tuple]]:
+        """query rows of datetime + BAR_FIELDS in chunks"""
+        fields = [DbBarData.datetime] + [getattr(DbBarData, name) for name in BAR_FIELDS]
+        condition = (
+            (DbBarData.symbol == symbol)
+            & (DbBarData.exchange == exchange.value)
+            & (DbBarData.interval == interval.value)
+        )
+        return self.query_rows(DbBarData, fields, condition, start, end, batch_size)
+
+    def query_tick_rows(
+            self,
+            symbol: str,
+            exchange: Exchange,
+            start: datetime,
+            end: datetime,
+            batch_size: int
+    ) -> Iterator[List[tuple]]:
+        """query rows of datetime + name + TICK_FIELDS in chunks"""
+        fields = [DbTickData.datetime, DbTickData.name] + [getattr(DbTickData, name) for name in TICK_FIELDS]
+        condition = (
+            (DbTickData.symbol == symbol)
+            & (DbTickData.exchange == exchange.value)
+        )
+        return self.query_rows(DbTickData, fields, condition, start, end, batch_size)
+
+    def query_rows(
+            self,
+            model: Type[Model],
+            fields: list,
+            condition: Expression,
+            start: datetime,
+            end: datetime,
+            batch_size: int
+    ) -> Iterator[List[tuple]]:
+        """
+        Query raw rows sorted by datetime, at most batch_size rows each time.
+
+        Next chunk continues after datetime of last row, which is unique with
+        condition, so no cursor or read transaction is kept open between
+        chunks. Datetime text is parsed into naive datetime.
+        """
+        lower = model.datetime >= start
+
+        while True:
+            s: ModelSelect = (
+                model.select(*fields)
+                .where(condition & lower & (model.datetime <= end))
+                .order_by(model.datetime)
+                .limit(batch_size)
+            )
+            sql, params = s.sql()
+            rows = self.db.execute_sql(sql, params).fetchall()
+
+            if not rows:
+                return
+
+            rows = [(datetime.fromisoformat(row[0]),) + row[1:] for row in rows]
+            yield rows
+
+            if len(rows) < batch_size:
+                return
+
+            lower = model.datetime > rows[-1][0]
+
     def delete_bar_data(
             self,
             symbol: str,
@@ -1,6 +1,8 @@
 from .binance_gateway import BinanceGateway
+from .binance_account import BinanceAccountService
 
 # 导出网关类
 __all__ = [
-    "BinanceGateway"
+    "BinanceGateway",
+    "BinanceAccountService"
 ]
@@ -0,0 +1,152 @@
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Any, Dict, Optional
+
+from .binance_gateway import BinanceGateway, BinanceGatewayConfig, filter_balance
+
+
+class BinanceAccountService:
+    """
+    币安账户数据服务，多个请求共享
+
+    只连接一次网关并缓存账户快照，缓存有效期内直接返回快照；
+    过期时并发请求只触发一次刷新，其余请求等待同一次刷新结果。
+    后台线程在有请求访问时定时刷新，空闲后停止访问交易所。
+    """
+
+    def __init__(
+        self,
+        config: BinanceGatewayConfig,
+        gateway: Optional[BinanceGateway] = None,
+        ttl: float = 10,
+        idle_timeout: float = 60,
+        quote_currency: str = "USDT"
+    ) -> None:
+        """"""
+        self.config: BinanceGatewayConfig = config
+        self.gateway: BinanceGateway = gateway or BinanceGateway()
+        self.connected: bool = False
+
+        self.ttl: float = ttl
+        self.idle_timeout: float = idle_timeout
+        self.quote_currency: str = quote_currency
+
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.fetch_error: Optional[Dict[str, Any]] = None
+        self.update_time: float = float("-inf")
+        self.access_time: float = float("-inf")
+
+        self.lock: Lock = Lock()
+        self.refresh_event: Optional[Event] = None
+        self.refresh_count: int = 0
+
+        self.active: bool = False
+        self.stop_event: Event = Event()
+        self.thread: Optional[Thread] = None
+
+    def start(self) -> None:
+        """启动后台刷新线程"""
+        if self.active:
+            return
+        self.active = True
+
+        self.stop_event.clear()
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        """"""
+        while not self.stop_event.wait(self.ttl / 2):
+            if monotonic() - self.access_time < self.idle_timeout:
+                self.refresh(force=True)
+
+    def close(self) -> None:
+        """停止后台刷新并关闭网关"""
+        if self.active:
+            self.active = False
+            self.stop_event.set()
+            self.thread.join()
+
+        self.gateway.close()
+
+    def get_account(self) -> Dict[str, Any]:
+        """获取账户数据，缓存有效时直接返回"""
+        now: float = monotonic()
+        self.access_time = now
+
+        snapshot: Optional[Dict[str, Any]] = self.snapshot
+        if snapshot and now - self.update_time < self.ttl:
+            return snapshot
+
+        return self.refresh()
+
+    def invalidate(self) -> None:
+        """使缓存失效，例如下单或划转之后"""
+        self.update_time = float("-inf")
+
+    def refresh(self, force: bool = False) -> Dict[str, Any]:
+        """
+        刷新账户数据，同一时间只有一个线程访问交易所
+
+        获取失败时保留上一次成功的快照，本次请求返回错误。
+        """
+        with self.lock:
+            event: Optional[Event] = self.refresh_event
+            leader: bool = event is None
+            if leader:
+                event = Event()
+                self.refresh_event = event
+
+        if not leader:
+            event.wait()
+            return self.fetch_error or self.snapshot
+
+        try:
+            # 其他线程可能刚刚完成刷新
+            snapshot: Optional[Dict[str, Any]] = self.snapshot
+            if not force and snapshot and monotonic() - self.update_time < self.ttl:
+                result: Dict[str, Any] = snapshot
+            else:
+                result = self.fetch()
+        except Exception as e:
+            self.gateway.write_log(f"获取币安账户数据失败: {str(e)}")
+            result = self.fetch_error = {"success": False, "error": str(e)}
+        finally:
+            with self.lock:
+                self.refresh_event = None
+            event.set()
+
+        return result
+
+    def fetch(self) -> Dict[str, Any]:
+        """从交易所获取账户数据"""
+        self.refresh_count += 1
+        self.fetch_error = None
+
+        if not self.connected:
+            self.connected = self.gateway.connect(self.config)
+            if not self.connected:
+                self.fetch_error = {"success": False, "error": "币安网关连接失败"}
+                return self.fetch_error
+
+        # 交易所请求出错时抛出异常，不能当作余额为空
+        balances, _, _ = self.gateway.fetch_all({
+            "spot": self.gateway.fetch_spot_balance,
+            "future": self.gateway.fetch_futures_balance
+        }, raise_error=True)
+
+        spot: Dict[str, float] = filter_balance(balances["spot"])
+        futures: Dict[str, float] = filter_balance(balances["future"])
+        total: float = spot.get(self.quote_currency, 0.0) + futures.get(self.quote_currency, 0.0)
+
+        self.snapshot = {
+            "success": True,
+            "account_info": {
+                "spot": spot,
+                "futures": futures,
+                "total": total
+            }
+        }
+        self.update_time = monotonic()
+
+        return self.snapshot
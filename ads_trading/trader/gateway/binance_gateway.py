@@ -1,7 +1,11 @@
 import logging
-from typing import Dict, List, Optional
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from logging import Logger, getLogger, INFO, StreamHandler
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import ccxt
 from ccxt.base.errors import NetworkError, ExchangeError
@@ -19,6 +23,19 @@ class BinanceGatewayConfig:
     proxy_host: Optional[str] = None
     proxy_port: Optional[int] = None
 
+@dataclass
+class BinanceSnapshot:
+    """币安账户快照，所有数据在同一批并发请求中获取"""
+    datetime: datetime
+    quote_currency: str
+    accounts: Dict[str, AccountData] = field(default_factory=dict)
+    prices: Dict[str, float] = field(default_factory=dict)
+    values: Dict[str, float] = field(default_factory=dict)
+    total_value: float = 0
+    latencies: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
 class BinanceGateway:
     """币安网关实现"""
     
@@ -29,6 +46,11 @@ class BinanceGateway:
         self.accounts: Dict[str, AccountData] = {}
         self.config: Optional[BinanceGatewayConfig] = None
         self.logger: Optional[Logger] = None
+
+        # 并发请求共享同一个交易所实例及其连接池
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="BinanceGateway")
+        self.metrics: Dict[str, Dict[str, float]] = {}
+        self.metrics_lock: Lock = Lock()
     
     def connect(self, config: BinanceGatewayConfig) -> bool:
         """连接到币安API"""
@@ -98,17 +120,11 @@ class BinanceGateway:
             return {}
         
         try:
-            # 获取现货账户余额
-            spot_balance = self.exchange.fetch_balance(params={'type': 'spot'})
-            
-            # 获取合约账户余额
-            futures_balance = self.exchange.fetch_balance(params={'type': 'future'})
-            
-            # 获取总账户余额
-            total_balance = {
-                'spot': spot_balance,
-                'future': futures_balance
-            }
+            # 并发获取现货和合约账户余额
+            total_balance, _, _ = self.fetch_all({
+                'spot': self.fetch_spot_balance,
+                'future': self.fetch_futures_balance
+            }, raise_error=True)
             
             self.write_log("成功获取币安账户余额")
             return total_balance
@@ -123,13 +139,8 @@ class BinanceGateway:
             return {}
         
         try:
-            balance = self.exchange.fetch_balance(params={'type': 'spot'})
-            result = {}
-            for currency, info in balance['total'].items():
-                if info > 0:
-                    result[currency] = info
-            
-            return result
+            balance, _ = self.timeit('spot', self.fetch_spot_balance)
+            return filter_balance(balance)
         except Exception as e:
             self.write_log(f"获取现货账户余额失败: {str(e)}")
             return {}
@@ -141,13 +152,8 @@ class BinanceGateway:
             return {}
         
         try:
-            balance = self.exchange.fetch_balance(params={'type': 'future'})
-            result = {}
-            for currency, info in balance['total'].items():
-                if info > 0:
-                    result[currency] = info
-            
-            return result
+            balance, _ = self.timeit('future', self.fetch_futures_balance)
+            return filter_balance(balance)
         except Exception as e:
             self.write_log(f"获取合约账户余额失败: {str(e)}")
             return {}
@@ -159,9 +165,13 @@ class BinanceGateway:
             return 0.0
         
         try:
-            # 获取现货和合约余额
-            spot_balance = self.get_spot_balance()
-            futures_balance = self.get_futures_balance()
+            # 并发获取现货和合约余额
+            balances, _, _ = self.fetch_all({
+                'spot': self.fetch_spot_balance,
+                'future': self.fetch_futures_balance
+            }, raise_error=True)
+            spot_balance = filter_balance(balances['spot'])
+            futures_balance = filter_balance(balances['future'])
             
             # 计算总余额
             total = 0.0
@@ -179,6 +189,135 @@ class BinanceGateway:
             self.write_log(f"获取总账户余额失败: {str(e)}")
             return 0.0
     
+    def get_snapshot(self, quote_currency: str = 'USDT') -> Optional[BinanceSnapshot]:
+        """
+        并发获取现货余额、合约余额和全部交易对最新价，生成账户快照
+        
+        资产估值使用一次全市场最新价请求，不需要逐个资产查询行情。
+        """
+        if not self.exchange:
+            self.write_log("币安网关未连接")
+            return None
+        
+        results, latencies, errors = self.fetch_all({
+            'spot': self.fetch_spot_balance,
+            'future': self.fetch_futures_balance,
+            'ticker': self.exchange.fetch_last_prices
+        })
+        
+        snapshot = BinanceSnapshot(
+            datetime=datetime.now(),
+            quote_currency=quote_currency,
+            latencies=latencies,
+            errors=errors
+        )
+        
+        tickers = results.get('ticker', {})
+        
+        for account_type in ['spot', 'future']:
+            balance = results.get(account_type, None)
+            if not balance:
+                continue
+            
+            for currency, total in balance['total'].items():
+                if not total:
+                    continue
+                
+                account = AccountData(
+                    gateway_name=self.gateway_name,
+                    accountid=f"{account_type}.{currency}",
+                    balance=total,
+                    frozen=balance['used'].get(currency, 0) or 0
+                )
+                snapshot.accounts[account.accountid] = account
+                
+                # 没有对应交易对的资产不计入总价值
+                price = self.get_quote_price(tickers, currency, quote_currency)
+                if price is None:
+                    continue
+                
+                snapshot.prices[currency] = price
+                snapshot.values[account.accountid] = total * price
+                snapshot.total_value += total * price
+        
+        self.accounts.update(snapshot.accounts)
+        
+        for endpoint, error in errors.items():
+            self.write_log(f"获取{endpoint}数据失败: {error}")
+        
+        return snapshot
+    
+    def get_quote_price(self, tickers: Dict[str, dict], currency: str, quote_currency: str) -> Optional[float]:
+        """从全市场最新价中获取资产以计价货币表示的价格"""
+        if currency == quote_currency:
+            return 1.0
+        
+        ticker = tickers.get(f"{currency}/{quote_currency}", None)
+        if ticker and ticker.get('price'):
+            return float(ticker['price'])
+        
+        # 只有反向交易对时取倒数
+        ticker = tickers.get(f"{quote_currency}/{currency}", None)
+        if ticker and ticker.get('price'):
+            return 1 / float(ticker['price'])
+        
+        return None
+    
+    def fetch_spot_balance(self) -> dict:
+        """"""
+        return self.exchange.fetch_balance(params={'type': 'spot'})
+    
+    def fetch_futures_balance(self) -> dict:
+        """"""
+        return self.exchange.fetch_balance(params={'type': 'future'})
+    
+    def fetch_all(self, requests: Dict[str, Callable[[], Any]], raise_error: bool = False) -> tuple:
+        """在线程池中并发执行请求，返回结果、耗时和错误"""
+        futures: Dict[str, Future] = {
+            endpoint: self.executor.submit(self.timeit, endpoint, func)
+            for endpoint, func in requests.items()
+        }
+        
+        results: Dict[str, Any] = {}
+        latencies: Dict[str, float] = {}
+        errors: Dict[str, str] = {}
+        
+        for endpoint, future in futures.items():
+            try:
+                results[endpoint], latencies[endpoint] = future.result()
+            except Exception as e:
+                if raise_error:
+                    raise
+                errors[endpoint] = str(e)
+        
+        return results, latencies, errors
+    
+    def timeit(self, endpoint: str, func: Callable[[], Any]) -> Tuple[Any, float]:
+        """执行请求并记录耗时，返回结果和耗时"""
+        start = perf_counter()
+        try:
+            result = func()
+        finally:
+            elapsed = perf_counter() - start
+            
+            with self.metrics_lock:
+                metric = self.metrics.setdefault(endpoint, {'count': 0, 'total_time': 0.0, 'max_time': 0.0, 'last_time': 0.0})
+                metric['count'] += 1
+                metric['total_time'] += elapsed
+                metric['max_time'] = max(metric['max_time'], elapsed)
+                metric['last_time'] = elapsed
+        
+        return result, elapsed
+    
+    def get_metrics(self) -> Dict[str, Dict[str, float]]:
+        """获取各接口请求耗时统计"""
+        metrics = {}
+        with self.metrics_lock:
+            for endpoint, metric in self.metrics.items():
+                metrics[endpoint] = dict(metric)
+                metrics[endpoint]['avg_time'] = metric['total_time'] / metric['count']
+        return metrics
+    
     def write_log(self, msg: str, level: int = INFO):
         """记录日志"""
         if not self.logger:
@@ -196,4 +335,14 @@ class BinanceGateway:
     
     def close(self):
         """关闭网关连接"""
+        self.executor.shutdown(wait=False)
         self.write_log("币安网关已关闭")
+
+
+def filter_balance(balance: dict) -> Dict[str, float]:
+    """过滤出余额大于0的资产"""
+    result = {}
+    for currency, info in balance['total'].items():
+        if info and info > 0:
+            result[currency] = info
+    return result
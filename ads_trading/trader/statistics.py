@@ -0,0 +1,273 @@
+"""
+Vectorized performance statistics of daily backtesting results.
+"""
+
+from datetime import date
+from functools import cached_property
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+STATISTICS_NAMES: List[str] = [
+    "start_date",
+    "end_date",
+    "total_days",
+    "profit_days",
+    "loss_days",
+    "capital",
+    "end_balance",
+    "max_drawdown",
+    "max_ddpercent",
+    "max_drawdown_duration",
+    "total_net_pnl",
+    "daily_net_pnl",
+    "total_commission",
+    "daily_commission",
+    "total_slippage",
+    "daily_slippage",
+    "total_turnover",
+    "daily_turnover",
+    "total_trade_count",
+    "daily_trade_count",
+    "total_return",
+    "annual_return",
+    "daily_return",
+    "return_std",
+    "sharpe_ratio",
+    "return_drawdown_ratio",
+]
+
+
+class DailyStatistics:
+    """
+    Performance statistics calculated from daily result arrays.
+
+    Each statistic is a cached property which is only calculated when
+    accessed, so reading the optimization target alone skips the others.
+
+    Daily arrays are either 1-D of (date) for one backtesting, or 2-D of
+    (run, date) for scoring many equity curves at once, then statistics are
+    arrays of runs.
+    """
+
+    def __init__(
+        self,
+        dates: Sequence[date],
+        net_pnl: np.ndarray,
+        commission: Optional[np.ndarray] = None,
+        slippage: Optional[np.ndarray] = None,
+        turnover: Optional[np.ndarray] = None,
+        trade_count: Optional[np.ndarray] = None,
+        capital: float = 1_000_000,
+        annual_days: int = 240,
+        sharpe_days: int = 240,
+        risk_free: float = 0
+    ) -> None:
+        """"""
+        self.dates: Sequence[date] = dates
+        self.net_pnl: np.ndarray = np.asarray(net_pnl, dtype="f8")
+
+        zeros: np.ndarray = np.zeros_like(self.net_pnl)
+        self.commission: np.ndarray = zeros if commission is None else np.asarray(commission)
+        self.slippage: np.ndarray = zeros if slippage is None else np.asarray(slippage)
+        self.turnover: np.ndarray = zeros if turnover is None else np.asarray(turnover)
+        self.trade_count: np.ndarray = zeros if trade_count is None else np.asarray(trade_count)
+
+        self.capital: float = capital
+        self.annual_days: int = annual_days
+        self.sharpe_days: int = sharpe_days
+        self.risk_free: float = risk_free
+
+    def get(self, name: str):
+        """
+        Get value of statistic by name.
+        """
+        if name not in STATISTICS_NAMES:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def to_dict(self) -> Dict[str, object]:
+        """
+        Get values of all statistics.
+        """
+        return {name: getattr(self, name) for name in STATISTICS_NAMES}
+
+    @cached_property
+    def balance(self) -> np.ndarray:
+        """"""
+        return np.cumsum(self.net_pnl, axis=-1) + self.capital
+
+    @cached_property
+    def returns(self) -> np.ndarray:
+        """
+        Daily log return, 0 for the first day and invalid values.
+        """
+        returns: np.ndarray = np.zeros_like(self.balance)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns[..., 1:] = np.log(self.balance[..., 1:] / self.balance[..., :-1])
+
+        returns[np.isnan(returns)] = 0
+        return returns
+
+    @cached_property
+    def highlevel(self) -> np.ndarray:
+        """"""
+        return np.maximum.accumulate(self.balance, axis=-1)
+
+    @cached_property
+    def drawdown(self) -> np.ndarray:
+        """"""
+        return self.balance - self.highlevel
+
+    @cached_property
+    def ddpercent(self) -> np.ndarray:
+        """"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.drawdown / self.highlevel * 100
+
+    @cached_property
+    def start_date(self) -> date:
+        """"""
+        return self.dates[0]
+
+    @cached_property
+    def end_date(self) -> date:
+        """"""
+        return self.dates[-1]
+
+    @cached_property
+    def total_days(self) -> int:
+        """"""
+        return self.net_pnl.shape[-1]
+
+    @cached_property
+    def profit_days(self) -> int:
+        """"""
+        return np.count_nonzero(self.net_pnl > 0, axis=-1)
+
+    @cached_property
+    def loss_days(self) -> int:
+        """"""
+        return np.count_nonzero(self.net_pnl < 0, axis=-1)
+
+    @cached_property
+    def end_balance(self) -> float:
+        """"""
+        return self.balance[..., -1][()]
+
+    @cached_property
+    def max_drawdown(self) -> float:
+        """"""
+        return self.drawdown.min(axis=-1)
+
+    @cached_property
+    def max_ddpercent(self) -> float:
+        """"""
+        return np.fmin.reduce(self.ddpercent, axis=-1)
+
+    @cached_property
+    def max_drawdown_duration(self) -> int:
+        """
+        Days from the highest balance to the bottom of max drawdown.
+        """
+        end: np.ndarray = np.argmin(self.drawdown, axis=-1)
+
+        # Highest balance before (and including) the bottom
+        ix: np.ndarray = np.arange(self.total_days)
+        before: np.ndarray = ix <= np.expand_dims(end, -1)
+        start: np.ndarray = np.argmax(np.where(before, self.balance, -np.inf), axis=-1)
+
+        dates: np.ndarray = np.asarray(self.dates, dtype="datetime64[D]")
+        return (dates[end] - dates[start]).astype("int64")[()]
+
+    @cached_property
+    def total_net_pnl(self) -> float:
+        """"""
+        return self.net_pnl.sum(axis=-1)
+
+    @cached_property
+    def daily_net_pnl(self) -> float:
+        """"""
+        return self.total_net_pnl / self.total_days
+
+    @cached_property
+    def total_commission(self) -> float:
+        """"""
+        return self.commission.sum(axis=-1)
+
+    @cached_property
+    def daily_commission(self) -> float:
+        """"""
+        return self.total_commission / self.total_days
+
+    @cached_property
+    def total_slippage(self) -> float:
+        """"""
+        return self.slippage.sum(axis=-1)
+
+    @cached_property
+    def daily_slippage(self) -> float:
+        """"""
+        return self.total_slippage / self.total_days
+
+    @cached_property
+    def total_turnover(self) -> float:
+        """"""
+        return self.turnover.sum(axis=-1)
+
+    @cached_property
+    def daily_turnover(self) -> float:
+        """"""
+        return self.total_turnover / self.total_days
+
+    @cached_property
+    def total_trade_count(self) -> int:
+        """"""
+        return self.trade_count.sum(axis=-1)
+
+    @cached_property
+    def daily_trade_count(self) -> float:
+        """"""
+        return self.total_trade_count / self.total_days
+
+    @cached_property
+    def total_return(self) -> float:
+        """"""
+        return (self.end_balance / self.capital - 1) * 100
+
+    @cached_property
+    def annual_return(self) -> float:
+        """"""
+        return self.total_return / self.total_days * self.annual_days
+
+    @cached_property
+    def daily_return(self) -> float:
+        """"""
+        return self.returns.mean(axis=-1) * 100
+
+    @cached_property
+    def return_std(self) -> float:
+        """"""
+        if self.total_days < 2:
+            return np.full(self.returns.shape[:-1], np.nan)[()]
+        return self.returns.std(axis=-1, ddof=1) * 100
+
+    @cached_property
+    def sharpe_ratio(self) -> float:
+        """
+        Annualized sharpe ratio, 0 if return std is 0.
+        """
+        daily_risk_free: float = self.risk_free / np.sqrt(self.sharpe_days)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe_ratio = (self.daily_return - daily_risk_free) / self.return_std * np.sqrt(self.sharpe_days)
+
+        return np.where(self.return_std != 0, sharpe_ratio, 0)[()]
+
+    @cached_property
+    def return_drawdown_ratio(self) -> float:
+        """"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return -self.total_return / self.max_ddpercent
@@ -4,10 +4,14 @@ General utility functions.
 
 import simplejson
 import logging
+import os
 import sys
+from collections import OrderedDict, deque
 from datetime import datetime
 from pathlib import Path
-from typing import Callable, Dict, Tuple, Union, Optional
+from threading import Condition, Thread
+from time import monotonic
+from typing import Callable, Dict, Iterable, Tuple, Union, Optional
 from decimal import Decimal, ROUND_DOWN, ROUND_UP
 
 import numpy as np
@@ -98,9 +102,14 @@ def load_json(filename: str) -> dict:
 def save_json(filename: str, data: dict) -> None:
     """
     Save data into json file in temp path.
+
+    Data is written into a temp file first and then replaces the old file,
+    so the file is never left half written if process crashes.
     """
     filepath: Path = get_file_path(filename)
-    with open(filepath, mode="w+", encoding="UTF-8") as f:
+    temp_path: Path = filepath.with_name(f"{filepath.name}.{os.getpid()}.tmp")
+
+    with open(temp_path, mode="w+", encoding="UTF-8") as f:
         simplejson.dump(
             data,
             f,
@@ -108,6 +117,123 @@ def save_json(filename: str, data: dict) -> None:
             ensure_ascii=False,
             use_decimal=True
         )
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(temp_path, filepath)
+
+
+class JsonWriter:
+    """
+    Save json file in a background thread.
+
+    Only the latest data is kept while the previous save is running, so a
+    burst of updates is coalesced into one write. With interval set, the
+    writer also waits that many seconds after each write before the next.
+
+    Data is saved with save_func, which defaults to save_json of this module.
+    Pass the save_json matching the load_json used to read the file back.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        interval: float = 0,
+        save_func: Callable[[str, dict], None] = None
+    ) -> None:
+        """"""
+        self.filename: str = filename
+        self.interval: float = interval
+        self.save_func: Callable[[str, dict], None] = save_func or save_json
+
+        self.data: Optional[dict] = None
+        self.condition: Condition = Condition()
+
+        self.active: bool = True
+        self.thread: Thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def save(self, data: dict) -> None:
+        """
+        Request saving data, which should be a snapshot not changed later.
+        """
+        with self.condition:
+            self.data = data
+            self.condition.notify()
+
+    def run(self) -> None:
+        """"""
+        while True:
+            with self.condition:
+                while self.data is None and self.active:
+                    self.condition.wait()
+
+                if self.data is None:
+                    return
+
+                data: dict = self.data
+                self.data = None
+
+            try:
+                self.save_func(self.filename, data)
+            except Exception:
+                logging.getLogger("JsonWriter").exception(f"保存{self.filename}失败")
+
+            # Collect updates within interval, unless closing
+            if self.interval:
+                with self.condition:
+                    self.condition.wait_for(lambda: not self.active, self.interval)
+
+    def close(self) -> None:
+        """
+        Save pending data and stop background thread.
+        """
+        with self.condition:
+            self.active = False
+            self.condition.notify()
+
+        self.thread.join()
+
+
+class RecentIds:
+    """
+    Set of recently seen ids, bounded by both count and age.
+    """
+
+    def __init__(self, maxlen: int = 100_000, ttl: float = 24 * 60 * 60) -> None:
+        """"""
+        self.maxlen: int = maxlen
+        self.ttl: float = ttl
+
+        self.ids: OrderedDict[str, float] = OrderedDict()
+
+    def __contains__(self, id: str) -> bool:
+        """"""
+        return id in self.ids
+
+    def __len__(self) -> int:
+        """"""
+        return len(self.ids)
+
+    def add(self, id: str) -> bool:
+        """
+        Add id and return False if it is already seen.
+        """
+        if id in self.ids:
+            return False
+
+        now: float = monotonic()
+        self.ids[id] = now
+
+        # Oldest ids are at the beginning
+        expire: float = now - self.ttl
+        while self.ids:
+            oldest: float = next(iter(self.ids.values()))
+            if len(self.ids) <= self.maxlen and oldest >= expire:
+                break
+            self.ids.popitem(last=False)
+
+        return True
 
 
 def round_to(value: Union[Decimal, float, int], target: Union[Decimal, float, int]) -> Decimal:
@@ -429,6 +555,10 @@ class ArrayManager(object):
     For:
     1. time series container of bar data
     2. calculating technical indicator value
+
+    Data is saved in a circular buffer with two copies of each slot, so that
+    update_bar only writes one column in O(1), and the last [size] values are
+    always available as a contiguous view for TA-Lib.
     """
 
     def __init__(self, size: int = 100) -> None:
@@ -437,13 +567,9 @@ class ArrayManager(object):
         self.size: int = size
         self.inited: bool = False
 
-        self.open_array: np.ndarray = np.zeros(size)
-        self.high_array: np.ndarray = np.zeros(size)
-        self.low_array: np.ndarray = np.zeros(size)
-        self.close_array: np.ndarray = np.zeros(size)
-        self.volume_array: np.ndarray = np.zeros(size)
-        self.turnover_array: np.ndarray = np.zeros(size)
-        self.open_interest_array: np.ndarray = np.zeros(size)
+        # Rows: open, high, low, close, volume, turnover, open_interest
+        self.buffer: np.ndarray = np.zeros((7, size * 2))
+        self.ix: int = 0
 
     def update_bar(self, bar: BarData) -> None:
         """
@@ -453,21 +579,57 @@ class ArrayManager(object):
         if not self.inited and self.count >= self.size:
             self.inited = True
 
-        self.open_array[:-1] = self.open_array[1:]
-        self.high_array[:-1] = self.high_array[1:]
-        self.low_array[:-1] = self.low_array[1:]
-        self.close_array[:-1] = self.close_array[1:]
-        self.volume_array[:-1] = self.volume_array[1:]
-        self.turnover_array[:-1] = self.turnover_array[1:]
-        self.open_interest_array[:-1] = self.open_interest_array[1:]
-
-        self.open_array[-1] = bar.open_price
-        self.high_array[-1] = bar.high_price
-        self.low_array[-1] = bar.low_price
-        self.close_array[-1] = bar.close_price
-        self.volume_array[-1] = bar.volume
-        self.turnover_array[-1] = bar.turnover
-        self.open_interest_array[-1] = bar.open_interest
+        values: tuple = (
+            bar.open_price,
+            bar.high_price,
+            bar.low_price,
+            bar.close_price,
+            bar.volume,
+            bar.turnover,
+            bar.open_interest
+        )
+
+        # Overwrite the oldest slot in both copies
+        ix: int = self.ix
+        self.buffer[:, ix] = values
+        self.buffer[:, ix + self.size] = values
+
+        self.ix = (ix + 1) % self.size
+
+    @property
+    def open_array(self) -> np.ndarray:
+        """"""
+        return self.buffer[0, self.ix:self.ix + self.size]
+
+    @property
+    def high_array(self) -> np.ndarray:
+        """"""
+        return self.buffer[1, self.ix:self.ix + self.size]
+
+    @property
+    def low_array(self) -> np.ndarray:
+        """"""
+        return self.buffer[2, self.ix:self.ix + self.size]
+
+    @property
+    def close_array(self) -> np.ndarray:
+        """"""
+        return self.buffer[3, self.ix:self.ix + self.size]
+
+    @property
+    def volume_array(self) -> np.ndarray:
+        """"""
+        return self.buffer[4, self.ix:self.ix + self.size]
+
+    @property
+    def turnover_array(self) -> np.ndarray:
+        """"""
+        return self.buffer[5, self.ix:self.ix + self.size]
+
+    @property
+    def open_interest_array(self) -> np.ndarray:
+        """"""
+        return self.buffer[6, self.ix:self.ix + self.size]
 
     @property
     def open(self) -> np.ndarray:
@@ -983,6 +1145,381 @@ def virtual(func: Callable) -> Callable:
     return func
 
 
+class IncrementalIndicator:
+    """
+    Base class of technical indicator updated in O(1) for each new bar.
+
+    Values follow the same recursion and seeding as the TA-Lib function
+    calculated over the whole bar history, and are nan before inited.
+    Window indicators (SMA, Bollinger, Donchian) equal the ArrayManager
+    result directly, while smoothed ones (EMA, ATR, RSI, MACD) equal it
+    after the seed of the ArrayManager window has decayed.
+    """
+
+    def __init__(self) -> None:
+        """"""
+        self.count: int = 0
+        self.inited: bool = False
+
+    @virtual
+    def update_bar(self, bar: BarData) -> Union[float, Tuple[float, ...]]:
+        """
+        Update new bar data into indicator and return latest value.
+        """
+        return self.update(bar.close_price)
+
+    @virtual
+    def update(self, value: float) -> Union[float, Tuple[float, ...]]:
+        """
+        Update new close price into indicator and return latest value.
+        """
+        return np.nan
+
+
+class IncrementalSMA(IncrementalIndicator):
+    """
+    Simple moving average.
+    """
+
+    def __init__(self, n: int) -> None:
+        """"""
+        super().__init__()
+
+        self.n: int = n
+        self.window: deque = deque(maxlen=n)
+        self.total: float = 0
+        self.value: float = np.nan
+
+    def update(self, value: float) -> float:
+        """"""
+        window: deque = self.window
+        if len(window) == self.n:
+            self.total -= window[0]
+
+        window.append(value)
+        self.total += value
+        self.count += 1
+
+        # Sum window again periodically to stop rounding error accumulating
+        if not self.count % self.n:
+            self.total = sum_window(window)
+
+        if self.count >= self.n:
+            self.inited = True
+            self.value = self.total / self.n
+
+        return self.value
+
+
+class IncrementalEMA(IncrementalIndicator):
+    """
+    Exponential moving average, seeded with SMA of first n values.
+    """
+
+    def __init__(self, n: int) -> None:
+        """"""
+        super().__init__()
+
+        self.n: int = n
+        self.k: float = 2 / (n + 1)
+        self.total: float = 0
+        self.value: float = np.nan
+
+    def update(self, value: float) -> float:
+        """"""
+        self.count += 1
+
+        if self.inited:
+            self.value = ((value - self.value) * self.k) + self.value
+        else:
+            self.total += value
+
+            if self.count == self.n:
+                self.inited = True
+                self.value = self.total / self.n
+
+        return self.value
+
+
+class IncrementalATR(IncrementalIndicator):
+    """
+    Average true range with Wilder smoothing.
+    """
+
+    def __init__(self, n: int) -> None:
+        """"""
+        super().__init__()
+
+        self.n: int = n
+        self.pre_close: float = 0
+        self.total: float = 0
+        self.value: float = np.nan
+
+    def update_bar(self, bar: BarData) -> float:
+        """"""
+        self.count += 1
+
+        # True range is available from the second bar
+        if self.count > 1:
+            tr: float = true_range(bar.high_price, bar.low_price, self.pre_close)
+
+            if self.inited:
+                value: float = self.value * (self.n - 1)
+                value += tr
+                self.value = value / self.n
+            else:
+                self.total += tr
+
+                if self.count > self.n:
+                    self.inited = True
+                    self.value = self.total / self.n
+
+        self.pre_close = bar.close_price
+        return self.value
+
+
+class IncrementalRSI(IncrementalIndicator):
+    """
+    Relative strength index with Wilder smoothing.
+    """
+
+    def __init__(self, n: int) -> None:
+        """"""
+        super().__init__()
+
+        self.n: int = n
+        self.pre_value: float = 0
+        self.gain: float = 0
+        self.loss: float = 0
+        self.value: float = np.nan
+
+    def update(self, value: float) -> float:
+        """"""
+        self.count += 1
+
+        if self.count > 1:
+            change: float = value - self.pre_value
+
+            if self.inited:
+                self.loss *= (self.n - 1)
+                self.gain *= (self.n - 1)
+
+            if change < 0:
+                self.loss -= change
+            else:
+                self.gain += change
+
+            if self.inited or self.count > self.n:
+                self.loss /= self.n
+                self.gain /= self.n
+                self.inited = True
+
+                total: float = self.gain + self.loss
+                if -1e-8 < total < 1e-8:
+                    self.value = 0.0
+                else:
+                    self.value = 100.0 * (self.gain / total)
+
+        self.pre_value = value
+        return self.value
+
+
+class IncrementalBoll(IncrementalIndicator):
+    """
+    Bollinger channel of SMA +/- population standard deviation * dev.
+    """
+
+    def __init__(self, n: int, dev: float) -> None:
+        """"""
+        super().__init__()
+
+        self.n: int = n
+        self.dev: float = dev
+        self.window: deque = deque(maxlen=n)
+        self.total: float = 0
+        self.square_total: float = 0
+
+        self.mid: float = np.nan
+        self.std: float = np.nan
+        self.up: float = np.nan
+        self.down: float = np.nan
+
+    def update(self, value: float) -> Tuple[float, float]:
+        """"""
+        window: deque = self.window
+        if len(window) == self.n:
+            old: float = window[0]
+            self.total -= old
+            self.square_total -= old * old
+
+        window.append(value)
+        self.total += value
+        self.square_total += value * value
+        self.count += 1
+
+        if not self.count % self.n:
+            self.total = sum_window(window)
+            self.square_total = sum_window([v * v for v in window])
+
+        if self.count >= self.n:
+            self.inited = True
+
+            mean: float = self.total / self.n
+            variance: float = self.square_total / self.n - mean * mean
+
+            self.mid = mean
+            self.std = np.sqrt(variance) if variance >= 1e-8 else 0.0
+            self.up = self.mid + self.std * self.dev
+            self.down = self.mid - self.std * self.dev
+
+        return self.up, self.down
+
+
+class IncrementalDonchian(IncrementalIndicator):
+    """
+    Donchian channel of highest high and lowest low, kept by monotonic queues.
+    """
+
+    def __init__(self, n: int) -> None:
+        """"""
+        super().__init__()
+
+        self.n: int = n
+        self.highs: deque = deque()
+        self.lows: deque = deque()
+
+        self.up: float = np.nan
+        self.down: float = np.nan
+
+    def update_bar(self, bar: BarData) -> Tuple[float, float]:
+        """"""
+        ix: int = self.count
+        self.count += 1
+
+        high: float = bar.high_price
+        highs: deque = self.highs
+        while highs and highs[-1][1] <= high:
+            highs.pop()
+        highs.append((ix, high))
+        if highs[0][0] <= ix - self.n:
+            highs.popleft()
+
+        low: float = bar.low_price
+        lows: deque = self.lows
+        while lows and lows[-1][1] >= low:
+            lows.pop()
+        lows.append((ix, low))
+        if lows[0][0] <= ix - self.n:
+            lows.popleft()
+
+        if self.count >= self.n:
+            self.inited = True
+            self.up = highs[0][1]
+            self.down = lows[0][1]
+
+        return self.up, self.down
+
+
+class IncrementalMACD(IncrementalIndicator):
+    """
+    MACD with the same EMA alignment as TA-Lib: both fast and slow EMA are
+    seeded at bar [slow_period], and signal is seeded with first MACD values.
+    """
+
+    def __init__(self, fast_period: int, slow_period: int, signal_period: int) -> None:
+        """"""
+        super().__init__()
+
+        if slow_period < fast_period:
+            fast_period, slow_period = slow_period, fast_period
+
+        self.fast_period: int = fast_period
+        self.slow_period: int = slow_period
+        self.signal_period: int = signal_period
+
+        self.fast_k: float = 2 / (fast_period + 1)
+        self.slow_k: float = 2 / (slow_period + 1)
+        self.signal_k: float = 2 / (signal_period + 1)
+
+        self.fast_total: float = 0
+        self.slow_total: float = 0
+        self.signal_total: float = 0
+        self.signal_count: int = 0
+
+        self.fast_ema: float = np.nan
+        self.slow_ema: float = np.nan
+        self.signal_ema: float = np.nan
+
+        self.macd: float = np.nan
+        self.signal: float = np.nan
+        self.hist: float = np.nan
+
+    def update(self, value: float) -> Tuple[float, float, float]:
+        """"""
+        self.count += 1
+
+        if self.count > self.slow_period:
+            self.fast_ema = ((value - self.fast_ema) * self.fast_k) + self.fast_ema
+            self.slow_ema = ((value - self.slow_ema) * self.slow_k) + self.slow_ema
+        else:
+            self.slow_total += value
+            if self.count > self.slow_period - self.fast_period:
+                self.fast_total += value
+
+            if self.count < self.slow_period:
+                return self.macd, self.signal, self.hist
+
+            self.fast_ema = self.fast_total / self.fast_period
+            self.slow_ema = self.slow_total / self.slow_period
+
+        macd: float = self.fast_ema - self.slow_ema
+
+        if self.signal_count < self.signal_period:
+            self.signal_count += 1
+            self.signal_total += macd
+
+            if self.signal_count < self.signal_period:
+                return self.macd, self.signal, self.hist
+
+            self.signal_ema = self.signal_total / self.signal_period
+            self.inited = True
+        else:
+            self.signal_ema = ((macd - self.signal_ema) * self.signal_k) + self.signal_ema
+
+        self.macd = macd
+        self.signal = self.signal_ema
+        self.hist = macd - self.signal_ema
+
+        return self.macd, self.signal, self.hist
+
+
+def true_range(high: float, low: float, pre_close: float) -> float:
+    """
+    True range of bar, same as TA-Lib TRANGE.
+    """
+    greatest: float = high - low
+
+    value: float = abs(pre_close - high)
+    if value > greatest:
+        greatest = value
+
+    value = abs(pre_close - low)
+    if value > greatest:
+        greatest = value
+
+    return greatest
+
+
+def sum_window(values: Iterable[float]) -> float:
+    """
+    Sum values one by one from the oldest, same order as TA-Lib.
+    """
+    total: float = 0
+    for value in values:
+        total += value
+    return total
+
+
 file_handlers: Dict[str, logging.FileHandler] = {}
 
 
@@ -1,10 +1,13 @@
 import os
 import json
 import time
-from flask import Flask, send_from_directory, jsonify, request
+from flask import Flask, Response, send_from_directory, jsonify, request
 from threading import Thread, Lock
 import random
+from ads_trading.trader.event import EVENT_TICK, EVENT_ORDER, EVENT_TRADE
 from ads_trading.trader.gateway.binance_gateway import BinanceGateway, BinanceGatewayConfig
+from ads_trading.trader.gateway.binance_account import BinanceAccountService
+from ads_trading.web_ui.stream import MarketStream, format_sse
 
 
 class TradingEngine:
@@ -475,70 +478,175 @@ class WebServer:
 
 
 class TradingEngine:
-    """模拟交易引擎"""
+    """
+    模拟交易引擎
 
-    def __init__(self):
+    传入事件引擎时行情、委托和成交来自事件引擎，否则使用模拟行情。
+    """
+
+    def __init__(self, event_engine=None):
         self.balance = 10000.0
         self.positions = {}
         self.trade_history = []
-        self.market_data = {
-            'BTC/USDT': {'price': 45000.0, 'change': 2.5, 'volume': 28492},
-            'ETH/USDT': {'price': 2500.0, 'change': -1.2, 'volume': 15932},
-            'ADA/USDT': {'price': 0.45, 'change': 0.8, 'volume': 8921},
-            'DOT/USDT': {'price': 6.5, 'change': 3.1, 'volume': 4532},
-            'SOL/USDT': {'price': 120.5, 'change': 5.2, 'volume': 12345}
-        }
+        self.event_engine = event_engine
+
+        if event_engine:
+            self.market_data = {}
+        else:
+            self.market_data = {
+                'BTC/USDT': {'price': 45000.0, 'change': 2.5, 'volume': 28492},
+                'ETH/USDT': {'price': 2500.0, 'change': -1.2, 'volume': 15932},
+                'ADA/USDT': {'price': 0.45, 'change': 0.8, 'volume': 8921},
+                'DOT/USDT': {'price': 6.5, 'change': 3.1, 'volume': 4532},
+                'SOL/USDT': {'price': 120.5, 'change': 5.2, 'volume': 12345}
+            }
+
+        # 行情字典每次更新整体替换，读取时不需要加锁；账户数据由lock保护
         self.lock = Lock()
         self.running = True
 
-        # 启动市场数据更新线程
-        self.update_thread = Thread(target=self._update_market_data, daemon=True)
-        self.update_thread.start()
+        # 行情、余额和持仓变化推送到所有网页连接
+        self.stream = MarketStream()
+
+        # 币安账户服务，首次访问时创建并在各请求间共享
+        self.binance_account_service = None
+        self.binance_lock = Lock()
+
+        if event_engine:
+            self.register_event()
+        else:
+            # 没有事件引擎时启动模拟市场数据更新线程
+            self.update_thread = Thread(target=self._update_market_data, daemon=True)
+            self.update_thread.start()
+
+    def register_event(self):
+        """将事件引擎的行情、委托和成交推送到网页"""
+        self.event_engine.register(EVENT_TICK, self.process_tick_event)
+        self.event_engine.register(EVENT_ORDER, self.process_order_event)
+        self.event_engine.register(EVENT_TRADE, self.process_trade_event)
+
+    def process_tick_event(self, event):
+        """更新行情并推送"""
+        tick = event.data
+
+        if tick.pre_close:
+            change = (tick.last_price / tick.pre_close - 1) * 100
+        else:
+            change = 0
+
+        data = {
+            'price': tick.last_price,
+            'change': round(change, 2),
+            'volume': tick.volume,
+            'bid': tick.bid_price_1,
+            'ask': tick.ask_price_1,
+            'datetime': str(tick.datetime)
+        }
+
+        market_data = dict(self.market_data)
+        market_data[tick.vt_symbol] = data
+        self.market_data = market_data
+
+        self.stream.publish('market', tick.vt_symbol, data)
+
+        # 持仓合约价格变化时账户市值随之变化
+        if tick.vt_symbol in self.positions:
+            self.publish_account()
+
+    def process_order_event(self, event):
+        """推送委托"""
+        order = event.data
+        self.stream.publish('orders', order.vt_orderid, {
+            'symbol': order.vt_symbol,
+            'direction': order.direction.value,
+            'price': order.price,
+            'volume': order.volume,
+            'traded': order.traded,
+            'status': order.status.value
+        })
+
+    def process_trade_event(self, event):
+        """推送成交"""
+        trade = event.data
+        self.stream.publish('trades', trade.vt_tradeid, {
+            'symbol': trade.vt_symbol,
+            'direction': trade.direction.value,
+            'price': trade.price,
+            'volume': trade.volume,
+            'datetime': str(trade.datetime)
+        })
 
     def _update_market_data(self):
         """模拟市场数据更新"""
         while self.running:
             time.sleep(3)  # 每3秒更新一次
-            with self.lock:
-                for symbol in self.market_data:
-                    # 模拟价格波动
-                    change = random.uniform(-2.0, 2.0)
-                    current_price = self.market_data[symbol]['price']
-                    new_price = max(0.01, current_price * (1 + change / 100))
 
-                    # 更新数据
-                    self.market_data[symbol]['price'] = round(new_price, 2)
-                    self.market_data[symbol]['change'] = round(change, 2)
-                    self.market_data[symbol]['volume'] = random.randint(1000, 30000)
+            market_data = {}
+            for symbol, data in self.market_data.items():
+                # 模拟价格波动
+                change = random.uniform(-2.0, 2.0)
+                new_price = max(0.01, data['price'] * (1 + change / 100))
+
+                # 更新数据
+                market_data[symbol] = {
+                    'price': round(new_price, 2),
+                    'change': round(change, 2),
+                    'volume': random.randint(1000, 30000)
+                }
+            self.market_data = market_data
+
+            for symbol, data in market_data.items():
+                self.stream.publish('market', symbol, data)
+            self.publish_account()
+
+    def publish_account(self):
+        """推送余额和持仓"""
+        self.stream.publish('account', 'balance', self.get_balance())
+        self.stream.publish('account', 'positions', self.get_positions())
+
+    def get_snapshot(self):
+        """获取推送连接建立时的完整数据"""
+        return {
+            'market': self.get_market_data(),
+            'account': {
+                'balance': self.get_balance(),
+                'positions': self.get_positions()
+            }
+        }
 
     def get_market_data(self):
         """获取市场数据"""
-        with self.lock:
-            return self.market_data.copy()
+        return self.market_data
 
     def get_balance(self):
         """获取账户余额"""
-        total_balance = self.balance
+        market_data = self.market_data
+        with self.lock:
+            total_balance = self.balance
+            available = self.balance
+            positions = list(self.positions.items())
+
         # 计算持仓价值
-        for symbol, quantity in self.positions.items():
-            if symbol in self.market_data:
-                price = self.market_data[symbol]['price']
+        for symbol, quantity in positions:
+            if symbol in market_data:
+                price = market_data[symbol]['price']
                 total_balance += price * quantity
 
         return {
             'total': round(total_balance, 2),
-            'available': round(self.balance, 2),
+            'available': round(available, 2),
             'currency': 'USDT',
             'pnl': round(total_balance - 10000, 2)  # 初始资金10000
         }
 
     def place_order(self, symbol, side, quantity, order_type='market'):
         """下单"""
-        with self.lock:
-            if symbol not in self.market_data:
-                return {'error': 'Invalid symbol'}
+        market_data = self.market_data
+        if symbol not in market_data:
+            return {'error': 'Invalid symbol'}
 
-            price = self.market_data[symbol]['price']
+        with self.lock:
+            price = market_data[symbol]['price']
             total_cost = price * quantity
 
             if side == 'buy' and total_cost > self.balance:
@@ -574,20 +682,26 @@ class TradingEngine:
             }
             self.trade_history.append(trade)
 
-            return {'success': True, 'trade': trade}
+        self.stream.publish('trades', str(trade['id']), trade)
+        self.publish_account()
+
+        return {'success': True, 'trade': trade}
 
     def get_positions(self):
         """获取持仓"""
         positions_with_value = {}
+        market_data = self.market_data
         with self.lock:
-            for symbol, quantity in self.positions.items():
-                if symbol in self.market_data:
-                    price = self.market_data[symbol]['price']
-                    positions_with_value[symbol] = {
-                        'quantity': quantity,
-                        'current_price': price,
-                        'value': round(price * quantity, 2)
-                    }
+            positions = list(self.positions.items())
+
+        for symbol, quantity in positions:
+            if symbol in market_data:
+                price = market_data[symbol]['price']
+                positions_with_value[symbol] = {
+                    'quantity': quantity,
+                    'current_price': price,
+                    'value': round(price * quantity, 2)
+                }
         return positions_with_value
 
     def get_trade_history(self):
@@ -609,22 +723,35 @@ class TradingEngine:
     def get_binance_account(self):
         """获取币安账户数据"""
         try:
+            service = self.get_binance_account_service()
+            if not service:
+                return {
+                    "success": False,
+                    "error": "币安API密钥或密钥未配置"
+                }
+
+            return service.get_account()
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    def get_binance_account_service(self):
+        """获取共享的币安账户服务"""
+        with self.binance_lock:
+            if self.binance_account_service:
+                return self.binance_account_service
+
             # 从配置文件加载币安API密钥和密钥
             from ads_trading.trader.setting import SETTINGS
-            
+
             binance_api_key = SETTINGS.get("binance.api_key", "")
             binance_api_secret = SETTINGS.get("binance.api_secret", "")
-            
+
             if not binance_api_key or not binance_api_secret:
-                return {
-                    "success": False,
-                    "error": "币安API密钥或密钥未配置"
-                }
-            
-            # 创建币安网关配置
-            from ads_trading.trader.gateway.binance_gateway import BinanceGatewayConfig
-            from ads_trading.trader.gateway.binance_gateway import BinanceGateway
-            
+                return None
+
             config = BinanceGatewayConfig(
                 api_key=binance_api_key,
                 api_secret=binance_api_secret,
@@ -633,38 +760,15 @@ class TradingEngine:
                 testnet=False
             )
 
-            # 创建币安网关
-            gateway = BinanceGateway()
-            
-            # 连接到币安API
-            connected = gateway.connect(config)
-            if not connected:
-                return {
-                    "success": False,
-                    "error": "币安网关连接失败"
-                }
-
-            # 获取账户余额
-            account_info = {
-                "spot": gateway.get_spot_balance(),
-                "futures": gateway.get_futures_balance(),
-                "total": gateway.get_total_balance()
-            }
-            return {
-                'success': True,
-                'account_info': account_info
-            }
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
-            }
+            self.binance_account_service = BinanceAccountService(config)
+            self.binance_account_service.start()
+            return self.binance_account_service
 
 
 class WebServer:
     """Web 服务器"""
 
-    def __init__(self):
+    def __init__(self, event_engine=None):
         # Get the absolute path to the build directory
         self.build_dir = os.path.abspath('/Users/rocky/work/python/ADS-Trading/web-ui/build')
         static_dir = os.path.join(self.build_dir, 'static')
@@ -678,7 +782,7 @@ class WebServer:
                         static_folder=static_dir,
                         static_url_path='/static')
                         
-        self.trading_engine = TradingEngine()
+        self.trading_engine = TradingEngine(event_engine)
         self.setup_routes()
 
     def setup_routes(self):
@@ -698,6 +802,7 @@ class WebServer:
         self.app.add_url_rule('/api/performance', view_func=self.api_performance, methods=['GET'])
         self.app.add_url_rule('/api/order', view_func=self.api_order, methods=['POST'])
         self.app.add_url_rule('/api/binance-account', view_func=self.api_binance_account, methods=['GET'])
+        self.app.add_url_rule('/api/stream', view_func=self.api_stream, methods=['GET'])
 
         # Test route - temporarily commented out
         # self.app.add_url_rule('/test', view_func=self.test)
@@ -766,6 +871,28 @@ class WebServer:
         binance_account = self.trading_engine.get_binance_account()
         return jsonify(binance_account)
 
+    def api_stream(self):
+        """推送行情和账户变化（Server-Sent Events）"""
+        stream = self.trading_engine.stream
+        client = stream.subscribe()
+        snapshot = self.trading_engine.get_snapshot()
+
+        def generate():
+            try:
+                yield format_sse(snapshot, 'snapshot')
+
+                while not client.closed:
+                    deltas = client.get(timeout=15)
+                    if deltas:
+                        yield format_sse(deltas)
+                    else:
+                        yield ': ping\n\n'
+            finally:
+                stream.unsubscribe(client)
+
+        headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        return Response(generate(), mimetype='text/event-stream', headers=headers)
+
     def api_order(self):
         """下单"""
         try:
@@ -0,0 +1,103 @@
+"""
+行情推送流，为每个网页连接合并增量数据
+"""
+import json
+from threading import Condition, Lock
+from typing import Any, Dict, Optional, Set, Tuple
+
+
+class StreamClient:
+    """
+    单个推送连接
+
+    同一频道同一键只保留最新数据，推送速度跟不上时旧数据被覆盖；
+    待推送的键超过上限时断开连接，由客户端重连后重新获取快照。
+    """
+
+    def __init__(self, max_pending: int = 1000) -> None:
+        """"""
+        self.max_pending: int = max_pending
+
+        self.pending: Dict[Tuple[str, str], Any] = {}
+        self.condition: Condition = Condition()
+        self.closed: bool = False
+
+    def put(self, channel: str, key: str, data: Any) -> None:
+        """添加增量数据"""
+        with self.condition:
+            if self.closed:
+                return
+
+            self.pending[(channel, key)] = data
+            if len(self.pending) > self.max_pending:
+                self.closed = True
+                self.pending.clear()
+
+            self.condition.notify()
+
+    def get(self, timeout: float) -> Optional[Dict[str, Dict[str, Any]]]:
+        """等待并取出所有增量数据，超时返回None"""
+        with self.condition:
+            if not self.pending and not self.closed:
+                self.condition.wait(timeout)
+
+            if not self.pending:
+                return None
+
+            pending: Dict[Tuple[str, str], Any] = self.pending
+            self.pending = {}
+
+        deltas: Dict[str, Dict[str, Any]] = {}
+        for (channel, key), data in pending.items():
+            deltas.setdefault(channel, {})[key] = data
+        return deltas
+
+    def close(self) -> None:
+        """"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+
+class MarketStream:
+    """
+    行情推送中心
+
+    每次更新只写入各连接的待推送字典，序列化和发送在各连接自己的线程完成。
+    """
+
+    def __init__(self, max_pending: int = 1000) -> None:
+        """"""
+        self.max_pending: int = max_pending
+
+        self.clients: Set[StreamClient] = set()
+        self.lock: Lock = Lock()
+
+    def subscribe(self) -> StreamClient:
+        """"""
+        client: StreamClient = StreamClient(self.max_pending)
+        with self.lock:
+            self.clients.add(client)
+        return client
+
+    def unsubscribe(self, client: StreamClient) -> None:
+        """"""
+        client.close()
+        with self.lock:
+            self.clients.discard(client)
+
+    def publish(self, channel: str, key: str, data: Any) -> None:
+        """推送一条更新到所有连接"""
+        with self.lock:
+            clients: list = list(self.clients)
+
+        for client in clients:
+            client.put(channel, key, data)
+
+
+def format_sse(data: Any, event: str = "") -> str:
+    """格式化为Server-Sent Events消息"""
+    message: str = f"data: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+    if event:
+        message = f"event: {event}\n" + message
+    return message
@@ -0,0 +1,149 @@
+"""
+风控检查延迟基准测试
+
+在不同数量的挂单下测量RiskEngine.check_risk单次耗时，并与原先遍历全部挂单
+查询最优价格、从MainEngine获取全部活动委托计数的方式对比。
+
+在仓库根目录运行：python -m benchmarks.bench_risk_check
+"""
+import random
+from time import perf_counter
+from unittest.mock import MagicMock, patch
+
+from howtrader.event import Event
+from howtrader.trader.constant import Direction, Exchange, OrderType, Status
+from howtrader.trader.event import EVENT_ORDER
+from howtrader.trader.object import OrderData, OrderRequest
+
+from ads_trading.app.risk_manager.engine import RiskEngine
+
+
+ORDER_COUNTS = [10, 100, 1000, 5000]
+CHECK_COUNT = 20000
+
+
+class ScanOrderBook:
+    """原先的活动委托簿，每次查询遍历全部挂单"""
+
+    def __init__(self) -> None:
+        self.bid_prices = {}
+        self.ask_prices = {}
+
+    def update_order(self, order: OrderData) -> None:
+        if order.is_active():
+            if order.direction == Direction.LONG:
+                self.bid_prices[order.vt_orderid] = order.price
+            else:
+                self.ask_prices[order.vt_orderid] = order.price
+        else:
+            self.bid_prices.pop(order.vt_orderid, None)
+            self.ask_prices.pop(order.vt_orderid, None)
+
+    def get_best_bid(self) -> float:
+        if not self.bid_prices:
+            return 0
+        return max(self.bid_prices.values())
+
+    def get_best_ask(self) -> float:
+        if not self.ask_prices:
+            return 0
+        return min(self.ask_prices.values())
+
+
+class ScanActiveOrders:
+    """原先的活动委托计数，每次生成全部活动委托列表"""
+
+    def __init__(self, main_engine: MagicMock) -> None:
+        self.orders = main_engine.get_all_active_orders.return_value
+
+    def __len__(self) -> int:
+        return len([order for order in self.orders if order.is_active()])
+
+
+def create_engine(orders: list, scan: bool) -> RiskEngine:
+    """创建挂有指定委托的风控引擎"""
+    main_engine = MagicMock()
+    main_engine.send_order.return_value = "BENCH.1"
+
+    with patch("ads_trading.app.risk_manager.engine.load_json", return_value={}):
+        engine = RiskEngine(main_engine, MagicMock())
+
+    engine.active = True
+    engine.order_flow_limit = CHECK_COUNT * 2
+    engine.active_order_limit = len(orders) + 1
+    engine.update_setting(engine.get_setting())
+
+    if scan:
+        book = ScanOrderBook()
+        engine.active_order_books["BTCUSDT.BINANCE"] = book
+        # 原先每次检查都从MainEngine获取全部活动委托
+        main_engine.get_all_active_orders.return_value = orders
+
+    for order in orders:
+        engine.process_order_event(Event(EVENT_ORDER, order))
+
+    if scan:
+        engine.active_orderids = ScanActiveOrders(main_engine)
+
+    return engine
+
+
+def create_orders(count: int) -> list:
+    """创建买卖各半的挂单"""
+    rng = random.Random(count)
+    orders = []
+
+    for i in range(count):
+        direction = Direction.LONG if i % 2 else Direction.SHORT
+        if direction == Direction.LONG:
+            price = rng.uniform(90, 99)
+        else:
+            price = rng.uniform(101, 110)
+
+        orders.append(OrderData(
+            symbol="BTCUSDT",
+            exchange=Exchange.BINANCE,
+            orderid=str(i),
+            direction=direction,
+            price=price,
+            volume=1,
+            status=Status.NOTTRADED,
+            gateway_name="BENCH"
+        ))
+
+    return orders
+
+
+def measure(engine: RiskEngine) -> float:
+    """返回单次检查的平均耗时，单位微秒"""
+    requests = [
+        OrderRequest(
+            symbol="BTCUSDT",
+            exchange=Exchange.BINANCE,
+            direction=Direction.LONG if i % 2 else Direction.SHORT,
+            type=OrderType.LIMIT,
+            volume=1,
+            price=100
+        )
+        for i in range(CHECK_COUNT)
+    ]
+
+    start = perf_counter()
+    for req in requests:
+        engine.check_risk(req, "BENCH")
+    return (perf_counter() - start) / CHECK_COUNT * 1e6
+
+
+def main() -> None:
+    """"""
+    print(f"{'挂单数量':>8}{'遍历(us)':>12}{'堆(us)':>12}{'加速':>8}")
+
+    for count in ORDER_COUNTS:
+        orders = create_orders(count)
+        scan_time = measure(create_engine(orders, scan=True))
+        heap_time = measure(create_engine(orders, scan=False))
+        print(f"{count:>12}{scan_time:>12.2f}{heap_time:>12.2f}{scan_time / heap_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
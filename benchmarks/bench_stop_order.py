@@ -0,0 +1,125 @@
+"""
+本地停止单触发检查基准测试
+
+在每个合约挂有大量本地停止单时测量CtaEngine每秒可处理的Tick数量，并与原先
+每个Tick遍历全部停止单的方式对比。价格在停止单之间波动，多数Tick不触发，
+测量的是检查本身的开销。
+
+在仓库根目录运行：python -m benchmarks.bench_stop_order
+"""
+import random
+from datetime import datetime
+from decimal import Decimal
+from time import perf_counter
+from unittest.mock import MagicMock, patch
+
+from howtrader.trader.constant import Direction, Exchange, Offset
+from howtrader.trader.object import TickData
+
+from ads_trading.app.cta_strategy.engine import CtaEngine
+
+
+STOP_COUNTS = [200, 1000, 2000, 5000]
+SYMBOL_COUNT = 20
+TICK_COUNT = 20000
+
+
+class FakeStrategy:
+    """不做任何处理的策略"""
+
+    def __init__(self, strategy_name: str, vt_symbol: str) -> None:
+        self.strategy_name = strategy_name
+        self.vt_symbol = vt_symbol
+        self.trading = True
+        self.inited = True
+
+    def on_stop_order(self, stop_order) -> None:
+        pass
+
+
+class ScanCtaEngine(CtaEngine):
+    """原先的检查方式，每个Tick遍历全部合约的停止单"""
+
+    def check_stop_order(self, tick: TickData) -> None:
+        for stop_order in list(self.stop_orders.values()):
+            if stop_order.vt_symbol != tick.vt_symbol:
+                continue
+
+            long_triggered = (
+                stop_order.direction == Direction.LONG and tick.last_price >= stop_order.price
+            )
+            short_triggered = (
+                stop_order.direction == Direction.SHORT and tick.last_price <= stop_order.price
+            )
+            if long_triggered or short_triggered:
+                raise RuntimeError("基准测试中的停止单不应触发")
+
+
+def create_engine(engine_class: type, stop_count: int) -> CtaEngine:
+    """创建挂有指定数量停止单的引擎"""
+    with patch("ads_trading.app.cta_strategy.engine.get_database"):
+        engine = engine_class(MagicMock(), MagicMock())
+
+    rng = random.Random(stop_count)
+
+    for i in range(stop_count):
+        vt_symbol = f"SYMBOL{i % SYMBOL_COUNT}.BINANCE"
+        strategy = engine.strategies.get(vt_symbol, None)
+        if not strategy:
+            strategy = FakeStrategy(vt_symbol, vt_symbol)
+            engine.strategies[vt_symbol] = strategy
+
+        # 多头停止单在价格上方，空头停止单在价格下方
+        if i % 2:
+            direction = Direction.LONG
+            price = Decimal(str(round(rng.uniform(101.5, 120), 2)))
+        else:
+            direction = Direction.SHORT
+            price = Decimal(str(round(rng.uniform(80, 98.5), 2)))
+
+        engine.send_local_stop_order(strategy, direction, Offset.OPEN, price, Decimal("1"), False, False)
+
+    return engine
+
+
+def create_ticks() -> list:
+    """创建在99到101之间波动的Tick"""
+    rng = random.Random(0)
+    ticks = []
+
+    for i in range(TICK_COUNT):
+        ticks.append(TickData(
+            symbol=f"SYMBOL{i % SYMBOL_COUNT}",
+            exchange=Exchange.BINANCE,
+            datetime=datetime(2023, 1, 2),
+            last_price=round(rng.uniform(99, 101), 2),
+            gateway_name="BENCH"
+        ))
+
+    return ticks
+
+
+def measure(engine: CtaEngine, ticks: list) -> float:
+    """返回每秒处理的Tick数量"""
+    start = perf_counter()
+    for tick in ticks:
+        engine.check_stop_order(tick)
+    elapsed = perf_counter() - start
+
+    engine.data_writer.close()
+    return len(ticks) / elapsed
+
+
+def main() -> None:
+    """"""
+    ticks = create_ticks()
+    print(f"{'停止单数量':>8}{'遍历(tick/s)':>16}{'索引(tick/s)':>16}{'加速':>8}")
+
+    for count in STOP_COUNTS:
+        scan_speed = measure(create_engine(ScanCtaEngine, count), ticks)
+        index_speed = measure(create_engine(CtaEngine, count), ticks)
+        print(f"{count:>12}{scan_speed:>16.0f}{index_speed:>16.0f}{index_speed / scan_speed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
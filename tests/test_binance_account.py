@@ -0,0 +1,170 @@
+"""
+币安账户服务测试模块
+使用本地模拟交易所网关，测试缓存、并发请求合并、缓存失效和后台刷新
+"""
+import unittest
+from threading import Lock, Thread
+from time import sleep
+
+from ads_trading.trader.gateway.binance_account import BinanceAccountService
+from ads_trading.trader.gateway.binance_gateway import BinanceGatewayConfig
+
+
+class MockGateway:
+    """本地模拟交易所网关，记录每个接口的访问次数"""
+
+    def __init__(self, delay=0.05, connected=True):
+        self.delay = delay
+        self.connected = connected
+        self.usdt = 100.0
+        self.error = None
+
+        self.lock = Lock()
+        self.counts = {"connect": 0, "spot": 0, "futures": 0}
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+        sleep(self.delay)
+
+    def connect(self, config):
+        self.count("connect")
+        return self.connected
+
+    def fetch_spot_balance(self):
+        self.count("spot")
+        if self.error:
+            raise self.error
+        return {"total": {"USDT": self.usdt, "BTC": 0.5, "ETH": 0}}
+
+    def fetch_futures_balance(self):
+        self.count("futures")
+        return {"total": {"USDT": 50.0}}
+
+    def fetch_all(self, requests, raise_error=False):
+        results = {}
+        for endpoint, func in requests.items():
+            results[endpoint] = func()
+        return results, {}, {}
+
+    def write_log(self, msg):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestBinanceAccountService(unittest.TestCase):
+    """测试币安账户服务"""
+
+    def setUp(self):
+        """测试环境准备"""
+        self.config = BinanceGatewayConfig(api_key="key", api_secret="secret")
+        self.gateway = MockGateway()
+        self.service = BinanceAccountService(self.config, self.gateway, ttl=60)
+
+    def tearDown(self):
+        self.service.close()
+
+    def test_cache(self):
+        """测试缓存有效期内不访问交易所"""
+        account = self.service.get_account()
+        self.assertTrue(account["success"], "获取账户失败")
+        self.assertEqual(account["account_info"]["total"], 150.0, "总余额计算错误")
+
+        for _ in range(100):
+            self.service.get_account()
+
+        self.assertEqual(self.gateway.counts, {"connect": 1, "spot": 1, "futures": 1}, "缓存未生效")
+
+    def test_single_flight(self):
+        """测试并发请求只访问一次交易所"""
+        results = []
+
+        def get():
+            results.append(self.service.get_account())
+
+        threads = [Thread(target=get) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 20, "请求结果数量不正确")
+        self.assertTrue(all(r["success"] for r in results), "部分请求失败")
+        self.assertEqual(self.gateway.counts["spot"], 1, "并发请求未合并")
+
+    def test_invalidate(self):
+        """测试缓存失效后重新获取"""
+        self.service.get_account()
+
+        self.gateway.usdt = 200.0
+        self.service.invalidate()
+        account = self.service.get_account()
+
+        self.assertEqual(account["account_info"]["spot"]["USDT"], 200.0, "缓存失效后未重新获取")
+        self.assertEqual(self.gateway.counts["connect"], 1, "网关重复连接")
+
+    def test_refresh_fresh(self):
+        """测试获得刷新权时缓存已被其他线程更新则不再访问交易所"""
+        self.service.get_account()
+        self.service.refresh()
+        self.assertEqual(self.gateway.counts["spot"], 1, "缓存有效时重复访问交易所")
+
+        self.service.refresh(force=True)
+        self.assertEqual(self.gateway.counts["spot"], 2, "强制刷新未访问交易所")
+
+    def test_fetch_error(self):
+        """测试交易所请求出错时返回错误并保留上一次快照"""
+        account = self.service.get_account()
+
+        self.gateway.error = RuntimeError("timeout")
+        self.service.invalidate()
+        result = self.service.get_account()
+        self.assertFalse(result["success"], "请求出错未返回错误")
+        self.assertIn("timeout", result["error"], "错误信息不正确")
+        self.assertIs(self.service.snapshot, account, "请求出错时覆盖了上一次快照")
+
+        # 错误不缓存，下次请求重新访问交易所
+        self.gateway.error = None
+        result = self.service.get_account()
+        self.assertTrue(result["success"], "恢复后获取失败")
+        self.assertEqual(self.gateway.counts["spot"], 3, "访问交易所次数不正确")
+
+    def test_background_error(self):
+        """测试后台刷新出错不覆盖有效快照"""
+        service = BinanceAccountService(self.config, self.gateway, ttl=0.1, idle_timeout=10)
+        account = service.get_account()
+
+        self.gateway.error = RuntimeError("timeout")
+        service.start()
+        sleep(0.3)
+        service.close()
+
+        self.assertGreater(self.gateway.counts["spot"], 1, "后台未刷新")
+        self.assertIs(service.snapshot, account, "后台刷新出错时覆盖了快照")
+
+    def test_connect_failed(self):
+        """测试连接失败时返回错误并在下次请求时重连"""
+        self.gateway.connected = False
+        account = self.service.get_account()
+        self.assertFalse(account["success"], "连接失败未返回错误")
+
+        self.gateway.connected = True
+        account = self.service.get_account()
+        self.assertTrue(account["success"], "重连失败")
+        self.assertEqual(self.gateway.counts["connect"], 2, "连接次数不正确")
+
+    def test_background_refresh(self):
+        """测试后台定时刷新"""
+        service = BinanceAccountService(self.config, self.gateway, ttl=0.1, idle_timeout=10)
+        service.get_account()
+        service.start()
+        sleep(0.5)
+        service.close()
+
+        self.assertGreater(self.gateway.counts["spot"], 2, "后台未刷新")
+
+
+if __name__ == "__main__":
+    unittest.main()
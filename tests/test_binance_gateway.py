@@ -0,0 +1,100 @@
+"""
+币安网关测试模块
+使用本地模拟交易所，测试并发账户快照、资产估值和接口耗时统计
+"""
+import unittest
+from time import perf_counter, sleep
+
+from ads_trading.trader.gateway.binance_gateway import BinanceGateway
+
+
+class MockExchange:
+    """本地模拟交易所，每个接口固定延迟"""
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.calls = []
+
+    def fetch_balance(self, params=None):
+        self.calls.append(params["type"])
+        sleep(self.delay)
+
+        if params["type"] == "spot":
+            return {
+                "total": {"USDT": 100.0, "BTC": 0.5, "ETH": 2.0, "XYZ": 10.0, "BNB": 0.0},
+                "used": {"USDT": 20.0, "BTC": 0.0, "ETH": None, "XYZ": 0.0, "BNB": 0.0},
+            }
+        return {
+            "total": {"USDT": 50.0, "BUSD": 5.0},
+            "used": {"USDT": 10.0, "BUSD": 0.0},
+        }
+
+    def fetch_last_prices(self):
+        self.calls.append("ticker")
+        sleep(self.delay)
+
+        return {
+            "BTC/USDT": {"price": 40000.0},
+            "ETH/USDT": {"price": 2000.0},
+            "USDT/BUSD": {"price": 1.25},
+        }
+
+
+class TestBinanceGateway(unittest.TestCase):
+    """测试币安网关"""
+
+    def setUp(self):
+        """测试环境准备"""
+        self.gateway = BinanceGateway()
+        self.exchange = MockExchange()
+        self.gateway.exchange = self.exchange
+
+    def tearDown(self):
+        self.gateway.close()
+
+    def test_snapshot(self):
+        """测试并发获取账户快照"""
+        start = perf_counter()
+        snapshot = self.gateway.get_snapshot()
+        elapsed = perf_counter() - start
+
+        self.assertLess(elapsed, 0.25, "接口未并发请求")
+        self.assertEqual(sorted(self.exchange.calls), ["future", "spot", "ticker"], "接口请求次数不正确")
+
+        account = snapshot.accounts["spot.USDT"]
+        self.assertEqual(account.balance, 100.0, "余额不正确")
+        self.assertEqual(account.available, 80.0, "可用余额不正确")
+        self.assertEqual(account.vt_accountid, "BINANCE.spot.USDT", "账户编号不正确")
+        self.assertNotIn("spot.BNB", snapshot.accounts, "零余额资产未过滤")
+
+        self.assertEqual(snapshot.prices["BUSD"], 0.8, "反向交易对价格不正确")
+        self.assertIn("spot.XYZ", snapshot.accounts, "无价格资产未保留")
+        self.assertNotIn("spot.XYZ", snapshot.values, "无价格资产计入估值")
+        self.assertAlmostEqual(snapshot.total_value, 100 + 20000 + 4000 + 50 + 4, msg="总价值不正确")
+
+        self.assertEqual(set(snapshot.latencies), {"spot", "future", "ticker"}, "接口耗时缺失")
+        self.assertEqual(self.gateway.accounts["future.USDT"].balance, 50.0, "网关账户未更新")
+
+    def test_error(self):
+        """测试单个接口失败时其余数据仍然返回"""
+        def fetch_last_prices():
+            raise RuntimeError("timeout")
+        self.exchange.fetch_last_prices = fetch_last_prices
+
+        snapshot = self.gateway.get_snapshot()
+
+        self.assertIn("ticker", snapshot.errors, "接口错误未记录")
+        self.assertEqual(snapshot.total_value, 150.0, "计价货币余额不正确")
+        self.assertIn("spot.BTC", snapshot.accounts, "账户数据缺失")
+
+    def test_total_balance(self):
+        """测试总余额并发获取现货和合约余额"""
+        self.assertEqual(self.gateway.get_total_balance(), 150.0, "总余额不正确")
+
+        metrics = self.gateway.get_metrics()
+        self.assertEqual(metrics["spot"]["count"], 1, "接口统计次数不正确")
+        self.assertGreater(metrics["future"]["avg_time"], 0, "接口平均耗时不正确")
+
+
+if __name__ == "__main__":
+    unittest.main()
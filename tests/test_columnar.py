@@ -0,0 +1,489 @@
+"""
+列式数据容器测试模块
+测试BarArray与BarData之间的转换、按时间切片、BarCache磁盘缓存以及成交记录盈亏计算功能
+"""
+import math
+import random
+import tempfile
+import unittest
+from unittest.mock import patch
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from ads_trading.trader.columnar import (
+    BarArray, BarCache, BarPanel, TradeLedger, generate_window_bars, resample_bars
+)
+from ads_trading.trader.constant import Direction, Exchange, Interval
+from ads_trading.trader.database import DB_TZ
+from ads_trading.trader.object import BarData, TradeData
+from ads_trading.trader.utility import BarGenerator
+
+
+class TestBarArray(unittest.TestCase):
+    """测试列式K线容器"""
+
+    def setUp(self):
+        """测试环境准备
+        创建10根带时区的1分钟K线
+        """
+        start = DB_TZ.localize(datetime(2023, 1, 1, 0, 0, 0))
+        self.bars = []
+        for i in range(10):
+            dt = datetime.fromtimestamp((start + timedelta(minutes=i)).timestamp(), DB_TZ)
+            bar = BarData(
+                symbol="BTCUSDT",
+                exchange=Exchange.BINANCE,
+                datetime=dt,
+                interval=Interval.MINUTE,
+                gateway_name="DB",
+                open_price=100 + i,
+                high_price=101.5 + i,
+                low_price=99.25 + i,
+                close_price=100.1 + i,
+                volume=1 + i,
+                turnover=100 + i,
+                open_interest=0
+            )
+            self.bars.append(bar)
+
+        self.array = BarArray.from_bars(self.bars)
+
+    def test_round_trip(self):
+        """测试BarData转换为列式数组后再还原，数据保持一致"""
+        self.assertEqual(len(self.array), 10, "K线数量不正确")
+        self.assertEqual(self.array.to_bars(), self.bars, "还原的K线数据不一致")
+        self.assertEqual(self.array.close[3], 103.1, "收盘价数组不正确")
+
+    def test_slice(self):
+        """测试按时间范围二分切片"""
+        start = self.bars[2].datetime
+        end = self.bars[5].datetime
+
+        result = self.array.slice(start, end)
+
+        self.assertEqual(len(result), 4, "切片K线数量不正确")
+        self.assertEqual(result.get_bar(0), self.bars[2], "切片起始K线不正确")
+        self.assertEqual(result.get_bar(-1), self.bars[5], "切片结束K线不正确")
+
+
+class MemoryDatabase:
+    """只实现load_bar_data的内存数据库，记录查询次数"""
+
+    def __init__(self, bars):
+        self.bars = bars
+        self.query_count = 0
+
+    def load_bar_data(self, symbol, exchange, interval, start, end):
+        self.query_count += 1
+        start = DB_TZ.localize(start)
+        end = DB_TZ.localize(end)
+        return [bar for bar in self.bars if start <= bar.datetime <= end]
+
+
+class TestBarCache(unittest.TestCase):
+    """测试列式K线磁盘缓存"""
+
+    def setUp(self):
+        """测试环境准备
+        创建一天的1分钟K线，缓存文件保存在临时目录
+        """
+        start = DB_TZ.localize(datetime(2023, 1, 1, 0, 0, 0))
+        bars = []
+        for i in range(24 * 60):
+            dt = datetime.fromtimestamp((start + timedelta(minutes=i)).timestamp(), DB_TZ)
+            bar = BarData(
+                symbol="BTCUSDT",
+                exchange=Exchange.BINANCE,
+                datetime=dt,
+                interval=Interval.MINUTE,
+                gateway_name="DB",
+                open_price=100 + i,
+                high_price=101 + i,
+                low_price=99 + i,
+                close_price=100 + i,
+                volume=1
+            )
+            bars.append(bar)
+
+        self.bars = bars
+        self.database = MemoryDatabase(bars)
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = BarCache(self.database, self.temp_dir.name)
+
+    def tearDown(self):
+        """测试环境清理"""
+        self.temp_dir.cleanup()
+
+    def load(self, start, end):
+        """加载缓存K线"""
+        return self.cache.load("BTCUSDT", Exchange.BINANCE, Interval.MINUTE, start, end)
+
+    def test_load_and_extend(self):
+        """测试缓存的加载、范围扩展以及命中后不再查询数据库"""
+        # 首次加载中间一段数据
+        result = self.cache.load(
+            "BTCUSDT", Exchange.BINANCE, Interval.MINUTE,
+            datetime(2023, 1, 1, 6, 0), datetime(2023, 1, 1, 12, 0)
+        )
+        self.assertEqual(len(result), 6 * 60 + 1, "首次加载K线数量不正确")
+        self.assertEqual(self.database.query_count, 1, "首次加载应查询一次数据库")
+
+        # 扩展到全天范围，只查询缺失的左右两段
+        result = self.cache.load(
+            "BTCUSDT", Exchange.BINANCE, Interval.MINUTE,
+            datetime(2023, 1, 1, 0, 0), datetime(2023, 1, 1, 23, 59)
+        )
+        self.assertEqual(len(result), 24 * 60, "扩展后K线数量不正确")
+        self.assertEqual(self.database.query_count, 3, "扩展范围应只查询缺失部分")
+        self.assertEqual(result.to_bars(), self.bars, "缓存K线数据与原始数据不一致")
+
+        # 已覆盖范围直接从缓存文件映射
+        result = self.cache.load(
+            "BTCUSDT", Exchange.BINANCE, Interval.MINUTE,
+            datetime(2023, 1, 1, 1, 0), datetime(2023, 1, 1, 1, 9)
+        )
+        self.assertEqual(len(result), 10, "缓存切片K线数量不正确")
+        self.assertEqual(result.get_bar(0), self.bars[60], "缓存切片起始K线不正确")
+        self.assertEqual(self.database.query_count, 3, "命中缓存时不应查询数据库")
+
+    def test_empty(self):
+        """测试没有数据时不记录缓存范围，数据下载后能够加载"""
+        self.database.bars = []
+        result = self.load(datetime(2023, 1, 1, 6, 0), datetime(2023, 1, 1, 12, 0))
+        self.assertEqual(len(result), 0, "没有数据时应返回空数组")
+        self.assertIsNone(self.cache.get_meta("BTCUSDT", Exchange.BINANCE, Interval.MINUTE), "空结果不应缓存")
+
+        self.database.bars = self.bars
+        result = self.load(datetime(2023, 1, 1, 6, 0), datetime(2023, 1, 1, 12, 0))
+        self.assertEqual(len(result), 6 * 60 + 1, "数据下载后应重新查询数据库")
+
+    def test_recorded_later(self):
+        """测试缓存范围只到最后一根K线，之后记录的K线能够加载"""
+        self.database.bars = self.bars[:8 * 60 + 1]
+        result = self.load(datetime(2023, 1, 1, 6, 0), datetime(2023, 1, 1, 12, 0))
+        self.assertEqual(len(result), 2 * 60 + 1, "首次加载K线数量不正确")
+
+        meta = self.cache.get_meta("BTCUSDT", Exchange.BINANCE, Interval.MINUTE)
+        self.assertEqual(meta["end"], self.bars[8 * 60].datetime.timestamp(), "缓存范围应只到最后一根K线")
+
+        self.database.bars = self.bars
+        result = self.load(datetime(2023, 1, 1, 6, 0), datetime(2023, 1, 1, 12, 0))
+        self.assertEqual(result.to_bars(), self.bars[6 * 60:12 * 60 + 1], "之后记录的K线未加载")
+
+        count = self.database.query_count
+        self.load(datetime(2023, 1, 1, 6, 0), datetime(2023, 1, 1, 12, 0))
+        self.assertEqual(self.database.query_count, count, "已覆盖范围不应再查询数据库")
+
+    def test_backfilled(self):
+        """测试第一根K线之前补充的历史数据能够加载"""
+        self.database.bars = self.bars[6 * 60:]
+        result = self.load(datetime(2023, 1, 1, 0, 0), datetime(2023, 1, 1, 12, 0))
+        self.assertEqual(len(result), 6 * 60 + 1, "首次加载K线数量不正确")
+
+        self.database.bars = self.bars
+        result = self.load(datetime(2023, 1, 1, 0, 0), datetime(2023, 1, 1, 12, 0))
+        self.assertEqual(result.to_bars(), self.bars[:12 * 60 + 1], "补充的历史K线未加载")
+
+    def test_stale_meta(self):
+        """测试读取到旧范围和新数据时扩展范围不产生重复K线"""
+        self.cache.load(
+            "BTCUSDT", Exchange.BINANCE, Interval.MINUTE,
+            datetime(2023, 1, 1, 6, 0), datetime(2023, 1, 1, 12, 0)
+        )
+        path = self.cache.get_path("BTCUSDT", Exchange.BINANCE, Interval.MINUTE)
+        meta_path = path.with_suffix(".json")
+        old_meta = meta_path.read_text(encoding="UTF-8")
+
+        # 其他进程已将数据扩展到全天，但本进程读到的仍是旧范围
+        self.cache.load(
+            "BTCUSDT", Exchange.BINANCE, Interval.MINUTE,
+            datetime(2023, 1, 1, 0, 0), datetime(2023, 1, 1, 23, 59)
+        )
+        meta_path.write_text(old_meta, encoding="UTF-8")
+
+        result = self.cache.load(
+            "BTCUSDT", Exchange.BINANCE, Interval.MINUTE,
+            datetime(2023, 1, 1, 0, 0), datetime(2023, 1, 1, 23, 59)
+        )
+        self.assertEqual(result.to_bars(), self.bars, "旧范围和新数据合并后K线不正确")
+
+    def test_replace_denied(self):
+        """测试缓存文件被占用无法替换时跳过写入"""
+        with patch("ads_trading.trader.columnar.os.replace", side_effect=PermissionError):
+            result = self.cache.load(
+                "BTCUSDT", Exchange.BINANCE, Interval.MINUTE,
+                datetime(2023, 1, 1, 6, 0), datetime(2023, 1, 1, 12, 0)
+            )
+
+        self.assertEqual(len(result), 6 * 60 + 1, "无法写入缓存时K线数量不正确")
+        self.assertIsNone(self.cache.get_meta("BTCUSDT", Exchange.BINANCE, Interval.MINUTE), "无法写入时不应生成缓存")
+        self.assertEqual(list(self.cache.folder_path.glob("*.tmp")), [], "临时文件未删除")
+
+    def test_meta(self):
+        """测试缓存范围和数量随扩展和清理变化"""
+        self.assertIsNone(self.cache.get_meta("BTCUSDT", Exchange.BINANCE, Interval.MINUTE), "未缓存时应返回None")
+
+        self.cache.load(
+            "BTCUSDT", Exchange.BINANCE, Interval.MINUTE,
+            datetime(2023, 1, 1, 6, 0), datetime(2023, 1, 1, 12, 0)
+        )
+        meta = self.cache.get_meta("BTCUSDT", Exchange.BINANCE, Interval.MINUTE)
+        self.assertEqual(meta["count"], 6 * 60 + 1, "缓存数量不正确")
+
+        self.cache.load(
+            "BTCUSDT", Exchange.BINANCE, Interval.MINUTE,
+            datetime(2023, 1, 1, 0, 0), datetime(2023, 1, 1, 12, 0)
+        )
+        extended = self.cache.get_meta("BTCUSDT", Exchange.BINANCE, Interval.MINUTE)
+        self.assertLess(extended["start"], meta["start"], "扩展后缓存范围不正确")
+        self.assertEqual(extended["count"], 12 * 60 + 1, "扩展后缓存数量不正确")
+
+        self.cache.clear("BTCUSDT", Exchange.BINANCE, Interval.MINUTE)
+        self.assertIsNone(self.cache.get_meta("BTCUSDT", Exchange.BINANCE, Interval.MINUTE), "清理后应返回None")
+
+
+class TestWindowBars(unittest.TestCase):
+    """测试批量K线合成"""
+
+    def setUp(self):
+        """测试环境准备
+        创建两天带缺口的1分钟K线，缺口包括整点前后和跨小时的情况
+        """
+        start = DB_TZ.localize(datetime(2023, 1, 1, 0, 0, 0))
+        self.bars = []
+        for i in range(2 * 24 * 60):
+            if i % 11 == 3 or i % 97 in (58, 59, 60) or 600 <= i < 700:
+                continue
+
+            dt = datetime.fromtimestamp((start + timedelta(minutes=i)).timestamp(), DB_TZ)
+            bar = BarData(
+                symbol="BTCUSDT",
+                exchange=Exchange.BINANCE,
+                datetime=dt,
+                interval=Interval.MINUTE,
+                gateway_name="DB",
+                open_price=100 + i % 7,
+                high_price=110 + i % 13,
+                low_price=90 - i % 5,
+                close_price=100 + i % 3,
+                volume=0.1 * (i % 10),
+                turnover=1.7 * (i % 4),
+                open_interest=i
+            )
+            self.bars.append(bar)
+
+        self.array = BarArray.from_bars(self.bars)
+
+    def generate(self, window, interval):
+        """逐根推送K线给BarGenerator，返回合成的K线"""
+        result = []
+        generator = BarGenerator(lambda bar: None, window, result.append, interval)
+        for bar in self.bars:
+            generator.update_bar(bar)
+        return result
+
+    def test_minute_window(self):
+        """测试分钟窗口合成，包括不能整除60的窗口"""
+        for window in [5, 7, 15]:
+            expected = self.generate(window, Interval.MINUTE)
+            result = generate_window_bars(self.array, window)
+            self.assertEqual(result.to_bars(), expected, f"{window}分钟K线与BarGenerator不一致")
+
+    def test_hour_window(self):
+        """测试小时窗口合成"""
+        for window in [1, 4]:
+            expected = self.generate(window, Interval.HOUR)
+            result = generate_window_bars(self.array, window, Interval.HOUR)
+            self.assertEqual(result.to_bars(), expected, f"{window}小时K线与BarGenerator不一致")
+
+    def test_dataframe(self):
+        """测试DataFrame输入输出"""
+        df = self.array.to_dataframe()
+        result = generate_window_bars(df, 15)
+
+        self.assertEqual(len(result), len(self.generate(15, Interval.MINUTE)), "DataFrame合成K线数量不正确")
+        self.assertEqual(list(result.columns), list(df.columns), "DataFrame列不正确")
+
+    def test_resample(self):
+        """测试按固定时长对齐的任意窗口重采样"""
+        result = resample_bars(self.array, 90)
+        bars = result.to_bars()
+
+        # 第一根90分钟K线覆盖00:00-01:29
+        first = [bar for bar in self.bars if bar.datetime < self.bars[0].datetime + timedelta(minutes=90)]
+        self.assertEqual(bars[0].datetime, self.bars[0].datetime, "窗口起始时间不正确")
+        self.assertEqual(bars[0].high_price, max(bar.high_price for bar in first), "窗口最高价不正确")
+        self.assertEqual(bars[0].close_price, first[-1].close_price, "窗口收盘价不正确")
+        self.assertEqual(bars[1].datetime, bars[0].datetime + timedelta(minutes=90), "窗口间隔不正确")
+
+        # 最后一个窗口的最后一分钟K线存在，所以包含在结果中
+        self.assertEqual(len(bars), 2 * 24 * 60 // 90, "90分钟K线数量不正确")
+
+
+class TestBarPanel(unittest.TestCase):
+    """测试多合约对齐的K线面板"""
+
+    def setUp(self):
+        """测试环境准备
+        BTCUSDT有5根连续K线，ETHUSDT从第2分钟开始且缺少第3分钟K线
+        """
+        start = DB_TZ.localize(datetime(2023, 1, 1, 0, 0, 0))
+
+        def make_bar(symbol, i):
+            dt = datetime.fromtimestamp((start + timedelta(minutes=i)).timestamp(), DB_TZ)
+            return BarData(
+                symbol=symbol,
+                exchange=Exchange.BINANCE,
+                datetime=dt,
+                interval=Interval.MINUTE,
+                gateway_name="DB",
+                open_price=10 + i,
+                high_price=11 + i,
+                low_price=9 + i,
+                close_price=10.5 + i,
+                volume=1 + i,
+                turnover=10 + i,
+                open_interest=0
+            )
+
+        self.btc_bars = [make_bar("BTCUSDT", i) for i in range(5)]
+        self.eth_bars = [make_bar("ETHUSDT", i) for i in [1, 2, 4]]
+
+        self.panel = BarPanel.from_bar_arrays([
+            BarArray.from_bars(self.btc_bars),
+            BarArray.from_bars(self.eth_bars)
+        ])
+
+    def test_align(self):
+        """测试按时间并集对齐，缺失K线用前收盘价填充"""
+        self.assertEqual(len(self.panel), 5, "面板行数不正确")
+        self.assertEqual(self.panel.vt_symbols, ["BTCUSDT.BINANCE", "ETHUSDT.BINANCE"], "合约列不正确")
+        self.assertTrue(math.isnan(self.panel.close[0, 1]), "首根K线之前应为NaN")
+
+        # 第3分钟ETHUSDT缺失，用第2分钟收盘价填充且成交量为0
+        self.assertEqual(self.panel.open[3, 1], self.eth_bars[1].close_price, "填充开盘价不正确")
+        self.assertEqual(self.panel.close[3, 1], self.eth_bars[1].close_price, "填充收盘价不正确")
+        self.assertEqual(self.panel.data["volume"][3, 1], 0, "填充成交量不正确")
+
+    def test_get_bars(self):
+        """测试按行获取只包含真实K线的视图"""
+        bars = self.panel.get_bars(3)
+        self.assertEqual(list(bars), ["BTCUSDT.BINANCE"], "视图合约不正确")
+        self.assertEqual(bars["BTCUSDT.BINANCE"].to_bar(), self.btc_bars[3], "视图K线不正确")
+
+        bars = self.panel.get_bars(4)
+        self.assertEqual(bars["ETHUSDT.BINANCE"].close_price, self.eth_bars[2].close_price, "视图收盘价不正确")
+        self.assertEqual(bars["ETHUSDT.BINANCE"].datetime, self.eth_bars[2].datetime, "视图时间不正确")
+
+
+class TestTradeLedger(unittest.TestCase):
+    """测试列式成交记录的逐日盯市盈亏计算"""
+
+    def setUp(self):
+        """测试环境准备
+        生成5天的随机收盘价和随机成交，第3天没有成交
+        """
+        rng = random.Random(7)
+        start = DB_TZ.localize(datetime(2023, 1, 1, 8, 0, 0))
+
+        self.dates = [date(2023, 1, 1) + timedelta(days=i) for i in range(5)]
+        self.closes = [rng.uniform(90, 110) for _ in self.dates]
+
+        self.trades = []
+        for i in range(32):
+            dt = start + timedelta(hours=i * 3)
+            if dt.date() == self.dates[2]:
+                continue
+
+            trade = TradeData(
+                symbol="BTCUSD",
+                exchange=Exchange.BINANCE,
+                orderid=str(i),
+                tradeid=str(i),
+                direction=rng.choice([Direction.LONG, Direction.SHORT]),
+                price=rng.uniform(90, 110),
+                volume=rng.choice([0.1, 0.3, 1.7]),
+                gateway_name="BACKTESTING"
+            )
+            trade.datetime = dt
+            self.trades.append(trade)
+
+    def calculate_by_trade(self, size, rate, slippage, inverse):
+        """逐笔计算每日盈亏作为对照"""
+        results = []
+        pre_close = 0
+        start_pos = 0
+
+        for d, close_price in zip(self.dates, self.closes):
+            pre_close = pre_close or 1
+            end_pos = start_pos
+            turnover = commission = slippage_cost = trading_pnl = 0
+
+            if not inverse:
+                holding_pnl = start_pos * (close_price - pre_close) * size
+            else:
+                holding_pnl = start_pos * (1 / pre_close - 1 / close_price) * size
+
+            for trade in self.trades:
+                if trade.datetime.date() != d:
+                    continue
+
+                pos_change = trade.volume if trade.direction == Direction.LONG else -trade.volume
+                end_pos += pos_change
+
+                if not inverse:
+                    value = trade.volume * size * trade.price
+                    trading_pnl += pos_change * (close_price - trade.price) * size
+                    slippage_cost += trade.volume * size * slippage
+                else:
+                    value = trade.volume * size / trade.price
+                    trading_pnl += pos_change * (1 / trade.price - 1 / close_price) * size
+                    slippage_cost += trade.volume * size * slippage / (trade.price ** 2)
+
+                turnover += value
+                commission += value * rate
+
+            total_pnl = trading_pnl + holding_pnl
+            net_pnl = total_pnl - commission - slippage_cost
+            results.append((start_pos, end_pos, turnover, commission, slippage_cost, trading_pnl, holding_pnl, net_pnl))
+
+            pre_close = close_price
+            start_pos = end_pos
+
+        return results
+
+    def check_pnl(self, inverse):
+        """对比向量化结果与逐笔结果完全一致"""
+        ledger = TradeLedger.from_trades(self.trades, ["BTCUSD.BINANCE"])
+        pnl = ledger.calculate_pnl(
+            np.array(self.dates, dtype="datetime64[D]"),
+            np.array([[close] for close in self.closes]),
+            [10],
+            [0.0004],
+            [0.5],
+            inverse
+        )
+
+        fields = ["start_pos", "end_pos", "turnover", "commission", "slippage", "trading_pnl", "holding_pnl", "net_pnl"]
+        expected = self.calculate_by_trade(10, 0.0004, 0.5, inverse)
+
+        for i, values in enumerate(expected):
+            for field, value in zip(fields, values):
+                self.assertEqual(pnl[field][i, 0], value, f"第{i}天{field}不一致")
+
+        self.assertEqual(pnl["trade_count"][2, 0], 0, "无成交日的成交笔数不正确")
+        self.assertEqual(pnl["trade_count"].sum(), len(self.trades), "总成交笔数不正确")
+
+    def test_normal(self):
+        """测试普通合约"""
+        self.check_pnl(False)
+
+    def test_inverse(self):
+        """测试反向合约"""
+        self.check_pnl(True)
+
+
+if __name__ == "__main__":
+    unittest.main()
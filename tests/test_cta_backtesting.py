@@ -0,0 +1,300 @@
+"""
+CTA策略回测引擎测试模块
+测试列式回测与逐根BarData回测结果一致，以及参数优化进程池分块执行、失败参数处理、
+取消优化和遗传算法结果缓存
+"""
+import math
+import random
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from pandas.testing import assert_frame_equal
+
+from howtrader.trader.constant import Exchange, Interval
+from howtrader.trader.object import BarData
+from ads_trading.app.cta_strategy import backtesting
+from ads_trading.app.cta_strategy.backtesting import (
+    BacktestingEngine, OptimizationExecutor, OptimizationSetting, evaluate_setting
+)
+from ads_trading.app.cta_strategy.template import CtaTemplate
+from ads_trading.trader.columnar import BarArray
+from ads_trading.trader.database import DB_TZ
+
+
+class GridStrategy(CtaTemplate):
+    """按收盘价上下挂限价单和停止单，隔根K线撤单重挂"""
+
+    author = "test"
+
+    spread = 2
+    fail_bar = 0
+
+    parameters = ["spread", "fail_bar"]
+    variables = []
+
+    def on_init(self):
+        self.bar_count = 0
+        self.events = []
+        self.load_bar(1)
+
+    def on_bar(self, bar):
+        self.bar_count += 1
+
+        if self.fail_bar and self.bar_count >= self.fail_bar:
+            raise ValueError("策略异常")
+
+        if not self.trading or self.bar_count % 2:
+            return
+
+        self.cancel_all()
+
+        price = Decimal(str(bar.close_price))
+        spread = Decimal(str(self.spread))
+
+        if self.pos <= 0:
+            self.buy(price - spread, Decimal("1"))
+            self.buy(price + spread * 2, Decimal("1"), stop=True)
+        else:
+            self.sell(price + spread, self.pos)
+            self.sell(price - spread * 2, self.pos, stop=True)
+
+    def on_order(self, order):
+        self.events.append((order.vt_orderid, order.status.name))
+
+    def on_trade(self, trade):
+        self.events.append((trade.vt_tradeid, trade.price))
+
+    def on_stop_order(self, stop_order):
+        self.events.append((stop_order.stop_orderid, stop_order.status.name))
+
+
+def create_bars():
+    """创建20天的1小时K线，价格随机游走"""
+    rng = random.Random(7)
+    start = DB_TZ.localize(datetime(2023, 1, 1))
+
+    bars = []
+    price = 1000
+
+    for i in range(24 * 20):
+        dt = datetime.fromtimestamp((start + timedelta(hours=i)).timestamp(), DB_TZ)
+
+        open_price = price
+        close_price = round(price + rng.gauss(0, 3), 2)
+        price = close_price
+
+        bar = BarData(
+            symbol="BTCUSDT",
+            exchange=Exchange.BINANCE,
+            datetime=dt,
+            interval=Interval.HOUR,
+            gateway_name="DB",
+            open_price=open_price,
+            high_price=round(max(open_price, close_price) + rng.random() * 3, 2),
+            low_price=round(min(open_price, close_price) - rng.random() * 3, 2),
+            close_price=close_price,
+            volume=1
+        )
+        bars.append(bar)
+
+    return bars
+
+
+def create_engine(columnar=False):
+    """创建已加载K线数据的回测引擎"""
+    engine = BacktestingEngine()
+    engine.output = lambda msg: None
+    engine.set_parameters(
+        vt_symbol="BTCUSDT.BINANCE",
+        interval=Interval.HOUR,
+        start=datetime(2023, 1, 1),
+        end=datetime(2023, 1, 21),
+        rate=0.0004,
+        slippage=0.01,
+        size=1,
+        pricetick=0.01,
+        capital=100000,
+        columnar=columnar
+    )
+    engine.strategy_class = GridStrategy
+
+    if columnar:
+        engine.bar_array = BarArray.from_bars(create_bars())
+    else:
+        engine.history_data = create_bars()
+    return engine
+
+
+def init_worker(strategy_class, parameters):
+    """优化子进程初始化函数，使用测试K线代替数据库加载"""
+    engine = create_engine(parameters["columnar"])
+    engine.set_parameters(**parameters)
+    engine.strategy_class = strategy_class
+
+    backtesting.worker_engine = engine
+
+
+class TestColumnar(unittest.TestCase):
+    """测试列式回测模式"""
+
+    def run_backtesting(self, columnar, setting):
+        """运行回测，返回引擎"""
+        engine = create_engine(columnar)
+        engine.add_strategy(GridStrategy, setting)
+        engine.run_backtesting()
+        engine.calculate_result()
+        return engine
+
+    def check(self, setting):
+        """比较两种模式的委托回报、成交、每日盈亏和统计指标"""
+        classic = self.run_backtesting(False, setting)
+        columnar = self.run_backtesting(True, setting)
+
+        self.assertFalse(classic.error, "回测出现异常")
+        self.assertFalse(columnar.error, "列式回测出现异常")
+        self.assertTrue(classic.trades, "回测没有成交")
+
+        self.assertEqual(columnar.strategy.events, classic.strategy.events, "委托回报顺序不一致")
+        self.assertEqual(columnar.trades, classic.trades, "成交记录不一致")
+        assert_frame_equal(columnar.daily_df, classic.daily_df)
+        self.assertEqual(
+            columnar.calculate_statistics(output=False),
+            classic.calculate_statistics(output=False),
+            "统计指标不一致"
+        )
+
+    def test_limit_and_stop(self):
+        """测试限价单、停止单以及撤单的回测结果一致"""
+        for spread in [1, 2, 5]:
+            with self.subTest(spread=spread):
+                self.check({"spread": spread})
+
+    def test_columnar_optimization(self):
+        """测试列式回测的优化结果与逐根回测一致"""
+        settings = [{"spread": spread} for spread in range(1, 4)]
+
+        classic = create_engine()
+        columnar = create_engine(True)
+
+        for setting in settings:
+            self.assertEqual(
+                evaluate_setting(columnar, setting, "total_net_pnl"),
+                evaluate_setting(classic, setting, "total_net_pnl"),
+                "列式回测优化结果不一致"
+            )
+
+
+class TestOptimization(unittest.TestCase):
+    """测试参数优化进程池"""
+
+    def setUp(self):
+        """测试环境准备
+        子进程初始化函数替换为加载测试K线
+        """
+        self.engine = create_engine()
+
+        patcher = patch.object(backtesting, "init_optimization_worker", init_worker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.settings = [
+            {"spread": spread, "fail_bar": 0} for spread in range(1, 7)
+        ]
+
+    def evaluate(self, settings, statistics=True):
+        """在当前进程逐个回测参数"""
+        engine = create_engine()
+        return [
+            evaluate_setting(engine, setting, "total_net_pnl", statistics)
+            for setting in settings
+        ]
+
+    def create_executor(self, max_workers=2, chunk_size=2):
+        """创建并启动优化进程池"""
+        executor = OptimizationExecutor(self.engine, "total_net_pnl", max_workers, chunk_size)
+        executor.start(len(self.settings))
+        self.addCleanup(executor.close)
+        return executor
+
+    def test_chunk(self):
+        """测试分块并行优化的结果与逐个回测一致"""
+        optimization_setting = OptimizationSetting()
+        optimization_setting.add_parameter("spread", 1, 6, 1)
+        optimization_setting.add_parameter("fail_bar", 0)
+        optimization_setting.set_target("total_net_pnl")
+
+        results = self.engine.run_optimization(
+            optimization_setting, output=False, max_workers=2, chunk_size=2
+        )
+
+        expected = self.evaluate(self.settings)
+        expected.sort(reverse=True, key=lambda result: result[1])
+
+        self.assertEqual(len(results), 6, "优化结果数量不正确")
+        self.assertEqual(results, expected, "分块优化结果与逐个回测不一致")
+
+    def test_failed(self):
+        """测试策略异常的参数记入失败列表，遗传算法适应度为负无穷"""
+        settings = self.settings[:2] + [{"spread": 3, "fail_bar": 30}]
+
+        executor = self.create_executor()
+        results = sorted(executor.run(settings))
+        expected = self.evaluate(settings[:2], False)
+
+        self.assertEqual(results, expected, "成功参数的结果不正确")
+        self.assertEqual(executor.failed, [str(settings[2])], "失败参数列表不正确")
+
+        individuals = [list(setting.items()) for setting in settings]
+        fitnesses = executor.map(None, individuals)
+
+        self.assertEqual(fitnesses[2], (-math.inf,), "失败参数的适应度应为负无穷")
+        self.assertEqual(fitnesses[:2], [(r[1],) for r in expected], "成功参数的适应度不正确")
+
+    def test_cancel(self):
+        """测试取消优化后返回已完成的部分结果"""
+        def output(msg):
+            # 收到第一个分块的进度后取消优化
+            if msg.startswith("optimization progress"):
+                self.engine.cancel_optimization()
+
+        self.engine.output = output
+
+        optimization_setting = OptimizationSetting()
+        optimization_setting.add_parameter("spread", 1, 6, 1)
+        optimization_setting.set_target("total_net_pnl")
+
+        results = self.engine.run_optimization(
+            optimization_setting, output=False, max_workers=1, chunk_size=1
+        )
+
+        self.assertEqual(len(results), 1, "取消后应只返回已完成的结果")
+        self.assertEqual(
+            results,
+            self.evaluate([{"spread": 1}]),
+            "已完成的结果不正确"
+        )
+
+    def test_map_cache(self):
+        """测试遗传算法评估时已缓存的个体不再回测"""
+        executor = self.create_executor()
+        individuals = [list(setting.items()) for setting in self.settings]
+
+        first = executor.map(None, individuals[:4])
+
+        with patch.object(executor, "run", wraps=executor.run) as run:
+            second = executor.map(None, individuals[2:])
+
+        settings = run.call_args[0][0]
+        self.assertEqual(settings, self.settings[4:], "已缓存的个体被重复回测")
+
+        self.assertEqual(second[:2], first[2:], "缓存的适应度不正确")
+        self.assertEqual(len(executor.cache), 6, "缓存数量不正确")
+
+        expected = [(r[1],) for r in self.evaluate(self.settings, False)]
+        self.assertEqual(first + second[2:], expected, "适应度与逐个回测不一致")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+CTA策略引擎测试模块
+测试本地停止单按合约和价格索引后的触发结果与逐个遍历全部停止单一致
+"""
+import random
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from howtrader.trader.constant import Direction, Exchange, Offset
+from howtrader.trader.object import TickData
+from ads_trading.app.cta_strategy.base import StopOrderStatus
+from ads_trading.app.cta_strategy.engine import CtaEngine
+
+
+class FakeStrategy:
+    """记录停止单回调的策略"""
+
+    def __init__(self, strategy_name, vt_symbol):
+        self.strategy_name = strategy_name
+        self.vt_symbol = vt_symbol
+        self.trading = True
+        self.inited = True
+
+        self.triggered = []
+        self.callback = None
+
+    def on_stop_order(self, stop_order):
+        if stop_order.status == StopOrderStatus.TRIGGERED:
+            self.triggered.append(stop_order.stop_orderid)
+
+            if self.callback:
+                self.callback(stop_order)
+
+
+def create_tick(vt_symbol, price):
+    """创建测试Tick"""
+    symbol, exchange = vt_symbol.split(".")
+    return TickData(
+        symbol=symbol,
+        exchange=Exchange(exchange),
+        datetime=datetime(2023, 1, 2),
+        last_price=price,
+        ask_price_5=price + 1,
+        bid_price_5=price - 1,
+        gateway_name="TEST"
+    )
+
+
+def scan_stop_orders(stop_orders, tick):
+    """原先的检查方式，遍历全部停止单，返回应触发的停止单编号"""
+    triggered = []
+
+    for stop_order in stop_orders:
+        if stop_order.vt_symbol != tick.vt_symbol:
+            continue
+
+        long_triggered = (
+            stop_order.direction == Direction.LONG and tick.last_price >= stop_order.price
+        )
+        short_triggered = (
+            stop_order.direction == Direction.SHORT and tick.last_price <= stop_order.price
+        )
+        if long_triggered or short_triggered:
+            triggered.append(stop_order.stop_orderid)
+
+    return triggered
+
+
+class TestStopOrder(unittest.TestCase):
+    """测试本地停止单触发"""
+
+    def setUp(self):
+        """测试环境准备"""
+        with patch("ads_trading.app.cta_strategy.engine.get_database"):
+            self.engine = CtaEngine(MagicMock(), MagicMock())
+
+        self.order_count = 0
+        self.engine.send_limit_order = self.send_limit_order
+
+        self.triggered = []
+        self.strategies = {}
+        for vt_symbol in ["BTCUSDT.BINANCE", "ETHUSDT.BINANCE"]:
+            strategy = FakeStrategy(vt_symbol, vt_symbol)
+            self.engine.strategies[strategy.strategy_name] = strategy
+            self.strategies[vt_symbol] = strategy
+
+    def tearDown(self):
+        self.engine.data_writer.close()
+
+    def send_limit_order(self, strategy, contract, direction, offset, price, volume, lock, net):
+        """代替发出委托，返回委托编号"""
+        self.order_count += 1
+        return [f"TEST.{self.order_count}"]
+
+    def send_stop_order(self, vt_symbol, direction, price):
+        """发出本地停止单"""
+        return self.engine.send_local_stop_order(
+            self.strategies[vt_symbol],
+            direction,
+            Offset.OPEN,
+            Decimal(str(price)),
+            Decimal("1"),
+            False,
+            False
+        )[0]
+
+    def check_tick(self, vt_symbol, price):
+        """推送Tick并返回本次触发的停止单编号"""
+        strategy = self.strategies[vt_symbol]
+        count = len(strategy.triggered)
+        self.engine.check_stop_order(create_tick(vt_symbol, price))
+        return strategy.triggered[count:]
+
+    def test_trigger(self):
+        """测试只触发当前合约价格穿越的停止单，并按发出顺序处理"""
+        long_1 = self.send_stop_order("BTCUSDT.BINANCE", Direction.LONG, 105)
+        short_1 = self.send_stop_order("BTCUSDT.BINANCE", Direction.SHORT, 95)
+        long_2 = self.send_stop_order("BTCUSDT.BINANCE", Direction.LONG, 101)
+        long_3 = self.send_stop_order("BTCUSDT.BINANCE", Direction.LONG, 103)
+        eth_long = self.send_stop_order("ETHUSDT.BINANCE", Direction.LONG, 10)
+
+        self.assertEqual(self.check_tick("BTCUSDT.BINANCE", 100), [], "价格未穿越时不应触发")
+        self.assertEqual(self.check_tick("BTCUSDT.BINANCE", 105), [long_1, long_2, long_3], "应按发出顺序触发")
+        self.assertEqual(self.check_tick("BTCUSDT.BINANCE", 105), [], "已触发的停止单不应再次触发")
+        self.assertEqual(self.check_tick("BTCUSDT.BINANCE", 95), [short_1], "空头停止单触发不正确")
+
+        self.assertIn(eth_long, self.engine.stop_orders, "其他合约的停止单不应触发")
+        self.assertEqual(len(self.engine.stop_books["BTCUSDT.BINANCE"].keys), 0, "触发后未从索引中移除")
+        self.assertNotIn(long_1, self.engine.strategy_orderid_map["BTCUSDT.BINANCE"], "触发后未从策略委托中移除")
+
+    def test_cancel(self):
+        """测试撤销的停止单不再触发"""
+        long_1 = self.send_stop_order("BTCUSDT.BINANCE", Direction.LONG, 101)
+        long_2 = self.send_stop_order("BTCUSDT.BINANCE", Direction.LONG, 102)
+
+        self.engine.cancel_local_stop_order(self.strategies["BTCUSDT.BINANCE"], long_1)
+        self.assertEqual(self.check_tick("BTCUSDT.BINANCE", 110), [long_2], "撤销的停止单不应触发")
+
+    def test_cancel_in_callback(self):
+        """测试前一个停止单回调中撤销的停止单在同一Tick中不再触发"""
+        strategy = self.strategies["BTCUSDT.BINANCE"]
+
+        long_1 = self.send_stop_order("BTCUSDT.BINANCE", Direction.LONG, 101)
+        long_2 = self.send_stop_order("BTCUSDT.BINANCE", Direction.LONG, 102)
+        long_3 = self.send_stop_order("BTCUSDT.BINANCE", Direction.LONG, 103)
+
+        def cancel_next(stop_order):
+            if stop_order.stop_orderid == long_1:
+                self.engine.cancel_local_stop_order(strategy, long_2)
+        strategy.callback = cancel_next
+
+        self.assertEqual(self.check_tick("BTCUSDT.BINANCE", 110), [long_1, long_3], "回调中撤销的停止单不应触发")
+        self.assertEqual(self.engine.stop_orders, {}, "停止单未全部移除")
+
+    def test_send_in_callback(self):
+        """测试回调中新发出的停止单在下一个Tick才检查"""
+        strategy = self.strategies["BTCUSDT.BINANCE"]
+        long_1 = self.send_stop_order("BTCUSDT.BINANCE", Direction.LONG, 101)
+
+        new_orderids = []
+
+        def send_new(stop_order):
+            if not new_orderids:
+                new_orderids.append(self.send_stop_order("BTCUSDT.BINANCE", Direction.LONG, 100))
+        strategy.callback = send_new
+
+        self.assertEqual(self.check_tick("BTCUSDT.BINANCE", 110), [long_1], "回调中新发出的停止单不应在同一Tick触发")
+        self.assertEqual(self.check_tick("BTCUSDT.BINANCE", 110), new_orderids, "新发出的停止单应在下一个Tick触发")
+
+    def test_random(self):
+        """测试随机发出、撤销停止单和推送Tick时与遍历全部停止单的结果一致"""
+        rng = random.Random(11)
+        vt_symbols = list(self.strategies.keys())
+
+        for _ in range(3000):
+            vt_symbol = rng.choice(vt_symbols)
+            action = rng.random()
+
+            if action < 0.5:
+                direction = rng.choice([Direction.LONG, Direction.SHORT])
+                self.send_stop_order(vt_symbol, direction, rng.randrange(90, 111))
+            elif action < 0.6 and self.engine.stop_orders:
+                stop_orderid = rng.choice(list(self.engine.stop_orders.keys()))
+                stop_order = self.engine.stop_orders[stop_orderid]
+                strategy = self.engine.strategies[stop_order.strategy_name]
+                self.engine.cancel_local_stop_order(strategy, stop_orderid)
+            else:
+                # 价格在区间内随机游走，多数停止单保持挂单
+                tick = create_tick(vt_symbol, rng.randrange(88, 113))
+                expected = scan_stop_orders(list(self.engine.stop_orders.values()), tick)
+                self.assertEqual(self.check_tick(vt_symbol, tick.last_price), expected, "触发结果与遍历结果不一致")
+
+            for vt_symbol, stop_book in self.engine.stop_books.items():
+                count = sum(1 for stop_order in self.engine.stop_orders.values() if stop_order.vt_symbol == vt_symbol)
+                self.assertEqual(len(stop_book.keys), count, "索引中的停止单数量不正确")
+
+
+if __name__ == "__main__":
+    unittest.main()
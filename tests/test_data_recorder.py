@@ -0,0 +1,272 @@
+"""
+行情记录测试模块
+使用内存数据库测试写入管道的数据合并、缓存上限、队列背压、失败重试以及关闭时的处理
+"""
+import unittest
+from datetime import datetime
+from queue import Queue
+from threading import Thread
+from time import time
+from unittest.mock import MagicMock, patch
+
+from ads_trading.trader.constant import Exchange, Interval
+from ads_trading.trader.database import BaseDatabase
+from ads_trading.trader.object import BarData, TickData
+
+from ads_trading.app.data_recorder.engine import RecorderEngine
+
+
+class FakeDatabase(BaseDatabase):
+    """记录保存数据的内存数据库，可以指定保存失败的次数"""
+
+    def __init__(self):
+        self.bars = []
+        self.ticks = []
+        self.bar_calls = []
+        # 每个合约剩余的失败次数，None表示一直失败
+        self.failures = {}
+
+    def check_failure(self, symbol):
+        """按设置的失败次数抛出异常"""
+        if symbol not in self.failures:
+            return
+
+        count = self.failures[symbol]
+        if count is None:
+            raise ConnectionError("数据库连接断开")
+
+        if count:
+            self.failures[symbol] = count - 1
+            raise ConnectionError("数据库连接断开")
+
+    def save_bar_data(self, bars):
+        symbol = bars[0].symbol
+        self.bar_calls.append(symbol)
+        self.check_failure(symbol)
+        self.bars.extend(bars)
+        return True
+
+    def save_tick_data(self, ticks):
+        self.check_failure(ticks[0].symbol)
+        self.ticks.extend(ticks)
+        return True
+
+    def load_bar_data(self, symbol, exchange, interval, start, end):
+        return []
+
+    def load_tick_data(self, symbol, exchange, start, end):
+        return []
+
+    def delete_bar_data(self, symbol, exchange, interval):
+        return 0
+
+    def delete_tick_data(self, symbol, exchange):
+        return 0
+
+    def get_bar_overview(self):
+        return []
+
+
+def create_bar(symbol, minute, close_price=100.0):
+    """创建测试K线"""
+    return BarData(
+        symbol=symbol,
+        exchange=Exchange.BINANCE,
+        datetime=datetime(2023, 1, 2, 0, minute),
+        interval=Interval.MINUTE,
+        close_price=close_price,
+        gateway_name="TEST"
+    )
+
+
+def create_tick(symbol, second, last_price=100.0):
+    """创建测试Tick"""
+    return TickData(
+        symbol=symbol,
+        exchange=Exchange.BINANCE,
+        datetime=datetime(2023, 1, 2, 0, 0, second),
+        last_price=last_price,
+        gateway_name="TEST"
+    )
+
+
+class TestRecorderEngine(unittest.TestCase):
+    """测试行情记录写入管道"""
+
+    def setUp(self):
+        """测试环境准备
+        创建引擎时不启动写入线程，由测试直接调用run处理队列中的批次
+        """
+        self.database = FakeDatabase()
+
+        with patch("ads_trading.app.data_recorder.engine.get_database", return_value=self.database), \
+                patch("ads_trading.app.data_recorder.engine.load_json", return_value={}), \
+                patch.object(RecorderEngine, "start"):
+            self.engine = RecorderEngine(MagicMock(), MagicMock())
+
+        self.engine.retry_interval = 0
+
+    def tearDown(self):
+        if self.engine.thread.is_alive():
+            self.engine.close()
+
+    def set_queue_size(self, size):
+        """替换为较小的写入队列"""
+        self.engine.queue_size = size
+        self.engine.queue = Queue(maxsize=size)
+
+    def test_coalesce(self):
+        """测试同一合约相同时间的数据只保留最新一条"""
+        self.engine.record_tick(create_tick("BTCUSDT", 1, 100.0))
+        self.engine.record_tick(create_tick("BTCUSDT", 1, 101.0))
+        self.engine.record_tick(create_tick("ETHUSDT", 1, 10.0))
+        self.engine.record_bar(create_bar("BTCUSDT", 1, 100.0))
+        self.engine.record_bar(create_bar("BTCUSDT", 1, 102.0))
+
+        metrics = self.engine.get_metrics()
+        self.assertEqual(metrics["recorded"], 5, "记录数量不正确")
+        self.assertEqual(metrics["coalesced"], 2, "合并数量不正确")
+        self.assertEqual(metrics["buffered"], 3, "缓存数量不正确")
+
+        self.engine.flush()
+        self.engine.run()
+
+        self.assertEqual([tick.last_price for tick in self.database.ticks], [101.0, 10.0], "Tick合并结果不正确")
+        self.assertEqual([bar.close_price for bar in self.database.bars], [102.0], "K线合并结果不正确")
+        self.assertEqual(self.engine.get_metrics()["saved"], 3, "保存数量不正确")
+
+    def test_buffer_size(self):
+        """测试单个合约缓存超过上限时丢弃最早的数据"""
+        self.engine.buffer_size = 3
+
+        for minute in range(5):
+            self.engine.record_bar(create_bar("BTCUSDT", minute))
+        self.engine.record_bar(create_bar("ETHUSDT", 0))
+
+        metrics = self.engine.get_metrics()
+        self.assertEqual(metrics["buffered"], 4, "缓存数量不正确")
+        self.assertEqual(metrics["dropped"], 2, "丢弃数量不正确")
+
+        self.engine.flush()
+        self.engine.run()
+
+        minutes = [bar.datetime.minute for bar in self.database.bars if bar.symbol == "BTCUSDT"]
+        self.assertEqual(minutes, [2, 3, 4], "应丢弃最早的K线")
+
+    def test_batch_size(self):
+        """测试缓存数量达到批次大小时自动放入队列"""
+        self.engine.batch_size = 3
+
+        for minute in range(3):
+            self.engine.record_bar(create_bar("BTCUSDT", minute))
+
+        self.assertEqual(self.engine.buffer_count, 0, "缓存数据未放入队列")
+        self.assertEqual(self.engine.queue.qsize(), 1, "队列批次数量不正确")
+
+    def test_backpressure(self):
+        """测试队列已满时数据保留在缓存中，直到下次放入"""
+        self.set_queue_size(2)
+
+        self.engine.record_bar(create_bar("BTCUSDT", 0))
+        self.engine.flush()
+        self.assertEqual(self.engine.queue.qsize(), 1, "队列批次数量不正确")
+
+        # 队列剩余空间不足一次放入的批次数量
+        self.engine.record_bar(create_bar("BTCUSDT", 1))
+        self.engine.record_tick(create_tick("BTCUSDT", 1))
+        self.engine.flush()
+        self.assertEqual(self.engine.queue.qsize(), 1, "队列已满时不应放入批次")
+        self.assertEqual(self.engine.buffer_count, 2, "队列已满时应保留缓存数据")
+
+        # 写入线程处理后腾出空间
+        self.engine.run()
+        self.engine.flush()
+        self.assertEqual(self.engine.queue.qsize(), 2, "腾出空间后应放入批次")
+
+        self.engine.run()
+        self.assertEqual(len(self.database.bars), 2, "K线保存数量不正确")
+        self.assertEqual(len(self.database.ticks), 1, "Tick保存数量不正确")
+        self.assertEqual(self.engine.get_metrics()["dropped"], 0, "不应丢弃数据")
+
+    def test_retry(self):
+        """测试保存失败后从失败的合约继续重试"""
+        self.database.failures["ETHUSDT"] = 2
+
+        for symbol in ["BTCUSDT", "ETHUSDT", "BNBUSDT"]:
+            self.engine.record_bar(create_bar(symbol, 0))
+        self.engine.flush()
+        self.engine.run()
+
+        self.assertEqual(
+            self.database.bar_calls,
+            ["BTCUSDT", "ETHUSDT", "ETHUSDT", "ETHUSDT", "BNBUSDT"],
+            "重试时不应重复保存已成功的合约"
+        )
+        self.assertEqual(len(self.database.bars), 3, "K线保存数量不正确")
+
+        metrics = self.engine.get_metrics()
+        self.assertEqual(metrics["retried"], 2, "重试次数不正确")
+        self.assertEqual(metrics["saved"], 3, "保存数量不正确")
+        self.assertEqual(metrics["dropped"], 0, "不应丢弃数据")
+
+    def test_retry_dropped(self):
+        """测试超过重试次数后丢弃未保存的数据"""
+        self.engine.max_retries = 2
+        self.database.failures["ETHUSDT"] = None
+
+        self.engine.record_bar(create_bar("BTCUSDT", 0))
+        self.engine.record_bar(create_bar("ETHUSDT", 0))
+        self.engine.record_bar(create_bar("ETHUSDT", 1))
+        self.engine.flush()
+        self.engine.run()
+
+        self.assertEqual(self.database.bar_calls.count("ETHUSDT"), 3, "保存尝试次数不正确")
+
+        metrics = self.engine.get_metrics()
+        self.assertEqual(metrics["saved"], 1, "保存数量不正确")
+        self.assertEqual(metrics["dropped"], 2, "丢弃数量不正确")
+        self.assertEqual(metrics["retried"], 2, "重试次数不正确")
+
+    def test_close(self):
+        """测试关闭时保存缓存中的数据后再退出"""
+        self.engine.start()
+
+        for minute in range(3):
+            self.engine.record_bar(create_bar("BTCUSDT", minute))
+        self.engine.record_tick(create_tick("BTCUSDT", 0))
+        self.engine.close()
+
+        self.assertFalse(self.engine.thread.is_alive(), "写入线程未退出")
+        self.assertEqual(len(self.database.bars), 3, "关闭时K线未保存")
+        self.assertEqual(len(self.database.ticks), 1, "关闭时Tick未保存")
+
+    def test_close_database_down(self):
+        """测试数据库不可用且队列已满时，关闭不等待重试"""
+        self.set_queue_size(2)
+        self.engine.retry_interval = 10
+        self.database.failures["BTCUSDT"] = None
+
+        # 队列已满，剩余数据只能在关闭时等待放入
+        self.engine.record_bar(create_bar("BTCUSDT", 0))
+        self.engine.record_tick(create_tick("BTCUSDT", 0))
+        self.engine.flush()
+        self.engine.record_bar(create_bar("BTCUSDT", 1))
+        self.engine.record_tick(create_tick("BTCUSDT", 1))
+
+        self.engine.start()
+
+        start = time()
+        thread = Thread(target=self.engine.close)
+        thread.start()
+        thread.join(timeout=5)
+
+        self.assertFalse(thread.is_alive(), "关闭时等待数据库恢复")
+        self.assertLess(time() - start, 5, "关闭耗时过长")
+
+        metrics = self.engine.get_metrics()
+        self.assertEqual(metrics["dropped"], 4, "丢弃数量不正确")
+        self.assertEqual(metrics["buffered"], 0, "缓存数据未放入队列")
+
+
+if __name__ == "__main__":
+    unittest.main()
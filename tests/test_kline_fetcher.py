@@ -0,0 +1,149 @@
+"""
+K线并发获取测试模块
+使用本地HTTP服务返回录制的K线数据，测试并发获取、限速重试和权重限速器
+"""
+import json
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from time import monotonic
+from urllib.parse import parse_qs, urlparse
+
+from ads_trading.scheduler.kline_fetcher import KlineFetcher, WeightLimiter, get_kline_weight
+
+SYMBOLS = [f"COIN{i}USDT" for i in range(20)]
+
+
+def create_klines(index, limit):
+    """生成录制格式的日K线数据"""
+    klines = []
+    for i in range(limit):
+        open_time = 1672531200000 + i * 86400000
+        price = 100 + index + i % 17
+        klines.append([
+            open_time, str(price), str(price + 5), str(price - 5), str(price + 1), "10.0",
+            open_time + 86399999, "1000.0", 100, "5.0", "500.0", "0"
+        ])
+    return klines
+
+
+class KlineHandler(BaseHTTPRequestHandler):
+    """本地K线服务，每个交易对的第一次请求返回429"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        server = self.server
+
+        with server.lock:
+            server.request_count += 1
+
+        if url.path == "/fapi/v1/exchangeInfo":
+            self.send_json(200, {"symbols": [{"symbol": symbol} for symbol in SYMBOLS]})
+            return
+
+        symbol = params["symbol"][0]
+        limit = int(params["limit"][0])
+
+        with server.lock:
+            limited = symbol not in server.limited
+            server.limited.add(symbol)
+
+        if limited:
+            self.send_json(429, {"code": -1003}, {"Retry-After": "0"})
+        elif symbol not in SYMBOLS:
+            self.send_json(400, {"code": -1121})
+        else:
+            self.send_json(200, create_klines(SYMBOLS.index(symbol), limit))
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-MBX-USED-WEIGHT-1M", "1")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestKlineFetcher(unittest.TestCase):
+    """测试K线并发获取"""
+
+    def setUp(self):
+        """测试环境准备
+        启动本地HTTP服务
+        """
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), KlineHandler)
+        self.server.lock = Lock()
+        self.server.limited = set()
+        self.server.request_count = 0
+
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.fetcher = KlineFetcher(base_url, max_workers=8)
+
+    def tearDown(self):
+        """测试环境清理"""
+        self.fetcher.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_get_all_kline_data(self):
+        """测试并发获取所有交易对的K线，限速后重试成功"""
+        symbols = self.fetcher.get_symbols()
+        self.assertEqual(symbols, SYMBOLS, "交易对列表不正确")
+
+        frames = self.fetcher.get_all_kline_data(symbols + ["MISSINGUSDT"], "1d", 300)
+
+        self.assertEqual(list(frames), SYMBOLS, "获取的交易对不正确")
+        df = frames["COIN3USDT"]
+        self.assertEqual(len(df), 300, "K线数量不正确")
+        self.assertEqual(df["high"].iloc[0], 108.0, "最高价不正确")
+        self.assertTrue(df["open_time"].is_monotonic_increasing, "K线未按时间排序")
+
+        # 交易所信息1次，每个交易对限速1次加成功1次，不存在的交易对限速1次加失败1次
+        self.assertEqual(self.server.request_count, 1 + 2 * len(SYMBOLS) + 2, "请求次数不正确")
+
+
+class TestWeightLimiter(unittest.TestCase):
+    """测试请求权重限速器"""
+
+    def test_kline_weight(self):
+        """测试K线请求权重"""
+        self.assertEqual(get_kline_weight(50), 1)
+        self.assertEqual(get_kline_weight(500), 5)
+        self.assertEqual(get_kline_weight(1500), 10)
+
+    def test_acquire(self):
+        """测试权重用完后等待窗口滑出"""
+        limiter = WeightLimiter(weight_limit=10, interval=0.2)
+
+        start = monotonic()
+        limiter.acquire(5)
+        limiter.acquire(5)
+        self.assertLess(monotonic() - start, 0.1, "权重未用完时不应等待")
+
+        limiter.acquire(5)
+        self.assertGreaterEqual(monotonic() - start, 0.2, "权重用完后应等待窗口滑出")
+
+    def test_update(self):
+        """测试交易所返回的已用权重校正本地记录"""
+        limiter = WeightLimiter(weight_limit=10, interval=0.2)
+        limiter.acquire(2)
+        limiter.update(9)
+        self.assertEqual(limiter.used_weight, 9, "已用权重未校正")
+
+        start = monotonic()
+        limiter.acquire(2)
+        self.assertGreaterEqual(monotonic() - start, 0.2, "超出校正后的权重应等待")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+MySQL数据库测试模块
+将MySQL连接器的数据模型绑定到内存SQLite，测试保存失败后重试同一批数据
+"""
+import unittest
+from datetime import datetime
+
+from peewee import OperationalError, SqliteDatabase as PeeweeSqliteDatabase
+
+from ads_trading.trader.dbconnectors.mysql_database import (
+    MysqlDatabase,
+    DbBarData,
+    DbTickData,
+    DbBarOverview
+)
+from ads_trading.trader.constant import Exchange, Interval
+from ads_trading.trader.object import BarData, TickData
+
+MODELS = [DbBarData, DbTickData, DbBarOverview]
+
+
+class TestMysqlDatabase(unittest.TestCase):
+    """测试MySQL数据保存重试"""
+
+    def setUp(self):
+        """测试环境准备
+        数据表先不创建，使第一次保存失败
+        """
+        self.sqlite = PeeweeSqliteDatabase(":memory:")
+        self.sqlite.bind(MODELS)
+        self.sqlite.connect()
+
+        self.database = MysqlDatabase.__new__(MysqlDatabase)
+        self.database.db = self.sqlite
+
+    def tearDown(self):
+        self.sqlite.close()
+
+    def test_retry_bar_data(self):
+        """测试保存K线失败后重试同一批数据成功"""
+        bars = [
+            BarData(
+                symbol="BTCUSDT",
+                exchange=Exchange.BINANCE,
+                datetime=datetime(2023, 1, 2, 0, i),
+                interval=Interval.MINUTE,
+                volume=1.0,
+                open_price=100.0,
+                high_price=101.0,
+                low_price=99.0,
+                close_price=100.5,
+                gateway_name="DB"
+            )
+            for i in range(3)
+        ]
+
+        with self.assertRaises(OperationalError):
+            self.database.save_bar_data(bars)
+
+        self.assertEqual(bars[0].exchange, Exchange.BINANCE, "K线数据被修改")
+        self.assertEqual(bars[0].vt_symbol, "BTCUSDT.BINANCE", "K线数据被修改")
+
+        self.sqlite.create_tables(MODELS)
+        self.assertTrue(self.database.save_bar_data(bars), "重试保存K线失败")
+
+        self.assertEqual(DbBarData.select().count(), 3, "K线数量不正确")
+        self.assertEqual(DbBarOverview.get().count, 3, "K线汇总数量不正确")
+
+    def test_failed_tick_data(self):
+        """测试保存Tick失败后数据未被修改，可以直接重试"""
+        ticks = [
+            TickData(
+                symbol="BTCUSDT",
+                exchange=Exchange.BINANCE,
+                datetime=datetime(2023, 1, 2, 0, 0, i),
+                last_price=100.0 + i,
+                gateway_name="DB"
+            )
+            for i in range(3)
+        ]
+
+        with self.assertRaises(OperationalError):
+            self.database.save_tick_data(ticks)
+
+        self.assertEqual(ticks[0].exchange, Exchange.BINANCE, "Tick数据被修改")
+        self.assertEqual(ticks[0].gateway_name, "DB", "Tick数据被修改")
+        self.assertEqual(ticks[0].vt_symbol, "BTCUSDT.BINANCE", "Tick数据被修改")
+        self.assertEqual(ticks[0].datetime, datetime(2023, 1, 2), "Tick时间被修改")
+
+if __name__ == "__main__":
+    unittest.main()
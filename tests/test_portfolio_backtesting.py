@@ -0,0 +1,173 @@
+"""
+组合策略回测引擎测试模块
+测试K线面板回测与逐根BarData回测在合约缺失K线、晚上市时结果一致
+"""
+import random
+import unittest
+from datetime import datetime, timedelta
+
+from pandas.testing import assert_frame_equal
+
+from howtrader.trader.constant import Exchange, Interval
+from howtrader.trader.object import BarData
+from ads_trading.app.portfolio_strategy.backtesting import BacktestingEngine
+from ads_trading.app.portfolio_strategy.template import StrategyTemplate
+from ads_trading.trader.columnar import BarArray, BarPanel
+from ads_trading.trader.database import DB_TZ
+
+
+class GridStrategy(StrategyTemplate):
+    """按各合约收盘价挂限价单，隔根K线撤单重挂"""
+
+    author = "test"
+
+    spread = 2
+
+    parameters = ["spread"]
+    variables = []
+
+    def on_init(self):
+        self.bar_count = 0
+        self.events = []
+        self.load_bars(1)
+
+    def on_bars(self, bars):
+        self.bar_count += 1
+        self.events.append(sorted(bars))
+
+        if not self.trading or self.bar_count % 2:
+            return
+
+        self.cancel_all()
+
+        for vt_symbol, bar in bars.items():
+            price = bar.close_price
+            pos = self.get_pos(vt_symbol)
+
+            if pos <= 0:
+                self.buy(vt_symbol, price - self.spread, 1)
+            else:
+                self.sell(vt_symbol, price + self.spread, pos)
+
+    def update_order(self, order):
+        super().update_order(order)
+        self.events.append((order.vt_orderid, order.status.name))
+
+    def update_trade(self, trade):
+        super().update_trade(trade)
+        self.events.append((trade.vt_tradeid, trade.price))
+
+
+def create_bars(symbol, hours, seed):
+    """创建指定小时的1小时K线，价格随机游走"""
+    rng = random.Random(seed)
+    start = DB_TZ.localize(datetime(2023, 1, 1))
+
+    bars = []
+    price = 1000
+
+    for i in hours:
+        dt = datetime.fromtimestamp((start + timedelta(hours=i)).timestamp(), DB_TZ)
+
+        open_price = price
+        close_price = round(price + rng.gauss(0, 3), 2)
+        price = close_price
+
+        bar = BarData(
+            symbol=symbol,
+            exchange=Exchange.BINANCE,
+            datetime=dt,
+            interval=Interval.HOUR,
+            gateway_name="DB",
+            open_price=open_price,
+            high_price=round(max(open_price, close_price) + rng.random() * 3, 2),
+            low_price=round(min(open_price, close_price) - rng.random() * 3, 2),
+            close_price=close_price,
+            volume=1
+        )
+        bars.append(bar)
+
+    return bars
+
+
+class TestPanelBacktesting(unittest.TestCase):
+    """测试K线面板回测模式"""
+
+    def setUp(self):
+        """测试环境准备
+        BTCUSDT有20天连续K线，ETHUSDT从第3天5点开始，每隔7小时缺一根且缺少第10天全天
+        """
+        self.vt_symbols = ["ETHUSDT.BINANCE", "BTCUSDT.BINANCE"]
+
+        eth_hours = [
+            i for i in range(24 * 2 + 5, 24 * 20)
+            if i % 7 and i // 24 != 9
+        ]
+        self.bars = {
+            "BTCUSDT.BINANCE": create_bars("BTCUSDT", range(24 * 20), 1),
+            "ETHUSDT.BINANCE": create_bars("ETHUSDT", eth_hours, 2),
+        }
+
+    def run_backtesting(self, columnar, setting):
+        """运行回测，返回引擎"""
+        engine = BacktestingEngine()
+        engine.output = lambda msg: None
+        engine.set_parameters(
+            vt_symbols=self.vt_symbols,
+            interval=Interval.HOUR,
+            start=datetime(2023, 1, 1),
+            end=datetime(2023, 1, 21),
+            rates={vt_symbol: 0.0004 for vt_symbol in self.vt_symbols},
+            slippages={vt_symbol: 0.01 for vt_symbol in self.vt_symbols},
+            sizes={vt_symbol: 1 for vt_symbol in self.vt_symbols},
+            priceticks={vt_symbol: 0.01 for vt_symbol in self.vt_symbols},
+            capital=100000,
+            columnar=columnar
+        )
+
+        if columnar:
+            engine.bar_panel = BarPanel.from_bar_arrays([
+                BarArray.from_bars(self.bars[vt_symbol]) for vt_symbol in self.vt_symbols
+            ])
+        else:
+            for vt_symbol in self.vt_symbols:
+                for bar in self.bars[vt_symbol]:
+                    engine.dts.add(bar.datetime)
+                    engine.history_data[(bar.datetime, vt_symbol)] = bar
+
+        engine.add_strategy(GridStrategy, setting)
+        engine.run_backtesting()
+        engine.calculate_result()
+        return engine
+
+    def test_gapped_symbol(self):
+        """测试缺失K线和晚上市合约的委托回报、成交、每日盈亏和统计指标一致"""
+        # 价差为0时，挂单会在缺失K线的前收盘价填充行上成交
+        for spread in [0, 1, 3]:
+            with self.subTest(spread=spread):
+                classic = self.run_backtesting(False, {"spread": spread})
+                panel = self.run_backtesting(True, {"spread": spread})
+
+                symbols = {trade.vt_symbol for trade in classic.trades.values()}
+                self.assertEqual(symbols, set(self.vt_symbols), "两个合约都应有成交")
+
+                self.assertEqual(panel.strategy.events, classic.strategy.events, "回调顺序不一致")
+                self.assertEqual(panel.trades, classic.trades, "成交记录不一致")
+                assert_frame_equal(panel.daily_df, classic.daily_df)
+
+                for d, result in classic.daily_results.items():
+                    self.assertEqual(
+                        panel.daily_results[d].close_prices,
+                        result.close_prices,
+                        f"{d}收盘价不一致"
+                    )
+
+                classic_statistics = classic.calculate_statistics(output=False)
+                panel_statistics = panel.calculate_statistics(output=False)
+
+                for key, value in classic_statistics.items():
+                    self.assertAlmostEqual(panel_statistics[key], value, msg=f"统计指标{key}不一致")
+
+
+if __name__ == "__main__":
+    unittest.main()
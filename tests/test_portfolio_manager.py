@@ -0,0 +1,210 @@
+"""
+投资组合管理测试模块
+测试定时器只重新计算有变化的合约结果，组合结果增量更新后与全部重新计算一致
+"""
+import random
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from howtrader.event import Event
+from howtrader.trader.constant import Direction, Exchange, Product
+from howtrader.trader.event import EVENT_TICK, EVENT_TIMER, EVENT_TRADE
+from howtrader.trader.object import ContractData, TickData, TradeData
+from ads_trading.app.portfolio_manager.base import ContractResult
+from ads_trading.app.portfolio_manager.engine import (
+    PortfolioEngine, EVENT_PM_CONTRACT, EVENT_PM_PORTFOLIO
+)
+
+
+VT_SYMBOLS = ["BTCUSDT.BINANCE", "ETHUSDT.BINANCE", "BNBUSDT.BINANCE"]
+REFERENCES = ["strategy1", "strategy2"]
+
+
+class TestPortfolioEngine(unittest.TestCase):
+    """测试投资组合盈亏计算"""
+
+    def setUp(self):
+        """测试环境准备
+        行情和合约从字典中读取，代替主引擎的缓存
+        """
+        self.ticks = {}
+        self.contracts = {}
+        for vt_symbol in VT_SYMBOLS:
+            symbol, exchange = vt_symbol.split(".")
+            self.contracts[vt_symbol] = ContractData(
+                symbol=symbol,
+                exchange=Exchange(exchange),
+                name=symbol,
+                product=Product.SPOT,
+                size=10,
+                pricetick=0.01,
+                gateway_name="TEST"
+            )
+
+        self.main_engine = MagicMock()
+        self.main_engine.get_tick.side_effect = self.ticks.get
+        self.main_engine.get_contract.side_effect = self.contracts.get
+        self.event_engine = MagicMock()
+
+        with patch("ads_trading.app.portfolio_manager.engine.load_json", return_value={}):
+            self.engine = PortfolioEngine(self.main_engine, self.event_engine)
+
+        self.engine.timer_interval = 1
+        self.trade_count = 0
+
+    def put_tick(self, vt_symbol, last_price, pre_close=100):
+        """更新行情缓存并推送Tick事件"""
+        symbol, exchange = vt_symbol.split(".")
+        tick = TickData(
+            symbol=symbol,
+            exchange=Exchange(exchange),
+            datetime=datetime(2023, 1, 2),
+            last_price=last_price,
+            pre_close=pre_close,
+            gateway_name="TEST"
+        )
+        self.ticks[vt_symbol] = tick
+        self.engine.process_tick_event(Event(EVENT_TICK, tick))
+
+    def put_trade(self, reference, vt_symbol, direction, price, volume):
+        """推送成交事件，委托号对应的策略由委托事件记录"""
+        self.trade_count += 1
+        symbol, exchange = vt_symbol.split(".")
+        trade = TradeData(
+            symbol=symbol,
+            exchange=Exchange(exchange),
+            orderid=str(self.trade_count),
+            tradeid=str(self.trade_count),
+            direction=direction,
+            price=price,
+            volume=volume,
+            gateway_name="TEST"
+        )
+        self.engine.order_reference_map[trade.vt_orderid] = reference
+        self.engine.process_trade_event(Event(EVENT_TRADE, trade))
+
+    def put_timer(self):
+        """推送定时器事件，返回推送的组合结果和合约结果事件"""
+        self.event_engine.put.reset_mock()
+        self.engine.process_timer_event(Event(EVENT_TIMER))
+
+        events = {}
+        for call in self.event_engine.put.call_args_list:
+            event = call.args[0]
+            if event.type in (EVENT_PM_CONTRACT, EVENT_PM_PORTFOLIO):
+                events[event.type] = event.data
+        return events
+
+    def recalculate(self):
+        """按全部成交重新计算每个策略的盈亏"""
+        totals = {}
+
+        for (reference, vt_symbol), contract_result in self.engine.contract_results.items():
+            result = ContractResult(self.engine, reference, vt_symbol, contract_result.open_pos)
+            for trade in contract_result.trades.values():
+                result.update_trade(trade)
+            result.calculate_pnl()
+
+            total = totals.setdefault(reference, [0, 0, 0])
+            total[0] += result.trading_pnl
+            total[1] += result.holding_pnl
+            total[2] += result.total_pnl
+
+        return totals
+
+    def assert_equal_recalculated(self):
+        """检查增量更新的组合结果与全部重新计算一致"""
+        for reference, (trading_pnl, holding_pnl, total_pnl) in self.recalculate().items():
+            portfolio_result = self.engine.portfolio_results[reference]
+            self.assertAlmostEqual(portfolio_result.trading_pnl, trading_pnl, msg=f"{reference}交易盈亏不一致")
+            self.assertAlmostEqual(portfolio_result.holding_pnl, holding_pnl, msg=f"{reference}持仓盈亏不一致")
+            self.assertAlmostEqual(portfolio_result.total_pnl, total_pnl, msg=f"{reference}总盈亏不一致")
+
+    def test_incremental(self):
+        """测试随机成交和行情后组合结果与全部重新计算一致"""
+        rng = random.Random(5)
+
+        for vt_symbol in VT_SYMBOLS:
+            self.put_tick(vt_symbol, 100)
+
+        for i in range(500):
+            if rng.random() < 0.4:
+                self.put_trade(
+                    rng.choice(REFERENCES),
+                    rng.choice(VT_SYMBOLS),
+                    rng.choice([Direction.LONG, Direction.SHORT]),
+                    rng.randrange(90, 111),
+                    rng.randrange(1, 5)
+                )
+            else:
+                self.put_tick(rng.choice(VT_SYMBOLS), rng.randrange(90, 111))
+
+            if i % 7 == 0:
+                self.put_timer()
+                self.assert_equal_recalculated()
+
+        self.put_timer()
+        self.assert_equal_recalculated()
+
+    def test_only_dirty(self):
+        """测试只重新计算有变化的合约结果，没有变化时不推送事件"""
+        for vt_symbol in VT_SYMBOLS:
+            self.put_tick(vt_symbol, 100)
+        self.put_trade("strategy1", "BTCUSDT.BINANCE", Direction.LONG, 100, 1)
+        self.put_trade("strategy2", "ETHUSDT.BINANCE", Direction.SHORT, 100, 2)
+        self.put_timer()
+
+        self.assertEqual(self.put_timer(), {}, "没有变化时不应推送事件")
+
+        # 价格未变化的Tick不需要重新计算
+        self.put_tick("BTCUSDT.BINANCE", 100)
+        self.put_tick("BNBUSDT.BINANCE", 120)
+        self.assertEqual(self.put_timer(), {}, "价格未变化或没有持仓的Tick不应推送事件")
+
+        self.put_tick("BTCUSDT.BINANCE", 105)
+        events = self.put_timer()
+        self.assertEqual(
+            [(r.reference, r.vt_symbol) for r in events[EVENT_PM_CONTRACT]],
+            [("strategy1", "BTCUSDT.BINANCE")],
+            "只应推送价格变化的合约结果"
+        )
+        self.assertEqual(
+            [r.reference for r in events[EVENT_PM_PORTFOLIO]],
+            ["strategy1"],
+            "只应推送有变化的组合结果"
+        )
+        self.assertAlmostEqual(self.engine.portfolio_results["strategy1"].trading_pnl, 50, msg="交易盈亏不正确")
+        self.assertAlmostEqual(self.engine.portfolio_results["strategy2"].trading_pnl, 0, msg="其他组合盈亏不应变化")
+
+    def test_trade_before_tick(self):
+        """测试收到行情前的成交在首个Tick后计入盈亏"""
+        self.put_trade("strategy1", "BTCUSDT.BINANCE", Direction.LONG, 100, 2)
+        events = self.put_timer()
+        self.assertEqual(len(events[EVENT_PM_CONTRACT]), 1, "新的合约结果应推送")
+        self.assertEqual(self.engine.portfolio_results["strategy1"].trading_pnl, 0, "没有行情时不应计算盈亏")
+
+        self.put_tick("BTCUSDT.BINANCE", 103)
+        self.put_timer()
+        self.assertAlmostEqual(self.engine.portfolio_results["strategy1"].trading_pnl, 60, msg="首个Tick后盈亏不正确")
+        self.assert_equal_recalculated()
+
+    def test_holding_pnl(self):
+        """测试昨仓按昨收价计算持仓盈亏"""
+        self.engine.add_contract_result(ContractResult(self.engine, "strategy1", "BTCUSDT.BINANCE", 3))
+        self.put_tick("BTCUSDT.BINANCE", 102, pre_close=100)
+        self.put_timer()
+
+        portfolio_result = self.engine.portfolio_results["strategy1"]
+        self.assertAlmostEqual(portfolio_result.holding_pnl, 60, msg="持仓盈亏不正确")
+        self.assertAlmostEqual(portfolio_result.total_pnl, 60, msg="总盈亏不正确")
+
+        # 昨收价变化同样需要重新计算
+        self.put_tick("BTCUSDT.BINANCE", 102, pre_close=101)
+        self.put_timer()
+        self.assertAlmostEqual(portfolio_result.holding_pnl, 30, msg="昨收价变化后持仓盈亏不正确")
+        self.assert_equal_recalculated()
+
+
+if __name__ == "__main__":
+    unittest.main()
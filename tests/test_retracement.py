@@ -0,0 +1,100 @@
+"""
+多周期回撤分析测试模块
+测试面板分析的最高点、最低点、极值时间以及因子数据生成
+"""
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ads_trading.scheduler.retracement import TIME_RANGES, analyze_panel, build_factors, to_report_rows
+
+
+def create_frame(high, low, close, end="2024-01-10"):
+    """创建以end为最后一天的日K线"""
+    times = pd.date_range(end=end, periods=len(high), freq="D")
+    return pd.DataFrame({"open_time": times, "high": high, "low": low, "close": close})
+
+
+class TestRetracement(unittest.TestCase):
+    """测试回撤面板分析"""
+
+    def setUp(self):
+        """测试环境准备
+        两个交易对：最高价重复出现、部分价格为NaN，第三个交易对没有近期数据
+        """
+        self.now = datetime(2024, 1, 10, 12, 0)
+        self.frames = {
+            "AAAUSDT": create_frame(
+                [10, 12, 15, 11, 15, 9, 8, 9, 10, 11],
+                [8, 9, 10, 7, 12, 6, 6, 7, 8, 9],
+                [9, 11, 14, 10, 13, 7, 7, 8, 9, 10]
+            ),
+            "BBBUSDT": create_frame(
+                [5, np.nan, 7, 6, np.nan],
+                [4, 3, np.nan, 5, 6],
+                [4.5, 4, 6, 5.5, 7.5]
+            ),
+            "CCCUSDT": create_frame([1, 2], [0.5, 1], [1, 2], end="2019-01-01"),
+        }
+
+    def test_analyze_panel(self):
+        """测试各时间范围的最高点、最低点和回撤"""
+        result = analyze_panel(self.frames, self.now).reshape(-1, len(TIME_RANGES))
+        self.assertEqual(result.shape, (3, len(TIME_RANGES)), "结果形状不正确")
+
+        # 最近一个星期：1月4日之后的7根K线
+        week = result[0, 1]
+        self.assertEqual(week["count"], 7, "数据点数不正确")
+        self.assertEqual(week["highest_price"], 15, "最高点不正确")
+        self.assertEqual(week["highest_time"], np.datetime64("2024-01-05"), "最高点时间应取最早出现的时间")
+        self.assertEqual(week["lowest_price"], 6, "最低点不正确")
+        self.assertEqual(week["lowest_time"], np.datetime64("2024-01-06"), "最低点时间应取最早出现的时间")
+        self.assertAlmostEqual(week["max_drawdown"], 60.0, msg="最高到最低回撤不正确")
+
+        # 一个月范围包含全部数据，最高点取第一次出现的15
+        month = result[0, 2]
+        self.assertEqual(month["count"], 10, "数据点数不正确")
+        self.assertEqual(month["highest_time"], np.datetime64("2024-01-03"), "最高点时间不正确")
+
+        # NaN不参与最高点和最低点比较
+        other = result[1, 2]
+        self.assertEqual(other["highest_price"], 7, "忽略NaN后的最高点不正确")
+        self.assertEqual(other["lowest_price"], 3, "忽略NaN后的最低点不正确")
+        self.assertEqual(other["high_drawdown"], 0, "当前价格不低于最高点时回撤应为0")
+
+        # 没有近期数据的时间范围
+        self.assertEqual(result[2, 0]["count"], 0, "无数据时间范围的数据点数不正确")
+        self.assertTrue(np.isnan(result[2, 0]["highest_price"]), "无数据时间范围的最高点应为NaN")
+
+        rows = to_report_rows(result[1])
+        self.assertEqual(rows[2]["从最高点回撤"], "0%", "报告中的高点回撤格式不正确")
+        self.assertIsNone(to_report_rows(result[2])[0]["最高点"], "报告中无数据的最高点应为None")
+
+    def test_empty_frames(self):
+        """测试空数据和None不参与分析"""
+        frames = {"EMPTYUSDT": create_frame([], [], []), "NONEUSDT": None}
+        self.assertEqual(len(analyze_panel(frames, self.now)), 0, "空数据应返回空结果")
+
+        frames["AAAUSDT"] = self.frames["AAAUSDT"]
+        result = analyze_panel(frames, self.now)
+        self.assertEqual(len(result), len(TIME_RANGES), "空数据不应占用结果行")
+        self.assertTrue((result["symbol"] == "AAAUSDT").all(), "结果交易对不正确")
+
+    def test_build_factors(self):
+        """测试由分析结果批量生成因子数据"""
+        result = analyze_panel(self.frames, self.now)
+        factors = build_factors(result, self.now)
+
+        self.assertEqual(len(factors), int((~np.isnan(result["highest_price"])).sum()), "因子数量不正确")
+
+        factor = factors[1]
+        self.assertEqual(factor.symbol, "AAAUSDT", "因子交易对不正确")
+        self.assertEqual(factor.recent_day, "7", "因子时间范围不正确")
+        self.assertEqual(factor.highest_time, datetime(2024, 1, 5), "因子最高点时间不正确")
+        self.assertEqual(factor.max_drawdown, "60.0%", "因子最大回撤不正确")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,371 @@
+"""
+风控引擎测试模块
+测试活动委托簿的最优价格查询、活动委托数量统计、委托流控以及每日统计清空
+"""
+import random
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from howtrader.event import Event
+from howtrader.trader.constant import Direction, Exchange, OrderType, Status
+from howtrader.trader.event import EVENT_ORDER, EVENT_TRADE, EVENT_TIMER
+from howtrader.trader.object import OrderData, OrderRequest, TradeData
+from ads_trading.app.risk_manager.engine import RiskEngine, ActiveOrderBook, FlowWindow
+
+
+def create_order(orderid, direction, price, status=None, symbol="BTCUSDT"):
+    """创建测试委托"""
+    return OrderData(
+        symbol=symbol,
+        exchange=Exchange.BINANCE,
+        orderid=orderid,
+        direction=direction,
+        price=price,
+        volume=1,
+        status=status or Status.NOTTRADED,
+        gateway_name="TEST"
+    )
+
+
+def create_request(direction, price, volume=1, symbol="BTCUSDT"):
+    """创建测试委托请求"""
+    return OrderRequest(
+        symbol=symbol,
+        exchange=Exchange.BINANCE,
+        direction=direction,
+        type=OrderType.LIMIT,
+        volume=volume,
+        price=price
+    )
+
+
+class TestActiveOrderBook(unittest.TestCase):
+    """测试活动委托簿"""
+
+    def setUp(self):
+        """测试环境准备"""
+        self.book = ActiveOrderBook("BTCUSDT.BINANCE")
+
+    def test_best_price(self):
+        """测试最优买卖价格"""
+        self.assertEqual(self.book.get_best_bid(), 0, "空委托簿买价不正确")
+        self.assertEqual(self.book.get_best_ask(), 0, "空委托簿卖价不正确")
+
+        for orderid, price in [("1", 99), ("2", 101), ("3", 100)]:
+            self.book.update_order(create_order(orderid, Direction.LONG, price))
+        for orderid, price in [("4", 105), ("5", 103), ("6", 104)]:
+            self.book.update_order(create_order(orderid, Direction.SHORT, price))
+
+        self.assertEqual(self.book.get_best_bid(), 101, "最高买价不正确")
+        self.assertEqual(self.book.get_best_ask(), 103, "最低卖价不正确")
+
+    def test_price_change(self):
+        """测试委托价格变化后旧价格失效"""
+        self.book.update_order(create_order("1", Direction.LONG, 100))
+        self.book.update_order(create_order("2", Direction.LONG, 99))
+        self.book.update_order(create_order("1", Direction.LONG, 98))
+        self.assertEqual(self.book.get_best_bid(), 99, "改价后最高买价不正确")
+
+        self.book.update_order(create_order("1", Direction.LONG, 100))
+        self.assertEqual(self.book.get_best_bid(), 100, "改回原价后最高买价不正确")
+
+        self.book.update_order(create_order("3", Direction.SHORT, 110))
+        self.book.update_order(create_order("3", Direction.SHORT, 112))
+        self.assertEqual(self.book.get_best_ask(), 112, "改价后最低卖价不正确")
+
+    def test_cancel_top(self):
+        """测试撤销最优价格委托后返回次优价格"""
+        self.book.update_order(create_order("1", Direction.LONG, 100))
+        self.book.update_order(create_order("2", Direction.LONG, 99))
+        self.book.update_order(create_order("3", Direction.SHORT, 101))
+        self.book.update_order(create_order("4", Direction.SHORT, 102))
+
+        self.book.update_order(create_order("1", Direction.LONG, 100, Status.CANCELLED))
+        self.book.update_order(create_order("3", Direction.SHORT, 101, Status.ALLTRADED))
+        self.assertEqual(self.book.get_best_bid(), 99, "撤单后最高买价不正确")
+        self.assertEqual(self.book.get_best_ask(), 102, "成交后最低卖价不正确")
+
+        self.book.update_order(create_order("2", Direction.LONG, 99, Status.CANCELLED))
+        self.book.update_order(create_order("4", Direction.SHORT, 102, Status.CANCELLED))
+        self.assertEqual(self.book.get_best_bid(), 0, "全部撤单后买价不正确")
+        self.assertEqual(self.book.get_best_ask(), 0, "全部撤单后卖价不正确")
+
+    def test_rebuild(self):
+        """测试过期记录过多时重建堆，堆大小不随改价次数增长"""
+        self.book.update_order(create_order("1", Direction.LONG, 100))
+
+        for i in range(1000):
+            self.book.update_order(create_order("2", Direction.LONG, 50 + i % 40))
+            self.assertLessEqual(len(self.book.bid_heap), 2 * len(self.book.bid_prices) + 64, "堆未重建")
+
+        self.assertEqual(self.book.get_best_bid(), 100, "重建后最高买价不正确")
+
+        self.book.update_order(create_order("1", Direction.LONG, 100, Status.CANCELLED))
+        self.assertEqual(self.book.get_best_bid(), 50 + 999 % 40, "重建后撤单的最高买价不正确")
+
+    def test_decimal_price(self):
+        """测试Decimal价格"""
+        self.book.update_order(create_order("1", Direction.LONG, Decimal("100.1")))
+        self.book.update_order(create_order("2", Direction.LONG, Decimal("100.2")))
+        self.book.update_order(create_order("3", Direction.SHORT, Decimal("100.4")))
+        self.book.update_order(create_order("4", Direction.SHORT, Decimal("100.3")))
+
+        self.assertEqual(self.book.get_best_bid(), Decimal("100.2"), "Decimal最高买价不正确")
+        self.assertEqual(self.book.get_best_ask(), Decimal("100.3"), "Decimal最低卖价不正确")
+
+        self.book.update_order(create_order("2", Direction.LONG, Decimal("100.2"), Status.CANCELLED))
+        self.book.update_order(create_order("4", Direction.SHORT, Decimal("100.5")))
+        self.assertEqual(self.book.get_best_bid(), Decimal("100.1"), "撤单后Decimal最高买价不正确")
+        self.assertEqual(self.book.get_best_ask(), Decimal("100.4"), "改价后Decimal最低卖价不正确")
+
+    def test_random(self):
+        """测试随机委托更新后最优价格与遍历全部委托的结果一致"""
+        rng = random.Random(7)
+        bids = {}
+        asks = {}
+
+        for _ in range(5000):
+            orderid = str(rng.randrange(200))
+            if orderid in bids:
+                direction = Direction.LONG
+            elif orderid in asks:
+                direction = Direction.SHORT
+            else:
+                direction = rng.choice([Direction.LONG, Direction.SHORT])
+            prices = bids if direction == Direction.LONG else asks
+
+            price = rng.randrange(90, 110)
+            if rng.random() < 0.3:
+                status = rng.choice([Status.CANCELLED, Status.ALLTRADED, Status.REJECTED])
+                prices.pop(orderid, None)
+            else:
+                status = Status.NOTTRADED
+                prices[orderid] = price
+
+            self.book.update_order(create_order(orderid, direction, price, status))
+
+            self.assertEqual(self.book.get_best_bid(), max(bids.values(), default=0), "最高买价与遍历结果不一致")
+            self.assertEqual(self.book.get_best_ask(), min(asks.values(), default=0), "最低卖价与遍历结果不一致")
+
+
+class TestFlowWindow(unittest.TestCase):
+    """测试委托流控滑动窗口"""
+
+    def test_limit(self):
+        """测试窗口内委托数量达到上限后拒绝"""
+        flow = FlowWindow(3, 1)
+
+        for now in [10.0, 10.1, 10.2]:
+            self.assertTrue(flow.check(now), "未达到上限时应允许委托")
+            flow.add(now)
+
+        self.assertFalse(flow.check(10.3), "达到上限时应拒绝委托")
+        self.assertEqual(flow.get_count(10.3), 3, "窗口内委托数量不正确")
+        self.assertEqual(flow.get_utilization(10.3), 1, "窗口使用率不正确")
+
+        # 最早一笔离开窗口后腾出一个位置
+        self.assertTrue(flow.check(11.0), "最早委托离开窗口后应允许委托")
+        flow.add(11.0)
+        self.assertFalse(flow.check(11.05), "只应腾出一个位置")
+
+    def test_no_edge_burst(self):
+        """测试窗口滑动时不会在边界处放行两倍委托"""
+        flow = FlowWindow(5, 1)
+
+        # 第一秒末尾发出全部委托
+        for i in range(5):
+            now = 10.9 + i * 0.01
+            self.assertTrue(flow.check(now), "未达到上限时应允许委托")
+            flow.add(now)
+
+        # 固定周期清零会在下一秒开始时放行，滑动窗口仍需等待
+        for now in [11.0, 11.5, 11.85]:
+            self.assertFalse(flow.check(now), f"{now}时不应放行委托")
+
+        self.assertTrue(flow.check(11.9), "窗口滑过后应允许委托")
+
+        # 任意1秒内的委托数量都不超过上限
+        times = sorted(t for t in flow.times)
+        for start in times:
+            count = sum(1 for t in times if start <= t < start + 1)
+            self.assertLessEqual(count, 5, "窗口内委托数量超过上限")
+
+    def test_random(self):
+        """测试随机委托时间下与逐笔统计窗口内委托的结果一致"""
+        rng = random.Random(3)
+        flow = FlowWindow(10, 2)
+        accepted = []
+        now = 0.0
+
+        for _ in range(5000):
+            now += rng.expovariate(8)
+            expected = sum(1 for t in accepted if t > now - 2) < 10
+            self.assertEqual(flow.check(now), expected, "流控结果与逐笔统计不一致")
+
+            if expected:
+                flow.add(now)
+                accepted.append(now)
+
+            self.assertEqual(flow.get_count(now), sum(1 for t in accepted if t > now - 2), "窗口内委托数量不正确")
+
+    def test_zero_limit(self):
+        """测试上限为0时拒绝全部委托"""
+        flow = FlowWindow(0, 1)
+        self.assertFalse(flow.check(10.0), "上限为0时应拒绝委托")
+        self.assertEqual(flow.get_utilization(10.0), 1, "上限为0时使用率不正确")
+
+
+class TestRiskEngine(unittest.TestCase):
+    """测试风控引擎"""
+
+    def setUp(self):
+        """测试环境准备"""
+        self.main_engine = MagicMock()
+        self.main_engine.send_order.return_value = "TEST.1"
+
+        with patch("ads_trading.app.risk_manager.engine.load_json", return_value={}):
+            self.engine = RiskEngine(self.main_engine, MagicMock())
+
+        self.engine.active = True
+
+    def put_order(self, order):
+        """推送委托事件"""
+        self.engine.process_order_event(Event(EVENT_ORDER, order))
+
+    def test_active_orderids(self):
+        """测试活动委托数量随委托状态增减"""
+        self.put_order(create_order("1", Direction.LONG, 100, Status.SUBMITTING))
+        self.put_order(create_order("2", Direction.LONG, 99))
+        self.put_order(create_order("1", Direction.LONG, 100, Status.PARTTRADED))
+        self.assertEqual(len(self.engine.active_orderids), 2, "活动委托数量不正确")
+
+        self.put_order(create_order("1", Direction.LONG, 100, Status.ALLTRADED))
+        self.assertEqual(self.engine.active_orderids, {"TEST.2"}, "成交后活动委托不正确")
+
+        # 重复推送的结束状态不影响统计
+        self.put_order(create_order("1", Direction.LONG, 100, Status.ALLTRADED))
+        self.put_order(create_order("2", Direction.LONG, 99, Status.CANCELLED))
+        self.put_order(create_order("2", Direction.LONG, 99, Status.CANCELLED))
+        self.assertEqual(len(self.engine.active_orderids), 0, "撤单后活动委托数量不正确")
+        self.assertEqual(self.engine.order_cancel_counts["BTCUSDT.BINANCE"], 2, "撤单次数不正确")
+
+    def test_active_order_limit(self):
+        """测试活动委托数量达到上限后拒绝委托"""
+        self.engine.active_order_limit = 2
+
+        self.put_order(create_order("1", Direction.LONG, 90))
+        self.put_order(create_order("2", Direction.LONG, 91, symbol="ETHUSDT"))
+        self.assertEqual(self.engine.send_order(create_request(Direction.LONG, 92), "TEST"), "", "活动委托达到上限时应拒绝")
+
+        self.put_order(create_order("2", Direction.LONG, 91, Status.CANCELLED, symbol="ETHUSDT"))
+        self.assertEqual(self.engine.send_order(create_request(Direction.LONG, 92), "TEST"), "TEST.1", "撤单后应允许委托")
+
+    def test_self_trade(self):
+        """测试可能自成交的委托被拒绝"""
+        self.put_order(create_order("1", Direction.LONG, 100))
+        self.put_order(create_order("2", Direction.SHORT, 102))
+
+        self.assertFalse(self.engine.check_risk(create_request(Direction.LONG, 102), "TEST"), "买价大于等于卖单价格时应拒绝")
+        self.assertFalse(self.engine.check_risk(create_request(Direction.SHORT, 100), "TEST"), "卖价小于等于买单价格时应拒绝")
+        self.assertTrue(self.engine.check_risk(create_request(Direction.LONG, 101), "TEST"), "正常买单应通过")
+        self.assertTrue(self.engine.check_risk(create_request(Direction.SHORT, 101), "TEST"), "正常卖单应通过")
+
+        # 其他合约的委托不影响
+        self.assertTrue(
+            self.engine.check_risk(create_request(Direction.LONG, 105, symbol="ETHUSDT"), "TEST"),
+            "其他合约委托不应被拒绝"
+        )
+
+
+    def send_orders(self, now, *orders):
+        """在指定时间发出委托，返回每笔委托是否通过"""
+        with patch("ads_trading.app.risk_manager.engine.monotonic", return_value=now):
+            return [
+                bool(self.engine.send_order(create_request(Direction.LONG, 100, symbol=symbol), gateway_name))
+                for symbol, gateway_name in orders
+            ]
+
+    def test_flow_scope(self):
+        """测试合约和接口流控分别计数"""
+        self.engine.symbol_flow_limit = 2
+        self.engine.gateway_flow_limit = 3
+
+        results = self.send_orders(
+            10.0,
+            ("BTCUSDT", "A"),
+            ("BTCUSDT", "A"),
+            ("BTCUSDT", "B"),      # 合约超过限制
+            ("ETHUSDT", "A"),
+            ("BNBUSDT", "A"),      # 接口超过限制
+            ("BNBUSDT", "B"),
+        )
+        self.assertEqual(results, [True, True, False, True, False, True], "合约和接口流控结果不正确")
+
+        with patch("ads_trading.app.risk_manager.engine.monotonic", return_value=10.5):
+            self.assertEqual(self.engine.get_flow_utilization(), 4 / 50, "全局流控使用率不正确")
+            self.assertEqual(self.engine.get_flow_utilization("BTCUSDT.BINANCE"), 1, "合约流控使用率不正确")
+            self.assertEqual(self.engine.get_flow_utilization(gateway_name="A"), 1, "接口流控使用率不正确")
+            self.assertEqual(self.engine.get_flow_utilization("ETHUSDT.BINANCE", "B"), 1 / 2, "取各范围最大使用率不正确")
+
+        # 窗口滑过后恢复
+        self.assertEqual(self.send_orders(11.0, ("BTCUSDT", "A")), [True], "窗口滑过后应允许委托")
+
+    def test_rejected_no_slot(self):
+        """测试被拒绝的委托不占用任何范围的流控次数"""
+        self.engine.order_flow_limit = 3
+        self.engine.symbol_flow_limit = 1
+        self.engine.gateway_flow_limit = 2
+        self.engine.update_setting(self.engine.get_setting())
+
+        results = self.send_orders(
+            10.0,
+            ("BTCUSDT", "A"),
+            ("BTCUSDT", "A"),      # 合约超过限制，不占用全局和接口次数
+            ("BTCUSDT", "B"),      # 合约超过限制，不占用全局和接口次数
+            ("ETHUSDT", "A"),
+            ("BNBUSDT", "A"),      # 接口超过限制，不占用全局和合约次数
+            ("BNBUSDT", "B"),
+        )
+        self.assertEqual(results, [True, False, False, True, False, True], "流控结果不正确")
+
+        self.assertEqual(self.engine.order_flow.get_count(10.0), 3, "全局流控次数不正确")
+        self.assertEqual(self.engine.gateway_flows["B"].get_count(10.0), 1, "接口流控次数不正确")
+        self.assertEqual(self.engine.symbol_flows["BNBUSDT.BINANCE"].get_count(10.0), 1, "合约流控次数不正确")
+
+        # 其他检查拒绝的委托同样不占用次数
+        self.engine.order_flow_limit = 10
+        self.engine.update_setting(self.engine.get_setting())
+        with patch("ads_trading.app.risk_manager.engine.monotonic", return_value=20.0):
+            self.engine.send_order(create_request(Direction.LONG, 100, volume=1000), "A")
+        self.assertEqual(self.engine.order_flow.get_count(20.0), 0, "委托数量超限时不应占用次数")
+
+    def test_daily_reset(self):
+        """测试交易日切换后清空成交和撤单统计"""
+        self.engine.process_trade_event(Event(EVENT_TRADE, TradeData(
+            symbol="BTCUSDT",
+            exchange=Exchange.BINANCE,
+            orderid="1",
+            tradeid="1",
+            direction=Direction.LONG,
+            price=100,
+            volume=3,
+            gateway_name="TEST"
+        )))
+        self.put_order(create_order("1", Direction.LONG, 100, Status.CANCELLED))
+
+        # 同一交易日不清空
+        self.engine.process_timer_event(Event(EVENT_TIMER))
+        self.assertEqual(self.engine.trade_count, 3, "成交数量不正确")
+        self.assertEqual(self.engine.order_cancel_counts["BTCUSDT.BINANCE"], 1, "撤单次数不正确")
+
+        self.engine.trading_day = date.today() - timedelta(days=1)
+        self.engine.process_timer_event(Event(EVENT_TIMER))
+        self.assertEqual(self.engine.trade_count, 0, "交易日切换后成交数量未清空")
+        self.assertEqual(len(self.engine.order_cancel_counts), 0, "交易日切换后撤单次数未清空")
+        self.assertEqual(self.engine.trading_day, date.today(), "交易日未更新")
+
+
+if __name__ == "__main__":
+    unittest.main()
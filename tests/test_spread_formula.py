@@ -0,0 +1,69 @@
+"""
+价差公式测试模块
+测试价差公式编译、序列化以及逐点计算与数组计算的一致性
+"""
+import pickle
+import unittest
+
+import numpy as np
+
+from ads_trading.app.spread_trading.base import SpreadFormula
+
+
+class TestSpreadFormula(unittest.TestCase):
+    """测试价差公式"""
+
+    def setUp(self):
+        """测试环境准备"""
+        self.prices = np.array([
+            [100.0, 101.5, 99.0, 102.0],
+            [50.0, 49.5, 51.0, 50.5],
+            [10.0, 11.0, 9.5, 10.5]
+        ])
+
+    def test_compile(self):
+        """测试变量按顺序替换为价格序列下标"""
+        formula = SpreadFormula("A - 2 * B + C / 4", ["A", "B", "C"])
+        self.assertTrue(formula.vectorized, "算术公式应支持数组计算")
+        self.assertAlmostEqual(formula([100, 30, 8]), 42, msg="价差计算结果不正确")
+        self.assertAlmostEqual(formula.evaluate({"C": 8, "B": 30, "A": 100}), 42, msg="按变量名计算结果不正确")
+
+        # 变量顺序决定下标
+        formula = SpreadFormula("A - B", ["B", "A"])
+        self.assertEqual(formula([1, 5]), 4, "变量顺序不正确")
+
+    def test_pickle(self):
+        """测试序列化后重新编译"""
+        formula = SpreadFormula("A / B - 1", ["A", "B"])
+        data = pickle.dumps(formula)
+        self.assertNotIn(b"<lambda>", data, "编译后的函数不应被序列化")
+
+        loaded = pickle.loads(data)
+        self.assertEqual(loaded.formula, formula.formula, "公式不正确")
+        self.assertEqual(loaded.variables, formula.variables, "变量不正确")
+        self.assertEqual(loaded([3, 2]), formula([3, 2]), "反序列化后计算结果不正确")
+
+    def test_calculate_array(self):
+        """测试数组计算与逐点计算结果一致"""
+        formula = SpreadFormula("A - 2 * B + C ** 2", ["A", "B", "C"])
+        result = formula.calculate_array(self.prices)
+
+        expected = [formula(column) for column in self.prices.T.tolist()]
+        np.testing.assert_allclose(result, expected, err_msg="数组计算结果与逐点计算不一致")
+
+        # 常数公式也返回完整序列
+        constant = SpreadFormula("1", ["A"])
+        self.assertEqual(constant.calculate_array(self.prices[:1]).shape, (4,), "常数公式结果长度不正确")
+
+    def test_not_vectorized(self):
+        """测试包含函数调用的公式逐点计算"""
+        formula = SpreadFormula("max(A, B) - C", ["A", "B", "C"])
+        self.assertFalse(formula.vectorized, "函数调用公式不应按数组计算")
+
+        result = formula.calculate_array(self.prices)
+        expected = [max(a, b) - c for a, b, c in self.prices.T.tolist()]
+        np.testing.assert_allclose(result, expected, err_msg="逐点计算结果不正确")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,457 @@
+"""
+价差交易测试模块
+测试价差腿K线按时间对齐后的价差序列计算、价差序列磁盘缓存以及价差腿行情的处理
+"""
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from queue import Queue
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from howtrader.event import Event
+from howtrader.trader.constant import Exchange, Interval
+from howtrader.trader.event import EVENT_TICK, EVENT_TRADE
+from howtrader.trader.object import BarData, TickData, TradeData
+from ads_trading.app.spread_trading import base
+from ads_trading.app.spread_trading.base import (
+    DB_TZ, EVENT_SPREAD_DATA, BarCache, LegData, SpreadData, clear_spread_cache, load_spread_array
+)
+from ads_trading.app.spread_trading.engine import SpreadEngine
+
+
+class MemoryDatabase:
+    """只实现load_bar_data的内存数据库，记录查询次数"""
+
+    def __init__(self):
+        self.bars = {}
+        self.query_count = 0
+
+    def add_bars(self, symbol, minutes, prices):
+        """添加指定分钟的K线"""
+        start = DB_TZ.localize(datetime(2023, 1, 1))
+        for minute, price in zip(minutes, prices):
+            bar = BarData(
+                symbol=symbol,
+                exchange=Exchange.BINANCE,
+                datetime=start + timedelta(minutes=minute),
+                interval=Interval.MINUTE,
+                close_price=price,
+                gateway_name="DB"
+            )
+            self.bars.setdefault(symbol, []).append(bar)
+
+    def load_bar_data(self, symbol, exchange, interval, start, end):
+        self.query_count += 1
+        start = DB_TZ.localize(start)
+        end = DB_TZ.localize(end)
+        return [bar for bar in self.bars.get(symbol, []) if start <= bar.datetime <= end]
+
+
+def create_spread(name, formula="A - 2 * B", multipliers=(1, -2)):
+    """创建两条腿的价差"""
+    legs = [LegData("AUSDT.BINANCE"), LegData("BUSDT.BINANCE")]
+    return SpreadData(
+        name=name,
+        legs=legs,
+        variable_symbols={"A": "AUSDT.BINANCE", "B": "BUSDT.BINANCE"},
+        variable_directions={"A": 1, "B": -1},
+        price_formula=formula,
+        trading_multipliers={
+            "AUSDT.BINANCE": multipliers[0],
+            "BUSDT.BINANCE": multipliers[1]
+        },
+        active_symbol="AUSDT.BINANCE",
+        min_volume=1
+    )
+
+
+def join_legs(spread, database, start, end):
+    """原先的计算方式，逐个时间检查各条腿是否都有K线"""
+    leg_bars = {}
+    for leg in spread.variable_legs.values():
+        symbol = leg.vt_symbol.split(".")[0]
+        bar_data = database.load_bar_data(symbol, Exchange.BINANCE, Interval.MINUTE, start, end)
+        bars = {bar.datetime: bar for bar in bar_data}
+        leg_bars[leg.vt_symbol] = bars
+
+    dts = [
+        dt for dt in bars.keys()
+        if all(dt in leg_bars[leg.vt_symbol] for leg in spread.variable_legs.values())
+    ]
+
+    prices = []
+    values = []
+    for dt in dts:
+        data = {
+            variable: leg_bars[leg.vt_symbol][dt].close_price
+            for variable, leg in spread.variable_legs.items()
+        }
+        prices.append(spread.formula.evaluate(data))
+        values.append(sum(
+            spread.trading_multipliers[leg.vt_symbol] * data[variable]
+            for variable, leg in spread.variable_legs.items()
+        ))
+
+    return dts, prices, values
+
+
+class TestSpreadArray(unittest.TestCase):
+    """测试价差序列计算和缓存"""
+
+    def setUp(self):
+        """测试环境准备
+        两条腿在不同时间缺失K线，K线缓存和价差缓存都写入临时目录
+        """
+        self.temp_dir = tempfile.TemporaryDirectory()
+        folder = Path(self.temp_dir.name)
+
+        self.database = MemoryDatabase()
+        self.database.add_bars("AUSDT", [m for m in range(20) if m not in (3, 7, 8)], [100 + m * 1.5 for m in range(20)])
+        self.database.add_bars("BUSDT", [m for m in range(20) if m not in (5, 8, 19)], [50 - m * 0.25 for m in range(20)])
+
+        class TempBarCache(BarCache):
+            def __init__(self, database):
+                self.database = database
+                self.folder_path = folder.joinpath("bar_cache")
+                self.folder_path.mkdir(exist_ok=True)
+
+        self.spread_folder = folder.joinpath("spread_cache")
+        self.spread_folder.mkdir()
+
+        self.patches = [
+            patch.object(base, "get_database", return_value=self.database),
+            patch.object(base, "BarCache", TempBarCache),
+            patch.object(base, "get_folder_path", return_value=self.spread_folder),
+        ]
+        for p in self.patches:
+            p.start()
+
+        self.start = datetime(2023, 1, 1, 0, 0)
+        self.end = datetime(2023, 1, 1, 0, 19)
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.temp_dir.cleanup()
+
+    def load(self, spread, start=None, end=None, cache=True):
+        """加载价差序列，返回结果和是否重新计算"""
+        with patch.object(base, "calculate_spread_array", wraps=base.calculate_spread_array) as mock:
+            data = load_spread_array(spread, Interval.MINUTE, start or self.start, end or self.end, cache)
+        return data, mock.called
+
+    def test_join(self):
+        """测试各条腿在不同时间缺失K线时，结果与逐个时间对齐一致"""
+        spread = create_spread("test", "A / B - 2 * A + B ** 2", (2, -3))
+        data, _ = self.load(spread)
+
+        dts, prices, values = join_legs(spread, self.database, self.start, self.end)
+
+        self.assertEqual(len(data), 15, "对齐后的K线数量不正确")
+        self.assertEqual(
+            data["datetime"].view("int64").tolist(),
+            [round(dt.timestamp() * 1e6) for dt in dts],
+            "对齐后的时间不正确"
+        )
+        np.testing.assert_allclose(data["price"], prices, err_msg="价差价格与逐个计算不一致")
+        np.testing.assert_allclose(data["value"], values, err_msg="价差价值与逐个计算不一致")
+
+    def test_no_cache(self):
+        """测试默认不使用缓存，每次从数据库查询"""
+        spread = create_spread("test")
+        data = load_spread_array(spread, Interval.MINUTE, self.start, self.end)
+        cached, _ = self.load(spread)
+        np.testing.assert_array_equal(data, cached, "不使用缓存时结果不一致")
+
+        self.database.bars.clear()
+        data = load_spread_array(spread, Interval.MINUTE, self.start, self.end)
+        self.assertEqual(len(data), 0, "不使用缓存时应重新查询数据库")
+
+    def test_downloaded_later(self):
+        """测试腿的数据下载前加载，下载后能够得到价差"""
+        spread = create_spread("test")
+        bars = dict(self.database.bars)
+        self.database.bars.clear()
+
+        data, _ = self.load(spread)
+        self.assertEqual(len(data), 0, "下载前价差应为空")
+
+        self.database.bars.update(bars)
+        data, _ = self.load(spread)
+        self.assertEqual(len(data), 15, "下载后应重新计算价差")
+
+    def test_cache_hit(self):
+        """测试第二次加载直接读取价差缓存"""
+        spread = create_spread("test")
+
+        data, calculated = self.load(spread)
+        self.assertTrue(calculated, "首次加载应计算价差")
+        query_count = self.database.query_count
+
+        cached, calculated = self.load(spread)
+        self.assertFalse(calculated, "命中缓存时不应重新计算")
+        self.assertEqual(self.database.query_count, query_count, "命中缓存时不应查询数据库")
+        np.testing.assert_array_equal(cached, data, "缓存数据与计算结果不一致")
+
+        # 价差定义不同时不使用同一个缓存
+        _, calculated = self.load(create_spread("test", "A - 3 * B"))
+        self.assertTrue(calculated, "价差公式变化后应重新计算")
+
+    def test_leg_extended(self):
+        """测试腿的K线缓存扩展后重新计算价差"""
+        spread = create_spread("test")
+        data, _ = self.load(spread)
+
+        # 补充A腿之前的历史后，其他回测扩展了A腿的缓存范围
+        self.database.add_bars("AUSDT", range(-30, 0), [100] * 30)
+        base.BarCache(self.database).load(
+            "AUSDT", Exchange.BINANCE, Interval.MINUTE,
+            datetime(2022, 12, 31, 23, 0), self.end
+        )
+
+        reloaded, calculated = self.load(spread)
+        self.assertTrue(calculated, "腿的缓存扩展后应重新计算")
+        np.testing.assert_array_equal(reloaded, data, "重新计算结果不正确")
+        self.assertEqual(len(list(self.spread_folder.glob("*.npy"))), 2, "应生成新的缓存文件")
+
+        _, calculated = self.load(spread)
+        self.assertFalse(calculated, "重新计算后应命中新的缓存")
+
+    def test_unfinished_range(self):
+        """测试未结束的时间范围不写入缓存"""
+        spread = create_spread("test")
+        self.load(spread, end=datetime.now() + timedelta(days=1))
+        self.assertEqual(list(self.spread_folder.glob("*.npy")), [], "未结束的范围不应缓存")
+
+    def test_clear(self):
+        """测试清理指定价差或全部价差的缓存"""
+        spread_1 = create_spread("test1")
+        spread_2 = create_spread("test2", "A + B", (1, 1))
+        self.load(spread_1)
+        self.load(spread_2)
+        self.assertEqual(len(list(self.spread_folder.glob("*.npy"))), 2, "缓存文件数量不正确")
+
+        clear_spread_cache(spread_1)
+        self.assertTrue(self.load(spread_1)[1], "清理后应重新计算")
+        self.assertFalse(self.load(spread_2)[1], "不应清理其他价差的缓存")
+
+        clear_spread_cache()
+        self.assertEqual(list(self.spread_folder.glob("*.npy")), [], "全部缓存应被清理")
+        self.assertTrue(self.load(spread_2)[1], "清理全部后应重新计算")
+
+
+def create_tick(vt_symbol, bid_price, ask_price, bid_volume=1, ask_volume=1, last_price=0):
+    """创建测试Tick"""
+    symbol, exchange = vt_symbol.split(".")
+    return TickData(
+        symbol=symbol,
+        exchange=Exchange(exchange),
+        datetime=datetime(2023, 1, 1),
+        last_price=last_price or (bid_price + ask_price) / 2,
+        bid_price_1=bid_price,
+        ask_price_1=ask_price,
+        bid_volume_1=bid_volume,
+        ask_volume_1=ask_volume,
+        gateway_name="TEST"
+    )
+
+
+class TestLegData(unittest.TestCase):
+    """测试价差腿行情更新"""
+
+    def test_update_tick(self):
+        """测试只有盘口价格或数量变化时返回True"""
+        leg = LegData("AUSDT.BINANCE")
+
+        self.assertTrue(leg.update_tick(create_tick("AUSDT.BINANCE", 100, 101)), "首个Tick应返回变化")
+        self.assertFalse(leg.update_tick(create_tick("AUSDT.BINANCE", 100, 101)), "相同盘口应返回未变化")
+
+        # 最新价变化但盘口不变
+        tick = create_tick("AUSDT.BINANCE", 100, 101, last_price=100.8)
+        self.assertFalse(leg.update_tick(tick), "只有最新价变化时应返回未变化")
+        self.assertEqual(leg.last_price, 100.8, "最新价未更新")
+        self.assertIs(leg.tick, tick, "Tick缓存未更新")
+
+        self.assertTrue(leg.update_tick(create_tick("AUSDT.BINANCE", 100.5, 101)), "买价变化应返回变化")
+        self.assertTrue(leg.update_tick(create_tick("AUSDT.BINANCE", 100.5, 100.9)), "卖价变化应返回变化")
+        self.assertTrue(leg.update_tick(create_tick("AUSDT.BINANCE", 100.5, 100.9, bid_volume=2)), "买量变化应返回变化")
+        self.assertTrue(
+            leg.update_tick(create_tick("AUSDT.BINANCE", 100.5, 100.9, bid_volume=2, ask_volume=3)),
+            "卖量变化应返回变化"
+        )
+        self.assertEqual(
+            (leg.bid_price, leg.ask_price, leg.bid_volume, leg.ask_volume),
+            (100.5, 100.9, 2, 3),
+            "盘口数据未更新"
+        )
+
+
+class TestSpreadTickRouting(unittest.TestCase):
+    """测试价差腿行情的价差计算和算法推送"""
+
+    def setUp(self):
+        """测试环境准备"""
+        self.main_engine = MagicMock()
+        self.main_engine.get_contract.return_value = None
+        self.main_engine.get_position.return_value = None
+        self.event_engine = MagicMock()
+
+        self.engine = SpreadEngine(self.main_engine, self.event_engine)
+        self.data_engine = self.engine.data_engine
+        self.algo_engine = self.engine.algo_engine
+
+        self.data_engine.add_spread(
+            "test",
+            [
+                {"variable": "A", "vt_symbol": "AUSDT.BINANCE", "trading_direction": 1, "trading_multiplier": 1},
+                {"variable": "B", "vt_symbol": "BUSDT.BINANCE", "trading_direction": -1, "trading_multiplier": -1},
+            ],
+            "A - B",
+            "AUSDT.BINANCE",
+            1,
+            save=False
+        )
+        self.spread = self.data_engine.get_spread("test")
+
+        self.algo = MagicMock()
+        self.algo.is_active.return_value = True
+        self.algo_engine.symbol_algo_map["AUSDT.BINANCE"].append(self.algo)
+
+    def put_tick(self, tick):
+        """推送Tick事件到数据引擎"""
+        self.data_engine.process_tick_event(Event(EVENT_TICK + tick.vt_symbol, tick))
+
+    def get_spread_events(self):
+        """获取推送的价差事件数量"""
+        return sum(
+            1 for call in self.event_engine.put.call_args_list
+            if call.args[0].type == EVENT_SPREAD_DATA
+        )
+
+    def test_skip_unchanged(self):
+        """测试盘口未变化时不重新计算价差"""
+        self.put_tick(create_tick("BUSDT.BINANCE", 50, 51))
+
+        with patch.object(self.spread, "calculate_price", wraps=self.spread.calculate_price) as mock:
+            self.put_tick(create_tick("AUSDT.BINANCE", 100, 101))
+            self.assertEqual(mock.call_count, 1, "盘口变化时应计算价差")
+            self.assertEqual(self.spread.bid_price, 49, "价差买价不正确")
+
+            events = self.get_spread_events()
+            self.put_tick(create_tick("AUSDT.BINANCE", 100, 101, last_price=100.2))
+            self.assertEqual(mock.call_count, 1, "盘口未变化时不应计算价差")
+            self.assertEqual(self.get_spread_events(), events, "盘口未变化时不应推送价差事件")
+
+            self.put_tick(create_tick("AUSDT.BINANCE", 100, 102))
+            self.assertEqual(mock.call_count, 2, "盘口变化后应重新计算价差")
+
+        metrics = self.data_engine.get_metrics()
+        self.assertEqual(metrics["tick"], 4, "Tick数量不正确")
+        self.assertEqual(metrics["unchanged"], 1, "未变化Tick数量不正确")
+
+    def test_add_spread_priced(self):
+        """测试使用已有行情的价差腿创建价差时立即计算价差并推送"""
+        self.put_tick(create_tick("AUSDT.BINANCE", 100, 101))
+        self.put_tick(create_tick("BUSDT.BINANCE", 50, 51))
+        events = self.get_spread_events()
+
+        self.data_engine.add_spread(
+            "test2",
+            [
+                {"variable": "A", "vt_symbol": "AUSDT.BINANCE", "trading_direction": 1, "trading_multiplier": 1},
+                {"variable": "B", "vt_symbol": "BUSDT.BINANCE", "trading_direction": -1, "trading_multiplier": -2},
+            ],
+            "A - 2 * B",
+            "AUSDT.BINANCE",
+            1,
+            save=False
+        )
+        spread = self.data_engine.get_spread("test2")
+
+        self.assertEqual((spread.bid_price, spread.ask_price), (-2, 1), "新建价差的盘口未计算")
+        self.assertEqual(self.get_spread_events(), events + 1, "新建价差应推送价差事件")
+
+    def test_add_spread_unpriced(self):
+        """测试价差腿没有行情时创建价差不推送价差事件"""
+        self.assertEqual(self.get_spread_events(), 0, "价差腿没有行情时不应推送价差事件")
+
+    def test_metrics_queue_size(self):
+        """测试事件引擎没有get_queue_size时读取队列长度"""
+        class QueueEventEngine:
+            def __init__(self):
+                self._queue = Queue()
+
+        self.data_engine.event_engine = QueueEventEngine()
+        self.data_engine.event_engine._queue.put(1)
+        self.data_engine.event_engine._queue.put(2)
+
+        self.assertEqual(self.data_engine.get_metrics()["queue_size"], 2, "事件队列长度不正确")
+
+    def test_route_to_algo(self):
+        """测试价差腿的Tick直接推送给对应的算法，包括盘口未变化的Tick"""
+        ticks = [
+            create_tick("AUSDT.BINANCE", 100, 101),
+            create_tick("AUSDT.BINANCE", 100, 101, last_price=100.2),
+        ]
+        for tick in ticks:
+            self.put_tick(tick)
+        self.put_tick(create_tick("BUSDT.BINANCE", 50, 51))
+        self.put_tick(create_tick("CUSDT.BINANCE", 10, 11))
+
+        self.assertEqual(
+            [call.args[0] for call in self.algo.update_tick.call_args_list],
+            ticks,
+            "算法收到的Tick不正确"
+        )
+
+        # 已结束的算法从映射中移除
+        self.algo.is_active.return_value = False
+        self.put_tick(create_tick("AUSDT.BINANCE", 100, 102))
+        self.assertEqual(self.algo.update_tick.call_count, 2, "已结束的算法不应收到Tick")
+        self.assertEqual(self.algo_engine.symbol_algo_map["AUSDT.BINANCE"], [], "已结束的算法未移除")
+
+    def test_algo_events(self):
+        """测试算法引擎不再监听全部Tick和价差事件"""
+        self.algo_engine.register_event()
+
+        event_types = [call.args[0] for call in self.event_engine.register.call_args_list]
+        self.assertNotIn(EVENT_TICK, event_types, "算法引擎不应监听Tick事件")
+        self.assertNotIn(EVENT_SPREAD_DATA, event_types, "算法引擎不应监听价差事件")
+
+
+
+class TestSpreadStrategyEngine(unittest.TestCase):
+    """测试价差策略引擎的成交推送"""
+
+    def setUp(self):
+        """测试环境准备"""
+        self.engine = SpreadEngine(MagicMock(), MagicMock())
+        self.strategy_engine = self.engine.strategy_engine
+
+        self.strategy = MagicMock()
+        self.strategy_engine.order_strategy_map["TEST.1"] = self.strategy
+
+    def test_duplicate_trade(self):
+        """测试重复推送的成交只回调策略一次，且成交号记录有上限"""
+        trade = TradeData(
+            symbol="AUSDT",
+            exchange=Exchange.BINANCE,
+            orderid="1",
+            tradeid="1",
+            price=100,
+            volume=1,
+            gateway_name="TEST"
+        )
+
+        self.strategy_engine.process_trade_event(Event(EVENT_TRADE, trade))
+        self.strategy_engine.process_trade_event(Event(EVENT_TRADE, trade))
+
+        self.assertEqual(self.strategy.on_trade.call_count, 1, "重复成交不应再次推送给策略")
+        self.assertEqual(self.strategy_engine.vt_tradeids.maxlen, 100_000, "成交号记录应有数量上限")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,7 @@ import unittest
 import os
 from datetime import datetime
 from ads_trading.trader.dbconnectors.sqlite_database import SqliteDatabase
+from ads_trading.trader.columnar import to_datetime64
 from ads_trading.trader.constant import Exchange, Interval
 from ads_trading.trader.object import BarData, TickData
 
@@ -118,6 +119,73 @@ class TestSqliteDatabase(unittest.TestCase):
         self.assertEqual(loaded_ticks[0].bid_price_1, 100.4, "行情数据的买一价不正确")
         self.assertEqual(loaded_ticks[0].ask_price_1, 100.6, "行情数据的卖一价不正确")
     
+    def test_bar_overview_count(self):
+        """测试K线汇总信息的增量更新
+        1. 保存K线数据后调用方的对象不被修改
+        2. 重复保存已有K线时汇总数量不变，只累加新插入的K线
+        """
+        def create_bar(minute):
+            return BarData(
+                symbol="OVERVIEW",
+                exchange=Exchange("BINANCE"),
+                datetime=datetime(2023, 1, 1, 0, minute, 0),
+                interval=Interval("1m"),
+                close_price=100.0 + minute,
+                gateway_name="DB"
+            )
+
+        self.db.delete_bar_data("OVERVIEW", Exchange("BINANCE"), Interval("1m"))
+
+        bars = [create_bar(i) for i in range(10)]
+        self.db.save_bar_data(bars)
+        self.assertEqual(bars[0].exchange, Exchange("BINANCE"), "保存后K线对象被修改")
+        self.assertEqual(bars[0].gateway_name, "DB", "保存后K线对象被修改")
+
+        # 5根已有K线和5根新K线
+        self.db.save_bar_data([create_bar(i) for i in range(5, 15)])
+
+        overviews = [
+            overview for overview in self.db.get_bar_overview()
+            if overview.symbol == "OVERVIEW"
+        ]
+        self.assertEqual(overviews[0].count, 15, "K线汇总数量不正确")
+        self.assertEqual(overviews[0].start, datetime(2023, 1, 1, 0, 0, 0), "K线汇总起始时间不正确")
+        self.assertEqual(overviews[0].end, datetime(2023, 1, 1, 0, 14, 0), "K线汇总结束时间不正确")
+
+        self.db.delete_bar_data("OVERVIEW", Exchange("BINANCE"), Interval("1m"))
+
+    def test_iter_bar_data(self):
+        """测试K线数据的分块迭代加载
+        1. 分块迭代加载的K线与一次性加载的结果一致
+        2. 结构化数组模式的价格与时间正确
+        """
+        self.db.delete_bar_data("ITER", Exchange("BINANCE"), Interval("1m"))
+
+        bars = [
+            BarData(
+                symbol="ITER",
+                exchange=Exchange("BINANCE"),
+                datetime=datetime(2023, 1, 1, 0, i, 0),
+                interval=Interval("1m"),
+                close_price=100.0 + i,
+                gateway_name="DB"
+            )
+            for i in range(25)
+        ]
+        self.db.save_bar_data(bars)
+
+        args = ("ITER", Exchange("BINANCE"), Interval("1m"), datetime(2023, 1, 1), datetime(2023, 1, 2))
+        loaded_bars = self.db.load_bar_data(*args)
+        iter_bars = list(self.db.iter_bar_data(*args, batch_size=10))
+        self.assertEqual(iter_bars, loaded_bars, "迭代加载的K线与一次性加载不一致")
+
+        records = list(self.db.iter_bar_records(*args, batch_size=10))
+        self.assertEqual([len(r) for r in records], [10, 10, 5], "结构化数组分块大小不正确")
+        self.assertEqual(records[2]["close_price"][-1], 124.0, "结构化数组收盘价不正确")
+        self.assertEqual(records[0]["datetime"][0], to_datetime64(loaded_bars[0].datetime), "结构化数组时间不正确")
+
+        self.db.delete_bar_data("ITER", Exchange("BINANCE"), Interval("1m"))
+
     def test_save_and_load_symbol_factor(self):
         """测试symbol factor数据的保存和加载功能
         1. 创建symbol factor数据对象
@@ -167,5 +235,50 @@ class TestSqliteDatabase(unittest.TestCase):
         # DBCoinAlphaFactor.delete().where(DBCoinAlphaFactor.symbol == "BTC").execute()
 
 
+    def test_migrate_factor_index(self):
+        """测试删除旧版本因子表只包含symbol和create_time的唯一索引
+        迁移后同一时间不同时间范围的因子都能保存
+        """
+        from peewee import SqliteDatabase as PeeweeSqliteDatabase
+        from ads_trading.trader.dbconnectors.sqlite_database import DBCoinAlphaFactor
+
+        sqlite = PeeweeSqliteDatabase(":memory:")
+        with sqlite.bind_ctx([DBCoinAlphaFactor]):
+            sqlite.create_tables([DBCoinAlphaFactor])
+            sqlite.execute_sql(
+                'CREATE UNIQUE INDEX "dbcoinalphafactor_symbol_create_time" '
+                'ON "dbcoinalphafactor" ("symbol", "create_time")'
+            )
+
+            database = SqliteDatabase.__new__(SqliteDatabase)
+            database.db = sqlite
+            database.migrate_factor_index()
+
+            columns = [index.columns for index in sqlite.get_indexes("dbcoinalphafactor")]
+            self.assertNotIn(["symbol", "create_time"], columns, "旧索引未删除")
+            self.assertIn(["symbol", "create_time", "recent_day", "recent_type"], columns, "新索引丢失")
+
+            factors = []
+            for recent_day in ["1", "7"]:
+                factors.append(DBCoinAlphaFactor(
+                    symbol="BTCUSDT",
+                    create_time=datetime(2023, 1, 1),
+                    recent_day=recent_day,
+                    recent_type="day",
+                    start=datetime(2022, 12, 1),
+                    highest_time=datetime(2022, 12, 2),
+                    highest_price=101.0,
+                    lowest_time=datetime(2022, 12, 3),
+                    lowest_price=99.0,
+                    max_drawdown="2.0%",
+                    high_drawdown="1.0%"
+                ))
+
+            self.assertTrue(database.save_symbol_factor(factors), "因子数据保存失败")
+            self.assertEqual(DBCoinAlphaFactor.select().count(), 2, "不同时间范围的因子互相覆盖")
+
+        sqlite.close()
+
+
 if __name__ == "__main__":
     unittest.main()
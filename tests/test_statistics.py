@@ -0,0 +1,101 @@
+"""
+回测统计指标测试模块
+测试向量化统计指标与pandas逐列计算结果一致，以及多条资金曲线批量计算
+"""
+import unittest
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from ads_trading.trader.statistics import STATISTICS_NAMES, DailyStatistics
+
+
+class TestDailyStatistics(unittest.TestCase):
+    """测试逐日统计指标"""
+
+    def setUp(self):
+        """测试环境准备
+        生成200天的随机逐日盈亏
+        """
+        rng = np.random.default_rng(7)
+        n = 200
+
+        self.capital = 1_000_000
+        self.df = pd.DataFrame({
+            "date": [date(2023, 1, 1) + timedelta(days=i) for i in range(n)],
+            "net_pnl": rng.normal(100, 3000, n),
+            "commission": rng.uniform(0, 10, n),
+            "slippage": rng.uniform(0, 10, n),
+            "turnover": rng.uniform(0, 100000, n),
+            "trade_count": rng.integers(0, 10, n),
+        }).set_index("date")
+
+        self.statistics = DailyStatistics(
+            self.df.index.values,
+            self.df["net_pnl"].values,
+            self.df["commission"].values,
+            self.df["slippage"].values,
+            self.df["turnover"].values,
+            self.df["trade_count"].values,
+            capital=self.capital
+        )
+
+    def test_pandas(self):
+        """测试与pandas计算结果一致"""
+        df = self.df
+        balance = df["net_pnl"].cumsum() + self.capital
+        returns = np.log(balance / balance.shift(1)).fillna(0)
+        highlevel = balance.rolling(min_periods=1, window=len(df), center=False).max()
+        drawdown = balance - highlevel
+        ddpercent = drawdown / highlevel * 100
+
+        max_drawdown_end = drawdown.idxmin()
+        max_drawdown_start = balance[:max_drawdown_end].idxmax()
+
+        daily_return = returns.mean() * 100
+        return_std = returns.std() * 100
+
+        expected = {
+            "start_date": df.index[0],
+            "end_date": df.index[-1],
+            "total_days": len(df),
+            "profit_days": len(df[df["net_pnl"] > 0]),
+            "loss_days": len(df[df["net_pnl"] < 0]),
+            "end_balance": balance.iloc[-1],
+            "max_drawdown": drawdown.min(),
+            "max_ddpercent": ddpercent.min(),
+            "max_drawdown_duration": (max_drawdown_end - max_drawdown_start).days,
+            "total_net_pnl": df["net_pnl"].sum(),
+            "total_trade_count": df["trade_count"].sum(),
+            "daily_return": daily_return,
+            "return_std": return_std,
+            "sharpe_ratio": daily_return / return_std * np.sqrt(240),
+        }
+
+        for name, value in expected.items():
+            self.assertAlmostEqual(self.statistics.get(name), value, msg=f"{name}不一致")
+
+        self.assertEqual(list(self.statistics.to_dict()), STATISTICS_NAMES, "统计指标字段不正确")
+
+    def test_batch(self):
+        """测试二维数组批量计算与逐条计算一致"""
+        curves = np.vstack([self.df["net_pnl"].values, -self.df["net_pnl"].values])
+        batch = DailyStatistics(self.df.index.values, curves, capital=self.capital)
+
+        for i, net_pnl in enumerate(curves):
+            single = DailyStatistics(self.df.index.values, net_pnl, capital=self.capital)
+
+            for name in ["max_drawdown", "max_drawdown_duration", "sharpe_ratio", "return_drawdown_ratio"]:
+                self.assertAlmostEqual(batch.get(name)[i], single.get(name), msg=f"第{i}条{name}不一致")
+
+    def test_flat(self):
+        """测试盈亏为0时夏普比率为0"""
+        statistics = DailyStatistics(self.df.index.values, np.zeros(len(self.df)), capital=self.capital)
+
+        self.assertEqual(statistics.sharpe_ratio, 0, "夏普比率不正确")
+        self.assertEqual(statistics.max_drawdown_duration, 0, "最长回撤天数不正确")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+"""
+行情推送流测试模块
+测试增量数据合并、积压断开、等待超时和事件引擎推送
+"""
+import importlib.util
+import os
+import unittest
+from collections import defaultdict
+from datetime import datetime
+from threading import Thread
+from time import monotonic
+
+from ads_trading.event import Event
+from ads_trading.trader.constant import Direction, Exchange, Status
+from ads_trading.trader.event import EVENT_ORDER, EVENT_TICK, EVENT_TRADE
+from ads_trading.trader.object import OrderData, TickData, TradeData
+
+try:
+    from ads_trading.web_ui.server import TradingEngine
+except ImportError:
+    # 网页服务依赖flask
+    TradingEngine = None
+
+# 直接加载stream模块，避免web_ui包初始化时导入flask
+STREAM_PATH = os.path.join(os.path.dirname(__file__), "..", "ads_trading", "web_ui", "stream.py")
+spec = importlib.util.spec_from_file_location("stream", STREAM_PATH)
+stream = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(stream)
+
+StreamClient = stream.StreamClient
+MarketStream = stream.MarketStream
+
+
+class TestStreamClient(unittest.TestCase):
+    """测试单个推送连接"""
+
+    def test_coalesce(self):
+        """测试同一频道同一键只保留最新数据"""
+        client = StreamClient()
+        client.put("market", "BTCUSDT", 1)
+        client.put("market", "BTCUSDT", 2)
+        client.put("market", "ETHUSDT", 3)
+        client.put("orders", "BTCUSDT", 4)
+
+        deltas = client.get(timeout=0)
+        self.assertEqual(deltas, {
+            "market": {"BTCUSDT": 2, "ETHUSDT": 3},
+            "orders": {"BTCUSDT": 4}
+        }, "增量数据合并不正确")
+        self.assertIsNone(client.get(timeout=0), "取出后待推送数据应为空")
+
+    def test_max_pending(self):
+        """测试待推送键超过上限时断开连接"""
+        client = StreamClient(max_pending=2)
+        client.put("market", "A", 1)
+        client.put("market", "B", 2)
+        self.assertFalse(client.closed, "未超过上限时不应断开")
+
+        client.put("market", "C", 3)
+        self.assertTrue(client.closed, "超过上限时应断开连接")
+        self.assertIsNone(client.get(timeout=0), "断开后应清空待推送数据")
+
+        client.put("market", "D", 4)
+        self.assertIsNone(client.get(timeout=0), "断开后不应再接收数据")
+
+    def test_get_timeout(self):
+        """测试无数据时等待超时返回None"""
+        client = StreamClient()
+        start = monotonic()
+        self.assertIsNone(client.get(timeout=0.05), "超时应返回None")
+        self.assertGreaterEqual(monotonic() - start, 0.04, "应等待到超时")
+
+    def test_get_wakeup(self):
+        """测试有数据时等待立即返回"""
+        client = StreamClient()
+        thread = Thread(target=client.put, args=("market", "BTCUSDT", 1))
+        thread.start()
+
+        deltas = client.get(timeout=5)
+        thread.join()
+        self.assertEqual(deltas, {"market": {"BTCUSDT": 1}}, "应取到新推送的数据")
+
+
+class TestMarketStream(unittest.TestCase):
+    """测试行情推送中心"""
+
+    def test_publish(self):
+        """测试推送到所有连接和取消订阅"""
+        market = MarketStream(max_pending=10)
+        first = market.subscribe()
+        second = market.subscribe()
+
+        market.publish("market", "BTCUSDT", 1)
+        market.publish("market", "BTCUSDT", 2)
+        self.assertEqual(first.get(timeout=0), {"market": {"BTCUSDT": 2}}, "连接应只收到最新数据")
+        self.assertEqual(second.get(timeout=0), {"market": {"BTCUSDT": 2}}, "所有连接都应收到数据")
+
+        market.unsubscribe(second)
+        self.assertTrue(second.closed, "取消订阅应关闭连接")
+
+        market.publish("market", "BTCUSDT", 3)
+        self.assertEqual(first.get(timeout=0), {"market": {"BTCUSDT": 3}}, "剩余连接应继续收到数据")
+        self.assertIsNone(second.get(timeout=0), "取消订阅后不应收到数据")
+
+
+class FakeEventEngine:
+    """记录注册的处理函数，推送事件时直接调用"""
+
+    def __init__(self):
+        self.handlers = defaultdict(list)
+
+    def register(self, type, handler):
+        self.handlers[type].append(handler)
+
+    def put(self, event):
+        for handler in self.handlers[event.type]:
+            handler(event)
+
+
+@unittest.skipIf(TradingEngine is None, "未安装flask")
+class TestTradingEngineEvents(unittest.TestCase):
+    """测试事件引擎的行情、委托和成交推送到网页"""
+
+    def setUp(self):
+        """测试环境准备"""
+        self.event_engine = FakeEventEngine()
+        self.engine = TradingEngine(self.event_engine)
+        self.client = self.engine.stream.subscribe()
+
+    def put_tick(self, last_price, pre_close=100):
+        """推送Tick事件"""
+        tick = TickData(
+            symbol="BTCUSDT",
+            exchange=Exchange.BINANCE,
+            datetime=datetime(2023, 1, 2),
+            last_price=last_price,
+            pre_close=pre_close,
+            volume=10,
+            bid_price_1=last_price - 1,
+            ask_price_1=last_price + 1,
+            gateway_name="TEST"
+        )
+        self.event_engine.put(Event(EVENT_TICK, tick))
+
+    def test_no_simulation(self):
+        """测试传入事件引擎时不使用模拟行情"""
+        self.assertFalse(hasattr(self.engine, "update_thread"), "不应启动模拟行情线程")
+        self.assertEqual(self.engine.get_market_data(), {}, "收到行情前不应有模拟数据")
+        self.assertEqual(
+            set(self.event_engine.handlers),
+            {EVENT_TICK, EVENT_ORDER, EVENT_TRADE},
+            "应注册行情、委托和成交事件"
+        )
+
+    def test_tick(self):
+        """测试行情更新市场数据并推送"""
+        self.put_tick(101)
+        self.put_tick(102)
+
+        data = {
+            "price": 102,
+            "change": 2.0,
+            "volume": 10,
+            "bid": 101,
+            "ask": 103,
+            "datetime": "2023-01-02 00:00:00"
+        }
+        self.assertEqual(self.client.get(timeout=0), {"market": {"BTCUSDT.BINANCE": data}}, "行情推送不正确")
+        self.assertEqual(self.engine.get_snapshot()["market"], {"BTCUSDT.BINANCE": data}, "快照行情不正确")
+
+    def test_tick_position(self):
+        """测试持仓合约的行情推送账户变化"""
+        self.put_tick(100)
+        self.engine.place_order("BTCUSDT.BINANCE", "buy", 2)
+        self.client.get(timeout=0)
+
+        self.put_tick(110)
+        deltas = self.client.get(timeout=0)
+        self.assertEqual(deltas["account"]["balance"]["pnl"], 20, "账户盈亏未随行情更新")
+        self.assertEqual(deltas["account"]["positions"]["BTCUSDT.BINANCE"]["value"], 220, "持仓市值未随行情更新")
+
+    def test_order_trade(self):
+        """测试委托和成交推送"""
+        order = OrderData(
+            symbol="BTCUSDT",
+            exchange=Exchange.BINANCE,
+            orderid="1",
+            direction=Direction.LONG,
+            price=100,
+            volume=2,
+            traded=1,
+            status=Status.PARTTRADED,
+            gateway_name="TEST"
+        )
+        trade = TradeData(
+            symbol="BTCUSDT",
+            exchange=Exchange.BINANCE,
+            orderid="1",
+            tradeid="2",
+            direction=Direction.LONG,
+            price=100,
+            volume=1,
+            gateway_name="TEST"
+        )
+        trade.datetime = datetime(2023, 1, 2)
+        self.event_engine.put(Event(EVENT_ORDER, order))
+        self.event_engine.put(Event(EVENT_TRADE, trade))
+
+        deltas = self.client.get(timeout=0)
+        self.assertEqual(deltas["orders"], {"TEST.1": {
+            "symbol": "BTCUSDT.BINANCE",
+            "direction": Direction.LONG.value,
+            "price": 100,
+            "volume": 2,
+            "traded": 1,
+            "status": Status.PARTTRADED.value
+        }}, "委托推送不正确")
+        self.assertEqual(deltas["trades"], {"TEST.2": {
+            "symbol": "BTCUSDT.BINANCE",
+            "direction": Direction.LONG.value,
+            "price": 100,
+            "volume": 1,
+            "datetime": "2023-01-02 00:00:00"
+        }}, "成交推送不正确")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,14 +3,21 @@
 测试各种工具函数的功能和正确性，包括数值处理、K线生成器和数组管理器等
 """
 import unittest
+from unittest.mock import patch
 from decimal import Decimal
 from ads_trading.trader.utility import (
     round_to, floor_to, ceil_to, get_digits,
-    BarGenerator, ArrayManager, extract_vt_symbol, generate_vt_symbol
+    BarGenerator, ArrayManager, extract_vt_symbol, generate_vt_symbol,
+    IncrementalSMA, IncrementalEMA, IncrementalATR, IncrementalRSI,
+    IncrementalBoll, IncrementalDonchian, IncrementalMACD,
+    JsonWriter, RecentIds, load_json, get_file_path
 )
+import numpy as np
+import talib
 from ads_trading.trader.constant import Exchange, Interval
 from ads_trading.trader.object import BarData, TickData
 from datetime import datetime
+from time import monotonic, sleep
 
 
 class TestUtilityFunctions(unittest.TestCase):
@@ -214,6 +221,192 @@ class TestArrayManager(unittest.TestCase):
         # 验证上下轨关系
         self.assertGreaterEqual(upper, lower, "布林带上轨小于下轨")
 
+    def test_ring_buffer(self):
+        """测试环形缓冲区
+        验证数组管理器写满后继续更新时，返回的数组按时间顺序连续排列
+        """
+        for i in range(3, 5):
+            bar = BarData(
+                symbol="BTC",
+                exchange=Exchange("BINANCE"),
+                datetime=datetime(2023, 1, 1, 0, 0, i),
+                gateway_name="DB",
+                close_price=100 + i
+            )
+            self.am.update_bar(bar)
+
+        self.assertEqual(self.am.close.tolist(), [102, 103, 104], "收盘价数组顺序不正确")
+        self.assertTrue(self.am.close.flags["C_CONTIGUOUS"], "收盘价数组不是连续内存")
+
+
+class TestIncrementalIndicator(unittest.TestCase):
+    """测试增量技术指标"""
+
+    def setUp(self):
+        """测试环境准备
+        生成随机游走K线，并计算TA-Lib全量指标作为对照
+        """
+        rng = np.random.default_rng(0)
+        n = 500
+        self.close = 100 + np.cumsum(rng.normal(0, 1, n))
+        self.high = self.close + rng.random(n)
+        self.low = self.close - rng.random(n)
+
+        self.bars = []
+        for i in range(n):
+            bar = BarData(
+                symbol="BTC",
+                exchange=Exchange("BINANCE"),
+                datetime=datetime(2023, 1, 1),
+                gateway_name="DB",
+                high_price=self.high[i],
+                low_price=self.low[i],
+                close_price=self.close[i]
+            )
+            self.bars.append(bar)
+
+    def assert_series_equal(self, values, expected, msg):
+        """对比指标序列，未初始化部分均为nan"""
+        values = np.array(values, dtype=float)
+        np.testing.assert_array_equal(np.isnan(values), np.isnan(expected), msg)
+        np.testing.assert_allclose(values, expected, rtol=1e-10, atol=1e-10, err_msg=msg)
+
+    def test_single_value(self):
+        """测试单值指标
+        验证SMA、EMA、ATR、RSI增量计算结果与TA-Lib一致
+        """
+        indicators = [
+            (IncrementalSMA(20), talib.SMA(self.close, 20)),
+            (IncrementalEMA(20), talib.EMA(self.close, 20)),
+            (IncrementalATR(14), talib.ATR(self.high, self.low, self.close, 14)),
+            (IncrementalRSI(14), talib.RSI(self.close, 14)),
+        ]
+
+        for indicator, expected in indicators:
+            values = []
+            for bar in self.bars:
+                value = indicator.update_bar(bar)
+                self.assertTrue(value == indicator.value or np.isnan(value), "update_bar返回值不正确")
+                values.append(value)
+
+            self.assert_series_equal(values, expected, f"{type(indicator).__name__}计算结果不正确")
+
+    def test_channel(self):
+        """测试通道指标
+        验证布林带、唐奇安通道、MACD增量计算结果与TA-Lib一致
+        """
+        boll = IncrementalBoll(20, 2)
+        donchian = IncrementalDonchian(20)
+        macd = IncrementalMACD(12, 26, 9)
+
+        results = {"boll": [], "donchian": [], "macd": []}
+        for bar in self.bars:
+            results["boll"].append(boll.update_bar(bar))
+            results["donchian"].append(donchian.update_bar(bar))
+            results["macd"].append(macd.update_bar(bar))
+
+        mid = talib.SMA(self.close, 20)
+        std = talib.STDDEV(self.close, 20, 1)
+        up, down = zip(*results["boll"])
+        self.assert_series_equal(up, mid + std * 2, "布林带上轨计算结果不正确")
+        self.assert_series_equal(down, mid - std * 2, "布林带下轨计算结果不正确")
+
+        up, down = zip(*results["donchian"])
+        self.assert_series_equal(up, talib.MAX(self.high, 20), "唐奇安通道上轨计算结果不正确")
+        self.assert_series_equal(down, talib.MIN(self.low, 20), "唐奇安通道下轨计算结果不正确")
+
+        for values, expected in zip(zip(*results["macd"]), talib.MACD(self.close, 12, 26, 9)):
+            self.assert_series_equal(values, expected, "MACD计算结果不正确")
+
+        # 窗口类指标与数组管理器结果一致
+        am = ArrayManager(100)
+        for bar in self.bars[-100:]:
+            am.update_bar(bar)
+        self.assertAlmostEqual(am.donchian(20)[0], donchian.up, msg="唐奇安通道与数组管理器不一致")
+        self.assertAlmostEqual(am.boll(20, 2)[0], boll.up, msg="布林带与数组管理器不一致")
+
+
+class TestRecentIds(unittest.TestCase):
+    """测试有界去重集合"""
+
+    def test_maxlen(self):
+        """测试超过容量时淘汰最早的编号"""
+        ids = RecentIds(maxlen=3)
+
+        self.assertTrue(ids.add("a"), "首次添加应返回True")
+        self.assertFalse(ids.add("a"), "重复添加应返回False")
+
+        for id in ["b", "c", "d"]:
+            ids.add(id)
+
+        self.assertEqual(len(ids), 3, "容量限制失效")
+        self.assertNotIn("a", ids, "最早的编号未被淘汰")
+        self.assertIn("d", ids, "最新的编号丢失")
+
+    def test_ttl(self):
+        """测试过期编号被淘汰，未过期编号保留"""
+        ids = RecentIds(ttl=10)
+
+        with patch("ads_trading.trader.utility.monotonic") as monotonic:
+            monotonic.return_value = 100.0
+            ids.add("a")
+
+            monotonic.return_value = 105.0
+            ids.add("b")
+            self.assertIn("a", ids, "未过期编号被淘汰")
+
+            monotonic.return_value = 112.0
+            ids.add("c")
+
+        self.assertNotIn("a", ids, "过期编号未被淘汰")
+        self.assertIn("b", ids, "未过期编号被淘汰")
+        self.assertIn("c", ids, "最新的编号丢失")
+
+
+class TestJsonWriter(unittest.TestCase):
+    """测试后台JSON写入"""
+
+    def test_save(self):
+        """测试关闭时写入最后一次数据"""
+        filename = "test_json_writer.json"
+        writer = JsonWriter(filename)
+
+        for i in range(100):
+            writer.save({"pos": i})
+        writer.close()
+
+        self.assertEqual(load_json(filename), {"pos": 99}, "最后一次数据未写入")
+        get_file_path(filename).unlink()
+
+    def test_interval(self):
+        """测试写入间隔内的多次更新合并为一次写入"""
+        filename = "test_json_writer_interval.json"
+        writer = JsonWriter(filename, interval=10)
+
+        writer.save({"pos": 0})
+        sleep(0.1)
+        for i in range(1, 100):
+            writer.save({"pos": i})
+        sleep(0.1)
+
+        self.assertEqual(load_json(filename), {"pos": 0}, "写入间隔内不应再次写入")
+
+        start = monotonic()
+        writer.close()
+        self.assertLess(monotonic() - start, 1, "关闭时未立即写入")
+        self.assertEqual(load_json(filename), {"pos": 99}, "最后一次数据未写入")
+        get_file_path(filename).unlink()
+
+    def test_save_func(self):
+        """测试使用指定的函数写入"""
+        saved = []
+        writer = JsonWriter("test_json_writer_func.json", save_func=lambda filename, data: saved.append((filename, data)))
+        writer.save({"pos": 1})
+        writer.close()
+
+        self.assertEqual(saved, [("test_json_writer_func.json", {"pos": 1})], "未使用指定的函数写入")
+        self.assertFalse(get_file_path("test_json_writer_func.json").exists(), "不应写入默认路径")
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
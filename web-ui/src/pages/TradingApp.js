@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { Chart as ChartJS, CategoryScale, LinearScale, PointElement, LineElement, Title, Tooltip, Legend } from 'chart.js';
 import { Line } from 'react-chartjs-2';
+import useMarketStream from '../useMarketStream';
 import '../App.css';
 
 // 注册Chart.js组件
@@ -15,10 +16,10 @@ ChartJS.register(
 );
 
 function TradingApp() {
+  // 行情、余额和持仓由后端推送，只为本次推送中变化的合约追加价格点
+  const { marketData, balance, positions } = useMarketStream((market) => updatePriceHistory(market));
+
   // 交易页面专属状态
-  const [marketData, setMarketData] = useState({});
-  const [balance, setBalance] = useState({});
-  const [positions, setPositions] = useState({});
   const [history, setHistory] = useState([]);
   const [performance, setPerformance] = useState({});
   const [order, setOrder] = useState({ symbol: 'BTC/USDT', side: 'buy', quantity: '' });
@@ -30,15 +31,6 @@ function TradingApp() {
   const chartRef = useRef(null);
   const priceHistoryRef = useRef({}); // 用于存储价格历史数据
 
-  // 初始化价格历史数据
-  useEffect(() => {
-    Object.keys(marketData).forEach(symbol => {
-      if (!priceHistoryRef.current[symbol]) {
-        priceHistoryRef.current[symbol] = { prices: [], times: [] };
-      }
-    });
-  }, [marketData]);
-
   // 定期获取数据
   useEffect(() => {
     fetchData();
@@ -49,24 +41,6 @@ function TradingApp() {
   const fetchData = async () => {
     try {
       // 模拟数据获取
-      const mockMarketData = {
-        'BTC/USDT': { price: 45000 + Math.random() * 1000, change: (Math.random() - 0.5) * 5, volume: 1000000 },
-        'ETH/USDT': { price: 3000 + Math.random() * 100, change: (Math.random() - 0.5) * 5, volume: 2000000 },
-        'BNB/USDT': { price: 300 + Math.random() * 20, change: (Math.random() - 0.5) * 5, volume: 500000 },
-        'SOL/USDT': { price: 110 + Math.random() * 10, change: (Math.random() - 0.5) * 5, volume: 800000 }
-      };
-
-      const mockBalance = {
-        total: 15000 + Math.random() * 5000,
-        available: 10000 + Math.random() * 2000,
-        pnl: (Math.random() - 0.5) * 2000
-      };
-
-      const mockPositions = {
-        'BTC/USDT': { quantity: 0.1 + Math.random() * 0.2, current_price: mockMarketData['BTC/USDT'].price, value: (0.1 + Math.random() * 0.2) * mockMarketData['BTC/USDT'].price },
-        'ETH/USDT': { quantity: 2 + Math.random() * 3, current_price: mockMarketData['ETH/USDT'].price, value: (2 + Math.random() * 3) * mockMarketData['ETH/USDT'].price }
-      };
-
       const mockHistory = [
         { id: 1, symbol: 'BTC/USDT', side: 'buy', quantity: 0.1, price: 44500, total: 4450, datetime: '2023-11-15 10:30:00' },
         { id: 2, symbol: 'ETH/USDT', side: 'buy', quantity: 2, price: 2950, total: 5900, datetime: '2023-11-15 11:45:00' },
@@ -80,24 +54,18 @@ function TradingApp() {
         total_volume: 1250000
       };
 
-      setMarketData(mockMarketData);
-      setBalance(mockBalance);
-      setPositions(mockPositions);
       setHistory(mockHistory);
       setPerformance(mockPerformance);
-      
-      // 更新价格历史数据
-      updatePriceHistory(mockMarketData);
     } catch (error) {
       console.error('Error fetching data:', error);
     }
   };
 
-  const updatePriceHistory = (marketData) => {
+  const updatePriceHistory = (market) => {
     const now = new Date();
     const timeLabel = now.toLocaleTimeString();
     
-    Object.entries(marketData).forEach(([symbol, data]) => {
+    Object.entries(market).forEach(([symbol, data]) => {
       if (!priceHistoryRef.current[symbol]) {
         priceHistoryRef.current[symbol] = { prices: [], times: [] };
       }
@@ -152,8 +120,17 @@ function TradingApp() {
 
     setLoading(true);
     try {
-      // 模拟下单
-      await new Promise(resolve => setTimeout(resolve, 1000));
+      const response = await fetch('/api/order', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ symbol: order.symbol, side: order.side, quantity: parseFloat(order.quantity) })
+      });
+      const result = await response.json();
+      if (!response.ok) {
+        throw new Error(result.error);
+      }
+
+      // 余额和持仓变化由后端推送
       alert(`订单执行成功! ${order.side === 'buy' ? '买入' : '卖出'} ${order.quantity} ${order.symbol}`);
       setOrder({ ...order, quantity: '' });
       fetchData();
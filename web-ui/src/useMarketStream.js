@@ -0,0 +1,54 @@
+import { useState, useEffect, useRef } from 'react';
+
+// 订阅后端推送的行情和账户数据
+// 连接建立时收到完整快照，之后只收到变化的部分；断线后浏览器自动重连并重新获取快照
+// onMarket在收到快照或行情增量时调用，参数只包含本次推送的合约
+function useMarketStream(onMarket) {
+  const [marketData, setMarketData] = useState({});
+  const [balance, setBalance] = useState({});
+  const [positions, setPositions] = useState({});
+
+  // 保存最新的回调，避免回调变化时重新建立连接
+  const onMarketRef = useRef(onMarket);
+  onMarketRef.current = onMarket;
+
+  useEffect(() => {
+    const source = new EventSource('/api/stream');
+
+    source.addEventListener('snapshot', (event) => {
+      const snapshot = JSON.parse(event.data);
+      setMarketData(snapshot.market);
+      if (onMarketRef.current) {
+        onMarketRef.current(snapshot.market);
+      }
+      setBalance(snapshot.account.balance);
+      setPositions(snapshot.account.positions);
+    });
+
+    source.onmessage = (event) => {
+      const deltas = JSON.parse(event.data);
+
+      if (deltas.market) {
+        setMarketData(prev => ({ ...prev, ...deltas.market }));
+        if (onMarketRef.current) {
+          onMarketRef.current(deltas.market);
+        }
+      }
+
+      if (deltas.account) {
+        if (deltas.account.balance) {
+          setBalance(deltas.account.balance);
+        }
+        if (deltas.account.positions) {
+          setPositions(deltas.account.positions);
+        }
+      }
+    };
+
+    return () => source.close();
+  }, []);
+
+  return { marketData, balance, positions };
+}
+
+export default useMarketStream;